@@ -85,7 +85,12 @@ Config file should be a json in the following format:
   "disable_all_hlil_opts" : false,      // Disable all optimizations in HLIL. DEFAULT=false
   "disable_relu_maxpool_opts" : false,  // Disable Relu-Maxpool optimization. DEFAULT=false
   "disable_garbage_collection" : false, // Disable Garbage Collection optimization. DEFAULT=false
-  "disable_trunc_opts" : false          // Disable truncation placement optimization. DEFAULT=false
+  "disable_trunc_opts" : false,         // Disable truncation placement optimization. DEFAULT=false
+
+  "omp_threshold" : 0,  // CPP/CPPRING only. Run loops over at least this many elements
+                        // in parallel with OpenMP. DEFAULT=0 (disabled). The number of
+                        // threads is set at runtime with OMP_NUM_THREADS.
+  "omp_collapse" : 2    // Number of nested loops a parallel loop collapses. DEFAULT=2
 }
 """,
     )
@@ -128,6 +133,8 @@ def generate_code(params, role, debug=False):
     disable_trunc_opts = (
         False if params["disable_trunc_opts"] is None else params["disable_trunc_opts"]
     )
+    omp_threshold = 0 if params["omp_threshold"] is None else params["omp_threshold"]
+    omp_collapse = 2 if params["omp_collapse"] is None else params["omp_collapse"]
     modulo = params["modulo"]
     backend = "OT" if params["backend"] is None else params["backend"]
     assert bitlength <= 64 and bitlength >= 1, "Bitlen must be >= 1 and <= 64"
@@ -184,6 +191,10 @@ def generate_code(params, role, debug=False):
     seedot_args += "--disableRMO {} ".format(disable_relu_maxpool_opts)
     seedot_args += "--disableLivenessOpti {} ".format(disable_garbage_collection)
     seedot_args += "--disableTruncOpti {} ".format(disable_trunc_opts)
+    if target in ["CPP", "CPPRING"] and omp_threshold > 0:
+        seedot_args += "--parallelThreshold {} --parallelCollapse {} ".format(
+            omp_threshold, omp_collapse
+        )
 
     seedot_script = os.path.join(athos_dir, "SeeDot", "SeeDot.py")
     print("python3 {} ".format(seedot_script) + seedot_args)
@@ -258,6 +269,8 @@ def generate_code(params, role, debug=False):
     else:
         opt_flag = "-O3"
     if target in ["CPP", "CPPRING"]:
+        if omp_threshold > 0:
+            opt_flag += " -fopenmp"
         os.system(
             'g++ {opt_flag} -w "{file}" -o "{output}"'.format(
                 file=output_file, output=program_path, opt_flag=opt_flag
@@ -0,0 +1,108 @@
+"""
+OpenMP parallel loop benchmark for the cleartext (CPP) target.
+
+Compiles sample networks from Athos/Networks with CompileSampleNetworks.py,
+once without parallel loops and once for each omp_threshold, and times the
+programs on the network's sample input with OMP_NUM_THREADS set to each
+thread count. Prints the best of --repeat runs for every combination.
+
+Run from Athos (needs the EzPC compiler built and the networks set up, as
+for CompileSampleNetworks.py):
+
+    python3 CompilerScripts/benchmark_openmp.py [Lenet ResNet ...]
+        [--thresholds 4096 65536] [--threads 1 2 4 8] [--collapse 2]
+"""
+
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ATHOS = os.path.join(HERE, "..")
+NETWORKS = os.path.join(ATHOS, "Networks")
+
+
+def compile_network(network, scale, threshold, collapse):
+    config = {
+        "network_name": network,
+        "target": "CPP",
+        "scale": scale,
+        "run_in_tmux": False,
+        "omp_threshold": threshold,
+        "omp_collapse": collapse,
+    }
+    with tempfile.NamedTemporaryFile("w", suffix=".json", delete=False) as f:
+        json.dump(config, f)
+        config_path = f.name
+    try:
+        subprocess.check_call(
+            [sys.executable, "CompileSampleNetworks.py", "--config", config_path],
+            cwd=ATHOS,
+            stdout=subprocess.DEVNULL,
+        )
+    finally:
+        os.remove(config_path)
+    # Keep one binary per threshold, the next compile overwrites the program
+    program = os.path.join(NETWORKS, network, network + "_CPP.out")
+    if not os.path.exists(program):
+        sys.exit("Compilation of {} failed".format(network))
+    binary = os.path.join(NETWORKS, network, "{}_CPP_omp{}.out".format(network, threshold))
+    shutil.copy(program, binary)
+    return binary
+
+
+def run(network, binary, scale, threads, repeat):
+    model_dir = os.path.join(NETWORKS, network)
+    inputs = os.path.join(model_dir, "model_input_scale_{}.inp".format(scale))
+    weights = os.path.join(model_dir, "model_weights_scale_{}.inp".format(scale))
+    env = dict(os.environ, OMP_NUM_THREADS=str(threads))
+    with open(inputs) as fi, open(weights) as fw:
+        data = fi.read() + fw.read()
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run(
+            [binary],
+            input=data,
+            env=env,
+            stdout=subprocess.DEVNULL,
+            universal_newlines=True,
+            check=True,
+        )
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("networks", nargs="*", default=["Lenet", "ResNet"])
+    parser.add_argument("--thresholds", nargs="+", type=int, default=[4096, 65536])
+    parser.add_argument("--threads", nargs="+", type=int, default=[1, 2, 4, 8])
+    parser.add_argument("--collapse", type=int, default=2)
+    parser.add_argument("--scale", type=int, default=12)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print("{:<12} {:>10} {:>8} {:>10} {:>8}".format(
+        "network", "threshold", "threads", "time (s)", "speedup"))
+    for network in args.networks:
+        binary = compile_network(network, args.scale, 0, args.collapse)
+        base = run(network, binary, args.scale, 1, args.repeat)
+        print("{:<12} {:>10} {:>8} {:>10.3f} {:>8.2f}".format(
+            network, "off", 1, base, 1.0))
+        for threshold in args.thresholds:
+            binary = compile_network(network, args.scale, threshold, args.collapse)
+            for threads in args.threads:
+                t = run(network, binary, args.scale, threads, args.repeat)
+                print("{:<12} {:>10} {:>8} {:>10.3f} {:>8.2f}".format(
+                    network, threshold, threads, t, base / t))
+
+
+if __name__ == "__main__":
+    main()
@@ -51,6 +51,8 @@ Sample config:
   "disable_relu_maxpool_opts"
   "disable_garbage_collection"
   "disable_trunc_opts"
+  "omp_threshold"
+  "omp_collapse"
 }
 """
 
@@ -194,6 +196,8 @@ def parse_config(config, sample_network=False):
         config, "disable_garbage_collection"
     )
     disable_trunc = get_opt_bool_param(config, "disable_trunc_opts")
+    omp_threshold = get_opt_int_param(config, "omp_threshold")
+    omp_collapse = get_opt_int_param(config, "omp_collapse")
 
     params = {
         "input_tensors": input_t_info,
@@ -208,6 +212,8 @@ def parse_config(config, sample_network=False):
         "disable_relu_maxpool_opts": disable_rmo,
         "disable_garbage_collection": disable_garbage_collection,
         "disable_trunc_opts": disable_trunc,
+        "omp_threshold": omp_threshold,
+        "omp_collapse": omp_collapse,
     }
     if sample_network:
         params["network_name"] = network_name
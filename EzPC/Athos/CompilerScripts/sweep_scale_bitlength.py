@@ -0,0 +1,249 @@
+"""
+Scale and bitlength sweep for ONNX models.
+
+Simulates the fixed point inference of an ONNX model on a validation set
+for every (scale, bitlength) of a grid, with the SeeDot interpreter
+(SeeDot/Interpreter.py) in a process pool, and compares it to the float
+model run with onnxruntime. Prints the accuracy of every configuration and
+writes the config.json for CompileONNXGraph.py with the cheapest one whose
+accuracy is within --max_drop of the float model.
+
+Communication is proportional to the bitlength (the size of the shares and
+of the OT messages), so configurations are ranked by bitlength and then by
+scale (the number of bits truncations remove). The ring is simulated modulo
+2^bitlength, as in the CPP and the SCI OT targets; with the SCI HE backend
+the recommendation is only indicative.
+
+The validation set is a .npy array with one input of the model per row (in
+the layout of the ONNX input). With --labels (a .npy array of class indices)
+the accuracy is the top-1 accuracy, otherwise it is the fraction of inputs
+on which the prediction is the same as the float model's. The prediction is
+the argmax over the first output tensor (or its value, if the model ends in
+an ArgMax).
+
+Run from Athos with a config for CompileONNXGraph.py (model_name,
+output_tensors, target, ...); scale and bitlength are taken from the sweep:
+
+    python3 CompilerScripts/sweep_scale_bitlength.py --config config.json
+        --inputs val_x.npy [--labels val_y.npy] [--scales 8-16]
+        [--bitlengths 32-64] [--max_drop 0.01] [--workers 8]
+        [--output sweep_config.json]
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+
+import numpy as np
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ATHOS = os.path.join(HERE, "..")
+sys.path.append(ATHOS)
+sys.path.append(os.path.join(ATHOS, "SeeDot"))
+import CompilerScripts.parse_config as parse_config
+import Interpreter
+
+# Set in every worker by init_worker
+_data = {}
+
+
+def parse_range(s):
+    values = []
+    for part in s.split(","):
+        if "-" in part:
+            (lo, hi) = part.split("-")
+            values.extend(range(int(lo), int(hi) + 1))
+        else:
+            values.append(int(part))
+    return sorted(set(values))
+
+
+def target_bitlength(target, bitlength):
+    # As CompileONNXGraph.generate_code
+    if target == "CPP":
+        return 64 if bitlength > 32 else 32
+    return bitlength
+
+
+def predictions(outputs, argmax_output):
+    out = outputs[0].reshape(outputs[0].shape[0], -1)
+    if argmax_output:
+        return out[:, 0].astype(np.int64)
+    return np.argmax(out, axis=1)
+
+
+def run_float_model(model_path, inputs, input_shape):
+    import onnxruntime
+
+    sess = onnxruntime.InferenceSession(model_path)
+    input_name = sess.get_inputs()[0].name
+    outputs = []
+    for x in inputs:
+        x = x.reshape(input_shape).astype(np.float32)
+        out = sess.run(None, {input_name: x})[0]
+        outputs.append(out.flatten())
+    outputs = np.stack(outputs)
+    argmax_output = np.issubdtype(outputs.dtype, np.integer)
+    preds = predictions([outputs], argmax_output)
+    return (preds, outputs.astype(np.float64))
+
+
+def init_worker(data):
+    _data.update(data)
+
+
+def simulate(config):
+    (scale, bitlength) = config
+    ast = Interpreter.loadProgram(_data["ast_file"], _data["disable_rmo"])
+    interpreter = Interpreter.Interpreter(
+        ast, scale, bitlength, _data["disable_trunc_opts"]
+    )
+    # Weights were dumped at the largest scale of the grid. Truncating them
+    # again gives exactly the weights a compilation at scale would dump.
+    weights = _data["weights"]
+    shift = np.int64(_data["weights_scale"] - scale)
+    server = np.where(weights < 0, -((-weights) >> shift), weights >> shift)
+    preds = []
+    max_error = 0.0
+    for start in range(0, _data["inputs"].shape[0], _data["batch"]):
+        x = _data["inputs"][start : start + _data["batch"]]
+        client = np.trunc(np.ldexp(x, scale)).astype(np.int64)
+        outputs = interpreter.run(client, server)
+        argmax_output = interpreter.outputScales[0] == -1
+        preds.append(predictions(outputs, argmax_output))
+        if not argmax_output:
+            out = outputs[0].reshape(x.shape[0], -1).astype(np.float64)
+            out = np.ldexp(out, -scale)
+            ref = _data["float_outputs"][start : start + _data["batch"]]
+            max_error = max(max_error, float(np.abs(out - ref).max()))
+    return (np.concatenate(preds), max_error)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Find the cheapest scale and bitlength for an ONNX model."
+    )
+    parser.add_argument("--config", required=True, help="CompileONNXGraph config")
+    parser.add_argument("--inputs", required=True, help="Validation inputs (.npy)")
+    parser.add_argument("--labels", help="Validation labels (.npy)")
+    parser.add_argument("--scales", default="8-16")
+    parser.add_argument("--bitlengths", default="32-64")
+    parser.add_argument(
+        "--max_drop",
+        type=float,
+        default=0.01,
+        help="Largest accepted accuracy drop from the float model",
+    )
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--batch", type=int, default=64, help="Inputs per run")
+    parser.add_argument("--output", default="sweep_config.json")
+    args = parser.parse_args()
+
+    config = parse_config.get_config(args.config)
+    params = parse_config.parse_config(config)
+    if not params["model_name"].endswith(".onnx"):
+        sys.exit("Only ONNX models are supported")
+    target = params["target"]
+    scales = parse_range(args.scales)
+    bitlengths = sorted(
+        set(target_bitlength(target, b) for b in parse_range(args.bitlengths))
+    )
+
+    # Generate the SeeDot program and dump the weights once
+    import ONNXCompiler.process_onnx as compile_onnx
+
+    weights_path = compile_onnx.compile(
+        params["model_name"],
+        params["input_tensors"],
+        params["output_tensors"],
+        max(scales),
+        True,
+        "server",
+    )
+    ast_file = os.path.join(
+        os.path.dirname(os.path.abspath(params["model_name"])), "astOutput.pkl"
+    )
+    disable_rmo = bool(params["disable_all_hlil_opts"]) or bool(
+        params["disable_relu_maxpool_opts"]
+    )
+    disable_trunc_opts = bool(params["disable_trunc_opts"])
+
+    interpreter = Interpreter.Interpreter(
+        Interpreter.loadProgram(ast_file, disable_rmo), max(scales), 64
+    )
+    client_inputs = [
+        node
+        for (name, node) in interpreter.inputNodes
+        if node.inputByParty == Interpreter.AST.Party.CLIENT
+    ]
+    if len(client_inputs) != 1:
+        sys.exit("Only models with one input are supported")
+    input_shape = client_inputs[0].shape
+
+    inputs = np.load(args.inputs).astype(np.float64)
+    inputs = inputs.reshape(inputs.shape[0], -1)
+    if inputs.shape[1] != interpreter.inputSize(Interpreter.AST.Party.CLIENT):
+        sys.exit(
+            "Validation inputs have {} values per row, the model takes {}".format(
+                inputs.shape[1], interpreter.inputSize(Interpreter.AST.Party.CLIENT)
+            )
+        )
+    labels = None if args.labels is None else np.load(args.labels).flatten()
+
+    (float_preds, float_outputs) = run_float_model(
+        params["model_name"], inputs, input_shape
+    )
+    if labels is not None:
+        baseline = float(np.mean(float_preds == labels))
+    else:
+        baseline = 1.0
+
+    data = {
+        "ast_file": ast_file,
+        "disable_rmo": disable_rmo,
+        "disable_trunc_opts": disable_trunc_opts,
+        "weights": Interpreter.readInts(weights_path),
+        "weights_scale": max(scales),
+        "inputs": inputs,
+        "float_outputs": float_outputs,
+        "batch": args.batch,
+    }
+    grid = [(s, b) for b in bitlengths for s in scales]
+    with multiprocessing.Pool(args.workers, init_worker, (data,)) as pool:
+        results = pool.map(simulate, grid, chunksize=1)
+
+    print("Float model accuracy: {:.4f}".format(baseline))
+    print(
+        "{:>6} {:>10} {:>10} {:>10} {:>12}".format(
+            "scale", "bitlength", "accuracy", "agreement", "max error"
+        )
+    )
+    best = None
+    for ((scale, bitlength), (preds, max_error)) in zip(grid, results):
+        agreement = float(np.mean(preds == float_preds))
+        accuracy = agreement if labels is None else float(np.mean(preds == labels))
+        print(
+            "{:>6} {:>10} {:>10.4f} {:>10.4f} {:>12.6f}".format(
+                scale, bitlength, accuracy, agreement, max_error
+            )
+        )
+        if best is None and accuracy >= baseline - args.max_drop:
+            best = (scale, bitlength)
+
+    if best is None:
+        sys.exit(
+            "No configuration is within {} of the float model".format(args.max_drop)
+        )
+    (scale, bitlength) = best
+    print("Cheapest configuration: scale {} bitlength {}".format(scale, bitlength))
+    config["scale"] = scale
+    config["bitlength"] = bitlength
+    with open(args.output, "w") as f:
+        json.dump(config, f, indent=2)
+    print("Config written to {}".format(args.output))
+
+
+if __name__ == "__main__":
+    main()
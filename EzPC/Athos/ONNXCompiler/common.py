@@ -24,7 +24,6 @@ SOFTWARE.
 import numpy
 import os
 import _pickle as pickle
-import re
 
 
 def get_data_type(proto_val):
@@ -109,21 +108,3 @@ def match_output(decimal=4):
     b = extract_txt_to_numpy_array("debug/cpp_output.txt")
     numpy.testing.assert_almost_equal(a, b, decimal)
 
-
-def add_openmp_threading_to_convolution(file):
-    with open(file, "r+") as f:
-        newfilename = file[:-5] + "1.cpp"
-        g = open(newfilename, "w")
-        content = f.read()
-        content1 = re.sub(
-            "void Conv3DLoopInner\(.*",
-            "\g<0> \n #pragma omp parallel for collapse(5) ",
-            content,
-        )
-        content2 = re.sub(
-            "void ConvTranspose3DLoopInner\(.*",
-            "\g<0> \n #pragma omp parallel for collapse(5) ",
-            content1,
-        )
-        g.write(content2)
-        g.close()
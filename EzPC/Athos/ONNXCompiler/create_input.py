@@ -30,6 +30,7 @@ import onnx
 from onnx import helper
 import math
 from onnx import numpy_helper
+from initializer_store import InitializerStore
 
 
 def main():
@@ -41,7 +42,7 @@ def main():
     scaling_factor = int(sys.argv[2])
     file_path = "models/" + file_name
     model_name = file_name[:-5]  # name without the '.onnx' extension
-    model = onnx.load(file_path)
+    model = onnx.load(file_path, load_external_data=False)
     graph_def = model.graph
 
     # Generating input
@@ -58,18 +59,15 @@ def main():
     f.write(chunk)
     f.close()
 
-    model_name_to_val_dict = {
-        init_vals.name: numpy_helper.to_array(init_vals).tolist()
-        for init_vals in model.graph.initializer
-    }
+    store = InitializerStore(model, os.path.dirname(file_path))
 
-    preprocess_batch_normalization(graph_def, model_name_to_val_dict)
+    preprocess_batch_normalization(graph_def, store)
 
     chunk_n = ""
     cnt_n = 0
-    for init_vals in model.graph.initializer:
+    for name in store.names():
         (chunk_1, cnt_1) = common.numpy_float_array_to_fixed_point_val_str(
-            np.asarray(model_name_to_val_dict[init_vals.name], dtype=np.float32),
+            np.asarray(store.get(name), dtype=np.float32),
             scaling_factor,
         )
         chunk_n += chunk_1
@@ -94,7 +92,7 @@ def main():
     )
 
 
-def preprocess_batch_normalization(graph_def, model_name_to_val_dict):
+def preprocess_batch_normalization(graph_def, store):
     # set names to graph nodes if not present
     for node in graph_def.node:
         node.name = node.output[0]
@@ -102,29 +100,23 @@ def preprocess_batch_normalization(graph_def, model_name_to_val_dict):
         # so that mean and var are not required
         if node.op_type == "BatchNormalization":
             # scale
-            gamma = model_name_to_val_dict[node.input[1]]
+            gamma = store.get(node.input[1]).astype(np.float64)
             # B
-            beta = model_name_to_val_dict[node.input[2]]
-            mean = model_name_to_val_dict[node.input[3]]
-            var = model_name_to_val_dict[node.input[4]]
-            for i in range(len(gamma)):
-                rsigma = 1 / math.sqrt(var[i] + 1e-5)
-                gamma[i] = gamma[i] * rsigma
-                beta[i] = beta[i] - gamma[i] * mean[i]
-                mean[i] = 0
-                var[i] = 1 - 1e-5
+            beta = store.get(node.input[2]).astype(np.float64)
+            mean = store.get(node.input[3]).astype(np.float64)
+            var = store.get(node.input[4]).astype(np.float64)
+            rsigma = 1 / np.sqrt(var + 1e-5)
+            gamma = gamma * rsigma
+            beta = beta - gamma * mean
+            store.set(node.input[1], gamma)
+            store.set(node.input[2], beta)
+            store.set(node.input[3], np.zeros_like(mean))
+            store.set(node.input[4], np.full_like(var, 1 - 1e-5))
 
     # Just testing if the correct values are put
-    model_name_to_val_dict2 = {}
-    for init_vals in graph_def.initializer:
-        # TODO: Remove float_data
-        model_name_to_val_dict2[init_vals.name] = init_vals.float_data
     for node in graph_def.node:
-        node.name = node.output[0]
         if node.op_type == "BatchNormalization":
-            mean = model_name_to_val_dict[node.input[3]]
-            for val in mean:
-                assert val == 0
+            assert not store.get(node.input[3]).any()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,92 @@
+"""
+
+Copyright:
+Copyright (c) 2026 Microsoft Research
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+
+"""
+import os
+
+import numpy as np
+from onnx import TensorProto, helper, numpy_helper
+
+
+class InitializerStore:
+    """The initializers of a model, looked up by name.
+
+    Built once per compile and shared by the stages that need weights, so
+    that none of them walks graph.initializer again. Arrays are converted
+    with numpy_helper.to_array on first use and cached. Tensors stored as
+    ONNX external data (model loaded with load_external_data=False) are
+    memory-mapped from their file instead of being read into the model.
+    Arrays are read-only views; stages that change values (batch norm
+    folding) put the new array back with set().
+    """
+
+    def __init__(self, model, model_dir=""):
+        self.model_dir = model_dir
+        self.initializers = list(model.graph.initializer)
+        self.index = {init.name: i for i, init in enumerate(self.initializers)}
+        self.arrays = {}
+
+    def __contains__(self, name):
+        return name in self.index
+
+    def __len__(self):
+        return len(self.initializers)
+
+    def names(self):
+        """Names in graph.initializer order, which is the order of the weights file."""
+        return [init.name for init in self.initializers]
+
+    def proto(self, name):
+        return self.initializers[self.index[name]]
+
+    def dims(self, name):
+        return tuple(self.proto(name).dims)
+
+    def data_type(self, name):
+        return self.proto(name).data_type
+
+    def get(self, name):
+        array = self.arrays.get(name)
+        if array is None:
+            init = self.proto(name)
+            if init.data_location == TensorProto.EXTERNAL:
+                array = self.map_external(init)
+            else:
+                array = numpy_helper.to_array(init)
+            self.arrays[name] = array
+        return array
+
+    def set(self, name, array):
+        self.arrays[name] = array
+
+    def map_external(self, init):
+        info = {entry.key: entry.value for entry in init.external_data}
+        dtype = np.dtype(helper.tensor_dtype_to_np_dtype(init.data_type)).newbyteorder("<")
+        shape = tuple(init.dims)
+        offset = int(info.get("offset", 0))
+        path = os.path.join(self.model_dir, info["location"])
+        if int(np.prod(shape)) == 0:
+            return np.zeros(shape, dtype=dtype)
+        return np.memmap(path, dtype=dtype, mode="r", offset=offset, shape=shape)
+
+    def has_external_data(self):
+        return any(
+            init.data_location == TensorProto.EXTERNAL for init in self.initializers
+        )
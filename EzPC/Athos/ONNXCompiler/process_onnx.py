@@ -31,10 +31,12 @@ os.environ["TF_CPP_MIN_LOG_LEVEL"] = "2"
 import _pickle as pickle
 import onnx
 import onnx.shape_inference
+from onnx.external_data_helper import load_external_data_for_model
 from onnx import numpy_helper
 from onnxsim import simplify
 
 import AST.AST as AST
+import AST.SSA as SSA
 
 from ONNXNodesAST import ONNXNodesAST, OnnxNode
 from onnx.helper import make_tensor_value_info
@@ -45,6 +47,7 @@ import numpy
 
 import common
 import math
+from initializer_store import InitializerStore
 
 import numpy as np
 
@@ -77,7 +80,10 @@ def exitIfUnsupportedOps(model):
 
 # This does constant folding and eliminates nodes like Shape.
 # Also annotates each node with shape information.
-def optimise(model):
+def optimise(model, model_dir):
+    # onnxsim folds constants, so it needs external weights in the model
+    if InitializerStore(model).has_external_data():
+        load_external_data_for_model(model, model_dir)
     optimized_model, check = simplify(model)
     assert check, "Optimised ONNX model failed validation"
     return optimized_model
@@ -139,7 +145,7 @@ def get_node_metadata(model):
     return value_info
 
 
-def generate_seedot_ast(model, value_info, model_dir):
+def generate_seedot_ast(model, value_info, model_dir, store):
     graph_def = model.graph
     # Iterate through the ONNX graph nodes and translate them to SeeDot AST nodes
     program = None
@@ -165,7 +171,7 @@ def generate_seedot_ast(model, value_info, model_dir):
         mtdAST,
         graph_def,
         value_info,
-        model,
+        store,
     )
 
     output_tensors = [i.name for i in graph_def.output]
@@ -183,11 +189,11 @@ def generate_seedot_ast(model, value_info, model_dir):
 
     with open(os.path.join(model_dir, "astOutput.pkl"), "wb") as f:
         # print(program)
-        pickle.dump(program, f)
+        SSA.SSAProgram.fromAST(program).dump(f)
         print("Dumped SeeDot AST")
 
 
-def preprocess_batch_normalization(graph_def, model_name_to_val_dict):
+def preprocess_batch_normalization(graph_def, store):
     # set names to graph nodes if not present
     for node in graph_def.node:
         node.name = node.output[0]
@@ -195,60 +201,49 @@ def preprocess_batch_normalization(graph_def, model_name_to_val_dict):
         # so that mean and var are not required
         if node.op_type == "BatchNormalization":
             # scale
-            gamma = model_name_to_val_dict[node.input[1]]
+            gamma = store.get(node.input[1]).astype(np.float64)
             # B
-            beta = model_name_to_val_dict[node.input[2]]
-            mean = model_name_to_val_dict[node.input[3]]
-            var = model_name_to_val_dict[node.input[4]]
-            for i in range(len(gamma)):
-                rsigma = 1 / math.sqrt(var[i] + 1e-5)
-                gamma[i] = gamma[i] * rsigma
-                beta[i] = beta[i] - gamma[i] * mean[i]
-                mean[i] = 0
-                var[i] = 1 - 1e-5
+            beta = store.get(node.input[2]).astype(np.float64)
+            mean = store.get(node.input[3]).astype(np.float64)
+            var = store.get(node.input[4]).astype(np.float64)
+            rsigma = 1 / np.sqrt(var + 1e-5)
+            gamma = gamma * rsigma
+            beta = beta - gamma * mean
+            store.set(node.input[1], gamma)
+            store.set(node.input[2], beta)
+            store.set(node.input[3], np.zeros_like(mean))
+            store.set(node.input[4], np.full_like(var, 1 - 1e-5))
 
     # Just testing if the correct values are put
-    model_name_to_val_dict2 = {}
-    for init_vals in graph_def.initializer:
-        # TODO: Remove float_data
-        model_name_to_val_dict2[init_vals.name] = init_vals.float_data
     for node in graph_def.node:
-        node.name = node.output[0]
         if node.op_type == "BatchNormalization":
-            mean = model_name_to_val_dict[node.input[3]]
-            for val in mean:
-                assert val == 0
+            assert not store.get(node.input[3]).any()
 
 
-def preprocess_winograd(graph_def, model_name_to_val_dict):
+def preprocess_winograd(graph_def, store):
     pass
 
 
-def dump_model_weights(model, scaling_factor, model_dir, gather_names, model_name):
+def dump_model_weights(model, store, scaling_factor, model_dir, gather_names, model_name):
     weights_path = ""
     weights_fname = (
         model_name + "_input_weights_fixedpt_scale_" + str(scaling_factor) + ".inp"
     )
     weights_path = os.path.join(model_dir, weights_fname)
 
-    model_name_to_val_dict = {
-        init_vals.name: numpy_helper.to_array(init_vals).tolist()
-        for init_vals in model.graph.initializer
-    }
-
-    preprocess_batch_normalization(model.graph, model_name_to_val_dict)
-    # preprocess_winograd(model.graph, model_name_to_val_dict)
+    preprocess_batch_normalization(model.graph, store)
+    # preprocess_winograd(model.graph, store)
 
     print(f"Going to dump and gather names = {gather_names}")
 
     chunk_n = ""
     cnt_n = 0
-    for init_vals in model.graph.initializer:
-        if init_vals.name in gather_names :
+    for name in store.names():
+        if name in gather_names :
             continue
 
         (chunk_1, cnt_1) = common.numpy_float_array_to_fixed_point_val_str(
-            np.asarray(model_name_to_val_dict[init_vals.name], dtype=np.float32),
+            np.asarray(store.get(name), dtype=np.float32),
             scaling_factor,
         )
         chunk_n += chunk_1
@@ -265,7 +260,7 @@ def dump_model_weights(model, scaling_factor, model_dir, gather_names, model_nam
     return weights_path
 
 
-def strip_weights(model):
+def strip_weights(model, store):
     graph = model.graph
 
     # Outputs remain same
@@ -276,13 +271,13 @@ def strip_weights(model):
     # We replace all initializers with input nodes.
     new_initializers = []
     new_inputs = list(graph.input)
-    for node in graph.initializer:
+    for name in store.names():
         input = ValueInfoProto()
-        input.name = node.name
+        input.name = name
         # Magic keyword for input nodes belonging to server
         input.doc_string = "MPC_MODEL_WEIGHTS"
-        input.type.tensor_type.elem_type = node.data_type
-        for size in node.dims:
+        input.type.tensor_type.elem_type = store.data_type(name)
+        for size in store.dims(name):
             dim = TensorShapeProto.Dimension()
             dim.dim_value = size
             input.type.tensor_type.shape.dim.append(dim)
@@ -317,22 +312,27 @@ def strip_weights(model):
 def compile(
     model_fname, input_t_info, output_t_names, scaling_factor, save_weights, role
 ):
-    sys.setrecursionlimit(10000)
     if not model_fname.endswith(".onnx"):
         sys.exit("Please supply a valid ONNX model (.onnx extension)")
 
     model_name = os.path.basename(model_fname)[:-5]
     model_abs_dir = os.path.dirname(os.path.abspath(model_fname))
     print("Loading onnx graph: ", model_fname)
-    model = onnx.load(model_fname)
+    # External weights are memory-mapped by the InitializerStore when needed
+    model = onnx.load(model_fname, load_external_data=False)
     OnnxNode.opset_version = model.opset_import[0].version
     graph_def = model.graph
 
     assert role == "server" or role == "client"
     if role == "server":
-        model = optimise(model)
+        model = optimise(model, model_abs_dir)
         model = inferShapes(model)
-        stripped_model = strip_weights(model)
+
+    # Built once, after the last stage that replaces the model
+    store = InitializerStore(model, model_abs_dir)
+
+    if role == "server":
+        stripped_model = strip_weights(model, store)
         pruned_model_path = os.path.join(
             model_abs_dir, "optimised_" + model_name + ".onnx"
         )
@@ -348,7 +348,7 @@ def compile(
 
     # value_info: { name : (type, dimension tuple) }
     value_info = get_node_metadata(model)
-    generate_seedot_ast(model, value_info, model_abs_dir)
+    generate_seedot_ast(model, value_info, model_abs_dir, store)
 
     if role == "server" and save_weights:
         gather_names = []
@@ -359,7 +359,9 @@ def compile(
                     list(node.input)[1]
                 )
 
-        return dump_model_weights(model, scaling_factor, model_abs_dir, gather_names, model_name)
+        return dump_model_weights(
+            model, store, scaling_factor, model_abs_dir, gather_names, model_name
+        )
     return
 
 
@@ -486,7 +488,7 @@ def process_onnx_nodes(
     mtdAST,
     graph_def,
     value_info,
-    model,
+    store,
 ):
     for node in graph_def.node:
         if DEBUG:
@@ -506,10 +508,8 @@ def process_onnx_nodes(
             name = list(node.input)[1]
 
             index = None
-            for lol in model.graph.initializer :
-                if lol.name == name:
-                    index = numpy_helper.to_array(lol).tolist()
-                    break
+            if name in store:
+                index = store.get(name).tolist()
 
             (innermost_let_ast_node, out_var_count) = func(
                 node,
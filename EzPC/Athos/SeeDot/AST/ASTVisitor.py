@@ -23,6 +23,7 @@ SOFTWARE.
 """
 
 import AST.AST as AST
+import AST.SSA as SSA
 
 
 class ASTVisitor:
@@ -71,10 +72,15 @@ class ASTVisitor:
     def visitFunc(self, node: AST.Func, args=None):
         self.visit(node.expr, args)
 
+    # Walks the chain of Lets with a loop: visitors that override visitLet
+    # do the same (see AST/SSA.py), so deep programs do not hit the
+    # recursion limit.
     def visitLet(self, node: AST.Let, args=None):
-        self.visit(node.name, args)
-        self.visit(node.decl, args)
-        self.visit(node.expr, args)
+        (lets, result) = SSA.letChain(node)
+        for let in lets:
+            self.visit(let.name, args)
+            self.visit(let.decl, args)
+        self.visit(result, args)
 
     def visitUninterpFuncCall(self, node: AST.UninterpFuncCall, args=None):
         for elem in node.argsList:
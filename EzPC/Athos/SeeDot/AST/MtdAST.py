@@ -23,6 +23,7 @@ SOFTWARE.
 """
 
 import AST.AST as AST
+import AST.SSA as SSA
 from AST.ASTVisitor import ASTVisitor
 
 
@@ -69,10 +70,12 @@ class MtdAST(ASTVisitor):
         self.visit(node.expr, mtd)
 
     def visitLet(self, node: AST.Let, mtd: dict):
-        node.metadata.update(mtd)
-        self.visit(node.name, mtd)
-        self.visit(node.decl, mtd)
-        self.visit(node.expr, mtd)
+        (lets, result) = SSA.letChain(node)
+        for let in lets:
+            let.metadata.update(mtd)
+            self.visit(let.name, mtd)
+            self.visit(let.decl, mtd)
+        self.visit(result, mtd)
 
     def visitUninterpFuncCall(self, node: AST.UninterpFuncCall, mtd: dict):
         node.metadata.update(mtd)
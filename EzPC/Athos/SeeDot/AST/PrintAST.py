@@ -23,6 +23,7 @@ SOFTWARE.
 """
 
 import AST.AST as AST
+import AST.SSA as SSA
 from AST.ASTVisitor import ASTVisitor
 import binascii
 
@@ -101,26 +102,28 @@ class PrintAST(ASTVisitor):
         self.visit(node.expr)
 
     def visitLet(self, node: AST.Let, args=None):
-        if node.decl is not None:
-            node.decl.depth = node.depth + 1
-        if node.expr is not None:
-            node.expr.depth = node.depth + 1
-        print(indent * node.depth, "(", end=" ")
-        print("let", end=" ")
-        if hasattr(node.name, "type") and hasattr(node.name.type, "taint"):
-            print("<", node.decl.type.taint.name, ">", end=" ")
-        self.visit(node.name)
-        print("=", end=" ")
-        self.visit(node.decl)
-        print(
-            "{",
-            node.metadata[AST.ASTNode.mtdKeyTFOpName],
-            node.metadata[AST.ASTNode.mtdKeyTFNodeName],
-            "} in ",
-            end="\n",
-        )
-        self.visit(node.expr)
-        print(")", end="")
+        (lets, result) = SSA.letChain(node)
+        for let in lets:
+            if let.decl is not None:
+                let.decl.depth = let.depth + 1
+            if let.expr is not None:
+                let.expr.depth = let.depth + 1
+            print(indent * let.depth, "(", end=" ")
+            print("let", end=" ")
+            if hasattr(let.name, "type") and hasattr(let.name.type, "taint"):
+                print("<", let.decl.type.taint.name, ">", end=" ")
+            self.visit(let.name)
+            print("=", end=" ")
+            self.visit(let.decl)
+            print(
+                "{",
+                let.metadata[AST.ASTNode.mtdKeyTFOpName],
+                let.metadata[AST.ASTNode.mtdKeyTFNodeName],
+                "} in ",
+                end="\n",
+            )
+        self.visit(result)
+        print(")" * len(lets), end="")
 
     def visitUninterpFuncCall(self, node: AST.UninterpFuncCall, args=None):
         print(indent * node.depth, "UninterpFuncCall", node.funcName, end=" ")
@@ -0,0 +1,164 @@
+"""
+
+Copyright:
+Copyright (c) 2020 Microsoft Research
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+
+"""
+
+import _pickle as pickle
+
+import AST.AST as AST
+
+# Flat view of a SeeDot program.
+#
+# The front ends build a program as a chain of Lets, one per layer:
+# 	let J0 = ... in (let J1 = ... in (... in output))
+# A visitor that recurses along node.expr uses a stack frame or two per Let,
+# and so does pickle. SSAProgram keeps the Lets of the chain in a list
+# (stmts), the expression the chain ends in (result, usually an Output) and
+# def-use indexes over the variable names, so passes can walk the program
+# with a loop. The Lets stay linked: toAST() gives back the chain, and the
+# visitors below the chain work on it unchanged.
+#
+# Passes that add or remove Lets have to call reindex(), or build a new
+# SSAProgram from the AST.
+
+
+def letChain(node: AST.ASTNode):
+    # The Lets of the chain starting at node, and the expression it ends in
+    lets = []
+    while isinstance(node, AST.Let):
+        lets.append(node)
+        node = node.expr
+    return (lets, node)
+
+
+def children(node: AST.ASTNode):
+    if isinstance(node, AST.BOp):
+        return [node.expr1, node.expr2]
+    elif isinstance(node, AST.UninterpFuncCall):
+        return list(node.argsList)
+    elif isinstance(node, AST.ArgMax):
+        return [node.expr, node.dim]
+    elif isinstance(node, AST.FusedBatchNorm):
+        return [node.expr, node.multExpr, node.addExpr]
+    elif isinstance(node, AST.Let):
+        return [node.name, node.decl, node.expr]
+    elif isinstance(
+        node,
+        (
+            AST.Transpose,
+            AST.Slice,
+            AST.Reshape,
+            AST.Gather,
+            AST.Unsqueeze,
+            AST.Pool,
+            AST.UOp,
+            AST.Func,
+            AST.Reduce,
+            AST.Output,
+        ),
+    ):
+        return [node.expr]
+    # Int, Float, ID, Decl (only holds constants), Input
+    return []
+
+
+def usedNames(node: AST.ASTNode):
+    # Names of the variables read by node, in visit order
+    names = []
+    stack = [node]
+    while stack:
+        cur = stack.pop()
+        if cur is None:
+            continue
+        if isinstance(cur, AST.ID):
+            names.append(cur.name)
+        else:
+            stack.extend(reversed(children(cur)))
+    return names
+
+
+class SSAProgram:
+    def __init__(self, stmts: list, result: AST.ASTNode):
+        self.stmts = stmts
+        self.result = result
+        self.reindex()
+
+    def fromAST(ast: AST.ASTNode):
+        (lets, result) = letChain(ast)
+        return SSAProgram(lets, result)
+
+    def toAST(self):
+        self.link()
+        return self.stmts[0] if self.stmts else self.result
+
+    # Position of the result in the use lists
+    def resultIndex(self):
+        return len(self.stmts)
+
+    def reindex(self):
+        # defs : name -> index of the Let that defines it
+        # uses : name -> indices of the Lets (or resultIndex()) that read it
+        self.defs = {}
+        self.uses = {}
+        for i, let in enumerate(self.stmts):
+            self.defs[let.name.name] = i
+            for name in usedNames(let.decl):
+                self.uses.setdefault(name, []).append(i)
+        for name in usedNames(self.result):
+            self.uses.setdefault(name, []).append(self.resultIndex())
+
+    def defOf(self, name: str):
+        i = self.defs.get(name)
+        return None if i is None else self.stmts[i]
+
+    def usesOf(self, name: str):
+        return self.uses.get(name, [])
+
+    def lastUse(self, name: str):
+        uses = self.usesOf(name)
+        return uses[-1] if uses else None
+
+    def link(self):
+        for i in range(len(self.stmts) - 1):
+            self.stmts[i].expr = self.stmts[i + 1]
+        if self.stmts:
+            self.stmts[-1].expr = self.result
+
+    def unlink(self):
+        for let in self.stmts:
+            let.expr = None
+
+    # The Lets are pickled unlinked, so that pickle does not recurse along
+    # the chain.
+    def dump(self, f):
+        self.unlink()
+        try:
+            pickle.dump(self, f)
+        finally:
+            self.link()
+
+
+# Reads what a front end dumped: an SSAProgram, or the chain of Lets itself
+# (older pickles).
+def loadAST(f):
+    obj = pickle.load(f)
+    if isinstance(obj, SSAProgram):
+        return obj.toAST()
+    return obj
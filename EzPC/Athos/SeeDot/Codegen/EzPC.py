@@ -86,7 +86,10 @@ class EzPC(CodegenBase):
 
     def printForHeader(self, ir):
         assert ir.endInt is not None and ir.endCond is None
-        self.out.printf("for ", indent=True)
+        if ir.parallel > 0:
+            self.out.printf("parallel(%d) for ", ir.parallel, indent=True)
+        else:
+            self.out.printf("for ", indent=True)
         self.print(ir.var)
         self.out.printf(" = [%d: %d]{\n ", ir.st, ir.endInt)
 
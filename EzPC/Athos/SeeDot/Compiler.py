@@ -28,6 +28,7 @@ import _pickle as pickle
 import Util
 import IR.IR as IR
 import AST.AST as AST
+import AST.SSA as SSA
 from Writer import Writer
 import Type as Type
 from Type import InferType
@@ -57,6 +58,8 @@ class Compiler:
         disableTruncOpti,
         disableAllOpti,
         debugVar,
+        parallelThreshold=0,
+        parallelCollapse=2,
     ):
         assert version == Util.Version.Fixed
         assert target == Util.Target.EzPC
@@ -78,6 +81,8 @@ class Compiler:
         Util.Config.disableTruncOpti = disableTruncOpti
         Util.Config.disableAllOpti = disableAllOpti
         Util.Config.debugVar = debugVar
+        Util.Config.parallelThreshold = parallelThreshold
+        Util.Config.parallelCollapse = parallelCollapse
         Util.Config.actualWordLength = int(bitlen)
         if Util.Config.actualWordLength > 32:
             Util.Config.wordLength = 64
@@ -157,7 +162,7 @@ class Compiler:
 
     def run(self):
         with open(Util.Config.astFile, "rb") as ff:
-            ast = pickle.load(ff)
+            ast = SSA.loadAST(ff)
 
         if not (Util.Config.disableAllOpti):
             if not (Util.Config.disableRMO):
@@ -248,6 +248,9 @@ class For(Cmd):
         self.st = DataType.getInt(st)
         self.cmd_l = cmd_l
         self.factor = fac
+        # Number of nested loops, starting with this one, whose iterations are
+        # independent and can run in parallel (0: run sequentially).
+        self.parallel = 0
         self.endInt = None
         self.endCond = None
         if self.__endIntArgStr in terminationCond:
@@ -260,7 +263,7 @@ class For(Cmd):
     def updateName(self, expr_mapping):
         cmd_l_new = list(map(lambda cmd: cmd.updateName(expr_mapping), self.cmd_l))
         if self.endCond:
-            return For(
+            new_for = For(
                 self.var,
                 self.st,
                 cmd_l_new,
@@ -269,7 +272,9 @@ class For(Cmd):
             )
         else:
             assert self.endInt is not None
-            return For(self.var, self.st, cmd_l_new, self.factor, endInt=self.endInt)
+            new_for = For(self.var, self.st, cmd_l_new, self.factor, endInt=self.endInt)
+        new_for.parallel = self.parallel
+        return new_for
 
 
 class While(Cmd):
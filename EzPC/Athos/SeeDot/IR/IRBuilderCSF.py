@@ -31,6 +31,7 @@ import Util
 import IR.IR as IR
 import Type as Type
 import AST.AST as AST
+import AST.SSA as SSA
 import IR.IRUtil as IRUtil
 from AST.ASTVisitor import ASTVisitor
 from AST.IRBuilderAST import IRBuilderAST
@@ -262,7 +263,7 @@ class IRBuilderCSF(IRBuilderAST):
         out_arr_expr = IRUtil.addIndex(out_arr, out_iters)
         inp_arr_expr = IRUtil.addIndex(inp_arr, inp_iters)
         assign_expr = IR.Assn(out_arr_expr, inp_arr_expr)
-        loop = IRUtil.loop(inp_type.shape, inp_iters, [assign_expr])
+        loop = IRUtil.parallelLoop(inp_type.shape, inp_iters, [assign_expr])
         # Finalize
         comment1 = IR.Comment(str(node.metadata))
         comment2 = IR.Comment(
@@ -305,7 +306,7 @@ class IRBuilderCSF(IRBuilderAST):
         out_arr_expr = IRUtil.addIndex(out_arr, out_iters)
         inp_arr_expr = IRUtil.addIndex(inp_arr, inp_iters)
         assign_expr = IR.Assn(out_arr_expr, inp_arr_expr)
-        loop = IRUtil.loop(out_type.shape, out_iters, [assign_expr])
+        loop = IRUtil.parallelLoop(out_type.shape, out_iters, [assign_expr])
         # Finalize
         comment1 = IR.Comment(str(node.metadata))
         comment2 = IR.Comment(
@@ -366,7 +367,7 @@ class IRBuilderCSF(IRBuilderAST):
         for var in loopIters:
             iter_decl_lst.append(IR.Decl(var.idf, Type.Int(), isSecret=False))
 
-        loop = IRUtil.loop(
+        loop = IRUtil.parallelLoop(
             loopShape,
             loopIters,
             [
@@ -418,7 +419,7 @@ class IRBuilderCSF(IRBuilderAST):
         for var in loopIters:
             iter_decl_lst.append(IR.Decl(var.idf, Type.Int(), isSecret=False))
 
-        loop = IRUtil.loop(
+        loop = IRUtil.parallelLoop(
             loopShape,
             loopIters,
             [
@@ -631,7 +632,7 @@ class IRBuilderCSF(IRBuilderAST):
             # cmdl_assn
             expr_1_elt = IRUtil.addIndex(expr_1, iters)
             expr_2_elt = IRUtil.addIndex(expr_2, iters)
-            cmdl_assn = IRUtil.loop(
+            cmdl_assn = IRUtil.parallelLoop(
                 typ_2.shape,
                 iters,
                 [IR.Assn(expr_2_elt, IRUtil.sub(IRUtil.zero, expr_1_elt))],
@@ -838,38 +839,28 @@ class IRBuilderCSF(IRBuilderAST):
             decl_out_arr_flat = IR.Decl(
                 out_arr_flat.idf, flat_type, node.type.bitlen, node.type.isSecret
             )
-            # idx
-            flat_idx = self.getTempVar()
-            decl_flat_idx = IR.Decl(
-                flat_idx.idf, Type.Int(bitlen=32), bitlen=32, isSecret=False
-            )
             # For 4d, generate (i1*s2*s3*s4) + (i2*s3*s4) + (i3*s4) + (i4);
-            flat_idx_expr = IR.Int(0, 32)
-            for i in range(len(out_iters)):
-                vol = Util.get_volume(output_shape[i + 1 :])
-                flat_idx_expr = IRUtil.add(
-                    flat_idx_expr, IRUtil.mul(out_iters[i], IR.Int(vol, 32))
-                )
+            # The index is computed inline (not in a shared temp variable) so
+            # that the iterations are independent and the loops can run in
+            # parallel.
+            flat_idx_expr = IRUtil.getFlatArrIdxExpr(out_iters, output_shape)
             # inp1_arr_flat[idx], inp2_arr_flat[idx], out_arr_flat[idx]
-            inp1_arr_flat_expr = IRUtil.addIndex(inp1_arr_flat, [flat_idx])
-            inp2_arr_flat_expr = IRUtil.addIndex(inp2_arr_flat, [flat_idx])
-            out_arr_flat_expr = IRUtil.addIndex(out_arr_flat, [flat_idx])
-            # idx = i1*s2 + i2;
-            # inp1_arr_flat[idx] = inp1_arr[i1][i2]
-            # inp2_arr_flat[idx] = inp2_arr[i1][i2]
-            assign_flat_idx_expr = IR.Assn(flat_idx, flat_idx_expr)
+            inp1_arr_flat_expr = IRUtil.addIndex(inp1_arr_flat, [flat_idx_expr])
+            inp2_arr_flat_expr = IRUtil.addIndex(inp2_arr_flat, [flat_idx_expr])
+            out_arr_flat_expr = IRUtil.addIndex(out_arr_flat, [flat_idx_expr])
+            # inp1_arr_flat[i1*s2 + i2] = inp1_arr[i1][i2]
+            # inp2_arr_flat[i1*s2 + i2] = inp2_arr[i1][i2]
             assign_inp1_arr_flat = IR.Assn(inp1_arr_flat_expr, inp1_arr_expr)
             assign_inp2_arr_flat = IR.Assn(inp2_arr_flat_expr, inp2_arr_expr)
             # Flattening loop
             # for i1=[0:s1]
             #   for i2=[0:s2]
-            #     idx = i1*s2 + i2
-            #     inp1_arr_flat[idx] = inp1_arr[i1][i2]
-            #     inp2_arr_flat[idx] = inp2_arr[i1][i2]
-            out_loop = IRUtil.loop(
+            #     inp1_arr_flat[i1*s2 + i2] = inp1_arr[i1][i2]
+            #     inp2_arr_flat[i1*s2 + i2] = inp2_arr[i1][i2]
+            out_loop = IRUtil.parallelLoop(
                 output_shape,
                 out_iters,
-                [assign_flat_idx_expr, assign_inp1_arr_flat, assign_inp2_arr_flat],
+                [assign_inp1_arr_flat, assign_inp2_arr_flat],
             )
             out_prog = IRUtil.Prog(out_loop)
             decls = [
@@ -877,7 +868,6 @@ class IRBuilderCSF(IRBuilderAST):
                 decl_inp1_arr_flat,
                 decl_inp2_arr_flat,
                 decl_out_arr_flat,
-                decl_flat_idx,
             ]
             out_prog = IRUtil.prog_merge(IRUtil.Prog(decls), out_prog)
 
@@ -929,9 +919,7 @@ class IRBuilderCSF(IRBuilderAST):
 
             # Unflatten output
             assign_out_arr_flat = IR.Assn(out_arr_expr, out_arr_flat_expr)
-            out_loop = IRUtil.loop(
-                output_shape, out_iters, [assign_flat_idx_expr, assign_out_arr_flat]
-            )
+            out_loop = IRUtil.parallelLoop(output_shape, out_iters, [assign_out_arr_flat])
             out_prog = IRUtil.prog_merge(out_prog, IRUtil.Prog(out_loop))
 
             argsDict = OrderedDict()
@@ -1627,16 +1615,24 @@ class IRBuilderCSF(IRBuilderAST):
         return (progFinal, out_expr)
 
     def visitLet(self, node: AST.Let, args=None):
-        (prog_1, expr_1) = self.visit(node.decl)
-        typ_1 = node.decl.type
-        idf = node.name.name
-        if not (Util.Config.disableTruncOpti):
-            self.scaleFacMapping[idf] = self.scaleFacMapping[expr_1.idf]
-        (prog_2, expr_2) = self.visit(node.expr)
-
-        self.name_mapping[idf] = expr_1.idf
-        self.expr_mapping[idf] = expr_1
-        prog_3 = IRUtil.prog_merge(prog_1, prog_2)
+        (lets, result) = SSA.letChain(node)
+        progList = []
+        defList = []
+        for let in lets:
+            (prog_1, expr_1) = self.visit(let.decl)
+            idf = let.name.name
+            if not (Util.Config.disableTruncOpti):
+                self.scaleFacMapping[idf] = self.scaleFacMapping[expr_1.idf]
+            progList.append(prog_1)
+            defList.append((idf, expr_1))
+        (prog_2, expr_2) = self.visit(result)
+        progList.append(prog_2)
+
+        # Innermost first, as when this recursed along the chain
+        for idf, expr_1 in reversed(defList):
+            self.name_mapping[idf] = expr_1.idf
+            self.expr_mapping[idf] = expr_1
+        prog_3 = IRUtil.prog_merge(*progList)
         return (prog_3, expr_2)
 
     def visitUninterpFuncCall(self, node: AST.UninterpFuncCall, args=None):
@@ -1952,7 +1948,7 @@ class IRBuilderCSF(IRBuilderAST):
         out_expr = IRUtil.addIndex(output, outputiters)
         out_flat_expr = IRUtil.addIndex(out_flat, [flat_idx_expr])
         out_assn_expr = IR.Assn(out_expr, out_flat_expr)
-        unflatten_loop = IRUtil.loop(
+        unflatten_loop = IRUtil.parallelLoop(
             loop_shape[:outer_nesting], inputiters[:outer_nesting], [out_assn_expr]
         )
 
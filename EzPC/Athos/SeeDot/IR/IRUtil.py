@@ -263,6 +263,21 @@ def loop(shape: list, iters: list, cmdl_body: CmdList, factor=0) -> CmdList:
     return cmdl_for
 
 
+# Same as loop, for loops whose iterations are independent: each one writes
+# its own output element and reads nothing written by another. Marks the
+# outermost loop parallel when there are enough elements to be worth it.
+# Leading loops of size 1 (the batch) do not count towards the collapse depth.
+def parallelLoop(shape: list, iters: list, cmdl_body: CmdList, factor=0) -> CmdList:
+    cmdl_for = loop(shape, iters, cmdl_body, factor)
+    threshold = Util.Config.parallelThreshold
+    if threshold and shape and np.prod(shape) >= threshold:
+        unit = 0
+        while unit < len(shape) - 1 and shape[unit] == 1:
+            unit += 1
+        cmdl_for[0].parallel = min(len(shape), unit + Util.Config.parallelCollapse)
+    return cmdl_for
+
+
 def print_loop(shape: list, iters: list, cmdl_body: CmdList, factor=0) -> CmdList:
     cmdl_for = cmdl_body
     for i in reversed(range(len(shape))):
@@ -315,7 +330,7 @@ def generateBroadcastLoopBOp(
     out_arr_expr = addIndex(expr_out, out_iters)
 
     assign_expr = Assn(out_arr_expr, IntBop(inp1_arr_expr, op, inp2_arr_expr))
-    out_loop = loop(output_shape, out_iters, [assign_expr])
+    out_loop = parallelLoop(output_shape, out_iters, [assign_expr])
     out_prog = Prog(out_loop)
     return out_prog
 
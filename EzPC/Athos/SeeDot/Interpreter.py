@@ -0,0 +1,817 @@
+"""
+
+Copyright:
+Copyright (c) 2020 Microsoft Research
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+
+"""
+
+import os, sys
+import argparse
+import math
+import _pickle as pickle
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+import Util
+import AST.AST as AST
+import AST.SSA as SSA
+import Type as Type
+from Type import InferType
+from AST.ASTVisitor import ASTVisitor
+import Optimizations.ReluMaxpoolOpti as ReluMaxpoolOpti
+
+# Fixed-point reference interpreter.
+#
+# Runs the typed SeeDot AST with the semantics of the program the compiler
+# generates for it, without going through EzPC and a C++ compiler:
+#  - every value is an integer in the ring of the compile bitlen, kept
+#    sign extended in an int64 array,
+#  - scales follow IRBuilderCSF: the same ScaleUp/ScaleDown calls are made
+#    at the same points (in place, on the same variables), and the final
+#    outputs are scaled down to consSF as in Compiler.fixOuputScale,
+#  - the library functions follow the cleartext library
+#    (SCI/src/cleartext_library_fixed_uniform.h) for padding, pooling windows,
+#    convolution layouts, ArgMax ties and the like. Division (AvgPool, Mean,
+#    ReduceMeanONNX) is the exception. It follows the EzPC library of the
+#    CPP target (TFEzPCLibrary/Library64_cpp.ezpc, not vendored in this
+#    tree), which divides signed values with "/" and so compiles to C's
+#    division, rounding towards zero. The cleartext library's PublicDiv
+#    rounds down (div_floor) instead; the two differ on negative sums, and
+#    the tests compare against the CPP target.
+# Tanh, Sigmoid, Sqrt/Rsqrt and HardSigmoid have no cleartext definition in
+# the tree; they are computed in floating point at the scales the compiler
+# passes them, and a run that uses them sets exact to False.
+#
+# Every value has a leading batch axis: Inputs read from a batched stream
+# (one row per image) have the batch size, everything that does not depend
+# on them (weights, constants) has size 1, and numpy broadcasting does the
+# rest. So one run evaluates the program on a whole validation set.
+
+
+class Var:
+    def __init__(self, arr, scale):
+        self.arr = arr
+        self.scale = scale
+
+
+class Ring:
+    def __init__(self, bitlen):
+        assert 1 <= bitlen <= 64
+        self.bitlen = bitlen
+        self.half = np.int64(1 << (bitlen - 1)) if bitlen < 64 else None
+        self.mask = np.int64((1 << bitlen) - 1) if bitlen < 64 else None
+
+    # Sign extends from bitlen bits. int64 arithmetic is exact modulo 2^64, so
+    # doing it on the results of +, -, * and << gives the ring operations.
+    def wrap(self, x):
+        x = np.asarray(x, dtype=np.int64)
+        if self.half is None:
+            return x
+        return ((x + self.half) & self.mask) - self.half
+
+    def const(self, value):
+        value = int(value) & ((1 << self.bitlen) - 1)
+        if value >= (1 << (self.bitlen - 1)):
+            value -= 1 << self.bitlen
+        return value
+
+
+def scaleDown(arr, sf):
+    return arr >> np.int64(sf)
+
+
+def divide(arr, divisor):
+    # C division as in the CPP target, rounds towards zero (not div_floor)
+    q = np.abs(arr) // np.int64(divisor)
+    return np.where(arr < 0, -q, q)
+
+
+def maxAbsBits(arr):
+    if arr.size == 0:
+        return 0
+    return max(int(arr.max()), -int(arr.min())).bit_length()
+
+
+def matmul(a, b):
+    # Exact int64 a @ b (modulo 2^64) for a: [M, K], b: [K, N].
+    # numpy has no BLAS for integers, so when the products are small enough
+    # the larger operand is split in limbs whose float64 products stay below
+    # 2^53 and each limb is multiplied with BLAS.
+    K = a.shape[1]
+    aBits = maxAbsBits(a)
+    bBits = maxAbsBits(b)
+    if aBits == 0 or bBits == 0 or K == 0:
+        return np.zeros((a.shape[0], b.shape[1]), dtype=np.int64)
+    if aBits < bBits:
+        return matmul(b.T, a.T).T
+    limbBits = 52 - bBits - K.bit_length()
+    if limbBits < 8 or -(-aBits // limbBits) > 4:
+        return np.dot(a, b)
+    bf = b.astype(np.float64)
+    limbMask = np.int64((1 << limbBits) - 1)
+    numLimbs = -(-aBits // limbBits)
+    out = np.zeros((a.shape[0], b.shape[1]), dtype=np.int64)
+    rest = a
+    for i in range(numLimbs):
+        if i == numLimbs - 1:
+            limb = rest
+        else:
+            limb = rest & limbMask
+            rest = rest >> np.int64(limbBits)
+        prod = np.dot(limb.astype(np.float64), bf).astype(np.int64)
+        out += prod << np.int64(i * limbBits)
+    return out
+
+
+def convolve(inp, filt, pads, strides, groups=1, chunkElems=1 << 24):
+    # inp: [M, *spatial, CI], filt: [*filterSize, CI/G, CO] -> [M, *out, CO]
+    d = len(pads)
+    M = inp.shape[0]
+    CI = inp.shape[-1]
+    CO = filt.shape[-1]
+    CIG = CI // groups
+    COG = CO // groups
+    fs = filt.shape[:d]
+    inp = np.pad(inp, [(0, 0)] + list(pads) + [(0, 0)])
+    outSize = [
+        (inp.shape[1 + i] - fs[i]) // strides[i] + 1 for i in range(d)
+    ]
+    patchLen = int(np.prod(fs)) * CIG
+    rowsPerImage = int(np.prod(outSize))
+    chunk = max(1, chunkElems // max(1, rowsPerImage * patchLen))
+    out = np.zeros([M] + outSize + [CO], dtype=np.int64)
+    window = sliding_window_view(inp, fs, axis=tuple(range(1, d + 1)))
+    strided = window[(slice(None),) + tuple(slice(None, None, s) for s in strides)]
+    strided = strided[(slice(None),) + tuple(slice(0, o) for o in outSize)]
+    # [M, *out, CI, *fs] -> [M, *out, *fs, CI], the filter's row order
+    perm = [0] + list(range(1, d + 1)) + list(range(d + 2, 2 * d + 2)) + [d + 1]
+    for g in range(groups):
+        f = filt[..., g * COG : (g + 1) * COG].reshape(patchLen, COG)
+        for m in range(0, M, chunk):
+            index = (slice(m, m + chunk),) + (slice(None),) * d
+            patches = strided[index + (slice(g * CIG, (g + 1) * CIG),)]
+            patches = patches.transpose(perm).reshape(-1, patchLen)
+            res = matmul(patches, f)
+            out[m : m + chunk, ..., g * COG : (g + 1) * COG] = res.reshape(
+                [-1] + outSize + [COG]
+            )
+    return out
+
+
+def loadProgram(astFile, disableRMO=False):
+    with open(astFile, "rb") as ff:
+        ast = SSA.loadAST(ff)
+    if not (disableRMO):
+        ReluMaxpoolOpti.ReluMaxpoolOpti().visit(ast)
+    InferType().visit(ast)
+    return ast
+
+
+class Interpreter(ASTVisitor):
+    def __init__(self, ast, consSF, bitlen, disableTruncOpti=False):
+        # The types InferType annotates depend on the word length
+        Util.Config.consSF = consSF
+        Util.Config.actualWordLength = int(bitlen)
+        Util.Config.wordLength = 64 if Util.Config.actualWordLength > 32 else 32
+        Util.Config.disableTruncOpti = disableTruncOpti
+        self.ast = ast
+        self.scaleFac = consSF
+        self.bitlen = int(bitlen)
+        self.ring = Ring(self.bitlen)
+        self.disableTruncOpti = disableTruncOpti
+        self.inputNodes = []
+        (lets, result) = SSA.letChain(ast)
+        for let in lets:
+            if isinstance(let.decl, AST.Input):
+                self.inputNodes.append((let.name.name, let.decl))
+
+    # Number of integers the Inputs of party read
+    def inputSize(self, party):
+        return sum(
+            Util.get_volume(node.shape)
+            for (name, node) in self.inputNodes
+            if node.inputByParty == party
+        )
+
+    # client, server: the integers each party inputs, in the order of the
+    # Inputs, as [n] (one run) or [B, n] (B runs). Returns the outputs as
+    # int arrays of shape [B, *shape] and sets outputScales (-1 for ArgMax).
+    def run(self, client, server):
+        self.feeds = {AST.Party.CLIENT: client, AST.Party.SERVER: server}
+        self.offsets = {AST.Party.CLIENT: 0, AST.Party.SERVER: 0}
+        self.env = {}
+        self.outputs = []
+        self.exact = True
+        self.visit(self.ast)
+        result = []
+        self.outputScales = []
+        for var in self.outputs:
+            arr = var.arr
+            if var.scale > self.scaleFac:
+                arr = scaleDown(arr, var.scale - self.scaleFac)
+            elif var.scale != -1:
+                assert (
+                    var.scale == self.scaleFac
+                ), "Scale up shouldnt be required of final output {} -> {}. We lost precision somewhere".format(
+                    var.scale, self.scaleFac
+                )
+            result.append(arr)
+            self.outputScales.append(self.scaleFac if var.scale != -1 else -1)
+        return result
+
+    def shapeOf(self, node):
+        if Type.isInt(node.type):
+            return []
+        return node.type.shape
+
+    def batched(self, arr, node):
+        # Gives arr, without batch axis, the batch axis of size 1
+        return arr.reshape([1] + list(self.shapeOf(node)))
+
+    def align(self, arr, ndim):
+        # Broadcasting between values of different rank, after the batch axis
+        if arr.ndim == ndim:
+            return arr
+        return arr.reshape(arr.shape[:1] + (1,) * (ndim - arr.ndim) + arr.shape[1:])
+
+    def truncate(self, var, sf):
+        var.arr = scaleDown(var.arr, sf)
+        var.scale -= sf
+
+    def truncateMulArgs(self, var1, var2):
+        # Arguments of a multiplication are brought down to scaleFac first
+        if var1.scale > self.scaleFac:
+            self.truncate(var1, var1.scale - self.scaleFac)
+        if (var2 is not var1) and (var2.scale > self.scaleFac):
+            self.truncate(var2, var2.scale - self.scaleFac)
+
+    def mulResult(self, arr):
+        arr = self.ring.wrap(arr)
+        if self.disableTruncOpti:
+            return Var(scaleDown(arr, self.scaleFac), self.scaleFac)
+        return Var(arr, 2 * self.scaleFac)
+
+    # =================
+    # Visit Functions
+    # =================
+
+    def visitInt(self, node: AST.Int, args=None):
+        arr = np.array([self.ring.const(node.value)], dtype=np.int64)
+        return Var(arr, self.scaleFac if node.isScaled else 0)
+
+    def visitFloat(self, node: AST.Float, args=None):
+        k = self.ring.const(int(np.ldexp(node.value, self.scaleFac)))
+        return Var(np.array([k], dtype=np.int64), self.scaleFac)
+
+    def visitId(self, node: AST.ID, args=None):
+        return self.env[node.name]
+
+    def visitDecl(self, node: AST.Decl, args=None):
+        if node.valueList:
+            values = []
+            for curVal in node.valueList:
+                if isinstance(curVal, AST.Int):
+                    values.append(self.ring.const(curVal.value))
+                else:
+                    assert isinstance(curVal, AST.Float)
+                    values.append(
+                        self.ring.const(int(np.ldexp(curVal.value, self.scaleFac)))
+                    )
+            arr = np.array(values, dtype=np.int64)
+        else:
+            arr = np.zeros(Util.get_volume(node.shape), dtype=np.int64)
+        return Var(
+            arr.reshape([1] + node.shape), self.scaleFac if node.isScaled else 0
+        )
+
+    def visitInput(self, node: AST.Input, args=None):
+        party = node.inputByParty
+        feed = self.feeds[party]
+        size = Util.get_volume(node.shape)
+        start = self.offsets[party]
+        self.offsets[party] += size
+        assert feed.shape[-1] >= start + size, "Not enough inputs for {}".format(
+            party.name
+        )
+        arr = self.ring.wrap(feed[..., start : start + size])
+        if arr.ndim == 1:
+            arr = arr[np.newaxis]
+        return Var(arr.reshape([arr.shape[0]] + node.shape), self.scaleFac)
+
+    def visitOutput(self, node: AST.Output, args=None):
+        self.outputs.append(self.visit(node.expr))
+        return Var(np.zeros(1, dtype=np.int64), self.scaleFac)
+
+    def visitLet(self, node: AST.Let, args=None):
+        (lets, result) = SSA.letChain(node)
+        for let in lets:
+            self.env[let.name.name] = self.visit(let.decl)
+        return self.visit(result)
+
+    def visitTranspose(self, node: AST.Transpose, args=None):
+        var = self.visit(node.expr)
+        perm = node.perm
+        if perm is None:
+            perm = [i for i in reversed(range(len(node.expr.type.shape)))]
+        arr = var.arr.transpose([0] + [p + 1 for p in perm])
+        return Var(np.ascontiguousarray(arr), var.scale)
+
+    def visitSlice(self, node: AST.Slice, args=None):
+        var = self.visit(node.expr)
+        index = [slice(None)]
+        for (subrange, size) in zip(node.subscriptRanges, node.type.shape):
+            index.append(slice(subrange[0], subrange[0] + size))
+        return Var(var.arr[tuple(index)].copy(), var.scale)
+
+    def visitGather(self, node: AST.Gather, args=None):
+        var = self.visit(node.expr)
+        return Var(var.arr[:, node.index].copy(), var.scale)
+
+    def visitUnsqueeze(self, node: AST.Unsqueeze, args=None):
+        var = self.visit(node.expr)
+        return Var(np.expand_dims(var.arr, node.axis + 1), var.scale)
+
+    def visitReshape(self, node: AST.Reshape, args=None):
+        var = self.visit(node.expr)
+        arr = var.arr
+        outShape = node.type.shape
+        if node.order:
+            # The output is filled in the order of the loops, outermost
+            # dimension order[0]
+            order = [o - 1 for o in node.order]
+            loopShape = [outShape[o] for o in order]
+            arr = arr.reshape([arr.shape[0]] + loopShape)
+            inverse = list(np.argsort(order))
+            arr = arr.transpose([0] + [i + 1 for i in inverse])
+        arr = np.ascontiguousarray(arr).reshape([arr.shape[0]] + outShape)
+        return Var(arr, var.scale)
+
+    def visitPool(self, node: AST.Pool, args=None):
+        var = self.visit(node.expr)
+        opts = node.options
+        FH = opts[AST.PaddingKeysDict.FH]
+        FW = opts[AST.PaddingKeysDict.FW]
+        strideH = opts[AST.PaddingKeysDict.strideH]
+        strideW = opts[AST.PaddingKeysDict.strideW]
+        [N1, outH, outW, CI1] = node.type.shape
+        arr = var.arr
+        B = arr.shape[0]
+        arr = arr.reshape((-1,) + arr.shape[2:])
+        # Padding is with zeros, also for MaxPool
+        arr = np.pad(
+            arr,
+            [
+                (0, 0),
+                (
+                    opts[AST.PaddingKeysDict.zPadHLeft],
+                    opts[AST.PaddingKeysDict.zPadHRight],
+                ),
+                (
+                    opts[AST.PaddingKeysDict.zPadWLeft],
+                    opts[AST.PaddingKeysDict.zPadWRight],
+                ),
+                (0, 0),
+            ],
+        )
+        window = sliding_window_view(arr, (FH, FW), axis=(1, 2))
+        window = window[:, : outH * strideH : strideH, : outW * strideW : strideW]
+        if node.poolType == AST.Pool.PoolType.MaxPool:
+            out = window.max(axis=(-2, -1))
+        else:
+            out = divide(self.ring.wrap(window.sum(axis=(-2, -1))), FH * FW)
+        return Var(self.ring.wrap(out).reshape([B] + node.type.shape), var.scale)
+
+    def visitUOp(self, node: AST.UOp, args=None):
+        var = self.visit(node.expr)
+        if node.op == AST.Operators.ADD:
+            return var
+        assert node.op == AST.Operators.SUB
+        return Var(self.ring.wrap(-var.arr), var.scale)
+
+    def visitBOp(self, node: AST.BOp, args=None):
+        op = node.op
+        if op in [AST.Operators.ADD, AST.Operators.SUB, AST.Operators.Equal]:
+            return self.visitBopAddOrSubLike(node)
+        elif op == AST.Operators.ElemWiseMul:
+            return self.visitBopElemWiseMul(node)
+        elif op == AST.Operators.MUL:
+            return self.visitBopMul(node)
+        elif op == AST.Operators.CONV:
+            return self.visitBopConv(node)
+        elif op == AST.Operators.CONVTRANSPOSE:
+            return self.visitBopConvTranspose(node)
+        else:
+            assert False, "{} not supported".format(op.name)
+
+    def visitBopAddOrSubLike(self, node: AST.BOp, args=None):
+        var1 = self.visit(node.expr1)
+        var2 = self.visit(node.expr2)
+
+        if not (self.disableTruncOpti):
+            # The argument with the lower scale is scaled up in place
+            if var1.scale > var2.scale:
+                var2.arr = self.ring.wrap(var2.arr << np.int64(var1.scale - var2.scale))
+                var2.scale = var1.scale
+            elif var2.scale > var1.scale:
+                var1.arr = self.ring.wrap(var1.arr << np.int64(var2.scale - var1.scale))
+                var1.scale = var2.scale
+
+        ndim = max(var1.arr.ndim, var2.arr.ndim)
+        a = self.align(var1.arr, ndim)
+        b = self.align(var2.arr, ndim)
+        if node.op == AST.Operators.ADD:
+            out = a + b
+        elif node.op == AST.Operators.SUB:
+            out = a - b
+        else:
+            out = (a == b).astype(np.int64)
+        return Var(self.ring.wrap(out), var1.scale)
+
+    def visitBopElemWiseMul(self, node: AST.BOp, args=None):
+        var1 = self.visit(node.expr1)
+        var2 = self.visit(node.expr2)
+        if not (self.disableTruncOpti):
+            self.truncateMulArgs(var1, var2)
+        ndim = max(var1.arr.ndim, var2.arr.ndim)
+        out = self.align(var1.arr, ndim) * self.align(var2.arr, ndim)
+        return self.mulResult(out)
+
+    def visitBopMul(self, node: AST.BOp, args=None):
+        typ_1 = node.expr1.type
+        typ_2 = node.expr2.type
+        if (
+            Type.isInt(node.type)
+            or Type.isInt(typ_1)
+            or Type.isInt(typ_2)
+            or typ_1.dim == 0
+            or typ_2.dim == 0
+        ):
+            # MulInt and ScalarMul
+            return self.visitBopElemWiseMul(node)
+
+        var1 = self.visit(node.expr1)
+        var2 = self.visit(node.expr2)
+        if not (self.disableTruncOpti):
+            self.truncateMulArgs(var1, var2)
+        a = var1.arr
+        b = var2.arr
+        [I, J] = typ_1.shape
+        [J, K] = typ_2.shape
+        if b.shape[0] == 1:
+            out = matmul(a.reshape(-1, J), b[0]).reshape(-1, I, K)
+        elif a.shape[0] == 1:
+            out = matmul(a[0], b.transpose(1, 0, 2).reshape(J, -1))
+            out = out.reshape(I, -1, K).transpose(1, 0, 2)
+        else:
+            out = np.stack([matmul(a[i], b[i]) for i in range(a.shape[0])])
+        return self.mulResult(out)
+
+    def convArgs(self, node):
+        convDim = node.options.get(AST.PaddingKeysDict.ConvDim, 2)
+        keys = AST.PaddingKeysDict
+        pads = [
+            (node.options[keys.zPadHLeft], node.options[keys.zPadHRight]),
+            (node.options[keys.zPadWLeft], node.options[keys.zPadWRight]),
+        ]
+        strides = [node.options[keys.strideH], node.options[keys.strideW]]
+        if convDim == 3:
+            pads.insert(
+                0, (node.options[keys.zPadDLeft], node.options[keys.zPadDRight])
+            )
+            strides.insert(0, node.options[keys.strideD])
+        return (convDim, pads, strides)
+
+    def convBatched(self, inp, filt, pads, strides, groups):
+        # inp: [B, N, *spatial, CI], filt: [1 or B, *filterSize, CI/G, CO]
+        B = inp.shape[0]
+        if filt.shape[0] == 1:
+            inp = inp.reshape((-1,) + inp.shape[2:])
+            out = convolve(inp, filt[0], pads, strides, groups)
+            return out.reshape((B, -1) + out.shape[1:])
+        inp = np.broadcast_to(inp, (filt.shape[0],) + inp.shape[1:])
+        return np.stack(
+            [
+                convolve(inp[i], filt[i], pads, strides, groups)
+                for i in range(filt.shape[0])
+            ]
+        )
+
+    def visitBopConv(self, node: AST.BOp, args=None):
+        var1 = self.visit(node.expr1)
+        var2 = self.visit(node.expr2)
+        if not (self.disableTruncOpti):
+            self.truncateMulArgs(var1, var2)
+        (convDim, pads, strides) = self.convArgs(node)
+        groups = node.options.get(AST.PaddingKeysDict.group, 1)
+        out = self.convBatched(var1.arr, var2.arr, pads, strides, groups)
+        return self.mulResult(out)
+
+    def visitBopConvTranspose(self, node: AST.BOp, args=None):
+        var1 = self.visit(node.expr1)
+        var2 = self.visit(node.expr2)
+        if not (self.disableTruncOpti):
+            self.truncateMulArgs(var1, var2)
+        (convDim, pads, strides) = self.convArgs(node)
+        keys = AST.PaddingKeysDict
+        outSize = [node.options[keys.outputImgH], node.options[keys.outputImgW]]
+        if convDim == 3:
+            outSize.insert(0, node.options[keys.outputImgD])
+        filterSize = node.expr2.type.shape[:convDim]
+        inSize = node.expr1.type.shape[1 : 1 + convDim]
+
+        # As the library: a stride 1 convolution of the input dilated by the
+        # stride, padded as findConvTransposePadding says, with the filter
+        # flipped and its channel axes swapped.
+        arr = var1.arr
+        dilated = np.zeros(
+            arr.shape[:2]
+            + tuple(i + (i - 1) * (s - 1) for (i, s) in zip(inSize, strides))
+            + arr.shape[-1:],
+            dtype=np.int64,
+        )
+        index = tuple(slice(None, None, s) for s in strides)
+        dilated[(slice(None), slice(None)) + index] = arr
+        trPads = []
+        for i in range(convDim):
+            [padTotal, strideTr, inTilde] = AST.Operators.findConvTransposePadding(
+                outSize[i], inSize[i], filterSize[i], sum(pads[i]), strides[i]
+            )
+            trPads.append(
+                tuple(AST.Operators.findLeftRightPaddingFromTotalPadding(padTotal))
+            )
+        filt = var2.arr[(slice(None),) + (slice(None, None, -1),) * convDim]
+        filt = np.ascontiguousarray(np.swapaxes(filt, -1, -2))
+        out = self.convBatched(dilated, filt, trPads, [1] * convDim, 1)
+        return self.mulResult(out)
+
+    def visitFunc(self, node: AST.Func, args=None):
+        var = self.visit(node.expr)
+        op = node.op
+        if op in [AST.Operators.ClearMemSecret, AST.Operators.ClearMemPublic]:
+            return var
+        if op == AST.Operators.Shape:
+            shape = np.array(self.shapeOf(node.expr), dtype=np.int64)
+            return Var(shape[np.newaxis], var.scale)
+        if op == AST.Operators.Floor:
+            mask = ~np.int64((1 << self.scaleFac) - 1)
+            return Var(var.arr & mask, var.scale)
+
+        if op in [AST.Operators.RELU, AST.Operators.HARDSIGMOID]:
+            sf = 0 if self.disableTruncOpti else var.scale - self.scaleFac
+            doTruncation = sf > 0
+            if doTruncation:
+                # If it can't tolerate one more mult operation, then scale down here
+                assert sf == self.scaleFac
+            if op == AST.Operators.RELU:
+                out = np.maximum(var.arr, 0)
+                if doTruncation:
+                    out = scaleDown(out, sf)
+                return Var(out, var.scale - sf)
+            self.exact = False
+            alpha = getattr(node, "alpha", 0.2)
+            beta = getattr(node, "beta", 0.5)
+            x = np.ldexp(var.arr.astype(np.float64), -var.scale)
+            y = np.clip(alpha * x + beta, 0.0, 1.0)
+            outScale = var.scale - sf
+            return Var(np.trunc(np.ldexp(y, outScale)).astype(np.int64), outScale)
+
+        assert op in [
+            AST.Operators.TANH,
+            AST.Operators.SIGMOID,
+            AST.Operators.SQRT,
+            AST.Operators.RSQRT,
+        ]
+        if self.disableTruncOpti:
+            sf = self.scaleFac
+        else:
+            # These only take 32 bit inputs
+            if var.scale > 31:
+                assert var.scale - self.scaleFac == self.scaleFac
+                self.truncate(var, var.scale - self.scaleFac)
+            sf = var.scale
+        self.exact = False
+        x = np.ldexp(var.arr.astype(np.float64), -sf)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            if op == AST.Operators.TANH:
+                y = np.tanh(x)
+            elif op == AST.Operators.SIGMOID:
+                y = 1.0 / (1.0 + np.exp(-x))
+            elif op == AST.Operators.SQRT:
+                y = np.sqrt(np.maximum(x, 0.0))
+            else:
+                y = 1.0 / np.sqrt(np.maximum(x, 0.0))
+        y = np.nan_to_num(np.ldexp(y, sf), posinf=2.0 ** (self.bitlen - 2))
+        return Var(self.ring.wrap(np.trunc(y).astype(np.int64)), sf)
+
+    def visitArgMax(self, node: AST.ArgMax, args=None):
+        var = self.visit(node.expr)
+        self.visit(node.dim)
+        # Over the last dimension, first maximum
+        out = np.argmax(var.arr, axis=-1).astype(np.int64)
+        return Var(out.reshape([var.arr.shape[0]] + node.type.shape), -1)
+
+    def visitReduce(self, node: AST.Reduce, args=None):
+        var = self.visit(node.expr)
+        assert node.op in [AST.Operators.ADD, AST.Operators.Mean]
+        axes = tuple(a + 1 for a in node.reductionAxesList)
+        out = self.ring.wrap(var.arr.sum(axis=axes))
+        if node.op == AST.Operators.Mean:
+            inputShape = node.expr.type.shape
+            divisor = Util.get_volume([inputShape[a] for a in node.reductionAxesList])
+            out = divide(out, divisor)
+        return Var(out.reshape([var.arr.shape[0]] + node.type.shape), var.scale)
+
+    def visitFusedBatchNorm(self, node: AST.FusedBatchNorm, args=None):
+        var1 = self.visit(node.expr)
+        var2 = self.visit(node.multExpr)
+        var3 = self.visit(node.addExpr)
+        multExprScaleDownSf = self.scaleFac
+        addExprScaleUpSf = 0
+        outScale = self.scaleFac
+        if not (self.disableTruncOpti):
+            multExprScaleDownSf = 0
+            if var1.scale > self.scaleFac:
+                self.truncate(var1, var1.scale - self.scaleFac)
+            if var2.scale > self.scaleFac:
+                self.truncate(var2, var2.scale - self.scaleFac)
+            outScale = 2 * self.scaleFac
+            assert outScale >= var3.scale
+            if outScale > var3.scale:
+                # The library scales up a copy, but the compiler records the
+                # new scale for the variable (IRBuilderCSF), so do the same.
+                addExprScaleUpSf = outScale - var3.scale
+                var3.scale += addExprScaleUpSf
+        ndim = var1.arr.ndim
+        out = self.ring.wrap(var1.arr * self.align(var2.arr, ndim))
+        if multExprScaleDownSf > 0:
+            out = scaleDown(out, multExprScaleDownSf)
+        bias = self.ring.wrap(self.align(var3.arr, ndim) << np.int64(addExprScaleUpSf))
+        return Var(self.ring.wrap(out + bias), outScale)
+
+    def visitUninterpFuncCall(self, node: AST.UninterpFuncCall, args=None):
+        argVars = [self.visit(arg) for arg in node.argsList]
+        if not (self.disableTruncOpti):
+            for (arg, var) in zip(node.argsList, argVars):
+                if (
+                    (not (Type.isInt(arg.type)))
+                    and (var.scale > self.scaleFac)
+                    and (arg.type.isSecret)
+                ):
+                    self.truncate(var, var.scale - self.scaleFac)
+        arrs = [var.arr for var in argVars]
+        outShape = node.type.shape
+        funcName = node.funcName
+
+        def intArg(i):
+            return [int(v) for v in arrs[i][0].flatten()]
+
+        if funcName in ["CreateIdentity", "Cast"]:
+            out = arrs[0].copy()
+        elif funcName == "CreateTensor":
+            out = np.broadcast_to(
+                arrs[0].reshape(arrs[0].shape[:1] + (1,) * len(outShape)),
+                (arrs[0].shape[0],) + tuple(outShape),
+            ).copy()
+        elif funcName in ["ExpandDims", "Squeeze"]:
+            x = arrs[0] if funcName == "ExpandDims" else arrs[-1]
+            out = x.reshape([x.shape[0]] + outShape)
+        elif funcName in ["Pad", "PadONNX"]:
+            x = arrs[0]
+            rank = x.ndim - 1
+            pads = intArg(1)
+            if funcName == "Pad":
+                before = pads[0::2]
+            else:
+                before = pads[:rank]
+            # Bounds as the library: whatever is not the input is zero
+            after = [o - i - b for (o, i, b) in zip(outShape, x.shape[1:], before)]
+            out = np.pad(x, [(0, 0)] + list(zip(before, after)))
+        elif funcName.startswith("Concat") and funcName.endswith("T"):
+            axis = intArg(len(arrs) - 1)[0]
+            inputs = arrs[:-1]
+            axis = axis % (inputs[0].ndim - 1)
+            B = max(x.shape[0] for x in inputs)
+            inputs = [np.broadcast_to(x, (B,) + x.shape[1:]) for x in inputs]
+            out = np.concatenate(inputs, axis=axis + 1)
+        elif funcName == "Split":
+            x = arrs[0]
+            [axis] = intArg(1)
+            [curCount] = intArg(2)
+            [total] = intArg(3)
+            size = x.shape[axis + 1] // total
+            index = [slice(None)] * x.ndim
+            index[axis + 1] = slice(size * curCount, size * (curCount + 1))
+            out = x[tuple(index)].copy()
+        elif funcName == "ReduceMeanONNX":
+            x = arrs[0]
+            divisor = x.shape[3] * x.shape[4]
+            out = divide(self.ring.wrap(x.sum(axis=(3, 4))), divisor)
+        elif funcName == "Tile":
+            x = arrs[0]
+            out = np.tile(x, [1] + intArg(1))
+        else:
+            raise NotImplementedError(
+                "UninterpFuncCall {} is not supported by the interpreter".format(
+                    funcName
+                )
+            )
+        out = self.ring.wrap(out).reshape([out.shape[0]] + outShape)
+        scale = self.scaleFac if not (self.disableTruncOpti) else argVars[0].scale
+        return Var(out, scale)
+
+
+# Integers of a .inp file (as CompileONNXGraph and the tests write them)
+def readInts(path):
+    with open(path) as f:
+        return np.array([int(x) for x in f.read().split()], dtype=np.int64)
+
+
+def main():
+    def str2bool(v):
+        if isinstance(v, bool):
+            return v
+        if v.lower() in ("true"):
+            return True
+        elif v.lower() in ("false"):
+            return False
+        else:
+            raise argparse.ArgumentTypeError("Boolean value expected.")
+
+    parser = argparse.ArgumentParser(
+        description="Run a SeeDot program (astOutput.pkl) in fixed point with numpy."
+    )
+    parser.add_argument("--astFile", required=True, help="Load AST from this file")
+    parser.add_argument(
+        "--consSF", default=15, type=int, help="Use this constant scaling factor."
+    )
+    parser.add_argument(
+        "--bitlen", default=64, type=int, help="Bitlength of the ring. Defaults to 64."
+    )
+    parser.add_argument(
+        "--disableRMO",
+        default=False,
+        type=str2bool,
+        help="Disable Relu-Maxpool optimization.",
+    )
+    parser.add_argument(
+        "--disableTruncOpti",
+        default=False,
+        type=str2bool,
+        help="Disable truncation placement optimization.",
+    )
+    parser.add_argument(
+        "--weightsFile", required=True, help="Fixed point weights (.inp) of the server."
+    )
+    parser.add_argument(
+        "--inputFile",
+        required=True,
+        help="Client input: a fixed point .inp file, or a .npy float array with "
+        "one input per row, which is scaled by consSF.",
+    )
+    parser.add_argument(
+        "--outputFile", help="Save the outputs (as floats) in this .npy file."
+    )
+    args = parser.parse_args()
+
+    ast = loadProgram(args.astFile, args.disableRMO)
+    interpreter = Interpreter(ast, args.consSF, args.bitlen, args.disableTruncOpti)
+    server = readInts(args.weightsFile)
+    if args.inputFile.endswith(".npy"):
+        x = np.load(args.inputFile)
+        client = np.trunc(np.ldexp(x.reshape(x.shape[0], -1), args.consSF)).astype(
+            np.int64
+        )
+    else:
+        client = readInts(args.inputFile)
+    outputs = interpreter.run(client, server)
+    outputs = [
+        np.ldexp(out.astype(np.float64), -max(scale, 0))
+        for (out, scale) in zip(outputs, interpreter.outputScales)
+    ]
+    for out in outputs:
+        print(out.reshape(out.shape[0], -1))
+    if args.outputFile:
+        if len(outputs) == 1:
+            np.save(args.outputFile, outputs[0])
+        else:
+            np.savez(args.outputFile, *outputs)
+
+
+if __name__ == "__main__":
+    main()
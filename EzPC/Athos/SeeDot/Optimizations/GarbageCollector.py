@@ -23,6 +23,7 @@ SOFTWARE.
 """
 
 import AST.AST as AST
+import AST.SSA as SSA
 import Util
 from AST.ASTVisitor import ASTVisitor
 from AST.MtdAST import MtdAST
@@ -52,9 +53,11 @@ class SecretFlowAnalysis(ASTVisitor):
         self.node_to_secret[node] = self.idf_to_secret[node.name]
 
     def visitLet(self, node: AST.Let, args):
-        self.visit(node.decl, args)
-        self.idf_to_secret[node.name.name] = self.node_to_secret[node.decl]
-        self.visit(node.expr, args)
+        (lets, result) = SSA.letChain(node)
+        for let in lets:
+            self.visit(let.decl, args)
+            self.idf_to_secret[let.name.name] = self.node_to_secret[let.decl]
+        self.visit(result, args)
 
     def visitDecl(self, node: AST.Decl, args):
         self.node_to_secret[node] = node.isSecret
@@ -137,12 +140,15 @@ class AliasAnalysis(ASTVisitor):
         return self.alias_sets.get_key_set(inp)
 
     def visitLet(self, node: AST.Let, args):
-        self.visit(node.decl)
-        self.visit(node.expr)
+        (lets, result) = SSA.letChain(node)
+        for let in lets:
+            self.visit(let.decl)
+        self.visit(result)
 
         # Two IDs with same name can have diff pointers. Hence we store ID names instead of pointers.
-        if isinstance(node.decl, AST.ID):
-            self.add_alias(node.name.name, node.decl.name)
+        for let in reversed(lets):
+            if isinstance(let.decl, AST.ID):
+                self.add_alias(let.name.name, let.decl.name)
 
 
 """
@@ -179,6 +185,8 @@ class GarbageCollector(ASTVisitor):
         self.alias_analysis = AliasAnalysis()
         self.alias_analysis.visit(self.ast)
         self.freed_nodes = set()
+        # Roots of the alias sets with a freed member
+        self.freed_aliases = set()
         self.counter = 0
         super().__init__()
 
@@ -186,20 +194,28 @@ class GarbageCollector(ASTVisitor):
         self.visit(self.ast, args)
 
     def isVarFreed(self, inp):
-        alias_set = self.alias_analysis.get_alias_set(inp)
-        if alias_set is None:
+        root = self.alias_analysis.alias_sets.find(inp)
+        if root is None:
             return inp in self.freed_nodes
-        for i in alias_set:
-            if i in self.freed_nodes:
-                return True
-        return False
+        return root in self.freed_aliases
+
+    def markFreed(self, inp):
+        self.freed_nodes.add(inp)
+        root = self.alias_analysis.alias_sets.find(inp)
+        if root is not None:
+            self.freed_aliases.add(root)
 
     def visitLet(self, node: AST.Let, args):
         assert isinstance(args, list)
         assert isinstance(args[0], MtdAST)
 
-        self.visit(node.expr, args)
+        (lets, result) = SSA.letChain(node)
+        self.visit(result, args)
+
+        for let in reversed(lets):
+            self.visitLetDecl(let, args)
 
+    def visitLetDecl(self, node: AST.Let, args):
         usedVars = self.visit(node.decl, args)
         if usedVars is None:
             assert (
@@ -209,7 +225,8 @@ class GarbageCollector(ASTVisitor):
             )
 
         varsToDeAllocate = [i for i in usedVars if not self.isVarFreed(i)]
-        self.freed_nodes = self.freed_nodes.union(set(varsToDeAllocate))
+        for i in varsToDeAllocate:
+            self.markFreed(i)
 
         astSubTree = node.expr
         mtdForNewASTNodes = {
@@ -22,29 +22,28 @@ SOFTWARE.
 
 """
 
-import AST.AST as AST
-from AST.ASTVisitor import ASTVisitor
-
-
-class ReluMaxpoolOpti(ASTVisitor):
-    def visitLet(self, node: AST.Let, args: dict):
-        if isinstance(node.decl, AST.Func) and node.decl.op == AST.Operators.RELU:
-            # Relu declaration entered
-            if isinstance(node.expr, AST.Let):
-                # There is a next let statement
-                if isinstance(node.expr.decl, AST.Pool) and (
-                    node.expr.decl.poolType == AST.Pool.PoolType.MaxPool
-                ):
-                    # This is the case of relu followed by maxpool declaration
-                    # Switch here
-                    print("Found relu followed by maxpool. Performing optimization.")
-                    # Assuming here that only maxpool's output is subsequently used.
-                    # TODO: Do something for above?
-                    reluDecl, maxpoolDecl = node.decl, node.expr.decl
-                    maxpoolDecl.expr = reluDecl.expr
-                    reluDecl.expr = node.name
-                    node.decl = maxpoolDecl
-                    node.expr.decl = reluDecl
-        self.visit(node.name)
-        self.visit(node.decl)
-        self.visit(node.expr)
+import AST.AST as AST
+import AST.SSA as SSA
+from AST.ASTVisitor import ASTVisitor
+
+
+class ReluMaxpoolOpti(ASTVisitor):
+    def visitLet(self, node: AST.Let, args: dict):
+        prog = SSA.SSAProgram.fromAST(node)
+        for i, let in enumerate(prog.stmts[:-1]):
+            if isinstance(let.decl, AST.Func) and let.decl.op == AST.Operators.RELU:
+                # Relu declaration entered
+                nextLet = prog.stmts[i + 1]
+                if (
+                    isinstance(nextLet.decl, AST.Pool)
+                    and (nextLet.decl.poolType == AST.Pool.PoolType.MaxPool)
+                    and prog.usesOf(let.name.name) == [i + 1]
+                ):
+                    # This is the case of relu followed by maxpool declaration,
+                    # and only maxpool uses the relu output. Switch here
+                    print("Found relu followed by maxpool. Performing optimization.")
+                    reluDecl, maxpoolDecl = let.decl, nextLet.decl
+                    maxpoolDecl.expr = reluDecl.expr
+                    reluDecl.expr = let.name
+                    let.decl = maxpoolDecl
+                    nextLet.decl = reluDecl
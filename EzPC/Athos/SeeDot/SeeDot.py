@@ -109,6 +109,18 @@ class MainDriver:
         parser.add_argument(
             "--debugVar", type=str, help="Name of the onnx node to be debugged"
         )
+        parser.add_argument(
+            "--parallelThreshold",
+            default=0,
+            type=int,
+            help="Mark loops over at least this many elements as OpenMP parallel (CPP/CPPRING targets of EzPC). 0 disables it.",
+        )
+        parser.add_argument(
+            "--parallelCollapse",
+            default=2,
+            type=int,
+            help="Number of nested loops a parallel loop collapses. Defaults to 2.",
+        )
 
         self.args = parser.parse_args()
 
@@ -130,6 +142,12 @@ class MainDriver:
             print("Running with liveness optimization disabled.")
         elif self.args.disableTruncOpti:
             print("Running with truncation placement optimization disabled.")
+        if self.args.parallelThreshold > 0:
+            print(
+                "Marking loops over at least {0} elements as parallel.".format(
+                    self.args.parallelThreshold
+                )
+            )
 
         obj = Compiler(
             self.args.version,
@@ -145,12 +163,13 @@ class MainDriver:
             self.args.disableTruncOpti,
             self.args.disableAllOpti,
             self.args.debugVar,
+            self.args.parallelThreshold,
+            self.args.parallelCollapse,
         )
         obj.run()
 
 
 if __name__ == "__main__":
-    sys.setrecursionlimit(100000)
     obj = MainDriver()
     obj.parseArgs()
     obj.runCompilerDriver()
@@ -26,6 +26,7 @@ import Util
 import operator
 from functools import reduce
 import AST.AST as AST
+import AST.SSA as SSA
 from AST.ASTVisitor import ASTVisitor
 from enum import Enum, auto
 import copy
@@ -224,7 +225,7 @@ class InferType(ASTVisitor):
         return node.type
 
     def visitTranspose(self, node: AST.Transpose, args=None):
-        node.expr.gamma = dict(node.gamma)
+        node.expr.gamma = node.gamma
         exprType = self.visit(node.expr)
 
         assert isTensor(exprType)
@@ -242,7 +243,7 @@ class InferType(ASTVisitor):
         return node.type
 
     def visitSlice(self, node: AST.Slice, args=None):
-        node.expr.gamma = dict(node.gamma)
+        node.expr.gamma = node.gamma
         exprType = self.visit(node.expr)
         assert isTensor(exprType)
 
@@ -262,7 +263,7 @@ class InferType(ASTVisitor):
         return node.type
 
     def visitReshape(self, node: AST.Reshape, args=None):
-        node.expr.gamma = dict(node.gamma)
+        node.expr.gamma = node.gamma
         # print(type(node.expr))
         exprType = self.visit(node.expr)
 
@@ -282,7 +283,7 @@ class InferType(ASTVisitor):
         return node.type
 
     def visitGather(self, node: AST.Gather, args=None):
-        node.expr.gamma = dict(node.gamma)
+        node.expr.gamma = node.gamma
         exprType = self.visit(node.expr)
 
         assert isTensor(exprType) and exprType.dim > 0
@@ -294,7 +295,7 @@ class InferType(ASTVisitor):
         return node.type
 
     def visitPool(self, node: AST.Pool, args=None):
-        node.expr.gamma = dict(node.gamma)
+        node.expr.gamma = node.gamma
         exprType = self.visit(node.expr)
 
         # Implementation only performs maxpool over a 4D input
@@ -319,15 +320,15 @@ class InferType(ASTVisitor):
         return node.type
 
     def visitUOp(self, node: AST.UOp, args=None):
-        node.expr.gamma = dict(node.gamma)
+        node.expr.gamma = node.gamma
         node.type = self.visit(node.expr)
         return node.type
 
     def visitBOp(self, node: AST.BOp, args=None):
-        node.expr1.gamma = dict(node.gamma)
+        node.expr1.gamma = node.gamma
         eType = self.visit(node.expr1)
 
-        node.expr2.gamma = dict(node.gamma)
+        node.expr2.gamma = node.gamma
         fType = self.visit(node.expr2)
 
         if node.op in [
@@ -530,7 +531,7 @@ class InferType(ASTVisitor):
         return node.type
 
     def visitFunc(self, node: AST.Func, args=None):
-        node.expr.gamma = dict(node.gamma)
+        node.expr.gamma = node.gamma
         eType = self.visit(node.expr)
 
         if node.op == AST.Operators.RELU:
@@ -568,18 +569,27 @@ class InferType(ASTVisitor):
 
         return node.type
 
+    # The Lets of a chain only add names to the environment, so they share
+    # one gamma, which the expressions below them only read. Copying it at
+    # every Let made type inference quadratic in the number of layers.
     def visitLet(self, node: AST.Let, args=None):
-        node.decl.gamma = dict(node.gamma)
-        eType = self.visit(node.decl)
+        (lets, result) = SSA.letChain(node)
+        gamma = dict(node.gamma)
+        for let in lets:
+            let.gamma = gamma
+            let.decl.gamma = gamma
+            eType = self.visit(let.decl)
 
-        node.name.gamma = {node.name.name: eType}
-        self.visit(node.name)
+            let.name.gamma = {let.name.name: eType}
+            self.visit(let.name)
 
-        node.expr.gamma = dict(node.gamma)
-        node.expr.gamma[node.name.name] = eType
-        fType = self.visit(node.expr)
+            gamma[let.name.name] = eType
 
-        node.type = copy.copy(fType)
+        result.gamma = gamma
+        fType = self.visit(result)
+
+        for let in lets:
+            let.type = copy.copy(fType)
         return node.type
 
     def visitUninterpFuncCall(self, node: AST.UninterpFuncCall, args=None):
@@ -588,7 +598,7 @@ class InferType(ASTVisitor):
         isSecret = False
         taint = Taints.PUBLIC_C
         for curArg in node.argsList:
-            curArg.gamma = dict(node.gamma)
+            curArg.gamma = node.gamma
             eType = self.visit(
                 curArg
             )  # This should set the type of each of the input nodes
@@ -599,10 +609,10 @@ class InferType(ASTVisitor):
         return node.type
 
     def visitArgMax(self, node: AST.ArgMax, args=None):
-        node.expr.gamma = dict(node.gamma)
+        node.expr.gamma = node.gamma
         eType = self.visit(node.expr)
 
-        node.dim.gamma = dict(node.gamma)
+        node.dim.gamma = node.gamma
         dimType = self.visit(node.dim)
         assert isInt(dimType) or (isTensor(dimType) and (len(dimType.shape) == 0))
 
@@ -610,7 +620,7 @@ class InferType(ASTVisitor):
         return node.type
 
     def visitUnsqueeze(self, node: AST.Unsqueeze, args=None):
-        node.expr.gamma = dict(node.gamma)
+        node.expr.gamma = node.gamma
         exprType = self.visit(node.expr)
 
         dims = len(node.shape)
@@ -628,7 +638,7 @@ class InferType(ASTVisitor):
         return node.type
 
     def visitReduce(self, node: AST.Reduce, args=None):
-        cur_gamma = dict(node.gamma)
+        cur_gamma = node.gamma
         node.expr.gamma = cur_gamma
         eType = self.visit(node.expr)
 
@@ -642,13 +652,13 @@ class InferType(ASTVisitor):
         return node.type
 
     def visitOutput(self, node: AST.Output, args=None):
-        node.expr.gamma = dict(node.gamma)
+        node.expr.gamma = node.gamma
         self.visit(node.expr)
         node.type = Unit()
         return node.type
 
     def visitFusedBatchNorm(self, node: AST.FusedBatchNorm, args=None):
-        cur_gamma = dict(node.gamma)
+        cur_gamma = node.gamma
         node.expr.gamma = cur_gamma
         node.multExpr.gamma = cur_gamma
         node.addExpr.gamma = cur_gamma
@@ -58,6 +58,10 @@ class Config:
     disableLivenessOpti = None
     disableAllOpti = None
     debugOnnx = None
+    # Loops over at least parallelThreshold elements are marked parallel
+    # (0: never), collapsing up to parallelCollapse nested loops.
+    parallelThreshold = 0
+    parallelCollapse = 2
 
 
 ###### Helper functions ######
@@ -33,6 +33,7 @@ import Graph, AST.AST as AST, _pickle as pickle, os
 from TFNodesAST import TFNodesAST
 from AST.PrintAST import PrintAST
 from AST.MtdAST import MtdAST
+import AST.SSA as SSA
 
 
 def checkTFNodeNameForEq(curNodeOp: str, givenOp: str):
@@ -358,7 +359,7 @@ def process_tf_graph(filename, output_tensors=None):
 
     print("SeeDot AST generation done. Pickling the AST.")
     with open(os.path.join(folderName, "astOutput.pkl"), "wb") as f:
-        pickle.dump(program, f)
+        SSA.SSAProgram.fromAST(program).dump(f)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,281 @@
+"""
+
+Copyright:
+Copyright (c) 2021 Microsoft Research
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+
+"""
+# Batched test mode (pytest --batch N).
+#
+# Compiling every unit test graph to its own binary and starting the parties
+# for it dominates the test time. In batched mode the test session runs in two
+# passes:
+#   1. Record: every test is executed once. Compiler.compile_and_run stores the
+#      graph, config and inputs of the test and skips it.
+#   2. Replay: recorded graphs are fused (per frontend and config, up to N at
+#      a time) into a single graph with disjoint, prefixed names, compiled and
+#      run in one MPC session. The flat output is split back per test. The
+#      normal test loop then runs and compile_and_run returns the
+#      demultiplexed output.
+# Inputs are regenerated identically in both passes because np.random is
+# seeded from the test id. If a fused run fails, its tests fall back to
+# compiling individually.
+import json
+import os
+import shutil
+import tempfile
+import warnings
+import zlib
+
+import numpy as np
+import pytest
+from _pytest.runner import runtestprotocol
+
+import onnx
+from onnx import helper
+
+RECORD = "record"
+REPLAY = "replay"
+
+_state = {
+    "mode": None,
+    "test": None,
+    "calls": 0,
+    "recorded": [],
+    "results": {},
+}
+
+
+class BatchMember:
+    def __init__(self, key, frontend, graph, config, inputs, output_sizes):
+        self.key = key
+        self.frontend = frontend
+        self.graph = graph
+        self.config = config
+        self.inputs = [np.array(i, copy=True) for i in inputs]
+        self.output_sizes = output_sizes
+
+
+def enabled():
+    return _state["mode"] is not None
+
+
+def seed_for(nodeid):
+    return zlib.crc32(nodeid.encode("utf-8"))
+
+
+def start_test(nodeid):
+    _state["test"] = nodeid
+    _state["calls"] = 0
+    np.random.seed(seed_for(nodeid))
+
+
+def _next_key():
+    key = "{}#{}".format(_state["test"], _state["calls"])
+    _state["calls"] += 1
+    return key
+
+
+def onnx_output_sizes(graph):
+    sizes = []
+    for out in graph.output:
+        dims = out.type.tensor_type.shape.dim
+        if not all(d.HasField("dim_value") for d in dims):
+            sizes.append(None)
+            continue
+        sizes.append(int(np.prod([d.dim_value for d in dims])))
+    return sizes
+
+
+def tf_output_sizes(graph, output_names):
+    return [
+        graph.get_tensor_by_name(name).shape.num_elements() for name in output_names
+    ]
+
+
+def dispatch(compiler, inputs):
+    """Called by Compiler.compile_and_run.
+
+    Returns the MPC output if it is already known for this call, None if the
+    test should be compiled and run on its own.
+    """
+    from tests.utils import Frontend
+
+    key = _next_key()
+    if _state["mode"] == RECORD:
+        if compiler.frontend == Frontend.Tensorflow:
+            sizes = tf_output_sizes(compiler.graph, compiler.config["output_tensors"])
+        else:
+            sizes = onnx_output_sizes(compiler.graph_def)
+        if None in sizes:
+            # Unknown output shape, cannot split the fused output.
+            pytest.skip("recorded without batching")
+        _state["recorded"].append(
+            BatchMember(
+                key,
+                compiler.frontend,
+                compiler.graph,
+                dict(compiler.config),
+                inputs,
+                sizes,
+            )
+        )
+        pytest.skip("recorded for batched run")
+
+    result = _state["results"].get(key)
+    if result is None:
+        return None
+    recorded_inputs, output = result
+    if len(recorded_inputs) != len(inputs) or not all(
+        np.array_equal(a, b) for a, b in zip(recorded_inputs, inputs)
+    ):
+        # Test is not deterministic, use the regular path.
+        return None
+    return output
+
+
+def member_prefix(idx):
+    return "b{}_".format(idx)
+
+
+def fuse_onnx_graphs(graphs):
+    nodes, inputs, outputs, initializer, value_info = [], [], [], [], []
+    for idx, graph in enumerate(graphs):
+        g = onnx.compose.add_prefix_graph(graph, member_prefix(idx))
+        nodes.extend(g.node)
+        inputs.extend(g.input)
+        outputs.extend(g.output)
+        initializer.extend(g.initializer)
+        value_info.extend(g.value_info)
+    return helper.make_graph(
+        nodes=nodes,
+        name="batched_test",
+        inputs=inputs,
+        outputs=outputs,
+        initializer=initializer,
+        value_info=value_info,
+    )
+
+
+def fuse_tf_graphs(graphs):
+    import tensorflow as tf
+
+    fused = tf.Graph()
+    with fused.as_default():
+        for idx, graph in enumerate(graphs):
+            tf.compat.v1.import_graph_def(
+                graph.as_graph_def(), name=member_prefix(idx)[:-1]
+            )
+    return fused
+
+
+def fused_config(members):
+    from tests.utils import Frontend
+
+    config = dict(members[0].config)
+    config["input_tensors"] = {}
+    config["output_tensors"] = []
+    for idx, m in enumerate(members):
+        prefix = member_prefix(idx)
+        if m.frontend == Frontend.Tensorflow:
+            prefix = prefix[:-1] + "/"
+        for name, shape in m.config.get("input_tensors", {}).items():
+            config["input_tensors"][prefix + name] = shape
+        for name in m.config["output_tensors"]:
+            config["output_tensors"].append(prefix + name)
+    if members[0].frontend == Frontend.Tensorflow:
+        config["model_name"] = "model.pb"
+    else:
+        config["model_name"] = "model.onnx"
+    return config
+
+
+def split_output(output, sizes):
+    if output is None or len(output) != sum(sizes):
+        return None
+    offsets = np.cumsum([0] + sizes)
+    return [output[offsets[i] : offsets[i + 1]] for i in range(len(sizes))]
+
+
+def run_chunk(members, test_dir, timeoutSeconds):
+    from tests.utils import Compiler, Frontend, make_dir
+
+    class _Config:
+        def __init__(self, config):
+            self.config = config
+
+    frontend = members[0].frontend
+    if frontend == Frontend.Tensorflow:
+        graph = fuse_tf_graphs([m.graph for m in members])
+    else:
+        graph = fuse_onnx_graphs([m.graph for m in members])
+    config = _Config(fused_config(members))
+    make_dir(test_dir)
+    inputs = [i for m in members for i in m.inputs]
+    compiler = Compiler(graph, config, test_dir, frontend)
+    try:
+        output = compiler.compile_and_run(inputs, timeoutSeconds)
+    except (Exception, SystemExit) as e:
+        warnings.warn("Batched run failed, falling back: {}".format(e))
+        return
+    sizes = [sum(m.output_sizes) for m in members]
+    outputs = split_output(output, sizes)
+    if outputs is None:
+        warnings.warn("Batched run produced unexpected output, falling back.")
+        return
+    for m, out in zip(members, outputs):
+        _state["results"][m.key] = (m.inputs, out)
+    shutil.rmtree(test_dir, ignore_errors=True)
+
+
+# Keys of the config that every test sets for its own graph. All the other
+# keys (scale, bitlength, target, ...) must be equal for tests to be fused.
+PER_TEST_KEYS = ["model_name", "input_tensors", "output_tensors"]
+
+
+def group_key(member):
+    shared = {k: v for k, v in member.config.items() if k not in PER_TEST_KEYS}
+    return (member.frontend, json.dumps(shared, sort_keys=True, default=str))
+
+
+def run_batches(batch_size, timeoutSeconds=40):
+    groups = {}
+    for m in _state["recorded"]:
+        groups.setdefault(group_key(m), []).append(m)
+    root = os.path.join(tempfile.gettempdir(), "cryptflow_batched_tests")
+    if not os.path.exists(root):
+        os.mkdir(root)
+    for group, ((frontend, _), members) in enumerate(groups.items()):
+        for start in range(0, len(members), batch_size):
+            chunk = members[start : start + batch_size]
+            chunk_dir = os.path.join(
+                root,
+                "batch_{}_{}_{}".format(
+                    frontend.name.lower(), group, start // batch_size
+                ),
+            )
+            run_chunk(chunk, chunk_dir, timeoutSeconds * len(chunk))
+
+
+def record_and_run(session, batch_size):
+    _state["mode"] = RECORD
+    for item in session.items:
+        runtestprotocol(item, log=False, nextitem=None)
+    _state["mode"] = None
+    run_batches(batch_size)
+    _state["mode"] = REPLAY
+    _state["recorded"] = []
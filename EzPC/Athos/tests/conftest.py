@@ -27,23 +27,73 @@ import shutil
 import os
 import sys
 
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
 
 def pytest_addoption(parser):
     parser.addoption(
         "--backend",
         action="store",
         choices=["CPP", "3PC", "2PC_HE", "2PC_OT"],
-        help="backend : CPP | 2PC_HE | 2PC_OT | 3PC",
-        required=True,
+        help="backend : CPP | 2PC_HE | 2PC_OT | 3PC. Required by the tests "
+        "that compile a program (not by tests/seedot).",
+    )
+    parser.addoption(
+        "--batch",
+        action="store",
+        type=int,
+        default=0,
+        help="Fuse up to N test graphs into one compiled program. 0 disables.",
+    )
+    parser.addoption(
+        "--no-interpret",
+        action="store_true",
+        default=False,
+        help="Do not check the CPP outputs against the SeeDot fixed point "
+        "interpreter (checked by default with --backend CPP).",
     )
 
 
 @pytest.fixture(scope="session")
 def backend(request):
     opt = request.config.getoption("--backend")
+    if opt is None:
+        pytest.fail("--backend is required", pytrace=False)
     return opt
 
 
+@pytest.hookimpl(hookwrapper=True)
+def pytest_runtestloop(session):
+    batch_size = session.config.getoption("--batch")
+    if batch_size > 0 and not session.config.option.collectonly:
+        # Imported here as it needs onnx, which tests/seedot does not.
+        import tests.batching as batching
+
+        batching.record_and_run(session, batch_size)
+    yield
+
+
+@pytest.fixture(scope="session", autouse=True)
+def interpret(request):
+    if request.config.getoption("--backend") == "CPP" and not request.config.getoption(
+        "--no-interpret"
+    ):
+        import tests.utils as utils
+
+        utils.interpreter_check["enabled"] = True
+    return
+
+
+@pytest.fixture(autouse=True)
+def batch_test(request):
+    # Inputs must be the same in the record and replay passes.
+    if request.config.getoption("--batch") > 0:
+        import tests.batching as batching
+
+        batching.start_test(request.node.nodeid)
+    return
+
+
 @pytest.fixture(scope="session", autouse=True)
 def test_env():
     config = {}
@@ -0,0 +1,68 @@
+"""
+
+Copyright:
+Copyright (c) 2021 Microsoft Research
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+
+"""
+import numpy as np
+import onnx
+from onnx import helper
+
+import pytest
+
+# Athos DIR
+import sys, os
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "..", ".."))
+from tests.utils import make_onnx_graph, run_onnx
+from tests.batching import fuse_onnx_graphs, onnx_output_sizes, split_output
+
+
+def make_binop_graph(Op, a, b):
+    out = {"Add": np.add, "Mul": np.multiply}[Op](a, b)
+    node = helper.make_node(Op, inputs=["a", "b"], outputs=["out"])
+    return make_onnx_graph(
+        node,
+        inputs=[a],
+        outputs=[out],
+        tensors=[b],
+        tensor_names=["b"],
+        name=Op + "_test",
+    )
+
+
+def test_fuse_onnx_graphs():
+    a0 = np.random.randn(2, 2, 2, 2).astype(np.single)
+    b0 = np.random.randn(2, 2, 2, 2).astype(np.single)
+    a1 = np.random.randn(1, 3, 2, 2).astype(np.single)
+    b1 = np.random.randn(1, 3, 2, 2).astype(np.single)
+    graphs = [make_binop_graph("Add", a0, b0), make_binop_graph("Mul", a1, b1)]
+    expected = [run_onnx(graphs[0], [a0]), run_onnx(graphs[1], [a1])]
+
+    fused = fuse_onnx_graphs(graphs)
+    assert [i.name for i in fused.input] == ["b0_a", "b1_a"]
+    assert [o.name for o in fused.output] == ["b0_out", "b1_out"]
+
+    fused_output = run_onnx(fused, [a0, a1])
+    flat = np.concatenate([o.flatten() for o in fused_output])
+    sizes = [sum(onnx_output_sizes(g)) for g in graphs]
+    outputs = split_output(flat, sizes)
+    for exp, out in zip(expected, outputs):
+        np.testing.assert_almost_equal(exp.flatten(), out, decimal=5)
+    assert split_output(flat[:-1], sizes) is None
+    return
@@ -0,0 +1,194 @@
+"""
+
+Copyright:
+Copyright (c) 2021 Microsoft Research
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+
+"""
+# Checks the SeeDot fixed point interpreter against integer references
+# written out by hand. The CPP target is checked against the interpreter by
+# tests/utils.py on every compiled unit test.
+import numpy as np
+
+import pytest
+
+# Athos DIR
+import sys, os
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "..", "SeeDot"))
+import AST.AST as AST
+import AST.SSA as SSA
+import Interpreter
+
+SCALE = 12
+K = AST.PaddingKeysDict
+
+
+def build_program(path, lets, output):
+    chain = [AST.Let(AST.ID(name), decl, AST.ASTNode()) for (name, decl) in lets]
+    for a, b in zip(chain, chain[1:]):
+        a.expr = b
+    chain[-1].expr = AST.Output(AST.ID(output), AST.Party.CLIENT)
+    with open(path, "wb") as f:
+        SSA.SSAProgram.fromAST(chain[0]).dump(f)
+    return path
+
+
+def client(shape):
+    return AST.Input(shape, "int64", isSecret=True, inputByParty=AST.Party.CLIENT)
+
+
+def server(shape):
+    return AST.Input(shape, "int64", isSecret=True, inputByParty=AST.Party.SERVER)
+
+
+def fixed(a, scale=SCALE):
+    return np.trunc(np.ldexp(a, scale)).astype(np.int64)
+
+
+def conv2d(x, f, pad, stride):
+    # x: [H, W, CI], f: [FH, FW, CI, CO], integer reference
+    x = np.pad(x, [(pad, pad), (pad, pad), (0, 0)])
+    FH, FW, CI, CO = f.shape
+    outH = (x.shape[0] - FH) // stride + 1
+    outW = (x.shape[1] - FW) // stride + 1
+    out = np.zeros((outH, outW, CO), dtype=np.int64)
+    for i in range(outH):
+        for j in range(outW):
+            patch = x[i * stride : i * stride + FH, j * stride : j * stride + FW]
+            for co in range(CO):
+                out[i, j, co] = np.sum(patch * f[..., co])
+    return out
+
+
+def c_div(a, b):
+    q = abs(int(a)) // b
+    return -q if a < 0 else q
+
+
+def test_cnn_fixed_point(tmp_path):
+    conv_opts = {
+        K.FH: 3,
+        K.FW: 3,
+        K.zPadHLeft: 1,
+        K.zPadHRight: 1,
+        K.zPadWLeft: 1,
+        K.zPadWRight: 1,
+        K.strideH: 2,
+        K.strideW: 2,
+        K.group: 1,
+    }
+    pool_opts = {
+        K.FH: 2,
+        K.FW: 2,
+        K.zPadHLeft: 0,
+        K.zPadHRight: 0,
+        K.zPadWLeft: 0,
+        K.zPadWRight: 0,
+        K.strideH: 2,
+        K.strideW: 2,
+    }
+    path = build_program(
+        str(tmp_path / "cnn.pkl"),
+        [
+            ("x", client([1, 8, 8, 3])),
+            ("f", server([3, 3, 3, 4])),
+            ("b", server([4])),
+            ("w", server([16, 5])),
+            ("c", AST.BOp(AST.ID("x"), AST.Operators.CONV, AST.ID("f"), conv_opts)),
+            ("cb", AST.BOp(AST.ID("c"), AST.Operators.ADD, AST.ID("b"))),
+            ("r", AST.Func(AST.Operators.RELU, AST.ID("cb"))),
+            ("p", AST.Pool(AST.Pool.PoolType.AvgPool, AST.ID("r"), pool_opts)),
+            ("q", AST.Reshape(AST.ID("p"), [1, 16], None)),
+            ("m", AST.BOp(AST.ID("q"), AST.Operators.MUL, AST.ID("w"))),
+        ],
+        "m",
+    )
+    x = fixed(np.random.uniform(-1, 1, (3, 8, 8, 3)))
+    f = fixed(np.random.uniform(-1, 1, (3, 3, 3, 4)))
+    b = fixed(np.random.uniform(-1, 1, 4))
+    w = fixed(np.random.uniform(-1, 1, (16, 5)))
+
+    interpreter = Interpreter.Interpreter(Interpreter.loadProgram(path), SCALE, 64)
+    [out] = interpreter.run(
+        x.reshape(3, -1), np.concatenate([f.ravel(), b.ravel(), w.ravel()])
+    )
+    assert interpreter.exact
+    assert interpreter.outputScales == [SCALE]
+
+    for n in range(3):
+        # Conv output has scale 2s, the bias is scaled up to it, Relu
+        # truncates back to s.
+        r = (np.maximum(conv2d(x[n], f, 1, 2) + (b << SCALE), 0)) >> SCALE
+        p = np.zeros((2, 2, 4), dtype=np.int64)
+        for i in range(2):
+            for j in range(2):
+                for c in range(4):
+                    window = r[2 * i : 2 * i + 2, 2 * j : 2 * j + 2, c]
+                    p[i, j, c] = c_div(window.sum(), 4)
+        expected = (p.reshape(1, 16) @ w) >> SCALE
+        np.testing.assert_array_equal(out[n], expected)
+
+
+def test_avgpool_rounds_towards_zero(tmp_path):
+    pool_opts = {
+        K.FH: 2,
+        K.FW: 1,
+        K.zPadHLeft: 0,
+        K.zPadHRight: 0,
+        K.zPadWLeft: 0,
+        K.zPadWRight: 0,
+        K.strideH: 2,
+        K.strideW: 1,
+    }
+    path = build_program(
+        str(tmp_path / "pool.pkl"),
+        [
+            ("x", client([1, 2, 2, 1])),
+            ("p", AST.Pool(AST.Pool.PoolType.AvgPool, AST.ID("x"), pool_opts)),
+        ],
+        "p",
+    )
+    interpreter = Interpreter.Interpreter(Interpreter.loadProgram(path), SCALE, 64)
+    [out] = interpreter.run(np.array([-3, 5, 0, -2], dtype=np.int64), np.zeros(0))
+    # (-3 + 0) / 2 and (5 - 2) / 2 as C division
+    np.testing.assert_array_equal(out.ravel(), [-1, 1])
+
+
+def test_ring_wraparound(tmp_path):
+    path = build_program(
+        str(tmp_path / "add.pkl"),
+        [
+            ("x", client([4])),
+            ("y", server([4])),
+            ("s", AST.BOp(AST.ID("x"), AST.Operators.ADD, AST.ID("y"))),
+        ],
+        "s",
+    )
+    big = (1 << 31) - 1
+    x = np.array([big, -big - 1, 5, -5], dtype=np.int64)
+    y = np.array([1, -1, 7, 3], dtype=np.int64)
+    interpreter = Interpreter.Interpreter(Interpreter.loadProgram(path), SCALE, 32)
+    [out] = interpreter.run(x, y)
+    np.testing.assert_array_equal(out[0], [-big - 1, big, 12, -2])
+
+
+@pytest.mark.parametrize("bits", [8, 24, 40, 62])
+def test_exact_matmul(bits):
+    a = np.random.randint(-(2**bits), 2**bits, (33, 70), dtype=np.int64)
+    b = np.random.randint(-(2**12), 2**12, (70, 9), dtype=np.int64)
+    np.testing.assert_array_equal(Interpreter.matmul(a, b), np.dot(a, b))
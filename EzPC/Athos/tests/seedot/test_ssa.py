@@ -0,0 +1,171 @@
+"""
+
+Copyright:
+Copyright (c) 2021 Microsoft Research
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+
+"""
+# Checks the flat SSA view of SeeDot programs (SeeDot/AST/SSA.py): deep
+# programs are dumped, loaded and compiled without raising the recursion
+# limit, and the new pickles compile to the same EzPC as the old ones.
+import _pickle as pickle
+import subprocess
+
+# Athos DIR
+import sys, os
+
+SEEDOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "SeeDot")
+sys.path.append(SEEDOT)
+import AST.AST as AST
+import AST.SSA as SSA
+import Optimizations.ReluMaxpoolOpti as ReluMaxpoolOpti
+
+K = AST.PaddingKeysDict
+POOL_OPTS = {
+    K.FH: 2,
+    K.FW: 2,
+    K.zPadHLeft: 0,
+    K.zPadHRight: 0,
+    K.zPadWLeft: 0,
+    K.zPadWRight: 0,
+    K.strideH: 2,
+    K.strideW: 2,
+}
+
+
+def make_program(lets, output):
+    stmts = [AST.Let(AST.ID(name), decl, AST.ASTNode()) for (name, decl) in lets]
+    return SSA.SSAProgram(stmts, AST.Output(AST.ID(output), AST.Party.CLIENT))
+
+
+def client(shape):
+    return AST.Input(shape, "int64", isSecret=True, inputByParty=AST.Party.CLIENT)
+
+
+def server(shape):
+    return AST.Input(shape, "int64", isSecret=True, inputByParty=AST.Party.SERVER)
+
+
+def relu(name):
+    return AST.Func(AST.Operators.RELU, AST.ID(name))
+
+
+def maxpool(name):
+    return AST.Pool(AST.Pool.PoolType.MaxPool, AST.ID(name), POOL_OPTS)
+
+
+def add(a, b):
+    return AST.BOp(AST.ID(a), AST.Operators.ADD, AST.ID(b))
+
+
+def seedot(ast_file, out_dir):
+    # In a fresh interpreter, so at the default recursion limit
+    env = dict(os.environ, PYTHONHASHSEED="0")
+    subprocess.run(
+        [
+            sys.executable,
+            os.path.join(SEEDOT, "SeeDot.py"),
+            "--astFile",
+            ast_file,
+            "--consSF",
+            "12",
+            "--outputFileName",
+            "out.ezpc",
+        ],
+        cwd=out_dir,
+        env=env,
+        check=True,
+        stdout=subprocess.DEVNULL,
+    )
+    with open(os.path.join(out_dir, "out.ezpc"), "rb") as f:
+        return f.read()
+
+
+def test_deep_program(tmp_path):
+    layers = 5000
+    lets = [("x", client([1, 4])), ("b", server([1, 4])), ("s0", add("x", "b"))]
+    for i in range(1, layers):
+        lets.append(("s" + str(i), add("s" + str(i - 1), "b")))
+    ast_file = str(tmp_path / "deep.pkl")
+    with open(ast_file, "wb") as f:
+        make_program(lets, "s" + str(layers - 1)).dump(f)
+
+    with open(ast_file, "rb") as f:
+        ast = SSA.loadAST(f)
+    (chain, result) = SSA.letChain(ast)
+    assert [let.name.name for let in chain] == [name for (name, _) in lets]
+    assert isinstance(result, AST.Output)
+
+    assert sys.getrecursionlimit() < layers
+    ezpc = seedot(ast_file, str(tmp_path))
+    assert b"EndComputation" in ezpc
+
+
+def test_old_pickles_compile_the_same(tmp_path):
+    lets = [
+        ("x", client([1, 4, 4, 2])),
+        ("b", server([1, 4, 4, 2])),
+        ("s", add("x", "b")),
+        ("r", relu("s")),
+        ("m", maxpool("r")),
+        ("t", relu("m")),
+    ]
+    new_file = str(tmp_path / "new.pkl")
+    with open(new_file, "wb") as f:
+        make_program(lets, "t").dump(f)
+    old_file = str(tmp_path / "old.pkl")
+    with open(old_file, "wb") as f:
+        # Front ends used to pickle the Let chain itself
+        pickle.dump(make_program(lets, "t").toAST(), f)
+
+    (tmp_path / "new").mkdir()
+    (tmp_path / "old").mkdir()
+    assert seedot(new_file, str(tmp_path / "new")) == seedot(
+        old_file, str(tmp_path / "old")
+    )
+
+
+def decls(ast):
+    (chain, _) = SSA.letChain(ast)
+    return [(let.name.name, type(let.decl).__name__) for let in chain]
+
+
+def test_relu_maxpool_swap():
+    lets = [("x", client([1, 4, 4, 2])), ("r", relu("x")), ("m", maxpool("r"))]
+    ast = make_program(lets, "m").toAST()
+    ReluMaxpoolOpti.ReluMaxpoolOpti().visit(ast)
+    assert decls(ast) == [("x", "Input"), ("r", "Pool"), ("m", "Func")]
+
+
+def test_relu_maxpool_skips_shared_relu():
+    # r is also read by m2, so maxpooling first would change m2
+    lets = [
+        ("x", client([1, 4, 4, 2])),
+        ("r", relu("x")),
+        ("m", maxpool("r")),
+        ("m2", maxpool("r")),
+        ("s", add("m", "m2")),
+    ]
+    ast = make_program(lets, "s").toAST()
+    ReluMaxpoolOpti.ReluMaxpoolOpti().visit(ast)
+    assert decls(ast) == [
+        ("x", "Input"),
+        ("r", "Func"),
+        ("m", "Pool"),
+        ("m2", "Pool"),
+        ("s", "BOp"),
+    ]
@@ -26,6 +26,7 @@ import sys
 import os
 import shutil
 import re
+import warnings
 from enum import Enum, auto
 
 sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
@@ -34,6 +35,11 @@ import CompileONNXGraph
 import CompilerScripts.parse_config as parse_config
 from CompilerScripts.get_output import convert_raw_output_to_np
 
+import tests.batching as batching
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "SeeDot"))
+import Interpreter
+
 import onnx
 from onnx import helper
 from onnx.backend.test.case import node
@@ -248,11 +254,16 @@ class Compiler:
             self.graph_def = graph.as_graph_def()
         else:
             self.graph_def = graph
+        self.graph = graph
         self.config = config.config
         self.test_dir = test_dir
         self.frontend = frontend
 
     def compile_and_run(self, inputs, timeoutSeconds=40):
+        if batching.enabled():
+            output = batching.dispatch(self, inputs)
+            if output is not None:
+                return output
         save_graph(self.graph_def, self.config, self.test_dir, self.frontend)
         params = get_params(self.config)
         if self.frontend == Frontend.Tensorflow:
@@ -265,9 +276,45 @@ class Compiler:
             )
         prog = Program(output_program, model_weight_file, params, self.test_dir)
         output = prog.run(inputs, timeoutSeconds)
+        if interpreter_check["enabled"] and prog.target == "CPP":
+            check_with_interpreter(prog, params, inputs, output)
         return output
 
 
+# Enabled by conftest for --backend CPP, unless --no-interpret is given.
+interpreter_check = {"enabled": False}
+
+
+# Runs the compiled SeeDot program in the fixed point interpreter and checks
+# that it gives the same outputs as the CPP program.
+def check_with_interpreter(prog, params, inputs, output):
+    ast_file = os.path.join(os.path.dirname(params["model_name"]), "astOutput.pkl")
+    disable_rmo = bool(params["disable_all_hlil_opts"]) or bool(
+        params["disable_relu_maxpool_opts"]
+    )
+    ast = Interpreter.loadProgram(ast_file, disable_rmo)
+    interpreter = Interpreter.Interpreter(
+        ast, prog.scale, prog.bitlength, bool(params["disable_trunc_opts"])
+    )
+    client = np.array(
+        [int(xx * (1 << prog.scale)) for i in inputs for xx in np.nditer(i, order="C")],
+        dtype=np.int64,
+    )
+    server = Interpreter.readInts(prog.model_weight_path)
+    try:
+        outputs = interpreter.run(client, server)
+    except NotImplementedError as e:
+        warnings.warn("Not checked with the interpreter: {}".format(e))
+        return
+    expected = np.concatenate([out.flatten() for out in outputs]) / (2**prog.scale)
+    if interpreter.exact:
+        np.testing.assert_array_equal(output, expected)
+    else:
+        # Tanh, Sigmoid and Sqrt are computed in floating point
+        np.testing.assert_allclose(output, expected, rtol=0, atol=2 ** (4 - prog.scale))
+    return
+
+
 def assert_almost_equal(model_output, mpc_tensor, precision):
     if model_output.shape == (0,):
         return
@@ -60,7 +60,8 @@ class Network :
         return str1
     
 class BeaconTranslator :
-    def __init__(self, net, batch, iters, lr, loss="CE", momentum=False, name="") :
+    def __init__(self, net, batch, iters, lr, loss="CE", momentum=False, name="", reveal_every=1, stream=False) :
+        assert reveal_every >= 0
         self.batch = batch
         self.iters = iters
         self.net = net
@@ -68,6 +69,8 @@ class BeaconTranslator :
         self.loss = loss
         self.momentum = momentum
         self.name = name
+        self.reveal_every = reveal_every
+        self.stream = stream
         
     def __str__(self) :
         str1 = f"Using a batch size of {self.batch} to train for {self.iters} iterations with lr={self.lr}\n"
@@ -214,10 +217,14 @@ updateWeights{'Momentum' if self.momentum else ''}({outf}, {self.lr}, {'0.9, ' i
 {self.get_backward_body()}\n\
 {brace_close}"
         
-    def get_inputs(self) :
+    def get_batch_inputs(self) :
         str_inp = f"input(CLIENT, inp, float_fl[BATCH][{self.net.in_dim}]) ;\n"
         str_lab = f"input(CLIENT, target, float_fl[BATCH][{self.net.no_class}]) ;\n"
-        str_ret = str_inp + str_lab
+        return str_inp + str_lab
+
+    def get_inputs(self) :
+        # When streaming, a new batch is read at the start of every iteration
+        str_ret = "" if self.stream else self.get_batch_inputs()
         
         for l in self.net.layers :
             str_ret += l.get_wt_input_stmt()
@@ -283,13 +290,27 @@ float_fl[{l.out_features}] layer{ind+1}bMom ;\n\
         
         return f"backward({arg_list}) ;\n"
         
+    def get_loss_reveal(self) :
+        """ Loss computation and reveal, done every reveal_every iterations (never if 0) """
+        brace_open, brace_close = '{', '}'
+        if self.reveal_every == 0 :
+            return ""
+
+        reveal = f"{self.get_loss_call()}output(ALL, loss[0]) ;\n"
+        if self.reveal_every == 1 :
+            return reveal
+
+        return f"if ((((i + 1) % {self.reveal_every}) == 0)) {brace_open}\n\
+{reveal}\
+{brace_close} ;\n"
+
     def get_training_loop(self) :
         brace_open, brace_close = '{', '}'
+        batch_inputs = self.get_batch_inputs() if self.stream else ""
         return f"for i=[0:iters] {brace_open}\n\
-            {self.get_intermediate_decls()}\n\
+            {batch_inputs}\n\
             {self.get_forward_call()}\n\
-            {self.get_loss_call()}\n\
-            output(ALL, loss[0]) ;\n\
+            {self.get_loss_reveal()}\n\
             {self.get_backward_call()}\n\
         {brace_close} ;"
     
@@ -300,6 +321,7 @@ float_fl[{l.out_features}] layer{ind+1}bMom ;\n\
 def void main () {brace_open}\n\
 {self.get_inputs()}\n\
 {self.get_mom_decls() if self.momentum else ''}\n\
+{self.get_intermediate_decls()}\n\
 {iter_decl}\n\
 {self.get_training_loop()}\n\
 {brace_close}"
@@ -334,10 +356,10 @@ def torch_ffnn_to_network_args(torch_net) :
     return input_size, hidden_sizes, output_size
 
 
-def get_translator(torch_net, batch, iters, lr, loss, momentum=False, name="") :
+def get_translator(torch_net, batch, iters, lr, loss, momentum=False, name="", reveal_every=1, stream=False) :
     net_args = torch_ffnn_to_network_args(torch_net)
     net = Network(*net_args)
-    return BeaconTranslator(net=net, batch=batch, iters=iters, lr=lr, loss=loss, momentum=momentum, name=name)
+    return BeaconTranslator(net=net, batch=batch, iters=iters, lr=lr, loss=loss, momentum=momentum, name=name, reveal_every=reveal_every, stream=stream)
 
 
 def dump_ezpc(trans) :
@@ -126,7 +126,8 @@ class BeaconTranslator :
             self.img_sizes.append((img, img1, img2, img_poolmask))
             img = img2
 
-    def __init__(self, tnet, net, in_img, in_chan, batch, iters, lr, loss="CE", momentum=False, name="") :
+    def __init__(self, tnet, net, in_img, in_chan, batch, iters, lr, loss="CE", momentum=False, name="", reveal_every=1, stream=False) :
+        assert reveal_every >= 0
         self.batch = batch
         self.in_img = in_img
         self.in_chan = in_chan
@@ -137,6 +138,8 @@ class BeaconTranslator :
         self.loss = loss
         self.momentum = momentum
         self.name = name
+        self.reveal_every = reveal_every
+        self.stream = stream
 
         self.__get_img_sizes()
         
@@ -160,7 +163,7 @@ class BeaconTranslator :
 
 
     def get_in_img_input_stmt(self) :
-        return f"input(CLIENT, inp, {self.get_in_img_type()}) ;\n"
+        return f"input(CLIENT, layer1In, {self.get_in_img_type()}) ;\n"
 
 
     def get_label_input_stmt(self) :
@@ -178,10 +181,8 @@ class BeaconTranslator :
         return mom_str
 
     def get_intermediate_decls(self) :
+        # layer1In is read directly by the input statement
         decls = ""
-        decls += f"\
-    float_fl[BATCH][{self.in_img}][{self.in_img}][{self.net.in_chan}] layer1In ;\n\
-"
         # Convolution Layers
         img = self.in_img
         for ind, l in enumerate(self.net.conv_layers) :
@@ -369,12 +370,13 @@ GemmAdd(BATCH, {outf}, layer{l.layer_no}Temp, layer{l.layer_no}b, layer{l.layer_
 {brace_close}"
 
 
+    def get_batch_inputs(self) :
+        return self.get_in_img_input_stmt() + self.get_label_input_stmt()
+
+
     def get_inputs(self) :
-        # str_inp = f"input(CLIENT, inp, float_fl[BATCH][{self.in_img}][{self.in_img}][{self.net.in_chan}]) ;\n"
-        # str_lab = f"input(CLIENT, target, float_fl[BATCH][{self.net.no_class}]) ;\n"
-        str_inp = self.get_in_img_input_stmt()
-        str_lab = self.get_label_input_stmt()
-        str_ret = str_inp + str_lab
+        # When streaming, a new batch is read at the start of every iteration
+        str_ret = "" if self.stream else self.get_batch_inputs()
 
         for l in self.net.conv_layers :
             str_ret += l.get_wt_input_stmt()
@@ -585,13 +587,27 @@ updateWeights{mom_factor}({outf}, {self.lr}, {'0.9, ' if self.momentum else ''}l
 {brace_close}"
 
 
+    def get_loss_reveal(self) :
+        """ Loss computation and reveal, done every reveal_every iterations (never if 0) """
+        brace_open, brace_close = '{', '}'
+        if self.reveal_every == 0 :
+            return ""
+
+        reveal = f"{self.get_loss_call()}output(ALL, loss[0]) ;\n"
+        if self.reveal_every == 1 :
+            return reveal
+
+        return f"if ((((i + 1) % {self.reveal_every}) == 0)) {brace_open}\n\
+{reveal}\
+{brace_close} ;\n"
+
     def get_training_loop(self) :
         brace_open, brace_close = '{', '}'
+        batch_inputs = self.get_batch_inputs() if self.stream else ""
         return f"for i=[0:iters] {brace_open}\n\
-            {self.get_intermediate_decls()}\n\
+            {batch_inputs}\n\
             {self.get_forward_call()}\n\
-            {self.get_loss_call()}\n\
-            output(ALL, loss[0]) ;\n\
+            {self.get_loss_reveal()}\n\
             {self.get_backward_call()}\n\
         {brace_close} ;"
 
@@ -603,6 +619,7 @@ updateWeights{mom_factor}({outf}, {self.lr}, {'0.9, ' if self.momentum else ''}l
 def void main () {brace_open}\n\
 {self.get_inputs()}\n\
 {self.get_mom_decls() if self.momentum else ''}\n\
+{self.get_intermediate_decls()}\n\
 {iter_decl}\n\
 {self.get_training_loop()}\n\
 {brace_close}"
@@ -650,11 +667,11 @@ def torch_ffnn_to_network_args(torch_net) :
 
     return conv_sizes, fc_sizes, output_size
 
-def get_translator(torch_net, in_img, in_chan, batch, iters, lr, loss, momentum=False, name="") :
+def get_translator(torch_net, in_img, in_chan, batch, iters, lr, loss, momentum=False, name="", reveal_every=1, stream=False) :
     net_args = torch_ffnn_to_network_args(torch_net)
     net_args = (in_img, ) + net_args
     net = ConvNetwork(*net_args)
-    return BeaconTranslator(tnet=torch_net, net=net, in_img=in_img, in_chan=in_chan, batch=batch, iters=iters, lr=lr, loss=loss, momentum=momentum, name=name)
+    return BeaconTranslator(tnet=torch_net, net=net, in_img=in_img, in_chan=in_chan, batch=batch, iters=iters, lr=lr, loss=loss, momentum=momentum, name=name, reveal_every=reveal_every, stream=stream)
 
 def dump_ezpc(trans) :
     with open("funcs.ezpc", 'r') as f :
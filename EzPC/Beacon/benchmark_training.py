@@ -0,0 +1,82 @@
+import argparse
+import os
+import subprocess
+import time
+
+# Measures the per-iteration training time of the generated Beacon/SecFloat
+# programs. Each configuration is compiled twice, with a short and a long
+# number of iterations, and the per-iteration time is the difference of the
+# two end-to-end times divided by the difference in iterations. This removes
+# input/weight loading and connection setup from the measurement.
+
+NETWORKS = ["FFNN", "LeNet", "HiNet"]
+
+
+def compile_network(network, batch, iters, lr, loss, reveal_every):
+    cmd = f"python3 compile_networks.py {network} {batch} {iters} {lr} {loss} no --reveal_every {reveal_every}"
+    ret = os.system(cmd)
+    assert ret == 0, f"Compilation failed: {cmd}"
+    for backend in ["secfloat", "beacon"]:
+        os.rename(
+            f"{network}_{backend}", f"{network}_{backend}_{iters}_{reveal_every}"
+        )
+
+
+def run_network(network, backend, batch, iters, loss, reveal_every, port):
+    prog = f"./{network}_{backend}_{iters}_{reveal_every}"
+    server_cmd = f"{prog} r=1 port={port} < {network}_weights.inp > /dev/null"
+    # As written by compile_networks.py: labels for CE, targets for MSE
+    outputs = "labels" if loss == "CE" else "target"
+    client_inputs = f"{network}_input{batch}.inp {network}_{outputs}{batch}.inp"
+    client_cmd = f"cat {client_inputs} | {prog} r=2 port={port} > /dev/null"
+
+    start = time.time()
+    procs = [subprocess.Popen(c, shell=True) for c in [server_cmd, client_cmd]]
+    for p in procs:
+        p.wait()
+    return time.time() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Per-iteration time of Beacon training for different loss reveal cadences"
+    )
+    parser.add_argument("--networks", nargs="+", default=NETWORKS, choices=NETWORKS)
+    parser.add_argument("--backend", default="beacon", choices=["beacon", "secfloat"])
+    parser.add_argument("--batch", type=int, default=32)
+    parser.add_argument("--lr", type=float, default=0.01)
+    parser.add_argument("--loss", default="CE", choices=["CE", "MSE"])
+    parser.add_argument("--short_iters", type=int, default=1)
+    parser.add_argument("--long_iters", type=int, default=5)
+    parser.add_argument(
+        "--reveal_every",
+        type=int,
+        nargs="+",
+        default=[1, 5, 0],
+        help="Loss reveal cadences to compare (0 never reveals)",
+    )
+    parser.add_argument("--port", type=int, default=32000)
+    args = parser.parse_args()
+    assert args.long_iters > args.short_iters
+
+    results = []
+    for network in args.networks:
+        for k in args.reveal_every:
+            times = {}
+            for iters in [args.short_iters, args.long_iters]:
+                compile_network(network, args.batch, iters, args.lr, args.loss, k)
+                times[iters] = run_network(
+                    network, args.backend, args.batch, iters, args.loss, k, args.port
+                )
+            per_iter = (times[args.long_iters] - times[args.short_iters]) / (
+                args.long_iters - args.short_iters
+            )
+            results.append((network, k, times[args.long_iters], per_iter))
+
+    print(f"\n{'Network':<10}{'reveal_every':>14}{'total (s)':>12}{'per-iter (s)':>15}")
+    for network, k, total, per_iter in results:
+        print(f"{network:<10}{k:>14}{total:>12.2f}{per_iter:>15.3f}")
+
+
+if __name__ == "__main__":
+    main()
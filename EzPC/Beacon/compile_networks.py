@@ -242,6 +242,21 @@ def get_pytorch_stuff_conv(ez, log=False):
     return net, net_inp, net_out
 
 
+def dump_stream_dataset(ez, in_shape, num_samples):
+    """Random dataset in the raw float32 format read by stream_dataset.py"""
+    torch.manual_seed(44)
+    inp = 2 * torch.rand(num_samples, *in_shape).to(dtype) - 1
+    if ez.loss == "CE":
+        labels = torch.randint(ez.net.no_class, (num_samples,))
+        target = F.one_hot(labels, ez.net.no_class).to(dtype)
+    else:
+        target = 10 * torch.rand(num_samples, ez.net.no_class).to(dtype)
+
+    inp.numpy().astype("<f4").tofile(f"{ez.name}_images.bin")
+    target.numpy().astype("<f4").tofile(f"{ez.name}_labels.bin")
+    return inp[0].numel(), ez.net.no_class
+
+
 def do_the_cmake(name):
     bo, bc = "{", "}"
     dollah = "$"
@@ -284,6 +299,17 @@ if __name__ == "__main__":
     parser.add_argument("lr")
     parser.add_argument("loss")
     parser.add_argument("momentum")
+    parser.add_argument(
+        "--reveal_every",
+        type=int,
+        default=1,
+        help="Reveal the loss every k iterations (0 to never reveal)",
+    )
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help="Read a new batch every iteration (see stream_dataset.py)",
+    )
     args = parser.parse_args()
     print(args.network)
 
@@ -299,10 +325,13 @@ if __name__ == "__main__":
             loss=args.loss,
             momentum=(args.momentum == "yes"),
             name=args.network,
+            reveal_every=args.reveal_every,
+            stream=args.stream,
         )
         bcf.dump_ezpc(trans)
 
         net1, net_inp, net_out = get_pytorch_stuff_ffnn(trans, False)
+        in_shape = (trans.net.in_dim,)
     elif args.network in ["LeNet", "HiNet"]:
         net = {"LeNet": LeNet, "HiNet": HiNet}[args.network]()
         trans = bcf_conv.get_translator(
@@ -315,14 +344,27 @@ if __name__ == "__main__":
             loss=args.loss,
             momentum=(args.momentum == "yes"),
             name=args.network,
+            reveal_every=args.reveal_every,
+            stream=args.stream,
         )
         bcf_conv.dump_ezpc(trans)
 
         net1, net_inp, net_out = get_pytorch_stuff_conv(trans)
+        in_shape = (trans.in_chan, trans.in_img, trans.in_img)
     else:
         print("Invalid network")
         sys.exit(1)
 
+    if args.stream:
+        features, classes = dump_stream_dataset(
+            trans, in_shape, trans.batch * trans.iters
+        )
+        print(
+            f"Client: python3 stream_dataset.py {args.network}_images.bin "
+            f"{args.network}_labels.bin --features {features} --classes {classes} "
+            f"--batch {trans.batch} --iters {trans.iters} | ./<binary> r=2"
+        )
+
     do_the_cmake(args.network)
 
     os.system(f"../EzPC/EzPC/ezpc --codegen SECFLOAT --bitlen 32 {args.network}.ezpc")
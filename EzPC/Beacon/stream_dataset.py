@@ -0,0 +1,90 @@
+import argparse
+import queue
+import sys
+import threading
+
+import numpy as np
+
+# Client side feeder for programs compiled with --stream. The dataset is
+# stored as two raw little-endian float32 files:
+#   <images file> : [num_samples][features]  (flattened input of one sample)
+#   <labels file> : [num_samples][classes]   (one-hot label or MSE target)
+# Every training iteration consumes one batch of inputs followed by one batch
+# of labels, read in that order from stdin by the generated program. Batches
+# are read and formatted in a background thread, a bounded number of batches
+# ahead of the training loop. The dataset wraps around, so iters * batch may
+# exceed the dataset size for multi-epoch training.
+
+
+def load(fname, width):
+    data = np.memmap(fname, dtype="<f4", mode="r")
+    assert data.size % width == 0, f"{fname} is not a multiple of {width} floats"
+    return data.reshape(-1, width)
+
+
+def format_batch(arr):
+    return "\n".join(map(str, arr.ravel().tolist())) + "\n"
+
+
+def batch_indices(num_samples, batch, iters, shuffle, seed):
+    rng = np.random.default_rng(seed)
+    order = np.arange(num_samples)
+    pos = num_samples
+    for _ in range(iters):
+        idx = []
+        while len(idx) < batch:
+            if pos == num_samples:
+                if shuffle:
+                    rng.shuffle(order)
+                pos = 0
+            take = min(batch - len(idx), num_samples - pos)
+            idx.extend(order[pos : pos + take])
+            pos += take
+        yield np.array(idx)
+
+
+def producer(images, labels, args, out_queue):
+    for idx in batch_indices(
+        images.shape[0], args.batch, args.iters, args.shuffle, args.seed
+    ):
+        out_queue.put(format_batch(images[idx]) + format_batch(labels[idx]))
+    out_queue.put(None)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Stream a binary dataset batch by batch to a Beacon client"
+    )
+    parser.add_argument("images")
+    parser.add_argument("labels")
+    parser.add_argument("--features", type=int, required=True)
+    parser.add_argument("--classes", type=int, required=True)
+    parser.add_argument("--batch", type=int, required=True)
+    parser.add_argument("--iters", type=int, required=True)
+    parser.add_argument(
+        "--prefetch", type=int, default=4, help="Number of batches read ahead"
+    )
+    parser.add_argument("--shuffle", action="store_true")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    images = load(args.images, args.features)
+    labels = load(args.labels, args.classes)
+    assert images.shape[0] == labels.shape[0], "Images and labels size mismatch"
+
+    batches = queue.Queue(maxsize=max(1, args.prefetch))
+    thread = threading.Thread(
+        target=producer, args=(images, labels, args, batches), daemon=True
+    )
+    thread.start()
+    while True:
+        text = batches.get()
+        if text is None:
+            break
+        sys.stdout.write(text)
+        sys.stdout.flush()
+    thread.join()
+
+
+if __name__ == "__main__":
+    main()
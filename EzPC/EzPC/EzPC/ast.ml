@@ -88,6 +88,7 @@ type qualifier =
   | Partition    (* functions having this qualifier get their top-level applications partitioned *)
   | Inline       (* functions having this qualifier get their applications inlined *)
   | Unroll       (* for loops that should be unrolled statically *)
+  | Parallel of int  (* for loops whose iterations are independent, run with OpenMP; the int is the number of nested loops to collapse *)
   | Immutable    (* array types can be immutable *)
   | Extern       (* extern function declaration *)
 
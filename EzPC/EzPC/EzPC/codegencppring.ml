@@ -347,7 +347,9 @@ let rec o_stmt (g:gamma) (s:stmt) :comp * gamma =
 
   | Call (f, args) -> o_with_semicolon (o_app (o_str f) (List.map (o_expr g) args)), g
 
-  | For (_, e1, e2, e3, s) -> o_codegen_stmt g (For_codegen (Base_e e1, Base_e e2, Base_e e3, Base_s s))
+  | For (quals, e1, e2, e3, s) ->
+     let c, g = o_codegen_stmt g (For_codegen (Base_e e1, Base_e e2, Base_e e3, Base_s s)) in
+     seq (o_omp_pragma quals) c, g
 
   | While (e, s) -> o_while (o_expr g e) (o_stmt ([] |> push_local_scope g) s |> fst), g
 
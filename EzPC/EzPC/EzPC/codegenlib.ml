@@ -69,6 +69,13 @@ let s_smln (c:comp) = seq c (seql [o_semicol; o_newline])
 (* Insert a semicolon at the end of the buffer *)
 let o_smln = o_null |> s_smln
 
+(* OpenMP pragma for a loop with the parallel(n) qualifier, nothing for other loops *)
+let o_omp_pragma (quals:Ast.qualifiers) :comp =
+  match List.find_opt (function Ast.Parallel _ -> true | _ -> false) quals with
+  | Some (Ast.Parallel n) when n > 1 -> seq (o_str ("#pragma omp parallel for collapse(" ^ string_of_int n ^ ")")) o_newline
+  | Some (Ast.Parallel _) -> seq (o_str "#pragma omp parallel for") o_newline
+  | _ -> o_null
+
 let o_string_literal (s:string) :comp = seq (o_str "\"") (seq (o_str s) (o_str "\""))
 
 let o_paren (c:comp) :comp = seql [o_str "("; c; o_str ")"]
@@ -0,0 +1,91 @@
+"""
+Times key loading in file mode for the benchmark networks.
+
+For every network the EzPC program is compiled with fssc, the dealer writes
+server.dat and client.dat, and then the server and client are run once with
+each key source (FSS_KEY_SOURCE=fstream and mmap). The "Key Read Time" both
+parties report is collected into a table.
+
+Run from FSS/benchmarks after building the backend and fssc:
+
+    python3 keyload.py [network ...]
+"""
+
+import os
+import re
+import subprocess
+import sys
+import time
+
+BITLEN = {
+    "google30": 64,
+    "deepsecure": 64,
+    "industrial": 64,
+    "lstm": 64,
+    "heads1": 64,
+    "heads2": 64,
+    "heads3": 64,
+    "minionn-cnn": 41,
+    "resnet50": 37,
+    "resnet18": 32,
+}
+
+SOURCES = ["fstream", "mmap"]
+KEY_READ = re.compile(r"Key Read Time = ([0-9.e+-]+) milliseconds")
+
+
+def run_party(binary, role, source):
+    env = dict(os.environ, FSS_KEY_SOURCE=source)
+    inputs = subprocess.Popen(["yes", "3"], stdout=subprocess.PIPE)
+    proc = subprocess.Popen(
+        [binary, "r={}".format(role), "file=1"],
+        stdin=inputs.stdout,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+        env=env,
+        universal_newlines=True,
+    )
+    inputs.stdout.close()
+    return proc
+
+
+def key_read_ms(stderr):
+    match = KEY_READ.search(stderr)
+    return float(match.group(1)) if match else None
+
+
+def benchmark(net):
+    subprocess.run(
+        ["fssc", "--bitlen", str(BITLEN[net]), net + ".ezpc"],
+        check=True,
+        stdout=subprocess.DEVNULL,
+    )
+    binary = "./{}.out".format(net)
+    dealer = run_party(binary, 1, "fstream")
+    dealer.communicate()
+
+    results = {}
+    for source in SOURCES:
+        server = run_party(binary, 2, source)
+        time.sleep(1)
+        client = run_party(binary, 3, source)
+        _, client_err = client.communicate()
+        _, server_err = server.communicate()
+        results[source] = (key_read_ms(server_err), key_read_ms(client_err))
+
+    for f in ["server.dat", "client.dat"]:
+        if os.path.exists(f):
+            os.remove(f)
+    return results
+
+
+def main():
+    nets = sys.argv[1:] or list(BITLEN)
+    print("{:<14} {:<8} {:>12} {:>12}".format("network", "source", "server_ms", "client_ms"))
+    for net in nets:
+        for source, (server_ms, client_ms) in benchmark(net).items():
+            print("{:<14} {:<8} {:>12} {:>12}".format(net, source, str(server_ms), str(client_ms)))
+
+
+if __name__ == "__main__":
+    main()
@@ -105,7 +105,12 @@ void EndComputation()
         std::cerr << "Offline Time = " << accumulatedInputTimeOffline / 1000.0 << " milliseconds\n";
         std::cerr << "Online Rounds = " << numRounds << "\n";
         std::cerr << "Online Communication = " << peer->bytesSent + peer->bytesReceived + inputOnlineComm << " bytes\n";
-        std::cerr << "Online Time = " << (evalMicroseconds + accumulatedInputTimeOnline) / 1000.0 << " milliseconds\n\n";
+        std::cerr << "Online Time = " << (evalMicroseconds + accumulatedInputTimeOnline) / 1000.0 << " milliseconds\n";
+        std::cerr << "Key Read Time = " << dealer->keyReadNanoseconds / 1e6 << " milliseconds"
+                  << (dealer->keys ? std::string(" (") + dealer->keys->name() + ")" : std::string()) << "\n";
+        std::cerr << "Key Wait Time = " << (dealer->keys ? dealer->keys->waitNanoseconds() / 1e6 : 0.0) << " milliseconds\n\n";
+        // Releases the key file (mapping, prefetch thread) or the socket.
+        dealer->close();
     }
     else {
         std::cerr << "Offline Communication = " << server->bytesSent + client->bytesSent << " bytes\n";
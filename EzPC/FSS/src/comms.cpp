@@ -22,6 +22,7 @@ SOFTWARE.
 #include "comms.h"
 #include "api.h"
 #include <cassert>
+#include <chrono>
 
 Peer::Peer(std::string ip, int port) {
     std::cerr << "trying to connect with server...";
@@ -531,96 +532,113 @@ Dealer::Dealer(std::string ip, int port) {
     }
 }
 
+// Called by EndComputation and again by the postlude of generated
+// programs, so a second call does nothing.
 void Dealer::close() {
     if (useFile) {
-        file.close();
+        if (keys) {
+            keys->close();
+            keys.reset();
+        }
     }
-    else {
+    else if (consocket >= 0) {
         ::close(consocket);
+        consocket = -1;
     }
 }
 
-GroupElement Dealer::recv_mask() {
-    char buf[8];
+// Accumulates the time spent reading keys into Dealer::keyReadNanoseconds.
+// Key packs nest (a maxpool key holds a relu key), so only the outermost
+// read is timed.
+struct KeyReadTimer {
+    Dealer *dealer;
+    std::chrono::high_resolution_clock::time_point start;
+    KeyReadTimer(Dealer *dealer) : dealer(dealer) {
+        if (dealer->keyReadDepth++ == 0)
+            start = std::chrono::high_resolution_clock::now();
+    }
+    ~KeyReadTimer() {
+        if (--dealer->keyReadDepth == 0)
+            dealer->keyReadNanoseconds += std::chrono::duration_cast<std::chrono::nanoseconds>(
+                std::chrono::high_resolution_clock::now() - start).count();
+    }
+};
+
+const char *Dealer::recv_bytes(size_t n, char *buf) {
+    bytesReceived += n;
     if (useFile) {
-        this->file.read(buf, 8);
-    } else {
-        recv(consocket, buf, 8, MSG_WAITALL);
+        return keys->next(n, buf);
     }
-    GroupElement g(*(uint64_t *)buf, bitlength);
-    bytesReceived += 8;
-    return g;
+    recv(consocket, buf, n, MSG_WAITALL);
+    return buf;
+}
+
+char *Dealer::scratch(size_t n) {
+    if (scratchBuf.size() < n) {
+        scratchBuf.resize(n);
+    }
+    return scratchBuf.data();
+}
+
+static inline int geBytes(int bw) {
+    return bw > 32 ? 8 : (bw > 16 ? 4 : (bw > 8 ? 2 : 1));
+}
+
+static inline uint64_t loadGe(const char *p, int nbytes) {
+    switch (nbytes) {
+    case 8: { uint64_t v; memcpy(&v, p, 8); return v; }
+    case 4: { uint32_t v; memcpy(&v, p, 4); return v; }
+    case 2: { uint16_t v; memcpy(&v, p, 2); return v; }
+    default: return (uint8_t)p[0];
+    }
+}
+
+void Dealer::recv_ges(GroupElement *g, size_t n, int bw) {
+    if (n == 0) return;
+    const int nbytes = geBytes(bw);
+    const char *p = recv_bytes(n * nbytes, scratch(n * nbytes));
+    for (size_t i = 0; i < n; ++i) {
+        g[i] = GroupElement(loadGe(p + i * nbytes, nbytes), bw);
+    }
+}
+
+void Dealer::recv_blocks(osuCrypto::block *b, size_t n) {
+    if (n == 0) return;
+    const size_t nbytes = n * sizeof(osuCrypto::block);
+    const char *p = recv_bytes(nbytes, (char *)b);
+    if (p != (const char *)b) {
+        memcpy(b, p, nbytes);
+    }
+}
+
+GroupElement Dealer::recv_mask() {
+    KeyReadTimer timer(this);
+    char buf[8];
+    const char *p = recv_bytes(8, buf);
+    return GroupElement(loadGe(p, 8), bitlength);
 }
 
 MultKey Dealer::recv_mult_key() {
-    char buf[sizeof(MultKey)];
-    if (useFile) {
-        this->file.read(buf, sizeof(MultKey));
-    } else {
-        recv(consocket, buf, sizeof(MultKey), MSG_WAITALL);
+    KeyReadTimer timer(this);
+    MultKey k;
+    const char *p = recv_bytes(sizeof(MultKey), (char *)&k);
+    if (p != (const char *)&k) {
+        memcpy(&k, p, sizeof(MultKey));
     }
-    MultKey k(*(MultKey *)buf);
-    bytesReceived += sizeof(MultKey);
     return k;
 }
 
 osuCrypto::block Dealer::recv_block() {
-    char buf[sizeof(osuCrypto::block)];
-    if (useFile) {
-        this->file.read(buf, sizeof(osuCrypto::block));
-    } else {
-        recv(consocket, buf, sizeof(osuCrypto::block), MSG_WAITALL);
-    }
-    osuCrypto::block b = *(osuCrypto::block *)buf;
-    bytesReceived += sizeof(osuCrypto::block);
+    osuCrypto::block b;
+    recv_blocks(&b, 1);
     return b;
 }
 
 GroupElement Dealer::recv_ge(int bl) {
-    if (bl > 32) {
-        char buf[8];
-        if (useFile) {
-            this->file.read(buf, 8);
-        } else {
-            recv(consocket, buf, 8, MSG_WAITALL);
-        }
-        GroupElement g(*(uint64_t *)buf, bl);
-        bytesReceived += 8;
-        return g;
-    }
-    else if (bl > 16) {
-        char buf[4];
-        if (useFile) {
-            this->file.read(buf, 4);
-        } else {
-            recv(consocket, buf, 4, MSG_WAITALL);
-        }
-        GroupElement g(*(uint32_t *)buf, bl);
-        bytesReceived += 4;
-        return g;
-    }
-    else if (bl > 8) {
-        char buf[2];
-        if (useFile) {
-            this->file.read(buf, 2);
-        } else {
-            recv(consocket, buf, 2, MSG_WAITALL);
-        }
-        GroupElement g(*(uint16_t *)buf, bl);
-        bytesReceived += 2;
-        return g;
-    }
-    else {
-        char buf[1];
-        if (useFile) {
-            this->file.read(buf, 1);
-        } else {
-            recv(consocket, buf, 1, MSG_WAITALL);
-        }
-        GroupElement g(*(uint8_t *)buf, bl);
-        bytesReceived += 1;
-        return g;
-    }
+    char buf[8];
+    const int nbytes = geBytes(bl);
+    const char *p = recv_bytes(nbytes, buf);
+    return GroupElement(loadGe(p, nbytes), bl);
 }
 
 DCFKeyPack Dealer::recv_dcf_keypack(int Bin, int Bout, int groupSize) {
@@ -629,18 +647,13 @@ DCFKeyPack Dealer::recv_dcf_keypack(int Bin, int Bout, int groupSize) {
     kp.Bout = Bout;
     kp.groupSize = groupSize;
 
+    KeyReadTimer timer(this);
     kp.k = new block[Bin + 1];
-    for (int i = 0; i < Bin + 1; ++i) {
-        kp.k[i] = recv_block();
-    }
+    recv_blocks(kp.k, Bin + 1);
     kp.g = new GroupElement[groupSize];
-    for (int i = 0; i < groupSize; ++i) {
-        kp.g[i] = recv_ge(Bout);
-    }
+    recv_ges(kp.g, groupSize, Bout);
     kp.v = new GroupElement[Bin * groupSize];
-    for (int i = 0; i < Bin * groupSize; ++i) {
-        kp.v[i] = recv_ge(Bout);
-    }
+    recv_ges(kp.v, Bin * groupSize, Bout);
     return kp;
 }
 
@@ -649,17 +662,17 @@ DualDCFKeyPack Dealer::recv_ddcf_keypack(int Bin, int Bout, int groupSize) {
     kp.Bin = Bin;
     kp.Bout = Bout;
     kp.groupSize = groupSize;
+    KeyReadTimer timer(this);
     kp.dcfKey = recv_dcf_keypack(Bin, Bout, groupSize);
     kp.sb = new GroupElement[groupSize];
-    for (int i = 0; i < groupSize; ++i) {
-        kp.sb[i] = recv_ge(Bout);
-    }
+    recv_ges(kp.sb, groupSize, Bout);
     return kp;
 }
 
 MultKeyNew Dealer::recv_new_mult_key(int bw1, int bw2)
 {
     MultKeyNew kp;
+    KeyReadTimer timer(this);
     kp.a = recv_ge(bw1 + bw2);
     kp.b = recv_ge(bw1 + bw2);
     kp.c = recv_ge(bw1 + bw2);
@@ -683,23 +696,30 @@ MatMulKey Dealer::recv_matmul_key(int Bin, int Bout, int s1, int s2, int s3) {
     k.b = make_array<GroupElement>(s2, s3);
     k.c = make_array<GroupElement>(s1, s3);
 
-    for(int i = 0; i < s1; ++i) {
-        for(int j = 0; j < s2; ++j) {
-            Arr2DIdxRowM(k.a, s1, s2, i, j) = (party == SERVER ? GroupElement(prngShared.get<uint64_t>(), Bin) : recv_ge(Bin));
+    KeyReadTimer timer(this);
+    if (party == SERVER) {
+        // The server's share of the matrices is derived from the common seed.
+        for(int i = 0; i < s1; ++i) {
+            for(int j = 0; j < s2; ++j) {
+                Arr2DIdxRowM(k.a, s1, s2, i, j) = GroupElement(prngShared.get<uint64_t>(), Bin);
+            }
         }
-    }
-    
-    for(int i = 0; i < s2; ++i) {
-        for(int j = 0; j < s3; ++j) {
-            Arr2DIdxRowM(k.b, s2, s3, i, j) = (party == SERVER ? GroupElement(prngShared.get<uint64_t>(), Bin) : recv_ge(Bin));
+        for(int i = 0; i < s2; ++i) {
+            for(int j = 0; j < s3; ++j) {
+                Arr2DIdxRowM(k.b, s2, s3, i, j) = GroupElement(prngShared.get<uint64_t>(), Bin);
+            }
         }
-    }
-
-    for(int i = 0; i < s1; ++i) {
-        for(int j = 0; j < s3; ++j) {
-            Arr2DIdxRowM(k.c, s1, s3, i, j) = (party == SERVER ? GroupElement(prngShared.get<uint64_t>(), Bout) : recv_ge(Bout));
+        for(int i = 0; i < s1; ++i) {
+            for(int j = 0; j < s3; ++j) {
+                Arr2DIdxRowM(k.c, s1, s3, i, j) = GroupElement(prngShared.get<uint64_t>(), Bout);
+            }
         }
     }
+    else {
+        recv_ges(k.a, (size_t)s1 * s2, Bin);
+        recv_ges(k.b, (size_t)s2 * s3, Bin);
+        recv_ges(k.c, (size_t)s1 * s3, Bout);
+    }
 
     return k;
 }
@@ -736,36 +756,45 @@ Conv2DKey Dealer::recv_conv2d_key(int Bin, int Bout, int64_t N, int64_t H, int64
     k.b = make_array<GroupElement>(FH, FW, CI, CO);
     k.c = make_array<GroupElement>(d0, d1, d2, d3);
 
-    for(int n = 0; n < N; ++n) {
-        for(int h = 0; h < H; ++h) {
-            for(int w = 0; w < W; ++w) {
-                for(int ci = 0; ci < CI; ++ci) {
-                    Arr4DIdxRowM(k.a, N, H, W, CI, n, h, w, ci) = (party == SERVER ? GroupElement(prngShared.get<uint64_t>(), Bin) : recv_ge(Bin));
+    KeyReadTimer timer(this);
+    if (party == SERVER) {
+        // The server's share of the tensors is derived from the common seed.
+        for(int n = 0; n < N; ++n) {
+            for(int h = 0; h < H; ++h) {
+                for(int w = 0; w < W; ++w) {
+                    for(int ci = 0; ci < CI; ++ci) {
+                        Arr4DIdxRowM(k.a, N, H, W, CI, n, h, w, ci) = GroupElement(prngShared.get<uint64_t>(), Bin);
+                    }
                 }
             }
         }
-    }
 
-    for(int fh = 0; fh < FH; ++fh) {
-        for(int fw = 0; fw < FW; ++fw) {
-            for(int ci = 0; ci < CI; ++ci) {
-                for(int co = 0; co < CO; ++co) {
-                    Arr4DIdxRowM(k.b, FH, FW, CI, CO, fh, fw, ci, co) = (party == SERVER ? GroupElement(prngShared.get<uint64_t>(), Bin) : recv_ge(Bin));
+        for(int fh = 0; fh < FH; ++fh) {
+            for(int fw = 0; fw < FW; ++fw) {
+                for(int ci = 0; ci < CI; ++ci) {
+                    for(int co = 0; co < CO; ++co) {
+                        Arr4DIdxRowM(k.b, FH, FW, CI, CO, fh, fw, ci, co) = GroupElement(prngShared.get<uint64_t>(), Bin);
+                    }
                 }
             }
         }
-    }
 
-    GroupElement *c = k.c;
-    for(int i = 0; i < d0; ++i) {
-        for(int j = 0; j < d1; ++j) {
-            for(int k = 0; k < d2; ++k) {
-                for(int l = 0; l < d3; ++l) {
-                    Arr4DIdxRowM(c, d0, d1, d2, d3, i, j, k, l) = (party == SERVER ? GroupElement(prngShared.get<uint64_t>(), Bout) : recv_ge(Bout));
+        GroupElement *c = k.c;
+        for(int i = 0; i < d0; ++i) {
+            for(int j = 0; j < d1; ++j) {
+                for(int k = 0; k < d2; ++k) {
+                    for(int l = 0; l < d3; ++l) {
+                        Arr4DIdxRowM(c, d0, d1, d2, d3, i, j, k, l) = GroupElement(prngShared.get<uint64_t>(), Bout);
+                    }
                 }
             }
         }
     }
+    else {
+        recv_ges(k.a, (size_t)N * H * W * CI, Bin);
+        recv_ges(k.b, (size_t)FH * FW * CI * CO, Bin);
+        recv_ges(k.c, (size_t)d0 * d1 * d2 * d3, Bout);
+    }
     return k;
 }
 
@@ -778,15 +807,10 @@ ReluKeyPack Dealer::recv_relu_key(int Bin, int Bout) {
     kp.g = new GroupElement[groupSize];
     kp.v = new GroupElement[Bin * groupSize];
     // kp.dcfKey = recv_dcf_keypack(Bin, Bout, groupSize);
-    for(int i = 0; i < Bin + 1; ++i) {
-        kp.k[i] = recv_block();
-    }
-    for(int i = 0; i < groupSize; ++i) {
-        kp.g[i] = recv_ge(Bout);
-    }
-    for(int i = 0; i < Bin * groupSize; ++i) {
-        kp.v[i] = recv_ge(Bout);
-    }
+    KeyReadTimer timer(this);
+    recv_blocks(kp.k, Bin + 1);
+    recv_ges(kp.g, groupSize, Bout);
+    recv_ges(kp.v, Bin * groupSize, Bout);
     kp.e_b0 = recv_ge(Bout);
     kp.e_b1 = recv_ge(Bout);
     kp.beta_b0 = recv_ge(Bout);
@@ -799,6 +823,7 @@ MaxpoolKeyPack Dealer::recv_maxpool_key(int Bin, int Bout) {
     MaxpoolKeyPack kp;
     kp.Bin = Bin; 
     kp.Bout = Bout;
+    KeyReadTimer timer(this);
     kp.reluKey = recv_relu_key(Bin, Bout);
     kp.rb = recv_ge(Bout);
     return kp;
@@ -809,6 +834,7 @@ ScmpKeyPack Dealer::recv_scmp_keypack(int Bin, int Bout) {
     ScmpKeyPack kp;
     kp.Bin = Bin;
     kp.Bout = Bout;
+    KeyReadTimer timer(this);
     kp.dualDcfKey = recv_ddcf_keypack(Bin-1, Bout, groupSize);
     kp.rb = recv_ge(Bout);
     return kp;
@@ -819,6 +845,7 @@ PublicDivKeyPack Dealer::recv_pubdiv_key(int Bin, int Bout) {
     PublicDivKeyPack kp;
     kp.Bin = Bin;
     kp.Bout = Bout;
+    KeyReadTimer timer(this);
     kp.dualDcfKey = recv_ddcf_keypack(Bin, Bout, groupSize);
     kp.scmpKey = recv_scmp_keypack(Bin, Bout);
     kp.zb = recv_ge(Bout);
@@ -829,6 +856,7 @@ ARSKeyPack Dealer::recv_ars_key(int Bin, int Bout, int shift) {
     ARSKeyPack kp;
     kp.Bin = Bin;
     kp.Bout = Bout;
+    KeyReadTimer timer(this);
     kp.shift = shift;
 
     int dcfGroupSize = 1, ddcfGroupSize = 2;
@@ -851,6 +879,7 @@ void Peer::sync() {
 
 SignedPublicDivKeyPack Dealer::recv_signedpubdiv_key(int Bin, int Bout) {
     SignedPublicDivKeyPack kp;
+    KeyReadTimer timer(this);
     kp.d = recv_ge(Bin);
     kp.Bin = Bin;
     kp.Bout = Bout;
@@ -871,6 +900,7 @@ PublicICKeyPack Dealer::recv_publicIC_key(int Bin, int Bout) {
     PublicICKeyPack kp;
     kp.Bin = Bin;
     kp.Bout = Bout;
+    KeyReadTimer timer(this);
     int groupSize = 1;
     kp.dcfKey = recv_dcf_keypack(Bin, Bout, groupSize);
     kp.zb = recv_ge(Bout);
@@ -885,25 +915,20 @@ SplineKeyPack Dealer::recv_spline_key(int Bin, int Bout, int numPoly, int degree
     kp.Bout = Bout;
     kp.numPoly = numPoly;
     kp.degree = degree;
+    KeyReadTimer timer(this);
     kp.dcfKey = recv_dcf_keypack(16, Bout, numPoly * (degree + 1));
 
     kp.p.resize(numPoly + 1);
-    for(int i = 0; i < numPoly + 1; ++i) {
-        kp.p[i] = recv_ge(Bin);
-    }
+    recv_ges(kp.p.data(), numPoly + 1, Bin);
 
     kp.e_b.resize(numPoly);
     for(int i = 0; i < numPoly; ++i) {
         kp.e_b[i].resize(degree + 1);
-        for(int j = 0; j < degree + 1; ++j) {
-            kp.e_b[i][j] = recv_ge(Bout);
-        }
+        recv_ges(kp.e_b[i].data(), degree + 1, Bout);
     }
 
     kp.beta_b.resize(numPoly * (degree + 1));
-    for(int i = 0; i < numPoly * (degree + 1); ++i) {
-        kp.beta_b[i] = recv_ge(Bout);
-    }
+    recv_ges(kp.beta_b.data(), numPoly * (degree + 1), Bout);
 
     kp.r_b = recv_ge(Bout);
     return kp;
@@ -26,6 +26,7 @@ SOFTWARE.
 #include "group_element.h"
 #include "keypack.h"
 #include "array.h"
+#include "keysource.h"
 
 #include <arpa/inet.h>
 #include <netinet/in.h>
@@ -37,6 +38,7 @@ SOFTWARE.
 #include <stdio.h>
 #include <string.h>
 #include <fstream>
+#include <vector>
 
 #define DEALER 1
 #define SERVER 2
@@ -112,17 +114,20 @@ Peer* waitForPeer(int port);
 
 class Dealer {
 public:
-    int consocket;
+    int consocket = -1;
     bool useFile = false;
-    std::fstream file;
+    // Released by close()
+    std::unique_ptr<KeySource> keys;
     uint64_t bytesSent = 0;
     uint64_t bytesReceived = 0;
+    uint64_t keyReadNanoseconds = 0;
+    int keyReadDepth = 0;
 
     Dealer(std::string ip, int port);
 
     Dealer(std::string filename) {
         this->useFile = true;
-        this->file.open(filename, std::ios::in | std::ios::binary);
+        this->keys = openKeySource(filename);
     }
 
     void close();
@@ -166,6 +171,18 @@ public:
 
     PublicICKeyPack recv_publicIC_key(int Bin, int Bout);
 
+private:
+    std::vector<char> scratchBuf;
+
+    // Returns the next n bytes, either in buf or (mmap) inside the key file.
+    const char *recv_bytes(size_t n, char *buf);
+
+    char *scratch(size_t n);
+
+    void recv_ges(GroupElement *g, size_t n, int bw);
+
+    void recv_blocks(osuCrypto::block *b, size_t n);
+
 };
 
 extern Dealer *dealer;
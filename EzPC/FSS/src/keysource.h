@@ -0,0 +1,268 @@
+/*
+Authors: Deepak Kumaraswamy, Kanav Gupta
+Copyright:
+Copyright (c) 2022 Microsoft Research
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+*/
+
+#pragma once
+
+#include <string>
+#include <atomic>
+#include <chrono>
+#include <condition_variable>
+#include <fstream>
+#include <mutex>
+#include <thread>
+#include <iostream>
+#include <fcntl.h>
+#include <sys/mman.h>
+#include <sys/stat.h>
+#include <unistd.h>
+#include <stdlib.h>
+#include <string.h>
+#include <algorithm>
+#include <memory>
+
+// Where a Dealer in file mode reads its keys from (server.dat / client.dat).
+//
+// next(n, buf) returns a pointer to the next n bytes of the key file. The
+// mmap source returns a pointer straight into the mapping and leaves buf
+// untouched, so whole key arrays are decoded without an intermediate copy.
+// The fstream source reads into buf and returns it.
+//
+// FSS_KEY_SOURCE=fstream selects the fstream source (default: mmap, falling
+// back to fstream if the file cannot be mapped). FSS_KEY_MADVISE=sequential
+// (default), willneed or none picks the readahead hint for the mapping.
+//
+// The mmap source also runs a prefetch thread that faults in the next
+// FSS_KEY_PREFETCH_MB (default 64, 0 disables) of the file while the
+// evaluator works on the current layer, and drops the pages it has read
+// once more than FSS_KEY_BUDGET_MB (default twice the lookahead) of the
+// file is resident. Reads that get ahead of the prefetcher block until it
+// catches up; that time is reported by waitNanoseconds().
+class KeySource {
+public:
+    virtual ~KeySource() {}
+
+    virtual const char *next(size_t n, char *buf) = 0;
+
+    virtual void close() {}
+
+    virtual const char *name() const = 0;
+
+    // Time spent blocked on keys that had not been prefetched yet.
+    virtual uint64_t waitNanoseconds() const { return 0; }
+};
+
+class FstreamKeySource : public KeySource {
+public:
+    std::fstream file;
+
+    FstreamKeySource(const std::string &filename) {
+        this->file.open(filename, std::ios::in | std::ios::binary);
+    }
+
+    const char *next(size_t n, char *buf) override {
+        this->file.read(buf, n);
+        return buf;
+    }
+
+    void close() override {
+        file.close();
+    }
+
+    const char *name() const override { return "fstream"; }
+};
+
+class MmapKeySource : public KeySource {
+public:
+    static constexpr size_t chunk = 1 << 20;
+
+    const char *base = nullptr;
+    size_t size = 0;
+    size_t pos = 0;
+
+    // Prefetcher state. ready is the end of the prefetched window, consumed
+    // is the start of the last read (everything before it has been decoded)
+    // and wanted is the end of a read that is blocked on the prefetcher.
+    bool prefetching = false;
+    size_t lookahead = 0;
+    size_t budget = 0;
+    size_t dropped = 0;
+    std::atomic<size_t> ready{0};
+    std::atomic<size_t> consumed{0};
+    std::atomic<size_t> wanted{0};
+    std::atomic<bool> stop{false};
+    std::mutex mtx;
+    std::condition_variable cv;
+    std::thread worker;
+    uint64_t waitNs = 0;
+
+    MmapKeySource(const std::string &filename, int advice) {
+        int fd = open(filename.c_str(), O_RDONLY);
+        if (fd < 0) {
+            return;
+        }
+        struct stat st;
+        if (fstat(fd, &st) == 0 && st.st_size > 0) {
+            void *addr = mmap(nullptr, st.st_size, PROT_READ, MAP_PRIVATE, fd, 0);
+            if (addr != MAP_FAILED) {
+                base = (const char *)addr;
+                size = st.st_size;
+                if (advice >= 0) {
+                    madvise(addr, size, advice);
+                }
+            }
+        }
+        ::close(fd);
+    }
+
+    ~MmapKeySource() {
+        close();
+    }
+
+    bool ok() const { return base != nullptr; }
+
+    void startPrefetch(size_t lookaheadBytes, size_t budgetBytes) {
+        if (base == nullptr || lookaheadBytes == 0) {
+            return;
+        }
+        lookahead = std::max(lookaheadBytes, chunk);
+        budget = std::max(budgetBytes, lookahead + chunk);
+        prefetching = true;
+        worker = std::thread(&MmapKeySource::prefetchLoop, this);
+    }
+
+    const char *next(size_t n, char *buf) override {
+        if (pos + n > size) {
+            std::cerr << "key file exhausted: need " << n << " bytes at offset "
+                      << pos << " of " << size << std::endl;
+            exit(1);
+        }
+        if (prefetching) {
+            if (ready.load(std::memory_order_acquire) < pos + n) {
+                waitFor(pos + n);
+            }
+            if ((pos + n) / chunk != pos / chunk) {
+                consumed.store(pos, std::memory_order_release);
+                cv.notify_one();
+            }
+        }
+        const char *p = base + pos;
+        pos += n;
+        return p;
+    }
+
+    uint64_t waitNanoseconds() const override { return waitNs; }
+
+    void close() override {
+        if (worker.joinable()) {
+            stop = true;
+            cv.notify_all();
+            worker.join();
+            prefetching = false;
+        }
+        if (base != nullptr) {
+            munmap((void *)base, size);
+            base = nullptr;
+        }
+    }
+
+    const char *name() const override { return "mmap"; }
+
+private:
+    void waitFor(size_t end) {
+        auto start = std::chrono::high_resolution_clock::now();
+        consumed.store(pos, std::memory_order_release);
+        wanted.store(end, std::memory_order_release);
+        std::unique_lock<std::mutex> lock(mtx);
+        cv.notify_all();
+        cv.wait(lock, [&] { return ready.load(std::memory_order_acquire) >= end; });
+        waitNs += std::chrono::duration_cast<std::chrono::nanoseconds>(
+            std::chrono::high_resolution_clock::now() - start).count();
+    }
+
+    void prefetchLoop() {
+        const size_t page = sysconf(_SC_PAGESIZE);
+        volatile char sink = 0;
+        while (!stop) {
+            size_t cur = consumed.load(std::memory_order_acquire);
+            size_t target = std::max(std::min(size, cur + lookahead),
+                                     wanted.load(std::memory_order_acquire));
+            size_t r = ready.load(std::memory_order_relaxed);
+            if (r < target) {
+                size_t end = std::min(size, r + chunk);
+                madvise((void *)(base + r / page * page), end - r / page * page, MADV_WILLNEED);
+                // Touch every page so the chunk is actually resident.
+                for (size_t off = r; off < end; off += page) {
+                    sink += base[off];
+                }
+                {
+                    std::lock_guard<std::mutex> lock(mtx);
+                    ready.store(end, std::memory_order_release);
+                }
+                cv.notify_all();
+                continue;
+            }
+            // Drop pages the evaluator is done with once over budget.
+            if (r - dropped > budget) {
+                size_t upto = cur / page * page;
+                if (upto > dropped) {
+                    madvise((void *)(base + dropped), upto - dropped, MADV_DONTNEED);
+                    dropped = upto;
+                }
+            }
+            if (r == size) {
+                break;
+            }
+            std::unique_lock<std::mutex> lock(mtx);
+            cv.wait_for(lock, std::chrono::milliseconds(1), [&] {
+                size_t r = ready.load(std::memory_order_relaxed);
+                return stop || consumed.load(std::memory_order_acquire) + lookahead > r ||
+                       wanted.load(std::memory_order_acquire) > r;
+            });
+        }
+    }
+};
+
+inline std::unique_ptr<KeySource> openKeySource(const std::string &filename) {
+    const char *kind = getenv("FSS_KEY_SOURCE");
+    if (kind == nullptr || strcmp(kind, "fstream") != 0) {
+        int advice = MADV_SEQUENTIAL;
+        const char *hint = getenv("FSS_KEY_MADVISE");
+        if (hint != nullptr) {
+            if (strcmp(hint, "willneed") == 0)
+                advice = MADV_WILLNEED;
+            else if (strcmp(hint, "none") == 0)
+                advice = -1;
+        }
+        std::unique_ptr<MmapKeySource> keys(new MmapKeySource(filename, advice));
+        if (keys->ok()) {
+            size_t lookaheadMB = 64;
+            if (const char *env = getenv("FSS_KEY_PREFETCH_MB"))
+                lookaheadMB = strtoull(env, nullptr, 10);
+            size_t budgetMB = 2 * lookaheadMB;
+            if (const char *env = getenv("FSS_KEY_BUDGET_MB"))
+                budgetMB = strtoull(env, nullptr, 10);
+            keys->startPrefetch(lookaheadMB << 20, budgetMB << 20);
+            return keys;
+        }
+        std::cerr << "could not map " << filename << ", reading it with fstream" << std::endl;
+    }
+    return std::unique_ptr<KeySource>(new FstreamKeySource(filename));
+}
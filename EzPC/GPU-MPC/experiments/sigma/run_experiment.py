@@ -30,7 +30,7 @@ import matplotlib.pyplot as plt
 
 import sys
 sys.path.insert(0, '../..')
-from experiments.utils import run_one
+from experiments.supervisor import Experiment, Phase, Supervisor
 
 def get_time(line):
     return round(float(line.split('=')[-1].split(' ')[0]) / 10**6, 3)
@@ -38,11 +38,26 @@ def get_time(line):
 def get_comm(line):
     return round(float(line.split('(')[-1].split(' ')[0]), 3)
 
+def run_sigma(party, gpu, peer_ip, cpu_threads, runs, results_file):
+    # The two parties connect on fixed ports, so the runs of one party are
+    # scheduled one at a time (max_cpus == cpu_threads).
+    experiments = []
+    for model, n_seq in runs:
+        cmd = "CUDA_VISIBLE_DEVICES={} ./sigma {} {} {} {} {}".format(gpu, model, n_seq, party, peer_ip, cpu_threads)
+        log_dir = "output/P{}/models/{}-{}/".format(party, model, n_seq)
+        phase = Phase('run', {'sigma': cmd}, {'sigma': 'logs.txt'})
+        experiments.append(Experiment('{}-{}'.format(model, n_seq), [phase], log_dir, cpus=cpu_threads))
+
+    supervisor = Supervisor(max_cpus=cpu_threads)
+    supervisor.run(experiments)
+    supervisor.print_results()
+    supervisor.write_results(results_file)
+    if supervisor.errors:
+        raise Exception("Some experiments did not run properly. Check logs for errors.")
+
 def run_perf(party, gpu, peer_ip, cpu_threads):
-    for model in ['bert-tiny', 'bert-base', 'bert-large', 'gpt2', 'gpt-neo', 'gpt-neo-large', 'llama7b', 'llama13b']:
-        cmd = "CUDA_VISIBLE_DEVICES={} ./sigma {} 128 {} {} {}".format(gpu, model, party, peer_ip, cpu_threads)
-        log_dir = "output/P{}/models/{}-128/".format(party, model)
-        run_one(cmd, log_dir, "logs.txt")
+    models = ['bert-tiny', 'bert-base', 'bert-large', 'gpt2', 'gpt-neo', 'gpt-neo-large', 'llama7b', 'llama13b']
+    run_sigma(party, gpu, peer_ip, cpu_threads, [(model, 128) for model in models], 'output/P{}/perf_runs.csv'.format(party))
 
     stats = dict({'dealer': dict(), 'evaluator': dict()})
     for model in ['bert-tiny', 'bert-base', 'bert-large', 'gpt2', 'gpt-neo', 'gpt-neo-large', 'llama7b', 'llama13b']:
@@ -128,10 +143,8 @@ def run_perf(party, gpu, peer_ip, cpu_threads):
 
 
 def run_table8(party, gpu, peer_ip, cpu_threads):
-    for n_seq in [64, 128, 256, 512, 1024]:
-        cmd = "CUDA_VISIBLE_DEVICES={} ./sigma gpt2 {} {} {} {}".format(gpu, n_seq, party, peer_ip, cpu_threads)
-        log_dir = 'output/P{}/models/gpt2-{}/'.format(party, n_seq)
-        run_one(cmd, log_dir, "logs.txt")
+    runs = [('gpt2', n_seq) for n_seq in [64, 128, 256, 512, 1024]]
+    run_sigma(party, gpu, peer_ip, cpu_threads, runs, 'output/P{}/table8_runs.csv'.format(party))
 
     with open('output/P{}/Table8.json'.format(party), 'w') as outfile:
         table8 = dict()
@@ -0,0 +1,290 @@
+#
+# Copyright:
+#
+# Copyright (c) 2024 Microsoft Research
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+# Event driven supervisor for experiment runs.
+#
+# An experiment is a list of phases that run one after the other. A phase is a
+# set of processes (e.g. a dealer and an evaluator) that run concurrently. The
+# supervisor blocks on process exit instead of polling, so a phase finishes as
+# soon as its last process does, and a failing process kills the rest of its
+# phase right away. Process output is streamed line by line to the log files
+# with a timestamp relative to the start of the phase.
+#
+# Independent experiments are run concurrently as long as the sum of their
+# declared CPU threads and memory stays within the given limits.
+#
+# Stand-alone usage with a JSON spec (works with any commands, e.g. `sleep`):
+#   python supervisor.py spec.json --max_cpus 64 --max_mem 256 --results results.csv
+# where spec.json is a list of
+#   {"name": "...", "log_dir": "...", "cpus": 32, "mem": 64,
+#    "phases": [{"name": "...", "cmds": {"dealer": "...", "evaluator": "..."}}]}
+# Each phase may also set "log_files": {"<role>": "<file name>"}.
+
+import argparse
+import csv
+import json
+import os
+import signal
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+
+
+class ExperimentFailed(Exception):
+    def __init__(self, message, results=None):
+        super().__init__(message)
+        self.results = results or []
+
+
+class Phase:
+    def __init__(self, name, cmds, log_files=None):
+        # cmds: role -> shell command, all started together
+        # log_files: role -> log file name, <role>.log by default
+        self.name = name
+        self.cmds = cmds
+        self.log_files = log_files or {}
+
+    def log_file(self, role):
+        return self.log_files.get(role, '{}.log'.format(role))
+
+
+class Experiment:
+    def __init__(self, name, phases, log_dir, cpus=1, mem=0):
+        self.name = name
+        self.phases = phases
+        self.log_dir = log_dir
+        self.cpus = cpus
+        self.mem = mem
+
+    @staticmethod
+    def from_dict(d):
+        phases = [Phase(p['name'], p['cmds'], p.get('log_files')) for p in d['phases']]
+        return Experiment(d['name'], phases, d['log_dir'], d.get('cpus', 1), d.get('mem', 0))
+
+
+class ProcessResult:
+    def __init__(self, experiment, phase, role, cmd):
+        self.experiment = experiment
+        self.phase = phase
+        self.role = role
+        self.cmd = cmd
+        self.start = None
+        self.end = None
+        self.returncode = None
+
+    @property
+    def duration(self):
+        if self.start is None or self.end is None:
+            return None
+        return self.end - self.start
+
+    def row(self):
+        duration = self.duration
+        return [self.experiment, self.phase, self.role, self.returncode,
+                time.strftime('%H:%M:%S', time.localtime(self.start)) if self.start else '',
+                '' if duration is None else round(duration, 3)]
+
+
+RESULT_HEADER = ['experiment', 'phase', 'role', 'returncode', 'start', 'duration (s)']
+
+
+def _stream_output(proc, log_file, phase_start, prefix, echo):
+    with open(log_file, 'a') as f:
+        for line in iter(proc.stdout.readline, ''):
+            stamped = '[{:10.3f}] {}'.format(time.time() - phase_start, line)
+            f.write(stamped)
+            f.flush()
+            if echo:
+                sys.stdout.write('{} {}'.format(prefix, stamped))
+                sys.stdout.flush()
+
+
+def run_phase(experiment_name, phase, log_dir, echo=False):
+    """Runs all commands of a phase concurrently and waits for them to exit.
+
+    Returns the list of ProcessResult. Raises ExperimentFailed as soon as one
+    of the processes exits with an error, after terminating the others.
+    """
+    Path(log_dir).mkdir(parents=True, exist_ok=True)
+    done = threading.Condition()
+    finished = []
+    procs = {}
+    results = {}
+    streams = []
+    phase_start = time.time()
+
+    def wait_for(role):
+        proc = procs[role]
+        proc.wait()
+        results[role].end = time.time()
+        results[role].returncode = proc.returncode
+        with done:
+            finished.append(role)
+            done.notify()
+
+    try:
+        for role, cmd in phase.cmds.items():
+            print('Running command={}'.format(cmd))
+            results[role] = ProcessResult(experiment_name, phase.name, role, cmd)
+            results[role].start = time.time()
+            # New session so that terminating also reaches the children of the shell
+            procs[role] = subprocess.Popen(cmd, shell=True, stdout=subprocess.PIPE,
+                                           stderr=subprocess.STDOUT, text=True,
+                                           start_new_session=True)
+            log_file = str(Path(log_dir) / phase.log_file(role))
+            prefix = '[{}/{}/{}]'.format(experiment_name, phase.name, role)
+            t = threading.Thread(target=_stream_output,
+                                 args=(procs[role], log_file, phase_start, prefix, echo), daemon=True)
+            t.start()
+            streams.append(t)
+        for role in procs:
+            threading.Thread(target=wait_for, args=(role,), daemon=True).start()
+    except:
+        _terminate(procs.values())
+        raise ExperimentFailed("Something went wrong. Please check the logs.")
+
+    failed = None
+    seen = 0
+    with done:
+        while seen < len(procs):
+            while seen == len(finished):
+                done.wait()
+            role = finished[seen]
+            seen += 1
+            if procs[role].returncode != 0 and failed is None:
+                failed = role
+                print('{} did not run properly, stopping the other processes.'.format(role))
+                _terminate(p for r, p in procs.items() if r != role)
+    for t in streams:
+        t.join()
+    if failed is not None:
+        raise ExperimentFailed('{} of {} ({}) did not run properly. Check logs in {} for errors.'.format(
+            failed, experiment_name, phase.name, log_dir), [results[role] for role in phase.cmds])
+    return [results[role] for role in phase.cmds]
+
+
+def _terminate(procs):
+    for p in procs:
+        if p.poll() is None:
+            try:
+                os.killpg(p.pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+            p.wait()
+
+
+class Supervisor:
+    def __init__(self, max_cpus, max_mem=0, echo=False):
+        # max_mem of 0 disables the memory limit
+        self.max_cpus = max_cpus
+        self.max_mem = max_mem
+        self.echo = echo
+        self.used_cpus = 0
+        self.used_mem = 0
+        self.lock = threading.Condition()
+        self.results = []
+        self.errors = []
+
+    def _fits(self, exp):
+        # An experiment larger than the limits still runs, alone.
+        if self.used_cpus == 0 and self.used_mem == 0:
+            return True
+        if self.used_cpus + exp.cpus > self.max_cpus:
+            return False
+        if self.max_mem and self.used_mem + exp.mem > self.max_mem:
+            return False
+        return True
+
+    def _run_experiment(self, exp):
+        try:
+            for phase in exp.phases:
+                phase_dir = str(Path(exp.log_dir) / phase.name) if len(exp.phases) > 1 else exp.log_dir
+                res = run_phase(exp.name, phase, phase_dir, self.echo)
+                with self.lock:
+                    self.results.extend(res)
+        except Exception as e:
+            with self.lock:
+                if isinstance(e, ExperimentFailed):
+                    self.results.extend(e.results)
+                self.errors.append((exp.name, str(e)))
+        finally:
+            with self.lock:
+                self.used_cpus -= exp.cpus
+                self.used_mem -= exp.mem
+                self.lock.notify_all()
+
+    def run(self, experiments):
+        threads = []
+        for exp in experiments:
+            with self.lock:
+                while not self._fits(exp):
+                    self.lock.wait()
+                self.used_cpus += exp.cpus
+                self.used_mem += exp.mem
+            print('Starting experiment {}'.format(exp.name))
+            t = threading.Thread(target=self._run_experiment, args=(exp,))
+            t.start()
+            threads.append(t)
+        for t in threads:
+            t.join()
+        return self.results
+
+    def write_results(self, path):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        with open(path, 'w') as f:
+            writer = csv.writer(f)
+            writer.writerow(RESULT_HEADER)
+            for r in self.results:
+                writer.writerow(r.row())
+
+    def print_results(self):
+        rows = [RESULT_HEADER] + [[str(c) for c in r.row()] for r in self.results]
+        widths = [max(len(row[i]) for row in rows) for i in range(len(RESULT_HEADER))]
+        for row in rows:
+            print('  '.join(c.ljust(w) for c, w in zip(row, widths)))
+        for name, err in self.errors:
+            print('FAILED {}: {}'.format(name, err))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run experiments concurrently within resource limits.')
+    parser.add_argument('spec', help='JSON list of experiments.')
+    parser.add_argument('--max_cpus', default=1, type=int, help='CPU threads available to experiments.')
+    parser.add_argument('--max_mem', default=0, type=int, help='Memory (GB) available to experiments, 0 for no limit.')
+    parser.add_argument('--results', default=None, type=str, help='Write the results table as csv.')
+    parser.add_argument('--echo', default=False, action='store_true', help='Also print process output.')
+    args = parser.parse_args()
+
+    with open(args.spec, 'r') as f:
+        experiments = [Experiment.from_dict(d) for d in json.load(f)]
+    supervisor = Supervisor(args.max_cpus, args.max_mem, args.echo)
+    supervisor.run(experiments)
+    supervisor.print_results()
+    if args.results:
+        supervisor.write_results(args.results)
+    if supervisor.errors:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,76 @@
+#
+# Copyright:
+#
+# Copyright (c) 2024 Microsoft Research
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+# Runs the supervisor with stand-in shell commands instead of the MPC binaries:
+#   python3 -m pytest experiments/test_supervisor.py   (from GPU-MPC)
+
+import csv
+import os
+import sys
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from experiments.supervisor import Experiment, ExperimentFailed, Phase, Supervisor, run_phase
+from experiments.utils import run_parallel
+
+
+def test_run_parallel_logs_both_roles(tmp_path):
+    log_dir = str(tmp_path) + '/'
+    results = run_parallel('echo dealer done', 'echo eval done', log_dir)
+    assert [r.returncode for r in results] == [0, 0]
+    assert 'dealer done' in (tmp_path / 'dealer.log').read_text()
+    assert 'eval done' in (tmp_path / 'eval.log').read_text()
+
+
+def test_phase_fails_fast(tmp_path):
+    phase = Phase('run', {'dealer': 'sleep 30', 'eval': 'echo oops; exit 3'})
+    start = time.time()
+    with pytest.raises(ExperimentFailed) as e:
+        run_phase('exp', phase, str(tmp_path))
+    # The dealer is stopped as soon as the evaluator fails.
+    assert time.time() - start < 10
+    codes = {r.role: r.returncode for r in e.value.results}
+    assert codes['eval'] == 3
+    assert codes['dealer'] != 0
+    assert 'oops' in (tmp_path / 'eval.log').read_text()
+
+
+def test_supervisor_runs_experiments_and_reports(tmp_path):
+    experiments = [
+        Experiment('ok', [Phase('keygen', {'dealer': 'echo key'}),
+                          Phase('online', {'eval': 'echo out'})], str(tmp_path / 'ok'), cpus=1),
+        Experiment('bad', [Phase('run', {'eval': 'exit 1'})], str(tmp_path / 'bad'), cpus=1),
+    ]
+    supervisor = Supervisor(max_cpus=2)
+    supervisor.run(experiments)
+    assert [name for name, _ in supervisor.errors] == ['bad']
+    assert (tmp_path / 'ok' / 'keygen' / 'dealer.log').exists()
+    assert (tmp_path / 'ok' / 'online' / 'eval.log').exists()
+
+    results_file = tmp_path / 'results.csv'
+    supervisor.write_results(str(results_file))
+    with open(results_file) as f:
+        rows = list(csv.reader(f))
+    assert len(rows) == 4
+    assert sorted((r[0], r[1], r[3]) for r in rows[1:]) == [
+        ('bad', 'run', '1'), ('ok', 'keygen', '0'), ('ok', 'online', '0')]
@@ -214,6 +214,13 @@ int main(int __argc, char**__argv){'{'}
     std::string ip = "127.0.0.1";
     int nt=4;
     std::string weights_file = "";
+    // Session mode: LLAMA_INFERENCES=<k> runs k inferences on one connection
+    // and one loaded net. All parties must use the same k; the dealer writes
+    // the keys of all k, the client reads k inputs from stdin.
+    int inferences = 1;
+    if (const char *env = getenv("LLAMA_INFERENCES")) {'{'}
+        inferences = std::max(1, atoi(env));
+    {'}'}
 
     if(party == 0){'{'}
         weights_file = __argv[2];
@@ -260,10 +267,12 @@ int main(int __argc, char**__argv){'{'}
         net.init(scale);
         net.load(weights_file);
         Tensor<i64> input({'{'}{iterate_list([n]+ dims +[c])}{'}'});
-        input.input_nchw(scale);
         print_dot_graph(net.root);
-        net.forward(input);
-        print(net.activation, scale, 64);
+        for (int i = 0; i < inferences; ++i) {'{'}
+            input.input_nchw(scale);
+            net.forward(input);
+            print(net.activation, scale, 64);
+        {'}'}
         return 0;
     {'}'}
 
@@ -283,9 +292,9 @@ int main(int __argc, char**__argv){'{'}
     Net<u64> net;
     net.init(scale);
     net.setBackend(llama);
-    net.optimize();
+    net.optimize({'{'}{iterate_list([n]+ dims +[c])}{'}'});
     if(party == SERVER){'{'}
-        net.load(weights_file);
+        net.load(weights_file, LlamaConfig::bitlength);
     {'}'}
     else if(party == DEALER){'{'}
         net.zero();
@@ -293,19 +302,32 @@ int main(int __argc, char**__argv){'{'}
     llama->initializeInferencePartyA(net.root);
 
     Tensor<u64> input({'{'}{iterate_list([n]+ dims +[c])}{'}'});
-    if(party == CLIENT){'{'}
-         input.input_nchw(scale);
-    {'}'}
-    llama->initializeInferencePartyB(input);
-
-    llama::start();
-    net.forward(input);
-    llama::end();
+    double sessionMs = 0;
+    for (int i = 0; i < inferences; ++i) {'{'}
+        if(party == CLIENT){'{'}
+             input.input_nchw(scale);
+        {'}'}
+        auto inferenceStart = std::chrono::high_resolution_clock::now();
+        llama->initializeInferencePartyB(input);
 
-    auto &output = net.activation;
-    llama->outputA(output);
-    if (party == CLIENT) {'{'}
-        print_nchw(output, scale, LlamaConfig::bitlength);
+        llama::start();
+        net.forward(input);
+        llama::end();
+
+        auto &output = net.activation;
+        llama->outputA(output);
+        double ms = std::chrono::duration<double, std::milli>(std::chrono::high_resolution_clock::now() - inferenceStart).count();
+        sessionMs += ms;
+        if (party == CLIENT) {'{'}
+            print_nchw(output, scale, LlamaConfig::bitlength);
+        {'}'}
+        if (inferences > 1) {'{'}
+            std::cerr << "Inference " << i << " = " << ms << " milliseconds\\n";
+        {'}'}
+    {'}'}
+    if (inferences > 1) {'{'}
+        std::cerr << "Session: " << inferences << " inferences in " << sessionMs << " milliseconds, "
+                  << inferences * 1000.0 / sessionMs << " inferences/s\\n";
     {'}'}
     llama->finalize();
 {'}'}
@@ -98,6 +98,10 @@ class IR(Backend):
         model = optimizations.infer_shapes(model)
         logger.info("Shape Inference Done")
 
+        model = optimizations.rewrite_graph(model, backend)
+        model = optimizations.infer_shapes(model)
+        logger.info("Graph Rewrites Done")
+
         is_compatible, unsupported_nodes = cls.is_compatible(model, backend)
 
         if is_compatible:
@@ -16,8 +16,8 @@ def pytest_addoption(parser):
             "SECFLOAT_CLEARTEXT",
             "CLEARTEXT_fp",
         ],
-        help="backend : CLEARTEXT_LLAMA | CLEARTEXT_fp | LLAMA | SECFLOAT | SECFLOAT_CLEARTEXT",
-        required=True,
+        help="backend : CLEARTEXT_LLAMA | CLEARTEXT_fp | LLAMA | SECFLOAT | SECFLOAT_CLEARTEXT. "
+        "Required by the tests that compile a model (not by test_rewrite.py).",
     )
     parser.addoption(
         "--batch_size",
@@ -43,6 +43,8 @@ def pytest_addoption(parser):
 @pytest.fixture(scope="session")
 def backend(request):
     opt = request.config.getoption("--backend")
+    if opt is None:
+        pytest.fail("--backend is required", pytrace=False)
     return opt
 
 
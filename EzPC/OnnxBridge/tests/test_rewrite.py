@@ -0,0 +1,240 @@
+"""
+Unit tests of the graph rewrites of utils/rewrite.py, on small models run
+with onnxruntime before and after optimizations.rewrite_graph. They need
+neither a backend build nor a download:
+
+    python -m pytest tests/test_rewrite.py
+"""
+
+import os
+import sys
+
+import numpy as np
+import onnx
+import onnxruntime as ort
+import pytest
+from onnx import TensorProto, helper, numpy_helper
+
+# OnnxBridge's utils package, not tests/utils.py
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+sys.modules.pop("utils", None)
+from utils import optimizations
+from utils.rewrite import RewriteEngine, RewriteGraph, RewritePass
+
+BACKEND = "CLEARTEXT_LLAMA"
+
+
+def make_model(nodes, inputs, outputs, initializers):
+    """
+    :param inputs: Dictionary {name}->shape of the float inputs.
+    :param outputs: Names of the float outputs.
+    :param initializers: Dictionary {name}->numpy array.
+    """
+    graph = helper.make_graph(
+        nodes,
+        "rewrite_test",
+        [
+            helper.make_tensor_value_info(name, TensorProto.FLOAT, shape)
+            for name, shape in inputs.items()
+        ],
+        [
+            helper.make_tensor_value_info(name, TensorProto.FLOAT, None)
+            for name in outputs
+        ],
+        [numpy_helper.from_array(arr, name) for name, arr in initializers.items()],
+    )
+    model = helper.make_model(graph, opset_imports=[helper.make_opsetid("", 13)])
+    # readable by older onnxruntime releases too
+    model.ir_version = 7
+    return model
+
+
+def run(model, feeds):
+    sess = ort.InferenceSession(
+        model.SerializeToString(), providers=["CPUExecutionProvider"]
+    )
+    return sess.run(None, feeds)
+
+
+def rewrite(model, backend=BACKEND):
+    """
+    Rewrites a copy of model. Returns the rewritten model and its op types.
+    """
+    copy = onnx.ModelProto()
+    copy.CopyFrom(model)
+    copy = optimizations.infer_shapes(copy)
+    copy = optimizations.rewrite_graph(copy, backend)
+    return copy, [node.op_type for node in copy.graph.node]
+
+
+def check_same_outputs(model, rewritten, feeds):
+    for exp, out in zip(run(model, feeds), run(rewritten, feeds)):
+        np.testing.assert_allclose(out, exp, rtol=1e-5, atol=1e-5)
+
+
+def rand(*shape):
+    return np.random.uniform(-1, 1, shape).astype(np.float32)
+
+
+def bn_params(channels, prefix="bn"):
+    return {
+        prefix + "_scale": rand(channels),
+        prefix + "_b": rand(channels),
+        prefix + "_mean": rand(channels),
+        prefix + "_var": np.random.uniform(0.5, 2, channels).astype(np.float32),
+    }
+
+
+def bn_node(inp, out, prefix="bn"):
+    return helper.make_node(
+        "BatchNormalization",
+        [inp] + [prefix + s for s in ["_scale", "_b", "_mean", "_var"]],
+        [out],
+        epsilon=1e-3,
+    )
+
+
+@pytest.mark.parametrize("bias", [True, False])
+def test_fold_batchnorm_conv(bias):
+    inits = {"w": rand(4, 3, 3, 3), **bn_params(4)}
+    conv_inputs = ["x", "w"]
+    if bias:
+        inits["b"] = rand(4)
+        conv_inputs.append("b")
+    model = make_model(
+        [
+            helper.make_node("Conv", conv_inputs, ["c"], pads=[1, 1, 1, 1]),
+            bn_node("c", "y"),
+        ],
+        {"x": [1, 3, 6, 6]},
+        ["y"],
+        inits,
+    )
+    rewritten, ops = rewrite(model)
+    assert ops == ["Conv"]
+    assert len(rewritten.graph.node[0].input) == 3
+    check_same_outputs(model, rewritten, {"x": rand(1, 3, 6, 6)})
+
+
+@pytest.mark.parametrize("bias", [True, False])
+@pytest.mark.parametrize("transB", [0, 1])
+def test_fold_batchnorm_gemm(bias, transB):
+    inits = {"w": rand(5, 8) if transB else rand(8, 5), **bn_params(5)}
+    gemm_inputs = ["x", "w"]
+    if bias:
+        inits["b"] = rand(5)
+        gemm_inputs.append("b")
+    model = make_model(
+        [
+            helper.make_node("Gemm", gemm_inputs, ["g"], transB=transB),
+            bn_node("g", "y"),
+        ],
+        {"x": [2, 8]},
+        ["y"],
+        inits,
+    )
+    rewritten, ops = rewrite(model)
+    assert ops == ["Gemm"]
+    check_same_outputs(model, rewritten, {"x": rand(2, 8)})
+
+
+def test_fold_batchnorm_skips_shared_weight():
+    # Folding into one Conv would change the weights of the other
+    inits = {"w": rand(4, 3, 1, 1), **bn_params(4, "bn0"), **bn_params(4, "bn1")}
+    model = make_model(
+        [
+            helper.make_node("Conv", ["x", "w"], ["c0"]),
+            helper.make_node("Conv", ["x", "w"], ["c1"]),
+            bn_node("c0", "y0", "bn0"),
+            bn_node("c1", "y1", "bn1"),
+        ],
+        {"x": [1, 3, 4, 4]},
+        ["y0", "y1"],
+        inits,
+    )
+    rewritten, ops = rewrite(model)
+    assert ops.count("BatchNormalization") == 2
+    check_same_outputs(model, rewritten, {"x": rand(1, 3, 4, 4)})
+
+
+@pytest.mark.parametrize(
+    "layout",
+    [
+        helper.make_node("Transpose", ["r"], ["t"], perm=[0, 3, 1, 2]),
+        helper.make_node("Reshape", ["r", "shape"], ["t"]),
+    ],
+)
+def test_reorder_relu_maxpool(layout):
+    model = make_model(
+        [
+            helper.make_node("Relu", ["x"], ["r"]),
+            layout,
+            helper.make_node(
+                "MaxPool", ["t"], ["y"], kernel_shape=[2, 2], strides=[2, 2]
+            ),
+        ],
+        {"x": [1, 4, 4, 2]},
+        ["y"],
+        {"shape": np.array([1, 2, 4, 4], dtype=np.int64)},
+    )
+    rewritten, ops = rewrite(model)
+    assert ops == [layout.op_type, "MaxPool", "Relu"]
+    check_same_outputs(model, rewritten, {"x": rand(1, 4, 4, 2)})
+
+
+def test_reorder_relu_maxpool_skips_shared_relu():
+    # r is also added to the pooled output, so it must stay a Relu output
+    model = make_model(
+        [
+            helper.make_node("Relu", ["x"], ["r"]),
+            helper.make_node("MaxPool", ["r"], ["m"], kernel_shape=[1, 1]),
+            helper.make_node("Add", ["m", "r"], ["y"]),
+        ],
+        {"x": [1, 2, 4, 4]},
+        ["y"],
+        {},
+    )
+    rewritten, ops = rewrite(model)
+    assert ops == ["Relu", "MaxPool", "Add"]
+    check_same_outputs(model, rewritten, {"x": rand(1, 2, 4, 4)})
+
+
+def test_fold_constants():
+    # The weight is stored transposed; the Transpose is evaluated once
+    model = make_model(
+        [
+            helper.make_node("Transpose", ["wt"], ["w"], perm=[1, 0]),
+            helper.make_node("MatMul", ["x", "w"], ["y"]),
+        ],
+        {"x": [2, 8]},
+        ["y"],
+        {"wt": rand(5, 8)},
+    )
+    rewritten, ops = rewrite(model)
+    assert ops == ["MatMul"]
+    check_same_outputs(model, rewritten, {"x": rand(2, 8)})
+
+
+def test_disable_passes(monkeypatch):
+    model = make_model(
+        [helper.make_node("Conv", ["x", "w"], ["c"]), bn_node("c", "y")],
+        {"x": [1, 3, 4, 4]},
+        ["y"],
+        {"w": rand(4, 3, 1, 1), **bn_params(4)},
+    )
+    monkeypatch.setenv("ONNXBRIDGE_DISABLE_PASSES", "FoldBatchNorm,AddReluHints")
+    _, ops = rewrite(model)
+    assert ops == ["Conv", "BatchNormalization"]
+
+    engine = RewriteEngine(BACKEND)
+    engine.run(RewriteGraph([], [], [], {}, {}, BACKEND))
+    assert [name for (name, _, _) in engine.stats] == [
+        "FoldConstants",
+        "ReorderReluMaxPool",
+        "EliminateDeadNodes",
+    ]
+
+
+def test_rewrite_pass_is_abstract():
+    with pytest.raises(TypeError):
+        RewritePass()
@@ -24,14 +24,16 @@ import struct
 
 import math
 import numpy as np
-from onnx import ValueInfoProto, TensorShapeProto, helper
+from onnx import NodeProto, ValueInfoProto, TensorShapeProto, helper
 from onnx import numpy_helper
 from onnx import shape_inference
 from onnx.helper import make_tensor_value_info
 from onnxsim import simplify
 
 from utils import logger
+from utils.nodes import Node
 from utils.onnx2IR_helper import proto_val_to_dimension_tuple
+from utils.rewrite import RewriteEngine, RewriteGraph
 
 
 def get_data_type(proto_val):
@@ -250,7 +252,7 @@ def relu_maxpool_optimiser(program, value_info):
     :param program: Onnx Model as a list of nodes
     :return: Optimised Program
     """
-    for idx, node in enumerate(program):
+    for idx, node in enumerate(program[:-1]):
         if node.op_type == "Relu" and program[idx + 1].op_type == "MaxPool":
             relu = program[idx]
             maxpool = program[idx + 1]
@@ -266,6 +268,61 @@ def relu_maxpool_optimiser(program, value_info):
     return program
 
 
+def rewrite_graph(model, backend):
+    """
+    Runs the rewrite passes of utils/rewrite.py over a shape inferred model
+    and writes the rewritten nodes and initializers back into it. The shapes
+    of the model are dropped, run infer_shapes again afterwards.
+    :param model: Onnx Model
+    :param backend: Backend the model is compiled to
+    :return: Rewritten Model
+    """
+    graph = model.graph
+    shapes = {
+        val.name: proto_val_to_dimension_tuple(val) for val in graph.value_info
+    }
+    initializers = {
+        init_vals.name: numpy_helper.to_array(init_vals)
+        for init_vals in graph.initializer
+    }
+    rewrite = RewriteGraph(
+        [Node(node) for node in graph.node],
+        [inp.name for inp in graph.input],
+        [out.name for out in graph.output],
+        shapes,
+        dict(initializers),
+        backend,
+    )
+    RewriteEngine(backend).run(rewrite)
+
+    new_nodes = []
+    for node in rewrite.nodes:
+        proto = NodeProto()
+        proto.CopyFrom(node.node_proto)
+        del proto.input[:]
+        proto.input.extend(node.inputs)
+        del proto.output[:]
+        proto.output.extend(node.outputs)
+        new_nodes.append(proto)
+    del graph.node[:]
+    graph.node.extend(new_nodes)
+
+    used = {inp for node in rewrite.nodes for inp in node.inputs}
+    kept = [name for name in rewrite.initializers if name in used]
+    del graph.initializer[:]
+    graph.initializer.extend(
+        numpy_helper.from_array(rewrite.initializers[name], name) for name in kept
+    )
+    # older models also list their initializers as inputs
+    inputs = [
+        inp for inp in graph.input if inp.name not in initializers or inp.name in used
+    ]
+    del graph.input[:]
+    graph.input.extend(inputs)
+    del graph.value_info[:]
+    return model
+
+
 def optimise(model):
     """
     Simplifies the Onnx Model, function provided by Onnx.
@@ -0,0 +1,427 @@
+"""
+Copyright:
+Copyright (c) 2021 Microsoft Research
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+"""
+Rewrite passes over the operator Nodes of a model, run on the ONNX graph
+before the weights are dumped (see optimizations.rewrite_graph), so passes
+can change weights as well as the graph.
+
+Every pass logs how many rewrites it made and an estimate of the secure
+non-linear operations they remove (comparisons and truncations for the
+fixed-point backends, floating point operations for SECFLOAT).
+
+ONNXBRIDGE_DISABLE_PASSES=FoldBatchNorm,ReorderReluMaxPool,... skips passes.
+"""
+
+import os
+from abc import ABC, abstractmethod
+
+import numpy as np
+
+from utils import logger
+
+FIXED_POINT_BACKENDS = ["LLAMA", "CLEARTEXT_LLAMA", "CLEARTEXT_fp"]
+FLOAT_BACKENDS = ["SECFLOAT", "SECFLOAT_CLEARTEXT"]
+
+# Ops that only move data around, so they commute with elementwise ops.
+LAYOUT_OPS = ["Flatten", "Reshape", "Transpose"]
+
+
+class RewriteGraph:
+    """
+    Operator Nodes of a model in execution order, with what the passes need
+    to know about the tensors between them.
+    """
+
+    def __init__(self, nodes, inputs, outputs, shapes, initializers, backend):
+        """
+        :param nodes: List of Nodes in execution order.
+        :param inputs: Names of the model inputs.
+        :param outputs: Names of the model outputs.
+        :param shapes: Dictionary {tensor}->shape.
+        :param initializers: Dictionary {initializer}->numpy array.
+        :param backend: Backend the model is compiled to.
+        """
+        self.nodes = nodes
+        self.inputs = inputs
+        self.outputs = outputs
+        self.shapes = shapes
+        self.initializers = initializers
+        self.backend = backend
+        # (Add, Relu) pairs found by AddReluHints
+        self.hints = []
+
+    @property
+    def fixed_point(self):
+        return self.backend in FIXED_POINT_BACKENDS
+
+    def producers(self):
+        return {out: node for node in self.nodes for out in node.outputs}
+
+    def consumers(self):
+        uses = {}
+        for node in self.nodes:
+            for inp in node.inputs:
+                uses.setdefault(inp, []).append(node)
+        return uses
+
+    def numel(self, tensor):
+        """
+        Number of elements of a tensor, 0 if its shape is not known.
+        """
+        shape = self.shapes.get(tensor)
+        if shape is None or any(not isinstance(d, int) or d <= 0 for d in shape):
+            return 0
+        return int(np.prod(shape, dtype=np.int64))
+
+    def single_use(self, tensor, uses):
+        return len(uses.get(tensor, [])) == 1 and tensor not in self.outputs
+
+    def remove(self, node):
+        self.nodes.remove(node)
+
+    def unique_name(self, name):
+        used = set(self.initializers) | set(self.shapes)
+        used |= {t for node in self.nodes for t in node.inputs + node.outputs}
+        new, i = name, 0
+        while new in used:
+            i += 1
+            new = f"{name}_{i}"
+        return new
+
+
+def secure_ops(node, graph):
+    """
+    Estimated number of secure non-linear operations a node costs.
+    :param node: Node
+    :param graph: RewriteGraph
+    :return: Number of operations, 0 if the shapes are not known.
+    """
+    op = node.op_type
+    out = graph.numel(node.outputs[0])
+    if op in ["Relu", "LeakyRelu", "Sigmoid", "Tanh", "Softmax"]:
+        return out
+    if op == "MaxPool":
+        window = int(np.prod(node.attrs.get("kernel_shape", [1])))
+        return out * (window - 1)
+    if op == "BatchNormalization":
+        # a truncation per element, or a float multiplication and addition
+        return out if graph.fixed_point else 2 * out
+    if op in ["Conv", "ConvTranspose", "Gemm", "MatMul", "Mul", "Div"]:
+        # truncation after the multiplication; SECFLOAT pays for the MACs
+        # either way, so only count what a rewrite can change.
+        return out if graph.fixed_point else 0
+    if op in ["AveragePool", "GlobalAveragePool"]:
+        return out
+    if op in ["Add", "Sub"]:
+        return 0 if graph.fixed_point else out
+    return 0
+
+
+class RewritePass(ABC):
+    """
+    A rewrite over a RewriteGraph. run() returns the number of rewrites and
+    the estimated secure operations they remove.
+    """
+
+    name = "RewritePass"
+    backends = FIXED_POINT_BACKENDS + FLOAT_BACKENDS
+
+    @abstractmethod
+    def run(self, graph):
+        pass
+
+
+def _flatten(x, attrs):
+    axis = attrs.get("axis", 1)
+    axis = axis if axis >= 0 else axis + x.ndim
+    return x.reshape(int(np.prod(x.shape[:axis], dtype=np.int64)), -1)
+
+
+def _reshape(x, shape, attrs):
+    shape = [
+        x.shape[i] if d == 0 and not attrs.get("allowzero", 0) else d
+        for i, d in enumerate(shape.astype(np.int64).tolist())
+    ]
+    return x.reshape(shape)
+
+
+class FoldConstants(RewritePass):
+    """
+    Evaluates nodes whose inputs are all initializers and makes their outputs
+    initializers, e.g. a Transpose or Reshape of a weight.
+    """
+
+    name = "FoldConstants"
+
+    evaluators = {
+        "Identity": lambda x, attrs: x,
+        "Relu": lambda x, attrs: np.maximum(x, 0).astype(x.dtype),
+        "Transpose": lambda x, attrs: np.transpose(x, attrs.get("perm")),
+        "Flatten": _flatten,
+        "Reshape": _reshape,
+        "Add": lambda a, b, attrs: (a + b).astype(a.dtype),
+        "Sub": lambda a, b, attrs: (a - b).astype(a.dtype),
+        "Mul": lambda a, b, attrs: (a * b).astype(a.dtype),
+        "Div": lambda a, b, attrs: (
+            a / b if np.issubdtype(a.dtype, np.floating) else a // b
+        ).astype(a.dtype),
+        "Concat": lambda *args: np.concatenate(args[:-1], axis=args[-1]["axis"]),
+    }
+
+    def run(self, graph):
+        rewrites, removed = 0, 0
+        for node in list(graph.nodes):
+            fn = self.evaluators.get(node.op_type)
+            if (
+                fn is None
+                or len(node.outputs) != 1
+                or node.outputs[0] in graph.outputs
+                or not node.inputs
+                or not all(i in graph.initializers for i in node.inputs)
+            ):
+                continue
+            args = [graph.initializers[i] for i in node.inputs]
+            graph.initializers[node.outputs[0]] = np.asarray(fn(*args, node.attrs))
+            graph.shapes[node.outputs[0]] = tuple(
+                graph.initializers[node.outputs[0]].shape
+            )
+            removed += secure_ops(node, graph)
+            graph.remove(node)
+            rewrites += 1
+        return rewrites, removed
+
+
+class EliminateDeadNodes(RewritePass):
+    """
+    Removes nodes none of whose outputs reach a model output.
+    """
+
+    name = "EliminateDeadNodes"
+
+    def run(self, graph):
+        rewrites, removed = 0, 0
+        changed = True
+        while changed:
+            changed = False
+            uses = graph.consumers()
+            for node in reversed(list(graph.nodes)):
+                if any(o in uses or o in graph.outputs for o in node.outputs if o):
+                    continue
+                removed += secure_ops(node, graph)
+                graph.remove(node)
+                rewrites += 1
+                changed = True
+                uses = graph.consumers()
+        return rewrites, removed
+
+
+class FoldBatchNorm(RewritePass):
+    """
+    Folds a BatchNormalization into the Conv or Gemm in front of it when the
+    BatchNormalization is its only consumer: the weights are scaled by
+    scale / sqrt(var + epsilon) per output channel and the bias becomes
+    (bias - mean) * scale / sqrt(var + epsilon) + B.
+    """
+
+    name = "FoldBatchNorm"
+
+    def run(self, graph):
+        rewrites, removed = 0, 0
+        for bn in list(graph.nodes):
+            if bn.op_type != "BatchNormalization":
+                continue
+            producers, uses = graph.producers(), graph.consumers()
+            layer = producers.get(bn.inputs[0])
+            if layer is None or not self._foldable(layer, bn, graph, uses):
+                continue
+
+            scale, b, mean, var = [graph.initializers[i] for i in bn.inputs[1:5]]
+            factor = scale / np.sqrt(var + bn.attrs.get("epsilon", 1e-5))
+            weight = graph.initializers[layer.inputs[1]]
+            if layer.op_type == "Conv":
+                folded = weight * factor.reshape([-1] + [1] * (weight.ndim - 1))
+            elif layer.attrs.get("transB", 0):
+                folded = weight * factor.reshape(-1, 1)
+            else:
+                folded = weight * factor.reshape(1, -1)
+            if len(layer.inputs) > 2 and layer.inputs[2] != "":
+                bias = graph.initializers[layer.inputs[2]]
+                bias_shape = bias.shape
+                bias = bias.reshape(-1)
+            else:
+                bias = np.zeros(factor.shape, dtype=weight.dtype)
+                bias_shape = bias.shape
+                name = graph.unique_name(layer.outputs[0] + "_bias")
+                layer.inputs = layer.inputs[:2] + [name]
+                graph.shapes[name] = bias_shape
+                if not graph.fixed_point:
+                    # SECFLOAT now adds a bias it did not add before
+                    removed -= graph.numel(bn.outputs[0])
+            graph.initializers[layer.inputs[1]] = folded.astype(weight.dtype)
+            graph.initializers[layer.inputs[2]] = (
+                ((bias - mean) * factor + b).astype(weight.dtype).reshape(bias_shape)
+            )
+
+            removed += secure_ops(bn, graph)
+            layer.outputs = [bn.outputs[0]]
+            graph.remove(bn)
+            rewrites += 1
+        return rewrites, removed
+
+    @staticmethod
+    def _foldable(layer, bn, graph, uses):
+        if layer.op_type not in ["Conv", "Gemm"] or not graph.single_use(
+            layer.outputs[0], uses
+        ):
+            return False
+        if any(o != "" for o in bn.outputs[1:]):
+            return False
+        if not all(i in graph.initializers for i in bn.inputs[1:5]):
+            return False
+        # the weights and bias must be initializers this layer does not share
+        params = [i for i in layer.inputs[1:] if i != ""]
+        if not all(i in graph.initializers and len(uses[i]) == 1 for i in params):
+            return False
+        if layer.op_type == "Gemm":
+            if layer.attrs.get("transA", 0) or layer.attrs.get("alpha", 1.0) != 1.0:
+                return False
+            # a bias per output feature, not a full matrix
+            if len(params) > 1 and (
+                layer.attrs.get("beta", 1.0) != 1.0
+                or graph.initializers[params[1]].size
+                != graph.initializers[bn.inputs[1]].size
+            ):
+                return False
+        return True
+
+
+class ReorderReluMaxPool(RewritePass):
+    """
+    Moves a Relu to after the MaxPool it feeds, also through Flatten, Reshape
+    and Transpose in between: the Relu commutes with all of them and then
+    runs on the pooled output, which has fewer elements.
+    """
+
+    name = "ReorderReluMaxPool"
+
+    def run(self, graph):
+        rewrites, removed = 0, 0
+        for relu in list(graph.nodes):
+            if relu.op_type != "Relu":
+                continue
+            uses = graph.consumers()
+            chain = []
+            tensor = relu.outputs[0]
+            while graph.single_use(tensor, uses):
+                node = uses[tensor][0]
+                chain.append(node)
+                if node.op_type not in LAYOUT_OPS or len(node.outputs) != 1:
+                    break
+                tensor = node.outputs[0]
+            if not chain or chain[-1].op_type != "MaxPool":
+                continue
+            maxpool = chain[-1]
+            if any(o != "" for o in maxpool.outputs[1:]):
+                continue
+
+            before = graph.numel(relu.inputs[0])
+            # relu.outputs[0] is free once the chain reads the Relu input
+            chain[0].inputs = [relu.inputs[0]] + chain[0].inputs[1:]
+            pooled, out = relu.outputs[0], maxpool.outputs[0]
+            maxpool.outputs = [pooled]
+            relu.inputs, relu.outputs = [pooled], [out]
+            graph.shapes[pooled] = graph.shapes.get(out)
+            graph.nodes.remove(relu)
+            graph.nodes.insert(graph.nodes.index(maxpool) + 1, relu)
+
+            removed += before - graph.numel(out)
+            rewrites += 1
+        return rewrites, removed
+
+
+class AddReluHints(RewritePass):
+    """
+    Finds Adds followed only by a Relu whose inputs come from Conv/Gemm
+    layers that feed nothing else. Nothing is rewritten here: Sytorch sinks
+    the truncations of those layers past the Add and fuses them with the
+    Relu (SinkTruncation), so the hints only report what that saves.
+    """
+
+    name = "AddReluHints"
+    backends = FIXED_POINT_BACKENDS
+
+    def run(self, graph):
+        hints, removed = 0, 0
+        producers, uses = graph.producers(), graph.consumers()
+        for add in graph.nodes:
+            if add.op_type != "Add" or not graph.single_use(add.outputs[0], uses):
+                continue
+            relu = uses[add.outputs[0]][0]
+            if relu.op_type != "Relu":
+                continue
+            truncating = [
+                producers[i]
+                for i in add.inputs
+                if i in producers
+                and producers[i].op_type in ["Conv", "Gemm"]
+                and graph.single_use(i, uses)
+            ]
+            if len(truncating) < 2 or len(truncating) != len(add.inputs):
+                continue
+            graph.hints.append((add.name, relu.name))
+            # one truncation, fused with the Relu, instead of one per input
+            removed += len(truncating) * graph.numel(add.outputs[0])
+            hints += 1
+        return hints, removed
+
+
+class RewriteEngine:
+    """
+    Runs rewrite passes over a RewriteGraph and logs what each saved.
+    """
+
+    def __init__(self, backend, passes=None):
+        self.backend = backend
+        self.passes = passes if passes is not None else self.default_passes()
+        self.stats = []
+
+    @staticmethod
+    def default_passes():
+        return [
+            FoldConstants(),
+            FoldBatchNorm(),
+            ReorderReluMaxPool(),
+            AddReluHints(),
+            EliminateDeadNodes(),
+        ]
+
+    def run(self, graph):
+        disabled = os.environ.get("ONNXBRIDGE_DISABLE_PASSES", "").split(",")
+        self.stats = []
+        for rewrite in self.passes:
+            if rewrite.name in disabled or self.backend not in rewrite.backends:
+                continue
+            rewrites, removed = rewrite.run(graph)
+            self.stats.append((rewrite.name, rewrites, removed))
+            logger.info(
+                f"{rewrite.name}: {rewrites} rewrites, ~{removed} secure non-linear ops removed"
+            )
+        return graph
@@ -0,0 +1,100 @@
+"""
+Send batching benchmark for the Porthos communication layer.
+
+Builds src/mainSendBatch.cpp, shapes the loopback device with tc for each
+network profile (same settings as OpenCheetah/scripts/throttle.sh), starts
+the three parties on 127.0.0.1 and prints the table P0 reports: the round
+time of a burst of sendVector calls with and without a SendBatch.
+
+Run from Porthos/benchmarks (tc needs root):
+
+    python3 send_batch.py [lan|wan|none ...] [--messages N] [--rounds N]
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+SRC = os.path.join(HERE, "..", "src")
+ADDRESSES = os.path.join(HERE, "..", "files", "addresses")
+BINARY = os.path.join(HERE, "mainSendBatch")
+
+DEV = "lo"
+PROFILES = {
+    # about 3Gbps, 0.3ms ping
+    "lan": ("3000mbit", "0.15msec"),
+    # about 400Mbps, 40ms ping
+    "wan": ("400mbit", "20msec"),
+    "none": None,
+}
+
+
+def build():
+    subprocess.check_call(
+        ["g++", "-O3", "-std=c++14", "-fpermissive", "-I" + SRC,
+         os.path.join(SRC, "mainSendBatch.cpp"),
+         os.path.join(SRC, "connect.cpp"),
+         os.path.join(SRC, "basicSockets.cpp"),
+         "-o", BINARY, "-lpthread"])
+
+
+def unshape():
+    subprocess.call(["sudo", "tc", "qdisc", "del", "dev", DEV, "root"],
+                    stderr=subprocess.DEVNULL)
+
+
+def shape(profile):
+    unshape()
+    rate, delay = PROFILES[profile]
+    subprocess.check_call(["sudo", "tc", "qdisc", "add", "dev", DEV, "root",
+                           "handle", "1:", "tbf", "rate", rate, "burst",
+                           "100000", "limit", "10000"])
+    subprocess.check_call(["sudo", "tc", "qdisc", "add", "dev", DEV,
+                           "parent", "1:1", "handle", "10:", "netem",
+                           "delay", delay])
+
+
+def run(messages, rounds):
+    procs = []
+    for party in range(3):
+        procs.append(subprocess.Popen(
+            [BINARY, str(party), ADDRESSES, str(messages), str(rounds)],
+            stdout=subprocess.PIPE, universal_newlines=True))
+    outputs = [p.communicate()[0] for p in procs]
+    if any(p.returncode != 0 for p in procs):
+        sys.exit("a party failed:\n" + "\n".join(outputs))
+    return [line for line in outputs[0].splitlines()
+            if not line.startswith("Trying to connect")]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("profiles", nargs="*", default=["lan", "wan"],
+                        choices=sorted(PROFILES))
+    parser.add_argument("--messages", type=int, default=16)
+    parser.add_argument("--rounds", type=int, default=200)
+    args = parser.parse_args()
+
+    build()
+    shaped = False
+    try:
+        for profile in args.profiles:
+            if PROFILES[profile] is not None:
+                shape(profile)
+                shaped = True
+            elif shaped:
+                unshape()
+                shaped = False
+            # Fewer rounds under WAN latency, the per-round time is what counts.
+            rounds = args.rounds if profile != "wan" else max(1, args.rounds // 10)
+            print("== %s ==" % profile)
+            print("\n".join(run(args.messages, rounds)))
+    finally:
+        if shaped:
+            unshape()
+
+
+if __name__ == "__main__":
+    main()
@@ -555,6 +555,7 @@ void funcDotProductMPC(const vector<porthosSecretType> &a,
 #ifdef VERIFYLAYERWISE
 
 		if (partyNum == PARTY_A){
+				SendBatch batch;
 				sendVector<porthosSecretType>(a, PARTY_B, size);
 				sendVector<porthosSecretType>(b, PARTY_B, size);
 				sendVector<porthosSecretType>(c, PARTY_B, size);
@@ -947,6 +948,8 @@ void funcShareConvertMPC(vector<porthosSecretType> &a,
 		addVectors<porthosSecretType>(a_tilde_1, a_tilde_2, x, size);
 		sharesOfBits(bit_shares_x_1, bit_shares_x_2, x, size, "INDEP");
 
+		//bit shares and delta shares go out together
+		SendBatch batch;
 		sendVector<smallType>(bit_shares_x_1, PARTY_A, size*BIT_SIZE);
 		sendVector<smallType>(bit_shares_x_2, PARTY_B, size*BIT_SIZE);
 		wrapAround(a_tilde_1, a_tilde_2, delta, size);
@@ -1161,6 +1164,9 @@ void funcComputeMSB3PC(const vector<porthosSecretType> &a,
 
 		addModuloOdd<porthosSecretType, porthosSecretType>(r1, r2, r, size);
 		sharesOfBits(bit_shares_r_1, bit_shares_r_2, r, size, "INDEP");
+
+		//bit shares, r and LSB shares go out together
+		SendBatch batch;
 		sendVector<smallType>(bit_shares_r_1, PARTY_A, size*BIT_SIZE);
 		sendVector<smallType>(bit_shares_r_2, PARTY_B, size*BIT_SIZE);
 
@@ -234,12 +234,13 @@ bool sendChunk(const void* data, size_t size, tcp::socket &socket) {
 	return true;
 }
 
-bool PorthosNet::sendMsg(const void* data, size_t size, int conn){
+template<typename Buffers>
+bool PorthosNet::writeBuffers(const Buffers &buffers, size_t size, int conn){
 //#if (LOG_LAYERWISE)
 	auto t1 = high_resolution_clock::now();
 //#endif
 	boost::system::error_code ec;
-	boost::asio::write(*sockets[conn], boost::asio::buffer(data, size), ec);
+	boost::asio::write(*sockets[conn], buffers, ec);
 	if (ec) {
 		std::cout << "ERROR writing to socket" << std::endl;
 		std::cout << ec.message() << "\n";
@@ -258,6 +259,14 @@ bool PorthosNet::sendMsg(const void* data, size_t size, int conn){
 	return true;
 }
 
+bool PorthosNet::sendMsg(const void* data, size_t size, int conn){
+	return writeBuffers(boost::asio::buffer(data, size), size, conn);
+}
+
+bool PorthosNet::sendMsgv(const vector<boost::asio::const_buffer> &buffers, int conn){
+	return writeBuffers(buffers, boost::asio::buffer_size(buffers), conn);
+}
+
 bool PorthosNet::receiveMsg(void* buff, size_t size, int conn){
 	memset(buff, 0, size);
 //#if (LOG_LAYERWISE)
@@ -137,6 +137,9 @@ private:
 	bool is_JustServer;
 	tcp::socket* sockets[NUMCONNECTIONS];
 
+	template<typename Buffers>
+	bool writeBuffers(const Buffers &buffers, size_t size, int conn);
+
 public:
 	/**
 	 * Constructor for servers and clients, got the host and the port for connect or listen.
@@ -175,6 +178,13 @@ public:
 	 */
 	bool sendMsg(const void* data, size_t size, int conn);
 
+	/**
+	 * Send several buffers to the other side in one gather write (writev),
+	 * without copying them together first. Counts as one send.
+	 * return true for success or false for failure.
+	 */
+	bool sendMsgv(const vector<boost::asio::const_buffer> &buffers, int conn);
+
 	/**
 	 * Recive data from other side.
 	 * return true for success or false for failure.
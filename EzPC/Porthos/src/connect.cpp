@@ -154,6 +154,7 @@ void receiveByte(int player,
 
 void synchronize(int length = 1)
 {
+	flushSendBatch();
 	char* toSend = new char[length+1];
 	memset(toSend, '0', length+1);
 	vector<thread *> threads;
@@ -203,6 +204,7 @@ void resume_communication()
 
 void end_communication()
 {
+	flushSendBatch();
 	cout << "------------------------------------" << endl;
 	cout << "Communication for execution, P" << partyNum << ": " 
 		 << (float)commObject.getSent()/(1024 * 1024) << "MiB (sent) " 
@@ -214,6 +216,122 @@ void end_communication()
 	commObject.reset();
 }
 
+//send batching
+struct SendBatchConfig
+{
+	bool enabled = true;
+	size_t threshold = 1024 * 1024;
+	size_t copyLimit = 64 * 1024;
+
+	SendBatchConfig()
+	{
+		if (const char* env = getenv("PORTHOS_SEND_BATCH"))
+			enabled = atoi(env) != 0;
+		if (const char* env = getenv("PORTHOS_SEND_BATCH_KB"))
+			threshold = strtoull(env, nullptr, 10) * 1024;
+		if (const char* env = getenv("PORTHOS_SEND_COPY_KB"))
+			copyLimit = strtoull(env, nullptr, 10) * 1024;
+	}
+};
+
+static const SendBatchConfig sendBatchConfig;
+static thread_local SendBatch* activeBatch = nullptr;
+
+SendBatch::SendBatch()
+{
+	if (activeBatch == nullptr && sendBatchConfig.enabled)
+	{
+		staged.resize(NUM_OF_PARTIES);
+		activeBatch = this;
+	}
+}
+
+SendBatch::~SendBatch()
+{
+	if (activeBatch == this)
+	{
+		flush();
+		activeBatch = nullptr;
+	}
+}
+
+SendBatch* SendBatch::current()
+{
+	return activeBatch;
+}
+
+bool SendBatch::add(size_t player, 
+		const vector<boost::asio::const_buffer> &buffers)
+{
+	vector<char> &pending = staged[player];
+	bool large = false;
+	for (const auto &buffer : buffers)
+		large = large || boost::asio::buffer_size(buffer) >= sendBatchConfig.copyLimit;
+
+	if (!large)
+	{
+		for (const auto &buffer : buffers)
+		{
+			const char* data = boost::asio::buffer_cast<const char*>(buffer);
+			pending.insert(pending.end(), data, data + boost::asio::buffer_size(buffer));
+		}
+		if (pending.size() >= sendBatchConfig.threshold)
+			return flush(player);
+		return true;
+	}
+
+	if (pending.empty())
+		return communicationSenders[player]->sendMsgv(buffers, 0);
+
+	vector<boost::asio::const_buffer> gather;
+	gather.reserve(buffers.size() + 1);
+	gather.push_back(boost::asio::buffer(pending));
+	gather.insert(gather.end(), buffers.begin(), buffers.end());
+	bool ok = communicationSenders[player]->sendMsgv(gather, 0);
+	pending.clear();
+	return ok;
+}
+
+void SendBatch::flush()
+{
+	for (size_t player = 0; player < staged.size(); player++)
+		if (!flush(player))
+			cout << "Send batch error" << endl;
+}
+
+bool SendBatch::flush(size_t player)
+{
+	vector<char> &pending = staged[player];
+	if (pending.empty())
+		return true;
+	bool ok = communicationSenders[player]->sendMsg(pending.data(), pending.size(), 0);
+	pending.clear();
+	return ok;
+}
+
+bool sendBytes(size_t player, 
+		const void* data, 
+		size_t size)
+{
+	if (activeBatch != nullptr)
+		return activeBatch->add(player, {boost::asio::buffer(data, size)});
+	return communicationSenders[player]->sendMsg(data, size, 0);
+}
+
+bool sendBuffers(size_t player, 
+		const vector<boost::asio::const_buffer> &buffers)
+{
+	if (activeBatch != nullptr)
+		return activeBatch->add(player, buffers);
+	return communicationSenders[player]->sendMsgv(buffers, 0);
+}
+
+void flushSendBatch()
+{
+	if (activeBatch != nullptr)
+		activeBatch->flush();
+}
+
 porthosLongUnsignedInt getCurrentTime()
 {
 	std::chrono::time_point<std::chrono::system_clock> now = std::chrono::system_clock::now();
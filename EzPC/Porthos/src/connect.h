@@ -79,6 +79,52 @@ void end_communication();
 
 porthosLongUnsignedInt getCurrentTime();
 
+/****************************** Send batching ******************************/
+
+// While a SendBatch is alive, the sends of the constructing thread are
+// coalesced per player: messages smaller than the copy limit are copied into
+// a staging buffer, and the staged bytes go out together with the next large
+// message (in one writev, the large message is not copied), once the
+// threshold is reached, before the thread receives anything, or when the
+// batch goes out of scope. Other threads are not affected, and nested batches
+// join the outermost one.
+//
+// PORTHOS_SEND_BATCH=0 disables batching, PORTHOS_SEND_BATCH_KB sets the
+// threshold (default 1024) and PORTHOS_SEND_COPY_KB the copy limit
+// (default 64).
+class SendBatch
+{
+public:
+	SendBatch();
+	~SendBatch();
+
+	SendBatch(const SendBatch&) = delete;
+	SendBatch& operator=(const SendBatch&) = delete;
+
+	//Returns the batch of this thread, nullptr if there is none.
+	static SendBatch* current();
+
+	bool add(size_t player, 
+		const vector<boost::asio::const_buffer> &buffers);
+
+	void flush();
+
+private:
+	bool flush(size_t player);
+
+	vector<vector<char>> staged;
+};
+
+//Sends through the batch of this thread if there is one.
+bool sendBytes(size_t player, 
+		const void* data, 
+		size_t size);
+
+bool sendBuffers(size_t player, 
+		const vector<boost::asio::const_buffer> &buffers);
+
+void flushSendBatch();
+
 /****************************** These functions are defined in header itself ******************/
 
 template<typename T>
@@ -134,7 +180,7 @@ void sendVector(const vector<T> &vec,
 	auto t1 = high_resolution_clock::now();
 #endif
 
-	if(!communicationSenders[player]->sendMsg(vec.data(), size * sizeof(T), 0))
+	if(!sendBytes(player, vec.data(), size * sizeof(T)))
 		cout << "Send vector error" << endl;
 
 #if (LOG_DEBUG)
@@ -169,7 +215,7 @@ void sendArr(T* arr,
 	auto t1 = high_resolution_clock::now();
 #endif
 
-	if(!communicationSenders[player]->sendMsg(arr, size * sizeof(T), 0))
+	if(!sendBytes(player, arr, size * sizeof(T)))
 		cout << "Send array error" << endl;
 
 #if (LOG_DEBUG)
@@ -203,6 +249,7 @@ void receiveVector(vector<T> &vec,
 	auto t1 = high_resolution_clock::now();
 #endif
 
+	flushSendBatch();
 	if(!communicationReceivers[player]->receiveMsg(vec.data(), size * sizeof(T), 0))
 		cout << "Receive porthosSecretType vector error" << endl;
 		
@@ -238,6 +285,7 @@ void receiveArr(T* arr,
 	auto t1 = high_resolution_clock::now();
 #endif
 
+	flushSendBatch();
 	if(!communicationReceivers[player]->receiveMsg(arr, size * sizeof(T), 0))
 		cout << "Receive porthosSecretType vector error" << endl;
 		
@@ -262,14 +310,12 @@ void sendTwoVectors(const vector<T> &vec1,
 		size_t size1, 
 		size_t size2)
 {
-	vector<T> temp(size1+size2);
-	for (size_t i = 0; i < size1; ++i)
-		temp[i] = vec1[i];
-
-	for (size_t i = 0; i < size2; ++i)
-		temp[size1 + i] = vec2[i];
+	vector<boost::asio::const_buffer> buffers = {
+		boost::asio::buffer(vec1.data(), size1 * sizeof(T)),
+		boost::asio::buffer(vec2.data(), size2 * sizeof(T))};
 
-	sendVector<T>(temp, player, size1+size2);
+	if(!sendBuffers(player, buffers))
+		cout << "Send vector error" << endl;
 }
 
 template<typename T>
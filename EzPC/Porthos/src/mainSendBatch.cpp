@@ -0,0 +1,124 @@
+/*
+
+Authors: Sameer Wagh, Mayank Rathee, Nishant Kumar.
+
+Copyright:
+Copyright (c) 2020 Microsoft Research
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+
+*/
+
+// Round time of a burst of back-to-back sendVector calls from P0 to P1,
+// answered by a one byte ack, with and without a SendBatch around the burst.
+// P2 only takes part in the connection setup. Only needs the communication
+// layer, build it with
+//   g++ -O3 -std=c++14 -fpermissive -I. mainSendBatch.cpp connect.cpp \
+//       basicSockets.cpp -o mainSendBatch -lpthread
+// and start the three parties as
+//   ./mainSendBatch <party> ../files/addresses [messages] [rounds]
+// (../benchmarks/send_batch.py does this for the LAN and WAN profiles).
+
+#include "connect.h"
+#include <thread>
+
+using namespace std;
+
+int partyNum;
+int instanceID = 0;
+int NUM_OF_PARTIES = 3;
+
+void error(string str)
+{
+	cout << "Error: " << str << endl;
+	exit(-1);
+}
+
+double runBurst(size_t elements, int messages, int rounds, bool batched)
+{
+	vector<porthosSecretType> vec(elements, partyNum);
+	vector<smallType> ack(1);
+
+	synchronize();
+	auto t1 = high_resolution_clock::now();
+	for (int r = 0; r < rounds; r++)
+	{
+		if (partyNum == PARTY_A)
+		{
+			if (batched)
+			{
+				SendBatch batch;
+				for (int m = 0; m < messages; m++)
+					sendVector<porthosSecretType>(vec, PARTY_B, elements);
+			}
+			else
+			{
+				for (int m = 0; m < messages; m++)
+					sendVector<porthosSecretType>(vec, PARTY_B, elements);
+			}
+			receiveVector<smallType>(ack, PARTY_B, 1);
+		}
+		else if (partyNum == PARTY_B)
+		{
+			for (int m = 0; m < messages; m++)
+				receiveVector<porthosSecretType>(vec, PARTY_A, elements);
+			sendVector<smallType>(ack, PARTY_A, 1);
+		}
+	}
+	auto t2 = high_resolution_clock::now();
+	return duration_cast<duration<double, milli>>(t2 - t1).count() / rounds;
+}
+
+int main(int argc, char** argv)
+{
+	if (argc < 3)
+	{
+		cout << "usage: " << argv[0] << " <party> <addresses> [messages] [rounds]" << endl;
+		return 1;
+	}
+	partyNum = atoi(argv[1]);
+	int messages = argc > 3 ? atoi(argv[3]) : 16;
+	int rounds = argc > 4 ? atoi(argv[4]) : 200;
+
+	initializeCommunication(argv[2], partyNum);
+	synchronize(2000000);
+
+	if (partyNum == PARTY_A)
+		cout << messages << " sends per round, " << rounds << " rounds" << endl
+			 << setw(10) << "bytes" << setw(16) << "unbatched (ms)"
+			 << setw(16) << "batched (ms)" << setw(10) << "speedup" << endl;
+	for (size_t elements : {1, 16, 128, 1024, 16384})
+	{
+		double plain = runBurst(elements, messages, rounds, false);
+		double batched = runBurst(elements, messages, rounds, true);
+		if (partyNum == PARTY_A)
+			cout << setw(10) << elements * sizeof(porthosSecretType)
+				 << setw(16) << fixed << setprecision(3) << plain
+				 << setw(16) << batched << setw(10) << setprecision(2)
+				 << plain / batched << endl;
+	}
+
+	synchronize();
+	for (int i = 0; i < NUM_OF_PARTIES; i++)
+	{
+		if (i != partyNum)
+		{
+			delete communicationReceivers[i];
+			delete communicationSenders[i];
+		}
+	}
+	return 0;
+}
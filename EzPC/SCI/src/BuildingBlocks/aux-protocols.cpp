@@ -231,6 +231,35 @@ void AuxProtocols::MSB_to_Wrap(uint64_t *x, uint8_t *msb_x, uint8_t *wrap_x,
   }
 }
 
+void AuxProtocols::MSB0_to_Wrap(uint64_t *x, uint8_t *wrap_x, int32_t size,
+                                int32_t bw_x) {
+  assert(bw_x <= 64);
+  if (party == sci::ALICE) {
+    PRG128 prg;
+    prg.random_bool((bool *)wrap_x, size);
+    uint8_t *spec_data = new uint8_t[2 * size];
+    uint8_t **spec = new uint8_t *[size];
+    for (int i = 0; i < size; i++) {
+      spec[i] = spec_data + 2 * i;
+      uint8_t msb_xa = (x[i] >> (bw_x - 1)) & 1;
+      spec[i][0] = (msb_xa ^ wrap_x[i]) & 1;
+      spec[i][1] = (1 ^ wrap_x[i]) & 1;
+    }
+    lookup_table<uint8_t>(spec, nullptr, nullptr, size, 1, 1);
+
+    delete[] spec;
+    delete[] spec_data;
+  } else { // party == sci::BOB
+    uint8_t *lut_in = new uint8_t[size];
+    for (int i = 0; i < size; i++) {
+      lut_in[i] = (x[i] >> (bw_x - 1)) & 1;
+    }
+    lookup_table<uint8_t>(nullptr, lut_in, wrap_x, size, 1, 1);
+
+    delete[] lut_in;
+  }
+}
+
 void AuxProtocols::AND(uint8_t *x, uint8_t *y, uint8_t *z, int32_t size) {
   int32_t old_size = size;
   size = ((old_size + 1)/2) * 2;
@@ -114,6 +114,18 @@ public:
       // bitwidth of x
       int32_t bw_x);
 
+  // Wrap computation for x known to have MSB 0 (e.g. ReLU outputs): the
+  // shares wrap iff either local MSB is set, so a 1-out-of-2 OT suffices
+  void MSB0_to_Wrap(
+      // input vector
+      uint64_t *x,
+      // output shares of Wrap(x)
+      uint8_t *wrap_x,
+      // size of input vector
+      int32_t size,
+      // bitwidth of x
+      int32_t bw_x);
+
   // Bitwise AND
   void AND(
       // input A (boolean) vector
@@ -243,6 +243,130 @@ void Truncation::truncate(int32_t dim, uint64_t *inA, uint64_t *outB,
   return;
 }
 
+void Truncation::truncate_inplace(int32_t dim, uint64_t *inA, int32_t shift,
+                                  int32_t bw, bool signed_arithmetic,
+                                  uint8_t *msb_x) {
+  uint64_t mask_bw = (bw == 64 ? -1 : ((1ULL << bw) - 1));
+  if (shift == 0) {
+    for (int i = 0; i < dim; i++) {
+      inA[i] &= mask_bw;
+    }
+    return;
+  }
+  assert((bw - shift) > 0 && "Truncation shouldn't truncate the full bitwidth");
+  assert((signed_arithmetic && (bw - shift - 1 >= 0)) || !signed_arithmetic);
+
+  uint64_t mask_shift = (shift == 64 ? -1 : ((1ULL << shift) - 1));
+  uint64_t mask_upper =
+      ((bw - shift) == 64 ? -1 : ((1ULL << (bw - shift)) - 1));
+  // inA is overwritten, so the offset for signed arithmetic is applied in
+  // place and never undone; it is taken off the output instead.
+  bool offset = signed_arithmetic && (party == ALICE);
+  uint64_t in_offset = (offset ? (1ULL << (bw - 1)) : 0);
+  uint64_t out_offset = (offset ? (1ULL << (bw - shift - 1)) : 0);
+
+  uint64_t *inA_lower = new uint64_t[dim];
+  uint64_t *inA_upper = new uint64_t[dim];
+  uint8_t *wrap_lower = new uint8_t[dim];
+  uint8_t *wrap_upper = new uint8_t[dim];
+  for (int i = 0; i < dim; i++) {
+    inA[i] = (inA[i] + in_offset) & mask_bw;
+    inA_lower[i] = inA[i] & mask_shift;
+    inA_upper[i] = (inA[i] >> shift) & mask_upper;
+    if (party == BOB) {
+      inA_upper[i] = (mask_upper - inA_upper[i]) & mask_upper;
+    }
+  }
+
+  this->aux->wrap_computation(inA_lower, wrap_lower, dim, shift);
+  if (msb_x == nullptr) {
+    uint8_t *eq_upper = new uint8_t[dim];
+    uint8_t *and_upper = new uint8_t[dim];
+    this->mill_eq->compare_with_eq(wrap_upper, eq_upper, inA_upper, dim,
+                                   (bw - shift));
+    this->aux->AND(wrap_lower, eq_upper, and_upper, dim);
+    for (int i = 0; i < dim; i++) {
+      wrap_upper[i] ^= and_upper[i];
+    }
+    delete[] eq_upper;
+    delete[] and_upper;
+  } else if (signed_arithmetic) {
+    uint8_t *inv_msb_x = new uint8_t[dim];
+    for (int i = 0; i < dim; i++) {
+      inv_msb_x[i] = msb_x[i] ^ (party == ALICE ? 1 : 0);
+    }
+    this->aux->MSB_to_Wrap(inA, inv_msb_x, wrap_upper, dim, bw);
+    delete[] inv_msb_x;
+  } else {
+    this->aux->MSB_to_Wrap(inA, msb_x, wrap_upper, dim, bw);
+  }
+
+  // inA_lower and inA_upper are done with; reuse them for the B2A outputs
+  uint64_t *arith_wrap_lower = inA_lower;
+  uint64_t *arith_wrap_upper = inA_upper;
+  this->aux->B2A(wrap_upper, arith_wrap_upper, dim, shift);
+  this->aux->B2A(wrap_lower, arith_wrap_lower, dim, bw);
+
+  for (int i = 0; i < dim; i++) {
+    inA[i] = (((inA[i] >> shift) & mask_upper) + arith_wrap_lower[i] -
+              (1ULL << (bw - shift)) * arith_wrap_upper[i] - out_offset) &
+             mask_bw;
+  }
+
+  delete[] inA_lower;
+  delete[] inA_upper;
+  delete[] wrap_lower;
+  delete[] wrap_upper;
+
+  return;
+}
+
+void Truncation::truncate_msb0(int32_t dim, uint64_t *inA, uint64_t *outB,
+                               int32_t shift, int32_t bw) {
+  uint64_t mask_bw = (bw == 64 ? -1 : ((1ULL << bw) - 1));
+  if (shift == 0) {
+    for (int i = 0; i < dim; i++) {
+      outB[i] = inA[i] & mask_bw;
+    }
+    return;
+  }
+  assert((bw - shift) > 0 && "Truncation shouldn't truncate the full bitwidth");
+
+  uint64_t mask_shift = (shift == 64 ? -1 : ((1ULL << shift) - 1));
+  uint64_t mask_upper =
+      ((bw - shift) == 64 ? -1 : ((1ULL << (bw - shift)) - 1));
+
+  // With MSB(x) = 0, signed and unsigned truncation agree, so no offset is
+  // needed, and the wrap of the shares over 2^bw only depends on their MSBs.
+  uint64_t *inA_lower = new uint64_t[dim];
+  uint8_t *wrap_lower = new uint8_t[dim];
+  uint8_t *wrap_upper = new uint8_t[dim];
+  for (int i = 0; i < dim; i++) {
+    inA_lower[i] = inA[i] & mask_shift;
+  }
+
+  this->aux->wrap_computation(inA_lower, wrap_lower, dim, shift);
+  this->aux->MSB0_to_Wrap(inA, wrap_upper, dim, bw);
+
+  uint64_t *arith_wrap_lower = inA_lower;
+  uint64_t *arith_wrap_upper = new uint64_t[dim];
+  this->aux->B2A(wrap_upper, arith_wrap_upper, dim, shift);
+  this->aux->B2A(wrap_lower, arith_wrap_lower, dim, bw);
+
+  for (int i = 0; i < dim; i++) {
+    outB[i] = (((inA[i] >> shift) & mask_upper) + arith_wrap_lower[i] -
+               (1ULL << (bw - shift)) * arith_wrap_upper[i]) &
+              mask_bw;
+  }
+
+  delete[] inA_lower;
+  delete[] wrap_lower;
+  delete[] wrap_upper;
+  delete[] arith_wrap_upper;
+
+  return;
+}
+
 void Truncation::truncate_red_then_ext(int32_t dim, uint64_t *inA,
                                        uint64_t *outB, int32_t shift,
                                        int32_t bw, bool signed_arithmetic,
@@ -60,6 +60,37 @@ public:
       // msb of input vector elements
       uint8_t *msb_x = nullptr);
 
+  // Truncate (right-shift) inA by shift in place. Bits of inA above bw are
+  // ignored, so the input need not be reduced first
+  void truncate_inplace(
+      // Size of vector
+      int32_t dim,
+      // input and output vector
+      uint64_t *inA,
+      // right shift amount
+      int32_t shift,
+      // Input and output bitwidth
+      int32_t bw,
+      // signed truncation?
+      bool signed_arithmetic = true,
+      // msb of input vector elements
+      uint8_t *msb_x = nullptr);
+
+  // Truncate (right-shift) by shift in the same ring, for inputs known to be
+  // non-negative (e.g. ReLU outputs). outB may alias inA. Bits of inA above
+  // bw are ignored
+  void truncate_msb0(
+      // Size of vector
+      int32_t dim,
+      // input vector
+      uint64_t *inA,
+      // output vector
+      uint64_t *outB,
+      // right shift amount
+      int32_t shift,
+      // Input and output bitwidth
+      int32_t bw);
+
   // Divide by 2^shift in the same ring (round towards 0)
   void div_pow2(
       // Size of vector
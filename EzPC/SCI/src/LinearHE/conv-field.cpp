@@ -549,8 +549,7 @@ Image ConvField::ideal_functionality(Image &image, Filters &filters) {
 
 void ConvField::non_strided_conv(int32_t H, int32_t W, int32_t CI, int32_t FH,
                                  int32_t FW, int32_t CO, Image *image,
-                                 Filters *filters,
-                                 vector<vector<vector<uint64_t>>> &outArr,
+                                 Filters *filters, uint64_t *outArr,
                                  bool verbose) {
   data.image_h = H;
   data.image_w = W;
@@ -615,8 +614,7 @@ void ConvField::non_strided_conv(int32_t H, int32_t W, int32_t CI, int32_t FH,
 
     for (int idx = 0; idx < data.output_h * data.output_w; idx++) {
       for (int chan = 0; chan < CO; chan++) {
-        outArr[idx / data.output_w][idx % data.output_w][chan] +=
-            HE_result[chan][idx];
+        outArr[idx * CO + chan] += HE_result[chan][idx];
       }
     }
   } else // party == ALICE
@@ -700,8 +698,7 @@ void ConvField::non_strided_conv(int32_t H, int32_t W, int32_t CI, int32_t FH,
 
     for (int idx = 0; idx < data.output_h * data.output_w; idx++) {
       for (int chan = 0; chan < CO; chan++) {
-        outArr[idx / data.output_w][idx % data.output_w][chan] +=
-            (prime_mod - secret_share[chan][idx]);
+        outArr[idx * CO + chan] += (prime_mod - secret_share[chan][idx]);
       }
     }
     for (int i = 0; i < data.out_chans; i++)
@@ -719,10 +716,9 @@ void ConvField::convolution(int32_t N, int32_t H, int32_t W, int32_t CI,
                             int32_t zPadHLeft, int32_t zPadHRight,
                             int32_t zPadWLeft, int32_t zPadWRight,
                             int32_t strideH, int32_t strideW,
-                            vector<vector<vector<vector<uint64_t>>>> &inputArr,
-                            vector<vector<vector<vector<uint64_t>>>> &filterArr,
-                            vector<vector<vector<vector<uint64_t>>>> &outArr,
-                            bool verify_output, bool verbose) {
+                            const uint64_t *inputArr, const uint64_t *filterArr,
+                            uint64_t *outArr, bool verify_output,
+                            bool verbose) {
   int paddedH = H + zPadHLeft + zPadHRight;
   int paddedW = W + zPadWLeft + zPadWRight;
   int newH = 1 + (paddedH - FH) / strideH;
@@ -730,77 +726,29 @@ void ConvField::convolution(int32_t N, int32_t H, int32_t W, int32_t CI,
   int limitH = FH + ((paddedH - FH) / strideH) * strideH;
   int limitW = FW + ((paddedW - FW) / strideW) * strideW;
 
-  for (int i = 0; i < newH; i++) {
-    for (int j = 0; j < newW; j++) {
-      for (int k = 0; k < CO; k++) {
-        outArr[0][i][j][k] = 0;
-      }
-    }
-  }
-
-  Image image;
+  // Row-major indexing into the NHWC input, HWIO filter and NHWC output
+  auto inpIdx = [&](int n, int h, int w, int c) {
+    return ((size_t(n) * H + h) * W + w) * CI + c;
+  };
+  auto filterIdx = [&](int h, int w, int ci, int co) {
+    return ((size_t(h) * FW + w) * CI + ci) * CO + co;
+  };
+  size_t outSize = size_t(newH) * newW * CO;
+
+  // The filters are the same for every image, so the server splits them
+  // into the per-stride sub-filters only once.
   Filters filters;
-
-  image.resize(CI);
-  for (int chan = 0; chan < CI; chan++) {
-    Channel tmp_chan(H, W);
-    for (int h = 0; h < H; h++) {
-      for (int w = 0; w < W; w++) {
-        tmp_chan(h, w) =
-            neg_mod((int64_t)inputArr[0][h][w][chan], (int64_t)prime_mod);
-      }
-    }
-    image[chan] = tmp_chan;
-  }
-  if (party == BOB) {
-    for (int s_row = 0; s_row < strideH; s_row++) {
-      for (int s_col = 0; s_col < strideW; s_col++) {
-        int lH = ((limitH - s_row + strideH - 1) / strideH);
-        int lW = ((limitW - s_col + strideW - 1) / strideW);
-        int lFH = ((FH - s_row + strideH - 1) / strideH);
-        int lFW = ((FW - s_col + strideW - 1) / strideW);
-        Image lImage(CI);
-        for (int chan = 0; chan < CI; chan++) {
-          Channel tmp_chan(lH, lW);
-          // lImage[chan] = new uint64_t[lH*lW];
-          for (int row = 0; row < lH; row++) {
-            for (int col = 0; col < lW; col++) {
-              int idxH = row * strideH + s_row - zPadHLeft;
-              int idxW = col * strideW + s_col - zPadWLeft;
-              if ((idxH < 0 || idxH >= H) || (idxW < 0 || idxW >= W)) {
-                tmp_chan(row, col) = 0;
-              } else {
-                tmp_chan(row, col) =
-                    neg_mod(inputArr[0][idxH][idxW][chan], (int64_t)prime_mod);
-              }
-            }
-          }
-          lImage[chan] = tmp_chan;
-        }
-        if (lFH > 0 && lFW > 0) {
-          non_strided_conv(lH, lW, CI, lFH, lFW, CO, &lImage, nullptr,
-                           outArr[0], verbose);
-        }
-      }
-    }
-    for (int idx = 0; idx < newH * newW; idx++) {
-      for (int chan = 0; chan < CO; chan++) {
-        outArr[0][idx / newW][idx % newW][chan] = neg_mod(
-            (int64_t)outArr[0][idx / newW][idx % newW][chan], prime_mod);
-      }
-    }
-    if (verify_output)
-      verify(H, W, CI, CO, image, nullptr, outArr);
-  } else // party == ALICE
-  {
+  vector<Filters> lFiltersAll;
+  if (party == ALICE) {
     filters.resize(CO);
     for (int out_c = 0; out_c < CO; out_c++) {
       Image tmp_img(CI);
       for (int inp_c = 0; inp_c < CI; inp_c++) {
         Channel tmp_chan(FH, FW);
         for (int idx = 0; idx < FH * FW; idx++) {
-          int64_t val = (int64_t)filterArr[idx / FW][idx % FW][inp_c][out_c];
-          if (val > int64_t(prime_mod/2)) {
+          int64_t val =
+              (int64_t)filterArr[filterIdx(idx / FW, idx % FW, inp_c, out_c)];
+          if (val > int64_t(prime_mod / 2)) {
             val = val - prime_mod;
           }
           tmp_chan(idx / FW, idx % FW) = val;
@@ -812,77 +760,169 @@ void ConvField::convolution(int32_t N, int32_t H, int32_t W, int32_t CI,
 
     for (int s_row = 0; s_row < strideH; s_row++) {
       for (int s_col = 0; s_col < strideW; s_col++) {
-        int lH = ((limitH - s_row + strideH - 1) / strideH);
-        int lW = ((limitW - s_col + strideW - 1) / strideW);
         int lFH = ((FH - s_row + strideH - 1) / strideH);
         int lFW = ((FW - s_col + strideW - 1) / strideW);
         Filters lFilters(CO);
         for (int out_c = 0; out_c < CO; out_c++) {
           Image tmp_img(CI);
           for (int inp_c = 0; inp_c < CI; inp_c++) {
-            Channel tmp_chan(lFH, lFW);
+            Channel tmp_chan(max(lFH, 0), max(lFW, 0));
             for (int row = 0; row < lFH; row++) {
               for (int col = 0; col < lFW; col++) {
                 int idxFH = row * strideH + s_row;
                 int idxFW = col * strideW + s_col;
-                tmp_chan(row, col) = neg_mod(
-                    filterArr[idxFH][idxFW][inp_c][out_c], (int64_t)prime_mod);
+                tmp_chan(row, col) =
+                    neg_mod((int64_t)filterArr[filterIdx(idxFH, idxFW, inp_c,
+                                                         out_c)],
+                            (int64_t)prime_mod);
               }
             }
             tmp_img[inp_c] = tmp_chan;
           }
           lFilters[out_c] = tmp_img;
         }
-        if (lFH > 0 && lFW > 0) {
-          non_strided_conv(lH, lW, CI, lFH, lFW, CO, nullptr, &lFilters,
-                           outArr[0], verbose);
+        lFiltersAll.push_back(lFilters);
+      }
+    }
+  }
+
+  for (int n = 0; n < N; n++) {
+    uint64_t *out = outArr + n * outSize;
+    std::fill(out, out + outSize, 0);
+
+    Image image(CI);
+    for (int chan = 0; chan < CI; chan++) {
+      Channel tmp_chan(H, W);
+      for (int h = 0; h < H; h++) {
+        for (int w = 0; w < W; w++) {
+          tmp_chan(h, w) = neg_mod((int64_t)inputArr[inpIdx(n, h, w, chan)],
+                                   (int64_t)prime_mod);
+        }
+      }
+      image[chan] = tmp_chan;
+    }
+
+    int sub = 0;
+    for (int s_row = 0; s_row < strideH; s_row++) {
+      for (int s_col = 0; s_col < strideW; s_col++, sub++) {
+        int lH = ((limitH - s_row + strideH - 1) / strideH);
+        int lW = ((limitW - s_col + strideW - 1) / strideW);
+        int lFH = ((FH - s_row + strideH - 1) / strideH);
+        int lFW = ((FW - s_col + strideW - 1) / strideW);
+        if (lFH <= 0 || lFW <= 0)
+          continue;
+        if (party == BOB) {
+          Image lImage(CI);
+          for (int chan = 0; chan < CI; chan++) {
+            Channel tmp_chan(lH, lW);
+            for (int row = 0; row < lH; row++) {
+              for (int col = 0; col < lW; col++) {
+                int idxH = row * strideH + s_row - zPadHLeft;
+                int idxW = col * strideW + s_col - zPadWLeft;
+                if ((idxH < 0 || idxH >= H) || (idxW < 0 || idxW >= W)) {
+                  tmp_chan(row, col) = 0;
+                } else {
+                  tmp_chan(row, col) =
+                      neg_mod((int64_t)inputArr[inpIdx(n, idxH, idxW, chan)],
+                              (int64_t)prime_mod);
+                }
+              }
+            }
+            lImage[chan] = tmp_chan;
+          }
+          non_strided_conv(lH, lW, CI, lFH, lFW, CO, &lImage, nullptr, out,
+                           verbose);
+        } else {
+          non_strided_conv(lH, lW, CI, lFH, lFW, CO, nullptr,
+                           &lFiltersAll[sub], out, verbose);
         }
       }
     }
-    data.image_h = H;
-    data.image_w = W;
-    data.inp_chans = CI;
-    data.out_chans = CO;
-    data.filter_h = FH;
-    data.filter_w = FW;
-    data.pad_t = zPadHLeft;
-    data.pad_b = zPadHRight;
-    data.pad_l = zPadWLeft;
-    data.pad_r = zPadWRight;
-    data.stride_h = strideH;
-    data.stride_w = strideW;
-
-    // The filter values should be small enough to not overflow uint64_t
-    Image local_result = ideal_functionality(image, filters);
-
-    for (int idx = 0; idx < newH * newW; idx++) {
-      for (int chan = 0; chan < CO; chan++) {
-        outArr[0][idx / newW][idx % newW][chan] =
-            neg_mod((int64_t)local_result[chan](idx / newW, idx % newW) +
-                        (int64_t)outArr[0][idx / newW][idx % newW][chan],
-                    prime_mod);
+
+    if (party == BOB) {
+      for (size_t idx = 0; idx < outSize; idx++) {
+        out[idx] = neg_mod((int64_t)out[idx], prime_mod);
       }
+      if (verify_output)
+        verify(H, W, CI, CO, image, nullptr, out, newH, newW);
+    } else // party == ALICE
+    {
+      data.image_h = H;
+      data.image_w = W;
+      data.inp_chans = CI;
+      data.out_chans = CO;
+      data.filter_h = FH;
+      data.filter_w = FW;
+      data.pad_t = zPadHLeft;
+      data.pad_b = zPadHRight;
+      data.pad_l = zPadWLeft;
+      data.pad_r = zPadWRight;
+      data.stride_h = strideH;
+      data.stride_w = strideW;
+
+      // The filter values should be small enough to not overflow uint64_t
+      Image local_result = ideal_functionality(image, filters);
+
+      for (int idx = 0; idx < newH * newW; idx++) {
+        for (int chan = 0; chan < CO; chan++) {
+          out[idx * CO + chan] =
+              neg_mod((int64_t)local_result[chan](idx / newW, idx % newW) +
+                          (int64_t)out[idx * CO + chan],
+                      prime_mod);
+        }
+      }
+      if (verify_output)
+        verify(H, W, CI, CO, image, &filters, out, newH, newW);
     }
-    if (verify_output)
-      verify(H, W, CI, CO, image, &filters, outArr);
   }
 }
 
+void ConvField::convolution(int32_t N, int32_t H, int32_t W, int32_t CI,
+                            int32_t FH, int32_t FW, int32_t CO,
+                            int32_t zPadHLeft, int32_t zPadHRight,
+                            int32_t zPadWLeft, int32_t zPadWRight,
+                            int32_t strideH, int32_t strideW,
+                            vector<vector<vector<vector<uint64_t>>>> &inputArr,
+                            vector<vector<vector<vector<uint64_t>>>> &filterArr,
+                            vector<vector<vector<vector<uint64_t>>>> &outArr,
+                            bool verify_output, bool verbose) {
+  int newH = 1 + (H + zPadHLeft + zPadHRight - FH) / strideH;
+  int newW = 1 + (W + zPadWLeft + zPadWRight - FW) / strideW;
+  // Only the first image was ever used by this interface.
+  vector<uint64_t> input(size_t(H) * W * CI);
+  vector<uint64_t> filter;
+  vector<uint64_t> output(size_t(newH) * newW * CO);
+  for (int h = 0; h < H; h++)
+    for (int w = 0; w < W; w++)
+      copy(inputArr[0][h][w].begin(), inputArr[0][h][w].end(),
+           input.begin() + (size_t(h) * W + w) * CI);
+  if (party == ALICE) {
+    filter.resize(size_t(FH) * FW * CI * CO);
+    for (int h = 0; h < FH; h++)
+      for (int w = 0; w < FW; w++)
+        for (int ci = 0; ci < CI; ci++)
+          copy(filterArr[h][w][ci].begin(), filterArr[h][w][ci].end(),
+               filter.begin() + ((size_t(h) * FW + w) * CI + ci) * CO);
+  }
+  convolution(1, H, W, CI, FH, FW, CO, zPadHLeft, zPadHRight, zPadWLeft,
+              zPadWRight, strideH, strideW, input.data(), filter.data(),
+              output.data(), verify_output, verbose);
+  for (int h = 0; h < newH; h++)
+    for (int w = 0; w < newW; w++)
+      copy(output.begin() + (size_t(h) * newW + w) * CO,
+           output.begin() + (size_t(h) * newW + w + 1) * CO,
+           outArr[0][h][w].begin());
+}
+
 void ConvField::verify(int H, int W, int CI, int CO, Image &image,
-                       Filters *filters,
-                       vector<vector<vector<vector<uint64_t>>>> &outArr) {
-  int newH = outArr[0].size();
-  int newW = outArr[0][0].size();
+                       Filters *filters, const uint64_t *outArr, int newH,
+                       int newW) {
+  size_t outSize = size_t(newH) * newW * CO;
   if (party == BOB) {
     for (int i = 0; i < CI; i++) {
       io->send_data(image[i].data(), H * W * sizeof(uint64_t));
     }
-    for (int i = 0; i < newH; i++) {
-      for (int j = 0; j < newW; j++) {
-        io->send_data(outArr[0][i][j].data(),
-                      sizeof(uint64_t) * data.out_chans);
-      }
-    }
+    io->send_data(outArr, sizeof(uint64_t) * outSize);
   } else // party == ALICE
   {
     Image image_0(CI); // = new Channel[CI];
@@ -900,29 +940,16 @@ void ConvField::verify(int H, int W, int CI, int CO, Image &image,
     }
     Image result = ideal_functionality(image, *filters);
 
-    vector<vector<vector<vector<uint64_t>>>> outArr_0;
-    outArr_0.resize(1);
-    outArr_0[0].resize(newH);
-    for (int i = 0; i < newH; i++) {
-      outArr_0[0][i].resize(newW);
-      for (int j = 0; j < newW; j++) {
-        outArr_0[0][i][j].resize(CO);
-        io->recv_data(outArr_0[0][i][j].data(), sizeof(uint64_t) * CO);
-      }
-    }
-    for (int i = 0; i < newH; i++) {
-      for (int j = 0; j < newW; j++) {
-        for (int k = 0; k < CO; k++) {
-          outArr_0[0][i][j][k] =
-              (outArr_0[0][i][j][k] + outArr[0][i][j][k]) % prime_mod;
-        }
-      }
+    vector<uint64_t> outArr_0(outSize);
+    io->recv_data(outArr_0.data(), sizeof(uint64_t) * outSize);
+    for (size_t i = 0; i < outSize; i++) {
+      outArr_0[i] = (outArr_0[i] + outArr[i]) % prime_mod;
     }
     bool pass = true;
     for (int i = 0; i < CO; i++) {
       for (int j = 0; j < newH; j++) {
         for (int k = 0; k < newW; k++) {
-          if ((int64_t)outArr_0[0][j][k][i] !=
+          if ((int64_t)outArr_0[(j * newW + k) * CO + i] !=
               neg_mod(result[i](j, k), (int64_t)prime_mod)) {
             pass = false;
           }
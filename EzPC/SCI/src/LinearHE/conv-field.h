@@ -151,10 +151,21 @@ public:
 
   Image ideal_functionality(Image &image, Filters &filters);
 
+  // Adds this party's share of the convolution to outArr, a row-major
+  // output_h x output_w x CO buffer.
   void non_strided_conv(int32_t H, int32_t W, int32_t CI, int32_t FH,
                         int32_t FW, int32_t CO, Image *image, Filters *filters,
-                        std::vector<std::vector<std::vector<uint64_t>>> &outArr,
-                        bool verbose = false);
+                        uint64_t *outArr, bool verbose = false);
+
+  // Convolution on contiguous row-major buffers: inputArr is N x H x W x CI
+  // (NHWC), filterArr is FH x FW x CI x CO (only read by the server) and
+  // outArr is N x newH x newW x CO. All values are elements of Z_prime_mod.
+  void convolution(int32_t N, int32_t H, int32_t W, int32_t CI, int32_t FH,
+                   int32_t FW, int32_t CO, int32_t zPadHLeft,
+                   int32_t zPadHRight, int32_t zPadWLeft, int32_t zPadWRight,
+                   int32_t strideH, int32_t strideW, const uint64_t *inputArr,
+                   const uint64_t *filterArr, uint64_t *outArr,
+                   bool verify_output = false, bool verbose = false);
 
   void convolution(
       int32_t N, int32_t H, int32_t W, int32_t CI, int32_t FH, int32_t FW,
@@ -165,9 +176,8 @@ public:
       std::vector<std::vector<std::vector<std::vector<uint64_t>>>> &outArr,
       bool verify_output = false, bool verbose = false);
 
-  void
-  verify(int H, int W, int CI, int CO, Image &image, Filters *filters,
-         std::vector<std::vector<std::vector<std::vector<uint64_t>>>> &outArr);
+  void verify(int H, int W, int CI, int CO, Image &image, Filters *filters,
+              const uint64_t *outArr, int newH, int newW);
 };
 
 #endif
@@ -23,6 +23,7 @@ SOFTWARE.
 #define DEFINES_H___
 
 #define LOG_LAYERWISE
+#define INSTRUMENT_LAYERS // see instrumentation.h
 // #define VERIFY_LAYERWISE
 #define USE_EIGEN
 #define WRITE_LOG
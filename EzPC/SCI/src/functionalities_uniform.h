@@ -23,6 +23,7 @@ SOFTWARE.
 #define FUNCTIONALITIES_UNIFORM_H__
 
 #include "globals.h"
+#include "scratch.h"
 #include <cmath>
 
 void funcLocalTruncate(int s, intType *arr, int consSF) {
@@ -214,6 +215,36 @@ void funcMaxpoolThread(int tid, int rows, int cols, intType *inpArr,
   maxpoolArr[tid]->funcMaxMPC(rows, cols, inpArr, maxi, maxiIdx);
 }
 
+// Splits size instances into num_threads contiguous chunks (the last one also
+// takes the remainder) and calls f(tid, offset, curSize) for chunk tid on
+// worker tid of the persistent pool.
+void runChunksOnWorkers(int size,
+                        const std::function<void(int, int, int)> &f) {
+  int chunk_size = size / num_threads;
+  auto chunk = [&](int i) {
+    int offset = i * chunk_size;
+    int curSize;
+    if (i == (num_threads - 1)) {
+      curSize = size - offset;
+    } else {
+      curSize = chunk_size;
+    }
+    f(i, offset, curSize);
+  };
+  if (workerPool != nullptr) {
+    workerPool->run(num_threads, chunk);
+    return;
+  }
+  // Used outside StartComputation/EndComputation
+  std::thread threads[num_threads];
+  for (int i = 0; i < num_threads; ++i) {
+    threads[i] = std::thread(chunk, i);
+  }
+  for (int i = 0; i < num_threads; ++i) {
+    threads[i].join();
+  }
+}
+
 #ifdef SCI_OT
 void funcMatmulThread(int tid, int N, int s1, int s2, int s3, intType *A,
                       intType *B, intType *C, int partyWithAInAB_mul) {
@@ -347,14 +378,15 @@ void funcTruncateTwoPowerRing(
   uint64_t *carryBitCompArr;
   uint8_t *carryBitCompAns;
   uint64_t moduloMask = sci::all1Mask(bitlength);
+  scratch::Frame frame;
 
   for (int i = 0; i < size; i++) {
     assert(inp[i] <= moduloMask);
   }
 
   if (doCarryBitCalculation) {
-    carryBitCompArr = new uint64_t[size];
-    carryBitCompAns = new uint8_t[size];
+    carryBitCompArr = frame.alloc<uint64_t>(size);
+    carryBitCompAns = frame.alloc<uint8_t>(size);
     for (int i = 0; i < size; i++) {
       carryBitCompArr[i] = (inp[i] & sci::all1Mask(consSF));
       if (curParty == sci::BOB) {
@@ -365,22 +397,21 @@ void funcTruncateTwoPowerRing(
     millionaire.compare(carryBitCompAns, carryBitCompArr, size, consSF);
   }
 
-  bool createdMsbSharesHere = false;
   if (msbShare == nullptr) {
-    msbShare = new uint8_t[size];
+    msbShare = frame.alloc<uint8_t>(size);
     curReluImpl->relu(nullptr, inp, size, msbShare, true);
-    createdMsbSharesHere = true;
   }
 
   if (curParty == sci::ALICE) {
-    uint64_t **otMessages1oo4 = new uint64_t *[size];
-    intType *otMessages1oo2Data = new intType[size];
-    intType *otMessages1oo2Corr = new intType[size];
-    intType *localShare1oo4 = new intType[size];
+    uint64_t **otMessages1oo4 = frame.alloc<uint64_t *>(size);
+    uint64_t *otMessages1oo4Data = frame.alloc<uint64_t>(4 * size);
+    intType *otMessages1oo2Data = frame.alloc<intType>(size);
+    intType *otMessages1oo2Corr = frame.alloc<intType>(size);
+    intType *localShare1oo4 = frame.alloc<intType>(size);
     curPrgInstance->random_data(localShare1oo4, sizeof(intType) * size);
 
     for (int i = 0; i < size; i++) {
-      otMessages1oo4[i] = new uint64_t[4];
+      otMessages1oo4[i] = otMessages1oo4Data + 4 * i;
       uint8_t localShareMSB = ((uint8_t)(inp[i] >> rightShiftForMsb));
       intType r = -localShare1oo4[i];
       for (int j = 0; j < 4; j++) {
@@ -421,18 +452,12 @@ void funcTruncateTwoPowerRing(
         outp[i] = outp[i] + ((intType)carryBitCompAns[i]) - 2 * curCarryShare;
       }
       outp[i] = outp[i] & moduloMask;
-      delete[] otMessages1oo4[i];
     }
-
-    delete[] otMessages1oo4;
-    delete[] otMessages1oo2Data;
-    delete[] otMessages1oo2Corr;
-    delete[] localShare1oo4;
   } else {
-    uint64_t *otRecvMsg1oo4 = new uint64_t[size];
-    uint8_t *choiceBits = new uint8_t[size];
-    intType *otRecvMsg1oo2 = new intType[size];
-    uint8_t *choiceBits1oo2OT = new uint8_t[size];
+    uint64_t *otRecvMsg1oo4 = frame.alloc<uint64_t>(size);
+    uint8_t *choiceBits = frame.alloc<uint8_t>(size);
+    intType *otRecvMsg1oo2 = frame.alloc<intType>(size);
+    uint8_t *choiceBits1oo2OT = frame.alloc<uint8_t>(size);
     for (int i = 0; i < size; i++) {
       uint8_t localShareMSB = ((uint8_t)(inp[i] >> rightShiftForMsb));
       choiceBits[i] = (msbShare[i] << 1) + localShareMSB;
@@ -457,20 +482,6 @@ void funcTruncateTwoPowerRing(
       }
       outp[i] = outp[i] & moduloMask;
     }
-
-    delete[] otRecvMsg1oo4;
-    delete[] choiceBits;
-    delete[] otRecvMsg1oo2;
-    delete[] choiceBits1oo2OT;
-  }
-
-  if (doCarryBitCalculation) {
-    delete[] carryBitCompArr;
-    delete[] carryBitCompAns;
-  }
-
-  if (createdMsbSharesHere) {
-    delete[] msbShare;
   }
 }
 
@@ -478,30 +489,18 @@ void funcTruncateTwoPowerRingWrapper(int size, intType *inp, intType *outp,
                                      int consSF, uint8_t *msbShare,
                                      bool doCarryBitCalculation = true) {
 #ifdef MULTITHREADED_TRUNC
-  std::thread truncThreads[num_threads];
-  int chunk_size = size / num_threads;
-  for (int i = 0; i < num_threads; i++) {
-    int offset = i * chunk_size;
-    int curSize;
-    if (i == (num_threads - 1)) {
-      curSize = size - offset;
-    } else {
-      curSize = chunk_size;
-    }
+  runChunksOnWorkers(size, [&](int i, int offset, int curSize) {
     int curParty = party;
     if (i & 1)
       curParty = 3 - curParty;
     uint8_t *msbShareArg = msbShare;
     if (msbShare != nullptr)
       msbShareArg = msbShareArg + offset;
-    truncThreads[i] = std::thread(
-        funcTruncateTwoPowerRing, curParty, iopackArr[i], otpackArr[i],
-        otInstanceArr[i], reluArr[i], prgInstanceArr[i], curSize, inp + offset,
-        outp + offset, consSF, msbShareArg, doCarryBitCalculation);
-  }
-  for (int i = 0; i < num_threads; ++i) {
-    truncThreads[i].join();
-  }
+    funcTruncateTwoPowerRing(curParty, iopackArr[i], otpackArr[i],
+                             otInstanceArr[i], reluArr[i], prgInstanceArr[i],
+                             curSize, inp + offset, outp + offset, consSF,
+                             msbShareArg, doCarryBitCalculation);
+  });
 #else
   funcTruncateTwoPowerRing(party, iopack, otpack, iknpOT, kkot, relu,
                            prg128Instance, // Global variables
@@ -510,6 +509,36 @@ void funcTruncateTwoPowerRingWrapper(int size, intType *inp, intType *outp,
 #endif
 }
 
+#ifdef SCI_OT
+// Truncates the output of a ReLU by consSF. The input is known to be
+// non-negative, so this skips the signed offset and uses a 1-out-of-2 OT for
+// the wrap instead of funcTruncateTwoPowerRing's 1-out-of-4. outp may alias
+// inp, and inp need not be reduced mod 2^bitlength.
+void funcReluTruncateWrapper(int size, intType *inp, intType *outp,
+                             int consSF) {
+#if defined(MULTITHREADED_TRUNC) && defined(MULTITHREADED_NONLIN)
+  runChunksOnWorkers(size, [&](int i, int offset, int curSize) {
+    truncationArr[i]->truncate_msb0(curSize, inp + offset, outp + offset,
+                                    consSF, bitlength);
+  });
+#else
+  truncation->truncate_msb0(size, inp, outp, consSF, bitlength);
+#endif
+}
+
+// Signed truncation of arr by consSF, in place.
+void funcTruncateInPlaceWrapper(int size, intType *arr, int consSF) {
+#if defined(MULTITHREADED_TRUNC) && defined(MULTITHREADED_NONLIN)
+  runChunksOnWorkers(size, [&](int i, int offset, int curSize) {
+    truncationArr[i]->truncate_inplace(curSize, arr + offset, consSF,
+                                       bitlength, true);
+  });
+#else
+  truncation->truncate_inplace(size, arr, consSF, bitlength, true);
+#endif
+}
+#endif
+
 /*
         More optimizations that could be done for this function:
         - Currently if bitsForA + bitlength > 64, then the function resorts to
@@ -786,27 +815,15 @@ void funcAvgPoolTwoPowerRing(int curParty, sci::IOPack *curiopack,
 void funcAvgPoolTwoPowerRingWrapper(int size, intType *inp, intType *outp,
                                     intType divisor) {
 #ifdef MULTITHREADED_TRUNC
-  std::thread truncThreads[num_threads];
-  int chunk_size = size / num_threads;
-  for (int i = 0; i < num_threads; i++) {
-    int offset = i * chunk_size;
-    int curSize;
-    if (i == (num_threads - 1)) {
-      curSize = size - offset;
-    } else {
-      curSize = chunk_size;
-    }
+  runChunksOnWorkers(size, [&](int i, int offset, int curSize) {
     int curParty = party;
     if (i & 1)
       curParty = 3 - curParty;
-    truncThreads[i] = std::thread(
-        funcAvgPoolTwoPowerRing, curParty, iopackArr[i], otpackArr[i],
-        otInstanceArr[i], kkotInstanceArr[i], reluArr[i], prgInstanceArr[i],
-        curSize, inp + offset, outp + offset, divisor);
-  }
-  for (int i = 0; i < num_threads; ++i) {
-    truncThreads[i].join();
-  }
+    funcAvgPoolTwoPowerRing(curParty, iopackArr[i], otpackArr[i],
+                            otInstanceArr[i], kkotInstanceArr[i], reluArr[i],
+                            prgInstanceArr[i], curSize, inp + offset,
+                            outp + offset, divisor);
+  });
 #else
   funcAvgPoolTwoPowerRing(party, iopack, otpack, iknpOT, kkot, relu,
                           prg128Instance, size, inp, outp, divisor);
@@ -1094,30 +1111,18 @@ template <typename intType>
 void funcFieldDivWrapper(int size, intType *inp, intType *outp, intType divisor,
                          uint8_t *msbShare) {
 #ifdef MULTITHREADED_TRUNC
-  std::thread truncThreads[num_threads];
-  int chunk_size = size / num_threads;
-  for (int i = 0; i < num_threads; i++) {
-    int offset = i * chunk_size;
-    int curSize;
-    if (i == (num_threads - 1)) {
-      curSize = size - offset;
-    } else {
-      curSize = chunk_size;
-    }
+  runChunksOnWorkers(size, [&](int i, int offset, int curSize) {
     int curParty = party;
     if (i & 1)
       curParty = 3 - curParty;
     uint8_t *msbShareArg = msbShare;
     if (msbShare != nullptr)
       msbShareArg = msbShareArg + offset;
-    truncThreads[i] = std::thread(
-        funcFieldDiv<intType>, curParty, iopackArr[i], otpackArr[i],
-        otInstanceArr[i], kkotInstanceArr[i], reluArr[i], prgInstanceArr[i],
-        curSize, inp + offset, outp + offset, divisor, msbShareArg);
-  }
-  for (int i = 0; i < num_threads; ++i) {
-    truncThreads[i].join();
-  }
+    funcFieldDiv<intType>(curParty, iopackArr[i], otpackArr[i],
+                          otInstanceArr[i], kkotInstanceArr[i], reluArr[i],
+                          prgInstanceArr[i], curSize, inp + offset,
+                          outp + offset, divisor, msbShareArg);
+  });
 #else
   funcFieldDiv<intType>(party, iopack, otpack, iknpOT, kkot, relu,
                         prg128Instance, size, inp, outp, divisor, msbShare);
@@ -69,6 +69,7 @@ MatMulUniform<sci::NetIO, intType, sci::IKNP<sci::NetIO>>
 sci::IKNP<sci::NetIO> *otInstanceArr[MAX_THREADS];
 sci::KKOT<sci::NetIO> *kkotInstanceArr[MAX_THREADS];
 sci::PRG128 *prgInstanceArr[MAX_THREADS];
+WorkerPool *workerPool = nullptr;
 
 std::chrono::time_point<std::chrono::high_resolution_clock> start_time;
 uint64_t comm_threads[MAX_THREADS];
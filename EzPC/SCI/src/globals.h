@@ -30,6 +30,7 @@ SOFTWARE.
 #include "NonLinear/relu-interface.h"
 #include "defines.h"
 #include "defines_uniform.h"
+#include "utils/WorkerPool.h"
 #include <chrono>
 #include <cstdint>
 #include <thread>
@@ -96,6 +97,9 @@ extern MatMulUniform<sci::NetIO, intType, sci::IKNP<sci::NetIO>>
 extern sci::IKNP<sci::NetIO> *otInstanceArr[MAX_THREADS];
 extern sci::KKOT<sci::NetIO> *kkotInstanceArr[MAX_THREADS];
 extern sci::PRG128 *prgInstanceArr[MAX_THREADS];
+// Persistent workers for the multithreaded layers, worker i owns index i of
+// the arrays above. Created in StartComputation.
+extern WorkerPool *workerPool;
 
 extern std::chrono::time_point<std::chrono::high_resolution_clock> start_time;
 extern uint64_t comm_threads[MAX_THREADS];
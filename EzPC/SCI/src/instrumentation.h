@@ -0,0 +1,288 @@
+/*
+Authors: Nishant Kumar, Deevashwer Rathee
+Copyright:
+Copyright (c) 2021 Microsoft Research
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+*/
+
+// Per-layer instrumentation for the Athos/SCI layers.
+//
+// Each instrumented layer opens an instr::Scope, which records the operator,
+// up to 8 shape values, wall time, process CPU time, page faults and the
+// bytes sent and received over all IOPacks while it was open. Records go into a buffer that
+// is reserved once in instr::init, so a probe costs two clock_gettime calls,
+// a getrusage and a few counter reads. Nested layers (e.g. the MatMul2D inside Conv2D)
+// are recorded with their depth.
+//
+// Switches:
+//  - compile time: remove INSTRUMENT_LAYERS from defines.h and all probes
+//    compile to nothing.
+//  - run time: SCI_INSTRUMENT=0 disables recording.
+//  - SCI_TRACE=<file> sets the trace written by instr::dump (CSV, or JSON if
+//    the name ends in .json). Defaults to sci_trace_party<party>.csv.
+//  - SCI_TRACE_CAPACITY=<n> sets the number of preallocated records
+//    (default 16384). Layers beyond that are counted but not recorded.
+
+#ifndef INSTRUMENTATION_H___
+#define INSTRUMENTATION_H___
+
+#include "defines.h"
+#include <algorithm>
+#include <cstdint>
+#include <cstdio>
+#include <cstdlib>
+#include <cstring>
+#include <initializer_list>
+#include <string>
+#include <sys/resource.h>
+#include <thread>
+#include <time.h>
+#include <vector>
+
+namespace instr {
+
+const int MAX_SHAPE = 8;
+
+struct LayerRecord {
+  const char *op;
+  int depth;
+  int num_dims;
+  int64_t shape[MAX_SHAPE];
+  double start; // seconds since instr::init
+  double wall;  // seconds
+  double cpu;   // seconds, all threads of the process
+  uint64_t sent;
+  uint64_t recv;
+  uint64_t faults; // minor + major, all threads of the process
+};
+
+// Writes the total bytes sent and received so far to its arguments.
+typedef void (*CommFn)(uint64_t *sent, uint64_t *recv);
+
+struct State {
+  bool enabled = false;
+  int depth = 0;
+  uint64_t dropped = 0;
+  double origin = 0;
+  CommFn comm = nullptr;
+  std::vector<LayerRecord> records;
+};
+
+inline State &state() {
+  static State s;
+  return s;
+}
+
+inline double wall_seconds() {
+  timespec ts;
+  clock_gettime(CLOCK_MONOTONIC, &ts);
+  return ts.tv_sec + ts.tv_nsec * 1e-9;
+}
+
+inline double cpu_seconds() {
+  timespec ts;
+  clock_gettime(CLOCK_PROCESS_CPUTIME_ID, &ts);
+  return ts.tv_sec + ts.tv_nsec * 1e-9;
+}
+
+inline uint64_t page_faults() {
+  struct rusage usage;
+  getrusage(RUSAGE_SELF, &usage);
+  return usage.ru_minflt + usage.ru_majflt;
+}
+
+// Peak resident set size of the process in MiB.
+inline double peak_rss_mib() {
+  struct rusage usage;
+  getrusage(RUSAGE_SELF, &usage);
+  return usage.ru_maxrss / 1024.0;
+}
+
+inline int num_cores() {
+  static int n = std::max(1u, std::thread::hardware_concurrency());
+  return n;
+}
+
+inline void init(CommFn comm) {
+  State &s = state();
+#ifdef INSTRUMENT_LAYERS
+  const char *env = std::getenv("SCI_INSTRUMENT");
+  s.enabled = (env == nullptr || std::strcmp(env, "0") != 0);
+#else
+  s.enabled = false;
+#endif
+  s.comm = comm;
+  s.depth = 0;
+  s.dropped = 0;
+  s.origin = wall_seconds();
+  s.records.clear();
+  if (s.enabled) {
+    size_t capacity = 16384;
+    if (const char *cap = std::getenv("SCI_TRACE_CAPACITY"))
+      capacity = std::strtoull(cap, nullptr, 10);
+    s.records.reserve(capacity);
+  }
+}
+
+class Scope {
+public:
+  Scope(const char *op, std::initializer_list<int64_t> shape) {
+    State &s = state();
+    active = s.enabled;
+    if (!active)
+      return;
+    rec.op = op;
+    rec.depth = s.depth++;
+    rec.num_dims = 0;
+    for (int64_t d : shape) {
+      if (rec.num_dims == MAX_SHAPE)
+        break;
+      rec.shape[rec.num_dims++] = d;
+    }
+    if (s.comm != nullptr)
+      s.comm(&rec.sent, &rec.recv);
+    else
+      rec.sent = rec.recv = 0;
+    rec.faults = page_faults();
+    rec.cpu = cpu_seconds();
+    rec.start = wall_seconds();
+  }
+
+  ~Scope() {
+    if (!active)
+      return;
+    State &s = state();
+    rec.wall = wall_seconds() - rec.start;
+    rec.cpu = cpu_seconds() - rec.cpu;
+    rec.faults = page_faults() - rec.faults;
+    rec.start -= s.origin;
+    if (s.comm != nullptr) {
+      uint64_t sent, recv;
+      s.comm(&sent, &recv);
+      rec.sent = sent - rec.sent;
+      rec.recv = recv - rec.recv;
+    }
+    s.depth--;
+    // Never reallocate while the computation runs.
+    if (s.records.size() < s.records.capacity())
+      s.records.push_back(rec);
+    else
+      s.dropped++;
+  }
+
+  Scope(const Scope &) = delete;
+  Scope &operator=(const Scope &) = delete;
+
+private:
+  bool active;
+  LayerRecord rec;
+};
+
+inline std::string shape_string(const LayerRecord &r, const char *sep) {
+  std::string out;
+  for (int i = 0; i < r.num_dims; i++) {
+    if (i > 0)
+      out += sep;
+    out += std::to_string(r.shape[i]);
+  }
+  return out;
+}
+
+// CPU utilization of a record in percent of all cores, as printed before.
+inline double cpu_usage(const LayerRecord &r) {
+  if (r.wall <= 0)
+    return 0;
+  return r.cpu / (r.wall * num_cores()) * 100.0;
+}
+
+// Average and peak CPU usage over the outermost layers.
+inline void cpu_usage_stats(double *average, double *peak) {
+  const State &s = state();
+  double total = 0;
+  int count = 0;
+  *peak = 0;
+  for (const LayerRecord &r : s.records) {
+    if (r.depth != 0)
+      continue;
+    double usage = cpu_usage(r);
+    total += usage;
+    *peak = std::max(*peak, usage);
+    count++;
+  }
+  *average = count ? total / count : 0;
+}
+
+inline bool dump(const std::string &path) {
+  const State &s = state();
+  FILE *f = std::fopen(path.c_str(), "w");
+  if (f == nullptr)
+    return false;
+  bool json =
+      path.size() >= 5 && path.compare(path.size() - 5, 5, ".json") == 0;
+  if (json) {
+    std::fprintf(f, "{\"party\": %d, \"num_threads\": %d, \"dropped\": %llu, "
+                    "\"layers\": [\n",
+                 party, num_threads, (unsigned long long)s.dropped);
+  } else {
+    std::fprintf(f, "op,depth,shape,start_s,wall_ms,cpu_ms,cpu_usage,"
+                    "bytes_sent,bytes_recv,page_faults\n");
+  }
+  for (size_t i = 0; i < s.records.size(); i++) {
+    const LayerRecord &r = s.records[i];
+    if (json) {
+      std::fprintf(f,
+                   "  {\"op\": \"%s\", \"depth\": %d, \"shape\": [%s], "
+                   "\"start_s\": %.6f, \"wall_ms\": %.3f, \"cpu_ms\": %.3f, "
+                   "\"bytes_sent\": %llu, \"bytes_recv\": %llu, "
+                   "\"page_faults\": %llu}%s\n",
+                   r.op, r.depth, shape_string(r, ", ").c_str(), r.start,
+                   r.wall * 1e3, r.cpu * 1e3,
+                   (unsigned long long)r.sent, (unsigned long long)r.recv,
+                   (unsigned long long)r.faults,
+                   i + 1 == s.records.size() ? "" : ",");
+    } else {
+      std::fprintf(f, "%s,%d,%s,%.6f,%.3f,%.3f,%.2f,%llu,%llu,%llu\n", r.op,
+                   r.depth, shape_string(r, "x").c_str(), r.start,
+                   r.wall * 1e3, r.cpu * 1e3, cpu_usage(r),
+                   (unsigned long long)r.sent, (unsigned long long)r.recv,
+                   (unsigned long long)r.faults);
+    }
+  }
+  if (json)
+    std::fprintf(f, "]}\n");
+  std::fclose(f);
+  return true;
+}
+
+inline std::string trace_path() {
+  if (const char *path = std::getenv("SCI_TRACE"))
+    return path;
+  return "sci_trace_party" + std::to_string(party) + ".csv";
+}
+
+} // namespace instr
+
+#ifdef INSTRUMENT_LAYERS
+#define INSTR_CONCAT_(a, b) a##b
+#define INSTR_CONCAT(a, b) INSTR_CONCAT_(a, b)
+#define INSTRUMENT_LAYER(op, ...)                                              \
+  instr::Scope INSTR_CONCAT(instrScope, __LINE__)(op, {__VA_ARGS__})
+#else
+#define INSTRUMENT_LAYER(op, ...)
+#endif
+
+#endif // INSTRUMENTATION_H___
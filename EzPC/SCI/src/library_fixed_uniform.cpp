@@ -22,6 +22,8 @@ SOFTWARE.
 #include "library_fixed_uniform.h"
 #include "functionalities_uniform.h"
 #include "library_fixed_common.h"
+#include "instrumentation.h"
+#include "scratch.h"
 #include <iostream>
 #include <chrono>
 #include <fstream>
@@ -59,59 +61,17 @@ uint64_t getRingElt(int64_t x) {
 #endif
 
 using namespace std;
-static std::vector<double> segmentCpuUsages;
-static int numCores = std::thread::hardware_concurrency(); 
-//long globalStartCpuTime = GetCpuTime()
- auto globalStartWallTime = std::chrono::high_resolution_clock::now();
-static double peakCpuUsage = 0; 
-
-// Function to get CPU time used by the current process
-long GetCpuTime() {
-    std::ifstream procStat("/proc/self/stat");
-    std::string line;
-    std::getline(procStat, line);
-    std::istringstream iss(line);
-
-    std::vector<std::string> stats;
-    std::string stat;
-    while (iss >> stat) {
-        stats.push_back(stat);
-    }
-
-    // The 14th and 15th values are utime and stime respectively
-    long utime = std::stol(stats[13]);
-    long stime = std::stol(stats[14]);
-
-    return utime + stime;
-}
-//std::chrono::high_resolution_clock::time_point globalStartWallTime = std::chrono::high_resolution_clock::now();
-long globalStartCpuTime = GetCpuTime();  // This should be set in a function if it depends on runtime initialization
-void CaptureCpuUsage() {
-    auto currentWallTime = std::chrono::high_resolution_clock::now();
-    long currentCpuTime = GetCpuTime();
-
-    // Calculate elapsed times for this segment
-    std::chrono::duration<double> elapsedWallTime = currentWallTime - globalStartWallTime;
-    double elapsedCpuTime = static_cast<double>(currentCpuTime - globalStartCpuTime) / sysconf(_SC_CLK_TCK);
-
-    // Calculate CPU usage for this segment
-    double cpuUsage = (elapsedCpuTime / (elapsedWallTime.count() * numCores)) * 100.0;
-    segmentCpuUsages.push_back(cpuUsage);
-
-    // Update peak CPU usage if the current usage is higher
-    peakCpuUsage = std::max(peakCpuUsage, cpuUsage);
-}
 
-void PerformComputation() {
-    // Your computation code goes here
-    for (int i = 0; i < 1e7; ++i) {
-        // Example loop simulating computation
-    }
+// Sums the bytes sent and received over the IOPacks of all threads.
+static void TotalComm(uint64_t *sent, uint64_t *recv) {
+  *sent = 0;
+  *recv = 0;
+  for (int i = 0; i < num_threads; i++) {
+    *sent += iopackArr[i]->get_comm();
+    *recv += iopackArr[i]->get_comm_recv();
+  }
 }
 
-
-
-
 double EstimateEnergyConsumption(double cpuUsage, double elapsedTimeSeconds) {
     // Assumed average power consumption of the VM in watts
     // You should adjust this value based on measurements from `powerstat` or `turbostat`
@@ -128,8 +88,7 @@ void MatMul2D(int32_t s1, int32_t s2, int32_t s3, const intType *A,
   INIT_ALL_IO_DATA_SENT;
   INIT_TIMER;
 #endif
-      auto startWallTime = std::chrono::high_resolution_clock::now();
-    long startCpuTime = GetCpuTime();
+  INSTRUMENT_LAYER("MatMul2D", s1, s2, s3);
   std::cout << "Matmul called s1,s2,s3 = " << s1 << " " << s2 << " " << s3
             << std::endl;
 
@@ -179,14 +138,14 @@ void MatMul2D(int32_t s1, int32_t s2, int32_t s3, const intType *A,
     //	server holds A or B, server should add locally A*B.
     //
     // Add also A*own share of B
-    intType *CTemp = new intType[s1 * s3];
+    scratch::Frame frame;
+    intType *CTemp = frame.alloc<intType>(s1 * s3);
 #ifdef USE_LINEAR_UNIFORM
     multUniform->ideal_func(s1, s2, s3, A, B, CTemp);
 #else  // USE_LINEAR_UNIFORM
     mult->matmul_cleartext(s1, s2, s3, A, B, CTemp, true);
 #endif // USE_LINEAR_UNIFORM
     sci::elemWiseAdd<intType>(s1 * s3, C, CTemp, C);
-    delete[] CTemp;
   } else {
     // For minionn kind of hacky runs, switch this off
 #ifndef HACKY_RUN
@@ -205,10 +164,11 @@ void MatMul2D(int32_t s1, int32_t s2, int32_t s3, const intType *A,
   if (s2 < num_threads) {
     required_num_threads = s2;
   }
+  scratch::Frame frame;
   intType *C_ans_arr[required_num_threads];
   std::thread matmulThreads[required_num_threads];
   for (int i = 0; i < required_num_threads; i++) {
-    C_ans_arr[i] = new intType[s1 * s3];
+    C_ans_arr[i] = frame.alloc<intType>(s1 * s3);
     matmulThreads[i] = std::thread(funcMatmulThread, i, required_num_threads,
                                    s1, s2, s3, (intType *)A, (intType *)B,
                                    (intType *)C_ans_arr[i], partyWithAInAB_mul);
@@ -223,18 +183,16 @@ void MatMul2D(int32_t s1, int32_t s2, int32_t s3, const intType *A,
     for (int j = 0; j < s1 * s3; j++) {
       C[j] += C_ans_arr[i][j];
     }
-    delete[] C_ans_arr[i];
   }
 
   if (party == sci::ALICE) {
-    intType *CTemp = new intType[s1 * s3];
+    intType *CTemp = frame.alloc<intType>(s1 * s3);
 #ifdef USE_LINEAR_UNIFORM
     multUniform->ideal_func(s1, s2, s3, A, B, CTemp);
 #else  // USE_LINEAR_UNIFORM
     mult->matmul_cleartext(s1, s2, s3, (intType*)A, (intType*)B, CTemp, true);
 #endif // USE_LINEAR_UNIFORM
     sci::elemWiseAdd<intType>(s1 * s3, C, CTemp, C);
-    delete[] CTemp;
   } else {
     // For minionn kind of hacky runs, switch this off
 #ifndef HACKY_RUN
@@ -351,18 +309,6 @@ void MatMul2D(int32_t s1, int32_t s2, int32_t s3, const intType *A,
     delete[] VC;
   }
 #endif
-auto endWallTime = std::chrono::high_resolution_clock::now();
-    long endCpuTime = GetCpuTime();
-
-    // Calculate elapsed times
-    std::chrono::duration<double> elapsedWallTime = endWallTime - startWallTime;
-    double elapsedCpuTime = static_cast<double>(endCpuTime - startCpuTime) / sysconf(_SC_CLK_TCK);
-
-    // Calculate and store CPU usage for this segment
-    double cpuUsage = (elapsedCpuTime / (elapsedWallTime.count() * numCores)) * 100.0;
-    segmentCpuUsages.push_back(cpuUsage);
-
-CaptureCpuUsage();
 }
 
 static void Conv2D(int32_t N, int32_t H, int32_t W, int32_t CI, int32_t FH,
@@ -373,9 +319,7 @@ static void Conv2D(int32_t N, int32_t H, int32_t W, int32_t CI, int32_t FH,
 
 
 
-    // Start timing
-    auto startWallTime = std::chrono::high_resolution_clock::now();
-    long startCpuTime = GetCpuTime();
+  INSTRUMENT_LAYER("Conv2D", N, H, W, CI, FH, FW, CO);
 
 
 
@@ -411,22 +355,6 @@ static void Conv2D(int32_t N, int32_t H, int32_t W, int32_t CI, int32_t FH,
   ClearMemSecret2(reshapedIPRows, reshapedIPCols, inputReshaped);
   ClearMemSecret2(reshapedFilterRows, reshapedIPCols, matmulOP);
 
-// Stop timing
-    auto endWallTime = std::chrono::high_resolution_clock::now();
-    long endCpuTime = GetCpuTime();
-
-    // Calculate elapsed times
-    std::chrono::duration<double> elapsedWallTime = endWallTime - startWallTime;
-    double elapsedCpuTime = static_cast<double>(endCpuTime - startCpuTime) / sysconf(_SC_CLK_TCK);
-
-    // Calculate and store CPU usage for this segment
-    double cpuUsage = (elapsedCpuTime / (elapsedWallTime.count() * numCores)) * 100.0;
-    segmentCpuUsages.push_back(cpuUsage);
-
-    // Update peak CPU usage if the current usage is higher
-    peakCpuUsage = std::max(peakCpuUsage, cpuUsage);
-
-CaptureCpuUsage();
 }
 
 void Conv2DWrapper(signedIntType N, signedIntType H, signedIntType W,
@@ -437,9 +365,7 @@ void Conv2DWrapper(signedIntType N, signedIntType H, signedIntType W,
                    signedIntType strideW, intType *inputArr, intType *filterArr,
                    intType *outArr) {
 
-    // Start timing
-    auto startWallTime = std::chrono::high_resolution_clock::now();
-    long startCpuTime = GetCpuTime();
+  INSTRUMENT_LAYER("Conv2DWrapper", N, H, W, CI, FH, FW, CO);
 #ifdef LOG_LAYERWISE
   INIT_ALL_IO_DATA_SENT;
   INIT_TIMER;
@@ -463,57 +389,11 @@ void Conv2DWrapper(signedIntType N, signedIntType H, signedIntType W,
 
 #ifdef SCI_HE
   // If its a field, then its a HE based -- use the HE based conv implementation
-  std::vector<std::vector<std::vector<std::vector<intType>>>> inputVec;
-  inputVec.resize(N, std::vector<std::vector<std::vector<intType>>>(
-                         H, std::vector<std::vector<intType>>(
-                                W, std::vector<intType>(CI, 0))));
-
-  std::vector<std::vector<std::vector<std::vector<intType>>>> filterVec;
-  filterVec.resize(FH, std::vector<std::vector<std::vector<intType>>>(
-                           FW, std::vector<std::vector<intType>>(
-                                   CI, std::vector<intType>(CO, 0))));
-
-  std::vector<std::vector<std::vector<std::vector<intType>>>> outputVec;
-  outputVec.resize(N, std::vector<std::vector<std::vector<intType>>>(
-                          newH, std::vector<std::vector<intType>>(
-                                    newW, std::vector<intType>(CO, 0))));
-
-  for (int i = 0; i < N; i++) {
-    for (int j = 0; j < H; j++) {
-      for (int k = 0; k < W; k++) {
-        for (int p = 0; p < CI; p++) {
-          inputVec[i][j][k][p] =
-              getRingElt(Arr4DIdxRowM(inputArr, N, H, W, CI, i, j, k, p));
-        }
-      }
-    }
-  }
-  for (int i = 0; i < FH; i++) {
-    for (int j = 0; j < FW; j++) {
-      for (int k = 0; k < CI; k++) {
-        for (int p = 0; p < CO; p++) {
-          filterVec[i][j][k][p] =
-              getRingElt(Arr4DIdxRowM(filterArr, FH, FW, CI, CO, i, j, k, p));
-        }
-      }
-    }
-  }
-
+  // The arrays are already contiguous NHWC/HWIO buffers of field elements,
+  // so they are handed over as is.
   he_conv->convolution(N, H, W, CI, FH, FW, CO, zPadHLeft, zPadHRight,
-                       zPadWLeft, zPadWRight, strideH, strideW, inputVec,
-                       filterVec, outputVec);
-
-  for (int i = 0; i < N; i++) {
-    for (int j = 0; j < newH; j++) {
-      for (int k = 0; k < newW; k++) {
-        for (int p = 0; p < CO; p++) {
-          Arr4DIdxRowM(outArr, N, newH, newW, CO, i, j, k, p) =
-              getRingElt(outputVec[i][j][k][p]);
-        }
-      }
-    }
-  }
-
+                       zPadWLeft, zPadWRight, strideH, strideW, inputArr,
+                       filterArr, outArr);
 #endif
 
 #ifdef LOG_LAYERWISE
@@ -614,18 +494,6 @@ void Conv2DWrapper(signedIntType N, signedIntType H, signedIntType W,
     delete[] VoutputArr;
   }
 #endif
- // Stop timing
-    auto endWallTime = std::chrono::high_resolution_clock::now();
-    long endCpuTime = GetCpuTime();
-
-    // Calculate elapsed times
-    std::chrono::duration<double> elapsedWallTime = endWallTime - startWallTime;
-    double elapsedCpuTime = static_cast<double>(endCpuTime - startCpuTime) / sysconf(_SC_CLK_TCK);
-
-    // Calculate and store CPU usage for this segment
-    double cpuUsage = (elapsedCpuTime / (elapsedWallTime.count() * numCores)) * 100.0;
-    segmentCpuUsages.push_back(cpuUsage);
-CaptureCpuUsage();
 }
 
 #ifdef SCI_OT
@@ -647,9 +515,7 @@ void Conv2DGroupWrapper(signedIntType N, signedIntType H, signedIntType W,
 {
 
 
-    // Start timing
-    auto startWallTime = std::chrono::high_resolution_clock::now();
-    long startCpuTime = GetCpuTime();
+  INSTRUMENT_LAYER("Conv2DGroupWrapper", N, H, W, CI, FH, FW, CO, G);
 #ifdef LOG_LAYERWISE
   INIT_ALL_IO_DATA_SENT;
   INIT_TIMER;
@@ -686,19 +552,6 @@ void Conv2DGroupWrapper(signedIntType N, signedIntType H, signedIntType W,
   ConvCommSent += curComm;
 #endif
 
-// Stop timing
-    auto endWallTime = std::chrono::high_resolution_clock::now();
-    long endCpuTime = GetCpuTime();
-
-    // Calculate elapsed times
-    std::chrono::duration<double> elapsedWallTime = endWallTime - startWallTime;
-    double elapsedCpuTime = static_cast<double>(endCpuTime - startCpuTime) / sysconf(_SC_CLK_TCK);
-
-    // Calculate and store CPU usage for this segment
-    double cpuUsage = (elapsedCpuTime / (elapsedWallTime.count() * numCores)) * 100.0;
-    segmentCpuUsages.push_back(cpuUsage);
-
-CaptureCpuUsage();
 }
 
 static void ConvTranspose2D(int32_t N, int32_t HPrime, int32_t WPrime,
@@ -711,9 +564,7 @@ static void ConvTranspose2D(int32_t N, int32_t HPrime, int32_t WPrime,
                                uint64_t* outArr){
                                   
 
-      // Start timing
-    auto startWallTime = std::chrono::high_resolution_clock::now();
-    long startCpuTime = GetCpuTime();
+  INSTRUMENT_LAYER("ConvTranspose2D", N, HPrime, WPrime, CI, FH, FW, CO);
   uint64_t reshapedFilterRows = CO;
 
   uint64_t reshapedFilterCols =(( FH * FW ) * CI);
@@ -740,18 +591,6 @@ static void ConvTranspose2D(int32_t N, int32_t HPrime, int32_t WPrime,
   ClearMemSecret2(reshapedIPRows, reshapedIPCols, inputReshaped);
   ClearMemSecret2(reshapedFilterRows, reshapedIPCols, matmulOP);
 
-// Stop timing
-    auto endWallTime = std::chrono::high_resolution_clock::now();
-    long endCpuTime = GetCpuTime();
-
-    // Calculate elapsed times
-    std::chrono::duration<double> elapsedWallTime = endWallTime - startWallTime;
-    double elapsedCpuTime = static_cast<double>(endCpuTime - startCpuTime) / sysconf(_SC_CLK_TCK);
-
-    // Calculate and store CPU usage for this segment
-    double cpuUsage = (elapsedCpuTime / (elapsedWallTime.count() * numCores)) * 100.0;
-    segmentCpuUsages.push_back(cpuUsage);
-CaptureCpuUsage();
 
 }
 
@@ -764,9 +603,8 @@ void ConvTranspose2DWrapper(int32_t N, int32_t HPrime, int32_t WPrime,
                                uint64_t* inArr, uint64_t* filterArr,
                                uint64_t* outArr){
 
-    // Start timing
-    auto startWallTime = std::chrono::high_resolution_clock::now();
-    long startCpuTime = GetCpuTime();
+  INSTRUMENT_LAYER("ConvTranspose2DWrapper", N, HPrime, WPrime, CI, FH, FW,
+                   CO);
 
 
   #ifdef LOG_LAYERWISE
@@ -806,29 +644,13 @@ void ConvTranspose2DWrapper(int32_t N, int32_t HPrime, int32_t WPrime,
     ConvCommSent += curComm;
   #endif
 
-// Stop timing
-    auto endWallTime = std::chrono::high_resolution_clock::now();
-    long endCpuTime = GetCpuTime();
-
-    // Calculate elapsed times
-    std::chrono::duration<double> elapsedWallTime = endWallTime - startWallTime;
-    double elapsedCpuTime = static_cast<double>(endCpuTime - startCpuTime) / sysconf(_SC_CLK_TCK);
-
-    // Calculate and store CPU usage for this segment
-    double cpuUsage = (elapsedCpuTime / (elapsedWallTime.count() * numCores)) * 100.0;
-    segmentCpuUsages.push_back(cpuUsage);
-
-
-CaptureCpuUsage();
 }
 
 void ElemWiseActModelVectorMult(int32_t size, intType *inArr,
                                 intType *multArrVec, intType *outputArr) {
 
 
-    // Start timing
-    auto startWallTime = std::chrono::high_resolution_clock::now();
-    long startCpuTime = GetCpuTime();
+  INSTRUMENT_LAYER("ElemWiseActModelVectorMult", size);
 #ifdef LOG_LAYERWISE
   INIT_ALL_IO_DATA_SENT;
   INIT_TIMER;
@@ -974,26 +796,11 @@ void ElemWiseActModelVectorMult(int32_t size, intType *inArr,
 
 
 
-// Stop timing
-    auto endWallTime = std::chrono::high_resolution_clock::now();
-    long endCpuTime = GetCpuTime();
-
-    // Calculate elapsed times
-    std::chrono::duration<double> elapsedWallTime = endWallTime - startWallTime;
-    double elapsedCpuTime = static_cast<double>(endCpuTime - startCpuTime) / sysconf(_SC_CLK_TCK);
-
-    // Calculate and store CPU usage for this segment
-    double cpuUsage = (elapsedCpuTime / (elapsedWallTime.count() * numCores)) * 100.0;
-    segmentCpuUsages.push_back(cpuUsage);
-
-CaptureCpuUsage();
 }
 
 void ArgMax(int32_t s1, int32_t s2, intType *inArr, intType *outArr) {
 
-    // Start timing
-    auto startWallTime = std::chrono::high_resolution_clock::now();
-    long startCpuTime = GetCpuTime();
+  INSTRUMENT_LAYER("ArgMax", s1, s2);
 
 
 #ifdef LOG_LAYERWISE
@@ -1059,18 +866,6 @@ void ArgMax(int32_t s1, int32_t s2, intType *inArr, intType *outArr) {
 
 
 
-// Stop timing
-    auto endWallTime = std::chrono::high_resolution_clock::now();
-    long endCpuTime = GetCpuTime();
-
-    // Calculate elapsed times
-    std::chrono::duration<double> elapsedWallTime = endWallTime - startWallTime;
-    double elapsedCpuTime = static_cast<double>(endCpuTime - startCpuTime) / sysconf(_SC_CLK_TCK);
-
-    // Calculate and store CPU usage for this segment
-    double cpuUsage = (elapsedCpuTime / (elapsedWallTime.count() * numCores)) * 100.0;
-    segmentCpuUsages.push_back(cpuUsage);
-CaptureCpuUsage();
 
 }
 
@@ -1085,13 +880,12 @@ CaptureCpuUsage();
 void Min(int32_t size, intType *inArr, int32_t alpha, intType *outArr, int32_t sf, bool doTruncation) {
 
 
-    // Start timing
-    auto startWallTime = std::chrono::high_resolution_clock::now();
-    long startCpuTime = GetCpuTime();
+  INSTRUMENT_LAYER("Min", size);
 
 
-  intType *tempIn = new intType[size] ;
-  intType *tempOut = new intType[size] ;
+  scratch::Frame frame;
+  intType *tempIn = frame.alloc<intType>(size) ;
+  intType *tempOut = frame.alloc<intType>(size) ;
 
   intType affine ;
   if (alpha < 0) {
@@ -1117,32 +911,15 @@ void Min(int32_t size, intType *inArr, int32_t alpha, intType *outArr, int32_t s
       outArr[i] = -tempOut[i] ;
   }
 
-  delete[] tempIn ;
-  delete[] tempOut ;
-
-// Stop timing
-    auto endWallTime = std::chrono::high_resolution_clock::now();
-    long endCpuTime = GetCpuTime();
-
-    // Calculate elapsed times
-    std::chrono::duration<double> elapsedWallTime = endWallTime - startWallTime;
-    double elapsedCpuTime = static_cast<double>(endCpuTime - startCpuTime) / sysconf(_SC_CLK_TCK);
-
-    // Calculate and store CPU usage for this segment
-    double cpuUsage = (elapsedCpuTime / (elapsedWallTime.count() * numCores)) * 100.0;
-    segmentCpuUsages.push_back(cpuUsage);
-
-CaptureCpuUsage();
 }
 
 void Max(int32_t size, intType *inArr, int32_t alpha, intType *outArr, int32_t sf, bool doTruncation) {
-    // Start timing
-    auto startWallTime = std::chrono::high_resolution_clock::now();
-    long startCpuTime = GetCpuTime();
+  INSTRUMENT_LAYER("Max", size);
 
 
-  intType *tempIn = new intType[size] ;
-  intType *tempOut = new intType[size] ;
+  scratch::Frame frame;
+  intType *tempIn = frame.alloc<intType>(size) ;
+  intType *tempOut = frame.alloc<intType>(size) ;
 
   intType affine ;
   if (alpha < 0) {
@@ -1166,27 +943,13 @@ void Max(int32_t size, intType *inArr, int32_t alpha, intType *outArr, int32_t s
        outArr[i] += affine ; 
   }
 
-  delete[] tempIn ;
-  delete[] tempOut ;
-
-// Stop timing
-    auto endWallTime = std::chrono::high_resolution_clock::now();
-    long endCpuTime = GetCpuTime();
-
-    // Calculate elapsed times
-    std::chrono::duration<double> elapsedWallTime = endWallTime - startWallTime;
-    double elapsedCpuTime = static_cast<double>(endCpuTime - startCpuTime) / sysconf(_SC_CLK_TCK);
-
-    // Calculate and store CPU usage for this segment
-    double cpuUsage = (elapsedCpuTime / (elapsedWallTime.count() * numCores)) * 100.0;
-    segmentCpuUsages.push_back(cpuUsage);
-CaptureCpuUsage();
 }
 
 void HardSigmoid(int32_t size, intType *inArr, intType *outArr, int32_t sf, bool doTruncation) {
 
-  intType *tmpIn = new intType[size] ;
-  intType *tmpIn1 = new intType[size] ;
+  scratch::Frame frame;
+  intType *tmpIn = frame.alloc<intType>(size) ;
+  intType *tmpIn1 = frame.alloc<intType>(size) ;
   for(int i=0;i<size;i++) {
     if (party == SERVER)
     	tmpIn[i] = inArr[i] + (intType)(3<<sf) ;
@@ -1197,17 +960,12 @@ void HardSigmoid(int32_t size, intType *inArr, intType *outArr, int32_t sf, bool
   ElemWiseVectorPublicDiv(size,tmpIn,6,tmpIn1);
   Min(size, tmpIn1, (int32_t)1, tmpIn1, sf, doTruncation) ;
   Max(size, tmpIn1, (int32_t)0, outArr, sf, doTruncation) ;
-
-  delete[] tmpIn ;
-  delete[] tmpIn1 ;
 }
 
 void Relu(int32_t size, intType *inArr, intType *outArr, int sf,
           bool doTruncation) {
 
-    // Start timing
-    auto startWallTime = std::chrono::high_resolution_clock::now();
-    long startCpuTime = GetCpuTime();
+  INSTRUMENT_LAYER("Relu", size);
 
 #ifdef LOG_LAYERWISE
   INIT_ALL_IO_DATA_SENT;
@@ -1219,28 +977,21 @@ void Relu(int32_t size, intType *inArr, intType *outArr, int sf,
   ctr++;
 
   intType moduloMask = sci::all1Mask(bitlength);
-  uint8_t *msbShare = new uint8_t[size];
-  intType *tempOutp = new intType[size];
+  scratch::Frame frame;
+#if defined(SCI_OT) && !defined(VERIFY_LAYERWISE)
+  // ReLU straight into outArr; the truncation then works on it in place.
+  intType *tempOutp = (outArr != inArr ? outArr : frame.alloc<intType>(size));
+#else
+  intType *tempOutp = frame.alloc<intType>(size);
+#endif
 
 #ifndef MULTITHREADED_NONLIN
   relu->relu(tempOutp, inArr, size, nullptr);
 #else
-  std::thread relu_threads[num_threads];
-  int chunk_size = size / num_threads;
-  for (int i = 0; i < num_threads; ++i) {
-    int offset = i * chunk_size;
-    int lnum_relu;
-    if (i == (num_threads - 1)) {
-      lnum_relu = size - offset;
-    } else {
-      lnum_relu = chunk_size;
-    }
-    relu_threads[i] = std::thread(funcReLUThread, i, tempOutp + offset,
-                                  inArr + offset, lnum_relu, nullptr, false);
-  }
-  for (int i = 0; i < num_threads; ++i) {
-    relu_threads[i].join();
-  }
+  runChunksOnWorkers(size, [&](int i, int offset, int lnum_relu) {
+    funcReLUThread(i, tempOutp + offset, inArr + offset, lnum_relu, nullptr,
+                   false);
+  });
 #endif
 
 #ifdef LOG_LAYERWISE
@@ -1258,16 +1009,14 @@ void Relu(int32_t size, intType *inArr, intType *outArr, int sf,
     INIT_ALL_IO_DATA_SENT;
     INIT_TIMER;
 #endif
-    for (int i = 0; i < size; i++) {
-      msbShare[i] = 0; // After relu, all numbers are +ve
-    }
-
 #ifdef SCI_OT
+    // After relu, all numbers are +ve; the output comes back reduced.
+    funcReluTruncateWrapper(size, tempOutp, outArr, sf);
+#else
+    uint8_t *msbShare = frame.alloc<uint8_t>(size);
     for (int i = 0; i < size; i++) {
-      tempOutp[i] = tempOutp[i] & moduloMask;
+      msbShare[i] = 0; // After relu, all numbers are +ve
     }
-    funcTruncateTwoPowerRingWrapper(size, tempOutp, outArr, sf, msbShare, true);
-#else
     funcFieldDivWrapper<intType>(size, tempOutp, outArr, 1ULL << sf, msbShare);
 #endif
 
@@ -1280,16 +1029,14 @@ void Relu(int32_t size, intType *inArr, intType *outArr, int sf,
 #endif
   } else {
     for (int i = 0; i < size; i++) {
+#ifdef SCI_OT
+      outArr[i] = tempOutp[i] & moduloMask;
+#else
       outArr[i] = tempOutp[i];
+#endif
     }
   }
 
-#ifdef SCI_OT
-  for (int i = 0; i < size; i++) {
-    outArr[i] = outArr[i] & moduloMask;
-  }
-#endif
-
 #ifdef VERIFY_LAYERWISE
 #ifdef SCI_HE
   for (int i = 0; i < size; i++) {
@@ -1353,22 +1100,6 @@ void Relu(int32_t size, intType *inArr, intType *outArr, int sf,
     delete[] VoutArr;
   }
 #endif
-
-  delete[] tempOutp;
-  delete[] msbShare;
-// Stop timing
-    auto endWallTime = std::chrono::high_resolution_clock::now();
-    long endCpuTime = GetCpuTime();
-
-    // Calculate elapsed times
-    std::chrono::duration<double> elapsedWallTime = endWallTime - startWallTime;
-    double elapsedCpuTime = static_cast<double>(endCpuTime - startCpuTime) / sysconf(_SC_CLK_TCK);
-
-    // Calculate and store CPU usage for this segment
-    double cpuUsage = (elapsedCpuTime / (elapsedWallTime.count() * numCores)) * 100.0;
-    segmentCpuUsages.push_back(cpuUsage);
-
-CaptureCpuUsage();
 }
 
 void MaxPool(int32_t N, int32_t H, int32_t W, int32_t C, int32_t ksizeH,
@@ -1377,9 +1108,7 @@ void MaxPool(int32_t N, int32_t H, int32_t W, int32_t C, int32_t ksizeH,
              int32_t strideW, int32_t N1, int32_t imgH, int32_t imgW,
              int32_t C1, intType *inArr, intType *outArr) {
 
-    // Start timing
-    auto startWallTime = std::chrono::high_resolution_clock::now();
-    long startCpuTime = GetCpuTime();
+  INSTRUMENT_LAYER("MaxPool", N, H, W, C, ksizeH, ksizeW);
 
 
 #ifdef LOG_LAYERWISE
@@ -1397,9 +1126,10 @@ void MaxPool(int32_t N, int32_t H, int32_t W, int32_t C, int32_t ksizeH,
   int rows = N * H * W * C;
   int cols = ksizeH * ksizeW;
 
-  intType *reInpArr = new intType[rows * cols];
-  intType *maxi = new intType[rows];
-  intType *maxiIdx = new intType[rows];
+  scratch::Frame frame;
+  intType *reInpArr = frame.alloc<intType>(rows * cols);
+  intType *maxi = frame.alloc<intType>(rows);
+  intType *maxiIdx = frame.alloc<intType>(rows);
 
   int rowIdx = 0;
   for (int n = 0; n < N; n++) {
@@ -1443,23 +1173,10 @@ void MaxPool(int32_t N, int32_t H, int32_t W, int32_t C, int32_t ksizeH,
 #ifndef MULTITHREADED_NONLIN
   maxpool->funcMaxMPC(rows, cols, reInpArr, maxi, maxiIdx);
 #else
-  std::thread maxpool_threads[num_threads];
-  int chunk_size = rows / num_threads;
-  for (int i = 0; i < num_threads; ++i) {
-    int offset = i * chunk_size;
-    int lnum_rows;
-    if (i == (num_threads - 1)) {
-      lnum_rows = rows - offset;
-    } else {
-      lnum_rows = chunk_size;
-    }
-    maxpool_threads[i] =
-        std::thread(funcMaxpoolThread, i, lnum_rows, cols,
-                    reInpArr + offset * cols, maxi + offset, maxiIdx + offset);
-  }
-  for (int i = 0; i < num_threads; ++i) {
-    maxpool_threads[i].join();
-  }
+  runChunksOnWorkers(rows, [&](int i, int offset, int lnum_rows) {
+    funcMaxpoolThread(i, lnum_rows, cols, reInpArr + offset * cols,
+                      maxi + offset, maxiIdx + offset);
+  });
 #endif
 
   for (int n = 0; n < N; n++) {
@@ -1473,10 +1190,6 @@ void MaxPool(int32_t N, int32_t H, int32_t W, int32_t C, int32_t ksizeH,
     }
   }
 
-  delete[] reInpArr;
-  delete[] maxi;
-  delete[] maxiIdx;
-
 #ifdef LOG_LAYERWISE
   auto temp = TIMER_TILL_NOW;
   MaxpoolTimeInMilliSec += temp;
@@ -1559,18 +1272,6 @@ void MaxPool(int32_t N, int32_t H, int32_t W, int32_t C, int32_t ksizeH,
   }
 #endif
 
-// Stop timing
-    auto endWallTime = std::chrono::high_resolution_clock::now();
-    long endCpuTime = GetCpuTime();
-
-    // Calculate elapsed times
-    std::chrono::duration<double> elapsedWallTime = endWallTime - startWallTime;
-    double elapsedCpuTime = static_cast<double>(endCpuTime - startCpuTime) / sysconf(_SC_CLK_TCK);
-
-    // Calculate and store CPU usage for this segment
-    double cpuUsage = (elapsedCpuTime / (elapsedWallTime.count() * numCores)) * 100.0;
-    segmentCpuUsages.push_back(cpuUsage);
-CaptureCpuUsage();
 }
 
 void AvgPool(int32_t N, int32_t H, int32_t W, int32_t C, int32_t ksizeH,
@@ -1580,9 +1281,7 @@ void AvgPool(int32_t N, int32_t H, int32_t W, int32_t C, int32_t ksizeH,
              int32_t C1, intType *inArr, intType *outArr) {
 
 
-    // Start timing
-    auto startWallTime = std::chrono::high_resolution_clock::now();
-    long startCpuTime = GetCpuTime();
+  INSTRUMENT_LAYER("AvgPool", N, H, W, C, ksizeH, ksizeW);
 
 
 
@@ -1599,8 +1298,9 @@ void AvgPool(int32_t N, int32_t H, int32_t W, int32_t C, int32_t ksizeH,
 
   uint64_t moduloMask = sci::all1Mask(bitlength);
   int rows = N * H * W * C;
-  intType *filterSum = new intType[rows];
-  intType *filterAvg = new intType[rows];
+  scratch::Frame frame;
+  intType *filterSum = frame.alloc<intType>(rows);
+  intType *filterAvg = frame.alloc<intType>(rows);
 
   int rowIdx = 0;
   for (int n = 0; n < N; n++) {
@@ -1673,9 +1373,6 @@ void AvgPool(int32_t N, int32_t H, int32_t W, int32_t C, int32_t ksizeH,
     }
   }
 
-  delete[] filterSum;
-  delete[] filterAvg;
-
 #ifdef LOG_LAYERWISE
   auto temp = TIMER_TILL_NOW;
   AvgpoolTimeInMilliSec += temp;
@@ -1756,27 +1453,13 @@ void AvgPool(int32_t N, int32_t H, int32_t W, int32_t C, int32_t ksizeH,
   }
 #endif
 
-// Stop timing
-    auto endWallTime = std::chrono::high_resolution_clock::now();
-    long endCpuTime = GetCpuTime();
-
-    // Calculate elapsed times
-    std::chrono::duration<double> elapsedWallTime = endWallTime - startWallTime;
-    double elapsedCpuTime = static_cast<double>(endCpuTime - startCpuTime) / sysconf(_SC_CLK_TCK);
-
-    // Calculate and store CPU usage for this segment
-    double cpuUsage = (elapsedCpuTime / (elapsedWallTime.count() * numCores)) * 100.0;
-    segmentCpuUsages.push_back(cpuUsage);
-CaptureCpuUsage();
 
 
 }
 
 void ScaleDown(int32_t size, intType *inArr, int32_t sf) {
 
-    // Start timing
-    auto startWallTime = std::chrono::high_resolution_clock::now();
-    long startCpuTime = GetCpuTime();
+  INSTRUMENT_LAYER("ScaleDown", size);
 
 
 #ifdef LOG_LAYERWISE
@@ -1784,15 +1467,23 @@ void ScaleDown(int32_t size, intType *inArr, int32_t sf) {
   INIT_TIMER;
 #endif
 
-  intType *outp = new intType[size];
-
+  scratch::Frame frame;
 #ifdef SCI_OT
+#ifdef VERIFY_LAYERWISE
+  // The check below needs the input too.
   uint64_t moduloMask = sci::all1Mask(bitlength);
+  intType *outp = frame.alloc<intType>(size);
   for (int i = 0; i < size; i++) {
     inArr[i] = inArr[i] & moduloMask;
+    outp[i] = inArr[i];
   }
-  truncation->truncate(size, inArr, outp, sf, bitlength, true);
 #else
+  intType *outp = inArr;
+#endif
+  // Reduces the input on the fly, no separate masking pass or copy back.
+  funcTruncateInPlaceWrapper(size, outp, sf);
+#else
+  intType *outp = frame.alloc<intType>(size);
   for (int i = 0; i < size; i++) {
     inArr[i] = sci::neg_mod(inArr[i], (int64_t)prime_mod);
   }
@@ -1849,29 +1540,15 @@ void ScaleDown(int32_t size, intType *inArr, int32_t sf) {
   }
 #endif
 
-  memcpy(inArr, outp, sizeof(intType) * size);
-  delete[] outp;
-
-    // Stop timing
-    auto endWallTime = std::chrono::high_resolution_clock::now();
-    long endCpuTime = GetCpuTime();
+  if (outp != inArr)
+    memcpy(inArr, outp, sizeof(intType) * size);
 
-    // Calculate elapsed times
-    std::chrono::duration<double> elapsedWallTime = endWallTime - startWallTime;
-    double elapsedCpuTime = static_cast<double>(endCpuTime - startCpuTime) / sysconf(_SC_CLK_TCK);
-
-    // Calculate and store CPU usage for this segment
-    double cpuUsage = (elapsedCpuTime / (elapsedWallTime.count() * numCores)) * 100.0;
-    segmentCpuUsages.push_back(cpuUsage);
-CaptureCpuUsage();
 }
 
 void ScaleUp(int32_t size, intType *arr, int32_t sf) {
 
 
-    // Start timing
-    auto startWallTime = std::chrono::high_resolution_clock::now();
-    long startCpuTime = GetCpuTime();
+  INSTRUMENT_LAYER("ScaleUp", size);
 
   for (int i = 0; i < size; i++) {
 #ifdef SCI_OT
@@ -1882,41 +1559,14 @@ void ScaleUp(int32_t size, intType *arr, int32_t sf) {
   }
 
 
-// Stop timing
-    auto endWallTime = std::chrono::high_resolution_clock::now();
-    long endCpuTime = GetCpuTime();
-
-    // Calculate elapsed times
-    std::chrono::duration<double> elapsedWallTime = endWallTime - startWallTime;
-    double elapsedCpuTime = static_cast<double>(endCpuTime - startCpuTime) / sysconf(_SC_CLK_TCK);
-
-    // Calculate and store CPU usage for this segment
-    double cpuUsage = (elapsedCpuTime / (elapsedWallTime.count() * numCores)) * 100.0;
-    segmentCpuUsages.push_back(cpuUsage);
-CaptureCpuUsage();
 }
 
-std::chrono::high_resolution_clock::time_point startWallTime;
-auto start = std::chrono::high_resolution_clock::now();
-long startCpuTime;
-//unsigned int numCores;
-
-//static std::vector<double> segmentCpuUsages;
-//static double peakCpuUsage = 0;  // Initialize peak CPU usage to 0
-//static int numCores = std::thread::hardware_concurrency();  // Automatically detect number of cores
+double startWallTime;
+double startCpuTime;
 void StartComputation() {
-//numCores = std::thread::hardware_concurrency();
-      // auto globalStartWallTime = std::chrono::high_resolution_clock::now();
-    //long globalStartCpuTime = GetCpuTime();
-   segmentCpuUsages.clear();
-std::cout << "Computation started. CPU and wall clocks initialized." << std::endl;
-    std::cout << "Number of CPU cores: " << numCores << std::endl;
-
-    // Start measuring CPU time and wall time
-    startWallTime = std::chrono::high_resolution_clock::now();
-    startCpuTime = GetCpuTime();
-
-CaptureCpuUsage();
+  std::cout << "Number of CPU cores: " << instr::num_cores() << std::endl;
+  startWallTime = instr::wall_seconds();
+  startCpuTime = instr::cpu_seconds();
   assert(bitlength < 64 && bitlength > 0);
   assert(num_threads <= MAX_THREADS);
 #ifdef SCI_HE
@@ -2057,6 +1707,11 @@ CaptureCpuUsage();
 
   cout << "After base ots, communication = " << (iopack->get_comm()) << " bytes"
        << endl;
+  scratch::init();
+  // Started once here instead of spawning threads in every layer.
+  workerPool = new WorkerPool(num_threads);
+  instr::init(TotalComm);
+
   start_time = std::chrono::high_resolution_clock::now();
   num_rounds = iopack->get_rounds();
   for (int i = 0; i < num_threads; i++) {
@@ -2073,32 +1728,27 @@ CaptureCpuUsage();
 }
 
 void EndComputation() {
-
-auto endWallTime = std::chrono::high_resolution_clock::now();
-    long endCpuTime = GetCpuTime();
-
-    // Calculate elapsed times
-
-    std::chrono::duration<double> elapsedWallTime = endWallTime - startWallTime;
-    double elapsedCpuTime = static_cast<double>(endCpuTime - startCpuTime) / sysconf(_SC_CLK_TCK);
-    
-
-    auto end = std::chrono::high_resolution_clock::now();
-    std::chrono::duration<double> elapsedTime = end - start;
-
-    // Calculate CPU usage percentage
-    double cpuUsage = (elapsedCpuTime / (elapsedWallTime.count() * numCores)) * 100.0;
-
-    // Output results
-    std::cout << "Elapsed wall time: " << elapsedWallTime.count() << " seconds" << std::endl;
-    std::cout << "Elapsed CPU time: " << elapsedCpuTime << " seconds" << std::endl;
-    std::cout << "CPU usage: " << cpuUsage << " %" << std::endl;
-
-
-   // Estimate energy consumption
-    double estimatedEnergy = EstimateEnergyConsumption(cpuUsage, elapsedTime.count());
-    std::cout << "Elapsed time: " << elapsedTime.count() << " seconds" << std::endl;
-    std::cout << "Estimated energy used: " << estimatedEnergy << " joules" << std::endl;
+  double elapsedWallTime = instr::wall_seconds() - startWallTime;
+  double elapsedCpuTime = instr::cpu_seconds() - startCpuTime;
+  double cpuUsage =
+      (elapsedCpuTime / (elapsedWallTime * instr::num_cores())) * 100.0;
+  std::cout << "Elapsed wall time: " << elapsedWallTime << " seconds"
+            << std::endl;
+  std::cout << "Elapsed CPU time: " << elapsedCpuTime << " seconds"
+            << std::endl;
+  std::cout << "CPU usage: " << cpuUsage << " %" << std::endl;
+  std::cout << "Peak memory usage: " << instr::peak_rss_mib() << " MiB"
+            << std::endl;
+  const scratch::Stats &scratchStats = scratch::local().get_stats();
+  std::cout << "Scratch arena: " << (scratchStats.capacity >> 20)
+            << " MiB reserved, peak " << (scratchStats.peak >> 20)
+            << " MiB, " << scratchStats.heap_allocs << " heap fallbacks"
+            << std::endl;
+  double estimatedEnergy =
+      EstimateEnergyConsumption(cpuUsage, elapsedWallTime);
+  std::cout << "Elapsed time: " << elapsedWallTime << " seconds" << std::endl;
+  std::cout << "Estimated energy used: " << estimatedEnergy << " joules"
+            << std::endl;
 
   auto endTimer = std::chrono::high_resolution_clock::now();
   auto execTimeInMilliSec =
@@ -2126,13 +1776,21 @@ auto endWallTime = std::chrono::high_resolution_clock::now();
 
 
 
-double totalCpuUsage = std::accumulate(segmentCpuUsages.begin(), segmentCpuUsages.end(), 0.0);
-    double averageCpuUsage = totalCpuUsage / segmentCpuUsages.size();
-
-    std::cout << "Average CPU usage across all segments: " << averageCpuUsage << " %" << std::endl;
-
-std::cout << "Peak CPU usage during computation: " << peakCpuUsage << " %" << std::endl;
-
+  // Labels are matched by the process_logs_*.py parsers
+  double averageCpuUsage, peakCpuUsage;
+  instr::cpu_usage_stats(&averageCpuUsage, &peakCpuUsage);
+  std::cout << "Average CPU usage across all segments: " << averageCpuUsage
+            << " %" << std::endl;
+  std::cout << "Peak CPU usage during computation: " << peakCpuUsage << " %"
+            << std::endl;
+  if (instr::state().enabled) {
+    std::string tracePath = instr::trace_path();
+    if (instr::dump(tracePath))
+      std::cout << "Layer trace written to " << tracePath << std::endl;
+    else
+      std::cout << "Could not write layer trace to " << tracePath
+                << std::endl;
+  }
 
   if (party == SERVER) {
     io->recv_data(&totalCommClient, sizeof(uint64_t));
@@ -2438,6 +2096,9 @@ std::cout << "Peak CPU usage during computation: " << peakCpuUsage << " %" << st
     io->send_data(&NormaliseL2CommSent, sizeof(uint64_t));
   }
 #endif
+
+  delete workerPool;
+  workerPool = nullptr;
 }
 
 intType SecretAdd(intType x, intType y) {
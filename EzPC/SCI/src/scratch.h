@@ -0,0 +1,187 @@
+/*
+Authors: Nishant Kumar, Deevashwer Rathee
+Copyright:
+Copyright (c) 2021 Microsoft Research
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+*/
+
+// Per-thread scratch arena for layer-local temporaries.
+//
+// The layers used to new[]/delete[] their temporaries (truncation outputs,
+// MSB shares, OT messages, ...) on every call, so large activations were
+// page-faulted in again in every layer. A layer now opens a scratch::Frame
+// and takes its buffers from the arena of the calling thread; they are
+// popped when the frame closes. Frames nest (Max -> Relu -> truncation).
+// A request that does not fit is served from the heap, and the arena grows
+// to the high-water mark as soon as no frame is open, so once the largest
+// layer has run, scratch buffers cost a pointer bump and no page faults.
+// Each thread of the worker pool has its own arena.
+//
+// Switches (read in scratch::init, called by StartComputation):
+//  - SCI_SCRATCH=0 serves every buffer from the heap, as before.
+//  - SCI_SCRATCH_MB=<n> reserves n MiB for the main thread up front
+//    (default 0: grow to the largest layer on the first pass).
+//  - SCI_SCRATCH_PREFAULT=1 faults arena memory in when it is reserved,
+//    instead of on first use inside a layer.
+
+#ifndef SCRATCH_H___
+#define SCRATCH_H___
+
+#include <cstdint>
+#include <cstdlib>
+#include <cstring>
+#include <sys/mman.h>
+#include <unistd.h>
+#include <utility>
+#include <vector>
+
+namespace scratch {
+
+const size_t ALIGN = 64;
+
+struct Config {
+  bool enabled = true;
+  bool prefault = false;
+  size_t reserve = 0;
+};
+
+inline Config &config() {
+  static Config c;
+  return c;
+}
+
+struct Stats {
+  size_t capacity = 0; // bytes currently mapped
+  size_t peak = 0;     // largest amount in use at once
+  uint64_t grows = 0;
+  uint64_t heap_allocs = 0; // requests that did not fit
+};
+
+class Arena {
+public:
+  Arena() = default;
+  Arena(const Arena &) = delete;
+  Arena &operator=(const Arena &) = delete;
+
+  ~Arena() {
+    release(0);
+    unmap();
+  }
+
+  // Only while no frame is open.
+  void reserve(size_t bytes) {
+    if (top != 0 || bytes <= cap)
+      return;
+    const size_t page = sysconf(_SC_PAGESIZE);
+    bytes = (bytes + page - 1) / page * page;
+    unmap();
+    int flags = MAP_PRIVATE | MAP_ANONYMOUS;
+    if (config().prefault)
+      flags |= MAP_POPULATE;
+    void *p = mmap(nullptr, bytes, PROT_READ | PROT_WRITE, flags, -1, 0);
+    if (p == MAP_FAILED)
+      return;
+    base = static_cast<char *>(p);
+    cap = bytes;
+    stats.capacity = cap;
+    stats.grows++;
+  }
+
+  void *alloc(size_t bytes) {
+    bytes = (bytes + ALIGN - 1) & ~(ALIGN - 1);
+    size_t offset = top;
+    top += bytes;
+    if (top > stats.peak)
+      stats.peak = top;
+    if (config().enabled && top <= cap)
+      return base + offset;
+    char *p = new char[bytes];
+    heap.emplace_back(offset, p);
+    stats.heap_allocs++;
+    return p;
+  }
+
+  size_t mark() const { return top; }
+
+  void release(size_t mark) {
+    while (!heap.empty() && heap.back().first >= mark) {
+      delete[] heap.back().second;
+      heap.pop_back();
+    }
+    top = mark;
+    if (top == 0 && config().enabled && stats.peak > cap)
+      reserve(stats.peak);
+  }
+
+  const Stats &get_stats() const { return stats; }
+
+private:
+  void unmap() {
+    if (base != nullptr)
+      munmap(base, cap);
+    base = nullptr;
+    cap = 0;
+    stats.capacity = 0;
+  }
+
+  char *base = nullptr;
+  size_t cap = 0;
+  size_t top = 0;
+  // (offset in the frame stack, buffer) of the requests that did not fit.
+  std::vector<std::pair<size_t, char *>> heap;
+  Stats stats;
+};
+
+inline Arena &local() {
+  static thread_local Arena arena;
+  return arena;
+}
+
+// Buffers taken from a frame are uninitialized, like new T[n], and live
+// until the frame goes out of scope.
+class Frame {
+public:
+  Frame() : arena(local()), start(arena.mark()) {}
+  ~Frame() { arena.release(start); }
+
+  Frame(const Frame &) = delete;
+  Frame &operator=(const Frame &) = delete;
+
+  template <typename T> T *alloc(size_t n) {
+    return static_cast<T *>(arena.alloc(n * sizeof(T)));
+  }
+
+private:
+  Arena &arena;
+  size_t start;
+};
+
+inline void init() {
+  Config &c = config();
+  const char *env = std::getenv("SCI_SCRATCH");
+  c.enabled = (env == nullptr || std::strcmp(env, "0") != 0);
+  env = std::getenv("SCI_SCRATCH_PREFAULT");
+  c.prefault = (env != nullptr && std::strcmp(env, "0") != 0);
+  env = std::getenv("SCI_SCRATCH_MB");
+  c.reserve = env ? (size_t)std::strtoull(env, nullptr, 10) << 20 : 0;
+  if (c.enabled && c.reserve > 0)
+    local().reserve(c.reserve);
+}
+
+} // namespace scratch
+
+#endif // SCRATCH_H___
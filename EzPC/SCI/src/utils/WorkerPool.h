@@ -0,0 +1,130 @@
+/*
+Authors: Nishant Kumar, Deevashwer Rathee
+Copyright:
+Copyright (c) 2021 Microsoft Research
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+*/
+
+#ifndef WORKER_POOL_H
+#define WORKER_POOL_H
+
+#include <cassert>
+#include <condition_variable>
+#include <cstdint>
+#include <exception>
+#include <functional>
+#include <mutex>
+#include <thread>
+#include <vector>
+
+// Fixed set of long-lived threads where worker i always runs the task for
+// chunk i. Unlike ThreadPool (shared queue, any thread picks any task), a
+// chunk index stays on the same thread for the whole computation, so the
+// per-thread IOPack/OTPack/protocol objects (iopackArr[i], otpackArr[i],
+// reluArr[i], ...) are only ever touched by one thread and stay warm in its
+// cache across layers.
+class WorkerPool {
+public:
+  explicit WorkerPool(int num_workers);
+  ~WorkerPool();
+  int size() const { return workers.size(); }
+
+  // Runs f(tid) on worker tid for every tid in [0, n) and blocks until all of
+  // them have returned. Exceptions thrown by a task are rethrown here.
+  void run(int n, const std::function<void(int)> &f);
+
+private:
+  void worker_loop(int tid);
+
+  std::vector<std::thread> workers;
+  std::mutex mtx;
+  std::condition_variable work_cv;
+  std::condition_variable done_cv;
+  const std::function<void(int)> *job = nullptr;
+  int job_size = 0;
+  int pending = 0;
+  uint64_t generation = 0;
+  bool stop = false;
+  std::exception_ptr error;
+};
+
+inline WorkerPool::WorkerPool(int num_workers) {
+  for (int i = 0; i < num_workers; ++i)
+    workers.emplace_back(&WorkerPool::worker_loop, this, i);
+}
+
+inline void WorkerPool::worker_loop(int tid) {
+  uint64_t seen = 0;
+  for (;;) {
+    const std::function<void(int)> *task;
+    {
+      std::unique_lock<std::mutex> lock(mtx);
+      work_cv.wait(lock, [&] { return stop || generation != seen; });
+      if (stop)
+        return;
+      seen = generation;
+      if (tid >= job_size)
+        continue;
+      task = job;
+    }
+
+    std::exception_ptr eptr;
+    try {
+      (*task)(tid);
+    } catch (...) {
+      eptr = std::current_exception();
+    }
+
+    {
+      std::unique_lock<std::mutex> lock(mtx);
+      if (eptr && !error)
+        error = eptr;
+      if (--pending == 0)
+        done_cv.notify_one();
+    }
+  }
+}
+
+inline void WorkerPool::run(int n, const std::function<void(int)> &f) {
+  assert(n <= size());
+  if (n <= 0)
+    return;
+  std::unique_lock<std::mutex> lock(mtx);
+  job = &f;
+  job_size = n;
+  pending = n;
+  error = nullptr;
+  ++generation;
+  work_cv.notify_all();
+  done_cv.wait(lock, [this] { return pending == 0; });
+  job = nullptr;
+  job_size = 0;
+  if (error)
+    std::rethrow_exception(error);
+}
+
+inline WorkerPool::~WorkerPool() {
+  {
+    std::unique_lock<std::mutex> lock(mtx);
+    stop = true;
+  }
+  work_cv.notify_all();
+  for (std::thread &worker : workers)
+    worker.join();
+}
+
+#endif
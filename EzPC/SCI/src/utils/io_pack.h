@@ -34,6 +34,10 @@ public:
 
   uint64_t get_comm() { return io->counter + io_rev->counter + io_GC->counter; }
 
+  uint64_t get_comm_recv() {
+    return io->recv_counter + io_rev->recv_counter + io_GC->recv_counter;
+  }
+
   ~IOPack() {
     delete io;
     delete io_rev;
@@ -58,6 +58,7 @@ public:
   string addr;
   int port;
   uint64_t counter = 0;
+  uint64_t recv_counter = 0;
   uint64_t num_rounds = 0;
   bool FBF_mode;
   LastCall last_call = LastCall::None;
@@ -189,6 +190,7 @@ public:
     if (has_sent)
       fflush(stream);
     has_sent = false;
+    recv_counter += len;
     int sent = 0;
     while (sent < len) {
       int res = fread(sent + (char *)data, 1, len - sent, stream);
@@ -0,0 +1,278 @@
+/*
+Copyright:
+Copyright (c) 2026 Microsoft Research
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+*/
+
+// HE convolution on SqueezeNet/ResNet-50 layer shapes, through the flat
+// buffers and through the old nested vectors.
+//
+// Conv2DWrapper used to copy the NHWC input and HWIO filter into nested
+// std::vector<std::vector<std::vector<std::vector<uint64_t>>>>, call the
+// nested ConvField::convolution, and copy the output back. It now hands the
+// contiguous arrays to the flat-buffer ConvField::convolution. For every
+// layer this
+//  - times `reps` calls of one path (mode=1: Conv2DWrapper, mode=0: the old
+//    nested-vector code, kept below as Conv2DNested) and reports the peak
+//    RSS after them. Peak RSS only grows, so run each mode in its own pair
+//    of processes.
+//  - then (check=1) runs both paths on the same shares, reveals the outputs
+//    and the inputs to the client and checks both against a cleartext
+//    convolution mod prime_mod.
+// Build it against SCI-HE like the networks (it needs -DSCI_HE) and run
+//   ./test_field_conv_layout r=1 mode=1 & ./test_field_conv_layout r=2 mode=1
+
+#include "globals.h"
+#include "instrumentation.h"
+#include "library_fixed_uniform.h"
+#include <iostream>
+#include <vector>
+
+using namespace std;
+using namespace sci;
+
+int party = 0;
+int port = 8000;
+string address = "127.0.0.1";
+int num_threads = 4;
+int32_t bitlength = 32;
+int mode = 1;
+int reps = 1;
+int check = 1;
+int filter_precision = 12;
+
+typedef vector<vector<vector<vector<uint64_t>>>> Vec4D;
+
+struct Layer {
+  const char *name;
+  int H, W, CI, FH, CO, stride, pad;
+
+  int newH() const { return 1 + (H + 2 * pad - FH) / stride; }
+  int newW() const { return 1 + (W + 2 * pad - FH) / stride; }
+  size_t inSize() const { return size_t(H) * W * CI; }
+  size_t filterSize() const { return size_t(FH) * FH * CI * CO; }
+  size_t outSize() const { return size_t(newH()) * newW() * CO; }
+};
+
+// clang-format off
+Layer layers[] = {
+    {"squeezenet conv1",     227, 227,   3, 3,   64, 2, 0},
+    {"squeezenet fire2 e3",   55,  55,  16, 3,   64, 1, 1},
+    {"squeezenet fire9 e3",   13,  13,  64, 3,  256, 1, 1},
+    {"squeezenet conv10",     13,  13, 512, 1, 1000, 1, 0},
+    {"resnet50 conv1",       224, 224,   3, 7,   64, 2, 3},
+    {"resnet50 res2 3x3",     56,  56,  64, 3,   64, 1, 1},
+    {"resnet50 res2 1x1",     56,  56,  64, 1,  256, 1, 0},
+    {"resnet50 res3 3x3",     28,  28, 128, 3,  128, 1, 1},
+    {"resnet50 res4 3x3",     14,  14, 256, 3,  256, 1, 1},
+    {"resnet50 res5 3x3",      7,   7, 512, 3,  512, 1, 1},
+};
+// clang-format on
+
+void Conv2DFlat(const Layer &l, uint64_t *inputArr, uint64_t *filterArr,
+                uint64_t *outArr) {
+  Conv2DWrapper(1, l.H, l.W, l.CI, l.FH, l.FH, l.CO, l.pad, l.pad, l.pad,
+                l.pad, l.stride, l.stride, inputArr, filterArr, outArr);
+}
+
+// The SCI_HE branch of Conv2DWrapper before the flat-buffer entry point.
+// neg_mod is what getRingElt computes for field elements.
+void Conv2DNested(const Layer &l, uint64_t *inputArr, uint64_t *filterArr,
+                  uint64_t *outArr) {
+  int N = 1, FW = l.FH, newH = l.newH(), newW = l.newW();
+  Vec4D inputVec(N, vector<vector<vector<uint64_t>>>(
+                        l.H, vector<vector<uint64_t>>(
+                                 l.W, vector<uint64_t>(l.CI, 0))));
+  Vec4D filterVec(l.FH, vector<vector<vector<uint64_t>>>(
+                            FW, vector<vector<uint64_t>>(
+                                    l.CI, vector<uint64_t>(l.CO, 0))));
+  Vec4D outputVec(N, vector<vector<vector<uint64_t>>>(
+                         newH, vector<vector<uint64_t>>(
+                                   newW, vector<uint64_t>(l.CO, 0))));
+  for (int i = 0; i < N; i++)
+    for (int j = 0; j < l.H; j++)
+      for (int k = 0; k < l.W; k++)
+        for (int p = 0; p < l.CI; p++)
+          inputVec[i][j][k][p] = neg_mod(
+              (int64_t)Arr4DIdxRowM(inputArr, N, l.H, l.W, l.CI, i, j, k, p),
+              (int64_t)prime_mod);
+  for (int i = 0; i < l.FH; i++)
+    for (int j = 0; j < FW; j++)
+      for (int k = 0; k < l.CI; k++)
+        for (int p = 0; p < l.CO; p++)
+          filterVec[i][j][k][p] = neg_mod(
+              (int64_t)Arr4DIdxRowM(filterArr, l.FH, FW, l.CI, l.CO, i, j, k, p),
+              (int64_t)prime_mod);
+
+  he_conv->convolution(N, l.H, l.W, l.CI, l.FH, FW, l.CO, l.pad, l.pad, l.pad,
+                       l.pad, l.stride, l.stride, inputVec, filterVec,
+                       outputVec);
+
+  for (int i = 0; i < N; i++)
+    for (int j = 0; j < newH; j++)
+      for (int k = 0; k < newW; k++)
+        for (int p = 0; p < l.CO; p++)
+          Arr4DIdxRowM(outArr, N, newH, newW, l.CO, i, j, k, p) =
+              neg_mod((int64_t)outputVec[i][j][k][p], (int64_t)prime_mod);
+}
+
+// A share of a random input, and for the server a random filter of
+// filter_precision bits, as field elements.
+void make_inputs(const Layer &l, vector<uint64_t> &input,
+                 vector<uint64_t> &filter) {
+  PRG128 prg;
+  input.resize(l.inSize());
+  filter.assign(l.filterSize(), 0);
+  prg.random_mod_p<uint64_t>(input.data(), input.size(), prime_mod);
+  if (party == SERVER) {
+    prg.random_data(filter.data(), filter.size() * sizeof(uint64_t));
+    for (uint64_t &f : filter) {
+      f = neg_mod(((int64_t)f) >> (64 - filter_precision), (int64_t)prime_mod);
+    }
+  }
+}
+
+inline int64_t signed_val(uint64_t x) {
+  return x > prime_mod / 2 ? int64_t(x - prime_mod) : int64_t(x);
+}
+
+// Cleartext convolution mod prime_mod.
+void conv_ref(const Layer &l, const uint64_t *input, const uint64_t *filter,
+              uint64_t *out) {
+  int newH = l.newH(), newW = l.newW();
+  for (int h = 0; h < newH; h++) {
+    for (int w = 0; w < newW; w++) {
+      for (int co = 0; co < l.CO; co++) {
+        int64_t acc = 0;
+        for (int fh = 0; fh < l.FH; fh++) {
+          for (int fw = 0; fw < l.FH; fw++) {
+            int ih = h * l.stride + fh - l.pad;
+            int iw = w * l.stride + fw - l.pad;
+            if (ih < 0 || ih >= l.H || iw < 0 || iw >= l.W)
+              continue;
+            for (int ci = 0; ci < l.CI; ci++) {
+              acc += signed_val(Arr3DIdxRowM(input, l.H, l.W, l.CI, ih, iw,
+                                             ci)) *
+                     signed_val(Arr4DIdxRowM(filter, l.FH, l.FH, l.CI, l.CO,
+                                             fh, fw, ci, co));
+              acc %= (int64_t)prime_mod;
+            }
+          }
+        }
+        Arr3DIdxRowM(out, newH, newW, l.CO, h, w, co) =
+            neg_mod(acc, (int64_t)prime_mod);
+      }
+    }
+  }
+}
+
+// Reveals the shares of x to the client, which gets the sum mod prime_mod.
+void reveal(vector<uint64_t> &x) {
+  if (party == SERVER) {
+    io->send_data(x.data(), x.size() * sizeof(uint64_t));
+  } else {
+    vector<uint64_t> x0(x.size());
+    io->recv_data(x0.data(), x0.size() * sizeof(uint64_t));
+    for (size_t i = 0; i < x.size(); i++) {
+      x[i] = (x[i] + x0[i]) % prime_mod;
+    }
+  }
+}
+
+// Runs both paths on the same shares. Returns false at the client if one of
+// them differs from the cleartext convolution.
+bool check_layer(const Layer &l) {
+  vector<uint64_t> input, filter;
+  make_inputs(l, input, filter);
+  vector<uint64_t> outFlat(l.outSize()), outNested(l.outSize());
+  Conv2DFlat(l, input.data(), filter.data(), outFlat.data());
+  Conv2DNested(l, input.data(), filter.data(), outNested.data());
+
+  reveal(input);
+  reveal(outFlat);
+  reveal(outNested);
+  if (party == SERVER) {
+    io->send_data(filter.data(), filter.size() * sizeof(uint64_t));
+    return true;
+  }
+  io->recv_data(filter.data(), filter.size() * sizeof(uint64_t));
+  vector<uint64_t> expected(l.outSize());
+  conv_ref(l, input.data(), filter.data(), expected.data());
+  size_t flatErrors = 0, nestedErrors = 0;
+  for (size_t i = 0; i < expected.size(); i++) {
+    flatErrors += (outFlat[i] != expected[i]);
+    nestedErrors += (outNested[i] != expected[i]);
+  }
+  cout << "  " << l.name << ": flat " << flatErrors << ", nested "
+       << nestedErrors << " wrong outputs of " << expected.size() << endl;
+  return flatErrors == 0 && nestedErrors == 0;
+}
+
+int main(int argc, char **argv) {
+  ArgMapping amap;
+  amap.arg("r", party, "Role of party: ALICE/SERVER = 1; BOB/CLIENT = 2");
+  amap.arg("port", port, "Port Number");
+  amap.arg("ip", address, "IP Address of server (ALICE)");
+  amap.arg("nt", num_threads, "Number of Threads");
+  amap.arg("ell", bitlength, "Uniform Bitwidth");
+  amap.arg("mode", mode, "Timed path: 0 nested vectors (old), 1 flat (new)");
+  amap.arg("reps", reps, "Timed calls per layer");
+  amap.arg("check", check, "Compare both paths with a cleartext conv");
+  amap.arg("fp", filter_precision, "Filter Precision");
+  amap.parse(argc, argv);
+
+  assert(party == SERVER || party == CLIENT);
+
+  StartComputation();
+
+  cout << (mode == 0 ? "Nested vector" : "Flat buffer")
+       << " path, time per conv:" << endl;
+  double total = 0;
+  for (const Layer &l : layers) {
+    vector<uint64_t> input, filter;
+    make_inputs(l, input, filter);
+    vector<uint64_t> output(l.outSize());
+    double start = instr::wall_seconds();
+    for (int r = 0; r < reps; r++) {
+      if (mode == 0)
+        Conv2DNested(l, input.data(), filter.data(), output.data());
+      else
+        Conv2DFlat(l, input.data(), filter.data(), output.data());
+    }
+    double ms = (instr::wall_seconds() - start) * 1000 / reps;
+    total += ms;
+    cout << "  " << l.name << " (" << l.H << "x" << l.W << "x" << l.CI << ", "
+         << l.FH << "x" << l.FH << "x" << l.CO << "):\t" << ms << " ms"
+         << endl;
+  }
+  cout << "Total per inference pass: " << total << " ms" << endl;
+  cout << "Peak RSS: " << instr::peak_rss_mib() << " MiB" << endl;
+
+  bool pass = true;
+  if (check) {
+    if (party == CLIENT)
+      cout << "Flat and nested outputs against a cleartext conv:" << endl;
+    for (const Layer &l : layers) {
+      pass &= check_layer(l);
+    }
+    if (party == CLIENT)
+      cout << (pass ? "PASS" : "FAIL") << endl;
+  }
+
+  EndComputation();
+  return pass ? 0 : 1;
+}
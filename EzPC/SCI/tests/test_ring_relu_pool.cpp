@@ -0,0 +1,172 @@
+/*
+Authors: Deevashwer Rathee
+Copyright:
+Copyright (c) 2021 Microsoft Research
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+*/
+
+// Per-layer overhead of the multithreaded ReLU when threads are spawned for
+// every layer (as the layers used to do) versus dispatching the chunks to the
+// persistent WorkerPool. Runs a number of back to back "layers" for a small
+// and a large ReLU size and reports the average time per layer for both.
+
+#include "Math/math-functions.h"
+#include "utils/WorkerPool.h"
+#include <fstream>
+#include <iostream>
+#include <thread>
+
+using namespace sci;
+using namespace std;
+
+#define MAX_THREADS 4
+
+int party, port = 32000;
+int num_threads = 4;
+string address = "127.0.0.1";
+
+int small_dim = 1000;
+int large_dim = 1ULL << 16;
+int num_layers = 50;
+int bw_x = 32;
+
+uint64_t mask_x = (bw_x == 64 ? -1 : ((1ULL << bw_x) - 1));
+
+sci::IOPack *iopackArr[MAX_THREADS];
+sci::OTPack *otpackArr[MAX_THREADS];
+MathFunctions *mathArr[MAX_THREADS];
+
+void relu_chunk(int tid, uint64_t *x, uint64_t *y, int dim) {
+  int chunk_size = dim / num_threads;
+  int offset = tid * chunk_size;
+  int lnum_ops = (tid == num_threads - 1) ? dim - offset : chunk_size;
+  mathArr[tid]->ReLU(lnum_ops, x + offset, y + offset, bw_x, 0);
+}
+
+long long run_spawned(uint64_t *x, uint64_t *y, int dim) {
+  auto start = clock_start();
+  for (int l = 0; l < num_layers; l++) {
+    std::thread relu_threads[num_threads];
+    for (int i = 0; i < num_threads; ++i) {
+      relu_threads[i] = std::thread(relu_chunk, i, x, y, dim);
+    }
+    for (int i = 0; i < num_threads; ++i) {
+      relu_threads[i].join();
+    }
+  }
+  return time_from(start);
+}
+
+long long run_pooled(WorkerPool &pool, uint64_t *x, uint64_t *y, int dim) {
+  auto start = clock_start();
+  for (int l = 0; l < num_layers; l++) {
+    pool.run(num_threads, [&](int i) { relu_chunk(i, x, y, dim); });
+  }
+  return time_from(start);
+}
+
+void verify(uint64_t *x, uint64_t *y, int dim) {
+  if (party == ALICE) {
+    iopackArr[0]->io->send_data(x, dim * sizeof(uint64_t));
+    iopackArr[0]->io->send_data(y, dim * sizeof(uint64_t));
+  } else { // party == BOB
+    uint64_t *x0 = new uint64_t[dim];
+    uint64_t *y0 = new uint64_t[dim];
+    iopackArr[0]->io->recv_data(x0, dim * sizeof(uint64_t));
+    iopackArr[0]->io->recv_data(y0, dim * sizeof(uint64_t));
+
+    for (int i = 0; i < dim; i++) {
+      int64_t X = signed_val(x[i] + x0[i], bw_x);
+      int64_t Y = signed_val(y[i] + y0[i], bw_x);
+      assert(Y == (X < 0 ? 0 : X));
+    }
+    delete[] x0;
+    delete[] y0;
+  }
+}
+
+int main(int argc, char **argv) {
+  /************* Argument Parsing  ************/
+  /********************************************/
+  ArgMapping amap;
+  amap.arg("r", party, "Role of party: ALICE = 1; BOB = 2");
+  amap.arg("p", port, "Port Number");
+  amap.arg("Ns", small_dim, "Number of ReLU operations in a small layer");
+  amap.arg("Nl", large_dim, "Number of ReLU operations in a large layer");
+  amap.arg("L", num_layers, "Number of layers per measurement");
+  amap.arg("nt", num_threads, "Number of threads");
+  amap.arg("ip", address, "IP Address of server (ALICE)");
+
+  amap.parse(argc, argv);
+
+  assert(num_threads <= MAX_THREADS);
+
+  /********** Setup IO and Base OTs ***********/
+  /********************************************/
+  for (int i = 0; i < num_threads; i++) {
+    iopackArr[i] = new IOPack(party, port + i, address);
+    if (i & 1) {
+      otpackArr[i] = new OTPack(iopackArr[i], 3 - party);
+      mathArr[i] = new MathFunctions(3 - party, iopackArr[i], otpackArr[i]);
+    } else {
+      otpackArr[i] = new OTPack(iopackArr[i], party);
+      mathArr[i] = new MathFunctions(party, iopackArr[i], otpackArr[i]);
+    }
+  }
+  std::cout << "All Base OTs Done" << std::endl;
+
+  WorkerPool pool(num_threads);
+  PRG128 prg;
+
+  for (int dim : {small_dim, large_dim}) {
+    uint64_t *x = new uint64_t[dim];
+    uint64_t *y = new uint64_t[dim];
+    prg.random_data(x, dim * sizeof(uint64_t));
+    for (int i = 0; i < dim; i++) {
+      x[i] &= mask_x;
+    }
+
+    iopackArr[0]->io->sync();
+    long long t_spawned = run_spawned(x, y, dim);
+    verify(x, y, dim);
+    iopackArr[0]->io->sync();
+    long long t_pooled = run_pooled(pool, x, y, dim);
+    verify(x, y, dim);
+
+    cout << "ReLU size " << dim << ", " << num_layers << " layers" << endl;
+    cout << "  Spawned threads per layer\t" << t_spawned / (1000.0 * num_layers)
+         << " ms" << endl;
+    cout << "  Worker pool per layer\t\t" << t_pooled / (1000.0 * num_layers)
+         << " ms" << endl;
+    cout << "  Saved per layer\t\t"
+         << (t_spawned - t_pooled) / (1000.0 * num_layers) << " ms" << endl;
+
+    delete[] x;
+    delete[] y;
+  }
+  if (party == BOB) {
+    cout << "ReLU Tests Passed" << endl;
+  }
+
+  /******************* Cleanup ****************/
+  /********************************************/
+  for (int i = 0; i < num_threads; i++) {
+    delete mathArr[i];
+    delete iopackArr[i];
+    delete otpackArr[i];
+  }
+}
@@ -0,0 +1,156 @@
+/*
+Authors: Nishant Kumar, Deevashwer Rathee
+Copyright:
+Copyright (c) 2021 Microsoft Research
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+*/
+
+// Cost of the scratch buffers of a ReLU + truncation layer on ResNet-50
+// activation sizes, with new[]/delete[] per layer (as before) and with the
+// scratch arena. The protocol itself is not run; each buffer is written once,
+// which is what the layer does with it. Reports time and page faults per
+// layer for two passes over the network (the arena grows during the first).
+//   ./test_ring_scratch mode=0   (new[]/delete[])
+//   ./test_ring_scratch mode=1   (scratch arena)
+//   SCI_SCRATCH_PREFAULT=1 SCI_SCRATCH_MB=512 ./test_ring_scratch mode=1
+
+#include "scratch.h"
+#include "utils/ArgMapping/ArgMapping.h"
+#include <chrono>
+#include <cstdint>
+#include <iostream>
+#include <sys/resource.h>
+
+using namespace std;
+
+struct Layer {
+  const char *name;
+  int64_t size;
+};
+
+// clang-format off
+Layer layers[] = {
+    {"conv1 relu",   1 * 112 * 112 *   64},
+    {"res2 relu",    1 *  56 *  56 *  256},
+    {"res3 relu",    1 *  28 *  28 *  512},
+    {"res4 relu",    1 *  14 *  14 * 1024},
+    {"res5 relu",    1 *   7 *   7 * 2048},
+};
+// clang-format on
+
+int mode = 1;
+int passes = 2;
+uint64_t checksum = 0;
+
+uint64_t page_faults() {
+  struct rusage usage;
+  getrusage(RUSAGE_SELF, &usage);
+  return usage.ru_minflt + usage.ru_majflt;
+}
+
+template <typename T> void touch(T *buf, int64_t n) {
+  for (int64_t i = 0; i < n; i++)
+    buf[i] = (T)i;
+  checksum += buf[n - 1];
+}
+
+// Buffers of Relu and of funcTruncateTwoPowerRing (BOB side).
+void layer_heap(int64_t size) {
+  uint8_t *msbShare = new uint8_t[size];
+  uint64_t *tempOutp = new uint64_t[size];
+  uint64_t *carryBitCompArr = new uint64_t[size];
+  uint8_t *carryBitCompAns = new uint8_t[size];
+  uint64_t *otRecvMsg1oo4 = new uint64_t[size];
+  uint8_t *choiceBits = new uint8_t[size];
+  uint64_t *otRecvMsg1oo2 = new uint64_t[size];
+  uint8_t *choiceBits1oo2OT = new uint8_t[size];
+  touch(msbShare, size);
+  touch(tempOutp, size);
+  touch(carryBitCompArr, size);
+  touch(carryBitCompAns, size);
+  touch(otRecvMsg1oo4, size);
+  touch(choiceBits, size);
+  touch(otRecvMsg1oo2, size);
+  touch(choiceBits1oo2OT, size);
+  delete[] msbShare;
+  delete[] tempOutp;
+  delete[] carryBitCompArr;
+  delete[] carryBitCompAns;
+  delete[] otRecvMsg1oo4;
+  delete[] choiceBits;
+  delete[] otRecvMsg1oo2;
+  delete[] choiceBits1oo2OT;
+}
+
+void layer_arena(int64_t size) {
+  scratch::Frame relu;
+  uint8_t *msbShare = relu.alloc<uint8_t>(size);
+  uint64_t *tempOutp = relu.alloc<uint64_t>(size);
+  touch(msbShare, size);
+  touch(tempOutp, size);
+  scratch::Frame trunc;
+  uint64_t *carryBitCompArr = trunc.alloc<uint64_t>(size);
+  uint8_t *carryBitCompAns = trunc.alloc<uint8_t>(size);
+  uint64_t *otRecvMsg1oo4 = trunc.alloc<uint64_t>(size);
+  uint8_t *choiceBits = trunc.alloc<uint8_t>(size);
+  uint64_t *otRecvMsg1oo2 = trunc.alloc<uint64_t>(size);
+  uint8_t *choiceBits1oo2OT = trunc.alloc<uint8_t>(size);
+  touch(carryBitCompArr, size);
+  touch(carryBitCompAns, size);
+  touch(otRecvMsg1oo4, size);
+  touch(choiceBits, size);
+  touch(otRecvMsg1oo2, size);
+  touch(choiceBits1oo2OT, size);
+}
+
+int main(int argc, char **argv) {
+  ArgMapping amap;
+  amap.arg("mode", mode, "0: new[]/delete[] (old), 1: scratch arena (new)");
+  amap.arg("passes", passes, "Passes over the network");
+  amap.parse(argc, argv);
+
+  scratch::init();
+  cout << (mode == 0 ? "new[]/delete[]" : "Scratch arena")
+       << ", per layer:" << endl;
+  for (int pass = 0; pass < passes; pass++) {
+    double total_ms = 0;
+    uint64_t total_faults = 0;
+    for (const Layer &l : layers) {
+      uint64_t faults = page_faults();
+      auto start = chrono::high_resolution_clock::now();
+      if (mode == 0)
+        layer_heap(l.size);
+      else
+        layer_arena(l.size);
+      chrono::duration<double, milli> elapsed =
+          chrono::high_resolution_clock::now() - start;
+      faults = page_faults() - faults;
+      total_ms += elapsed.count();
+      total_faults += faults;
+      cout << "  pass " << pass << " " << l.name << " (" << l.size
+           << "):\t" << elapsed.count() << " ms, " << faults
+           << " page faults" << endl;
+    }
+    cout << "Pass " << pass << ": " << total_ms << " ms, " << total_faults
+         << " page faults" << endl;
+  }
+  const scratch::Stats &stats = scratch::local().get_stats();
+  cout << "Arena: " << (stats.capacity >> 20) << " MiB, peak "
+       << (stats.peak >> 20) << " MiB, " << stats.heap_allocs
+       << " heap fallbacks" << endl;
+  cout << "(checksum " << checksum << ")" << endl;
+}
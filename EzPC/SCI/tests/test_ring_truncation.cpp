@@ -111,6 +111,90 @@ void trunc(bool signed_arithmetic = true) {
   }
 }
 
+void trunc_inplace(bool signed_arithmetic = true) {
+  uint64_t *inA = new uint64_t[dim];
+  uint64_t *inA_copy = new uint64_t[dim];
+
+  prg.random_data(inA, dim * sizeof(uint64_t));
+
+  for (int i = 0; i < dim; i++) {
+    inA[i] &= mask_bw;
+    inA_copy[i] = inA[i];
+  }
+
+  trunc_oracle->truncate_inplace(dim, inA, shift, bw, signed_arithmetic,
+                                 nullptr);
+
+  if (party == ALICE) {
+    uint64_t *inA_bob = new uint64_t[dim];
+    uint64_t *outB_bob = new uint64_t[dim];
+    iopack->io->recv_data(inA_bob, sizeof(uint64_t) * dim);
+    iopack->io->recv_data(outB_bob, sizeof(uint64_t) * dim);
+    for (int i = 0; i < dim; i++) {
+      inA_copy[i] = (inA_copy[i] + inA_bob[i]) & mask_bw;
+      inA[i] = (inA[i] + outB_bob[i]) & mask_bw;
+    }
+    cout << "Testing for correctness..." << endl;
+    for (int i = 0; i < dim; i++) {
+      if (signed_arithmetic) {
+        assert((signed_val(inA_copy[i], bw) >> shift) ==
+               signed_val(inA[i], bw));
+      } else {
+        assert((inA_copy[i] >> shift) == inA[i]);
+      }
+    }
+    cout << "Correct!" << endl;
+  } else { // BOB
+    iopack->io->send_data(inA_copy, sizeof(uint64_t) * dim);
+    iopack->io->send_data(inA, sizeof(uint64_t) * dim);
+  }
+}
+
+// Inputs known to be non-negative, as after a ReLU. BOB picks the secrets
+// and deals ALICE her shares.
+void trunc_msb0() {
+  uint64_t *inA = new uint64_t[dim];
+  uint64_t *outB = new uint64_t[dim];
+
+  if (party == ALICE) {
+    iopack->io->recv_data(inA, sizeof(uint64_t) * dim);
+  } else { // BOB
+    uint64_t *x = new uint64_t[dim];
+    prg.random_data(x, dim * sizeof(uint64_t));
+    prg.random_data(inA, dim * sizeof(uint64_t));
+    uint64_t *inA_alice = new uint64_t[dim];
+    for (int i = 0; i < dim; i++) {
+      x[i] &= (mask_bw >> 1);
+      inA[i] &= mask_bw;
+      inA_alice[i] = (x[i] - inA[i]) & mask_bw;
+    }
+    iopack->io->send_data(inA_alice, sizeof(uint64_t) * dim);
+    delete[] x;
+    delete[] inA_alice;
+  }
+
+  trunc_oracle->truncate_msb0(dim, inA, outB, shift, bw);
+
+  if (party == ALICE) {
+    uint64_t *inA_bob = new uint64_t[dim];
+    uint64_t *outB_bob = new uint64_t[dim];
+    iopack->io->recv_data(inA_bob, sizeof(uint64_t) * dim);
+    iopack->io->recv_data(outB_bob, sizeof(uint64_t) * dim);
+    for (int i = 0; i < dim; i++) {
+      inA[i] = (inA[i] + inA_bob[i]) & mask_bw;
+      outB[i] = (outB[i] + outB_bob[i]) & mask_bw;
+    }
+    cout << "Testing for correctness..." << endl;
+    for (int i = 0; i < dim; i++) {
+      assert((inA[i] >> shift) == outB[i]);
+    }
+    cout << "Correct!" << endl;
+  } else { // BOB
+    iopack->io->send_data(inA, sizeof(uint64_t) * dim);
+    iopack->io->send_data(outB, sizeof(uint64_t) * dim);
+  }
+}
+
 void div_pow2(bool signed_arithmetic = true) {
   uint64_t *inA = new uint64_t[dim];
   uint64_t *outB = new uint64_t[dim];
@@ -178,6 +262,14 @@ int main(int argc, char **argv) {
 
   cout << "<><><><> (Signed) Truncate <><><><>" << endl;
   trunc(true);
+  cout << "<><><><> (Signed) Truncate in place <><><><>" << endl;
+  trunc_inplace(true);
+  cout << "<><><><> Truncate (MSB = 0) <><><><>" << endl;
+  num_rounds = iopack->get_rounds();
+  trunc_msb0();
+  num_rounds = iopack->get_rounds() - num_rounds;
+  cout << "Num rounds (LRS, MSB = 0): " << num_rounds << endl;
+
   cout << "<><><><> (Unsigned) Division by power of 2 <><><><>" << endl;
   num_rounds = iopack->get_rounds();
   div_pow2(false);
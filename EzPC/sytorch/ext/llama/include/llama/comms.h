@@ -39,6 +39,7 @@ SOFTWARE.
 #include <stdio.h>
 #include <string.h>
 #include <fstream>
+#include <vector>
 
 #define DEALER 1
 #define SERVER 2
@@ -49,8 +50,11 @@ public:
     int sendsocket, recvsocket;
     bool useFile = false;
     std::fstream file;
+    std::string filename;
     uint64_t bytesSent = 0;
     uint64_t bytesReceived = 0;
+    // end offsets of the key segments written so far (file mode)
+    std::vector<uint64_t> segments;
     
 
     Peer(std::string ip, int port);
@@ -60,11 +64,15 @@ public:
     }
     Peer(std::string filename) {
         this->useFile = true;
+        this->filename = filename;
         this->file.open(filename, std::ios::out | std::ios::binary);
     }
 
     void close();
 
+    // Ends the key segment of a layer (file mode), see comms.cpp
+    void end_segment();
+
     void send_ge(const GroupElement &g, int bw);
     void send_ge_array(const GroupElement *g, int size);
 
@@ -158,6 +166,15 @@ public:
     char *ramdiskStart;
     int ramdiskSize;
     bool ramdisk_path = false;
+    // Layer-sliced keys (file mode), see comms.cpp: end offsets of the
+    // segments from <filename>.idx, empty if the keys are one bundle
+    std::vector<uint64_t> segments;
+    size_t segment = 0;
+    size_t prefetched = 0;
+    uint64_t released = 0;
+    size_t readahead = 2;
+    bool punch = false;
+    int keyfd = -1;
 
     Dealer(std::string ip, int port);
 
@@ -165,12 +182,15 @@ public:
         this->useFile = true;
         this->ramdisk = ramdisk;
         this->ramdisk_path = ramdisk_path;
+        open_segments(filename);
         if (ramdisk && ramdisk_path) {
             int fd = open(filename.c_str(), O_RDWR | O_CREAT, 0);
             struct stat sb;
             fstat(fd, &sb);
             std::cerr << "Key Size: " << sb.st_size << " bytes" << "\n";
-            int advise=posix_fadvise(fd, 0, sb.st_size, POSIX_FADV_WILLNEED);
+            if (segments.empty()) {
+                int advise=posix_fadvise(fd, 0, sb.st_size, POSIX_FADV_WILLNEED);
+            }
             ramdiskSize = sb.st_size;
             ramdiskBuffer = (char*)mmap(NULL, sb.st_size, PROT_READ, MAP_PRIVATE, fd, 0);
             ramdiskStart = ramdiskBuffer;
@@ -184,6 +204,10 @@ public:
 
     void close();
 
+    // Called after every layer: releases the key segments read so far and
+    // reads ahead the next ones
+    void next_segment();
+
     GroupElement recv_mask();
 
     MultKey recv_mult_key();
@@ -260,4 +284,9 @@ public:
 
     TripleKeyPack recv_triple_key(int bw, int64_t na, int64_t nb, int64_t nc);
 
+private:
+    void open_segments(const std::string &filename);
+    uint64_t read_offset();
+    void prefetch_segments();
+    void release_keys(uint64_t upto);
 };
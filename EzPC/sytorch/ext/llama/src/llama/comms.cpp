@@ -21,6 +21,7 @@ SOFTWARE.
 
 #include <llama/comms.h>
 #include <llama/assert.h>
+#include <algorithm>
 
 using namespace LlamaConfig;
 
@@ -70,9 +71,51 @@ Peer::Peer(std::string ip, int port) {
 
 }
 
+// Layer-sliced key files. In file mode the dealer ends a key segment after
+// every layer (Peer::end_segment) and writes the end offsets of the segments
+// to <file>.idx next to the keys. An online party that finds the index does
+// not ask for the whole key file up front: it reads ahead the next
+// LLAMA_KEY_READAHEAD segments (default 2) and drops every segment it has
+// read once its layer is done (Dealer::next_segment), so only a few layers'
+// keys are resident at a time. Dropped pages of a key file on disk are read
+// again if touched. A key file on the tmpfs ramdisk stays in memory until it
+// is removed, so LLAMA_KEY_RELEASE=punch punches the read segments out of the
+// file instead; keys are single use, but the file cannot be rerun after that.
+// LLAMA_KEY_SEGMENTS=0 writes and reads one key bundle per file as before.
+
+static const char keyIndexMagic[8] = {'L', 'L', 'A', 'M', 'A', 'I', 'D', 'X'};
+
+static bool keySegmentsEnabled() {
+    const char *env = getenv("LLAMA_KEY_SEGMENTS");
+    return env == nullptr || strcmp(env, "0") != 0;
+}
+
+void Peer::end_segment() {
+    if (!useFile || !keySegmentsEnabled()) {
+        return;
+    }
+    uint64_t end = file.tellp();
+    if (segments.empty() || end > segments.back()) {
+        segments.push_back(end);
+    }
+}
+
 void Peer::close() {
     if (useFile) {
+        end_segment();
         file.close();
+        std::string index = filename + ".idx";
+        if (segments.size() > 1) {
+            std::ofstream idx(index, std::ios::out | std::ios::binary);
+            uint64_t count = segments.size();
+            idx.write(keyIndexMagic, sizeof(keyIndexMagic));
+            idx.write((char *)&count, sizeof(count));
+            idx.write((char *)segments.data(), count * sizeof(uint64_t));
+        }
+        else {
+            // a stale index would not match the new keys
+            remove(index.c_str());
+        }
     }
     else {
         ::close(sendsocket);
@@ -740,7 +783,101 @@ Dealer::Dealer(std::string ip, int port) {
     }
 }
 
+void Dealer::open_segments(const std::string &filename) {
+    if (filename.empty() || !keySegmentsEnabled()) {
+        return;
+    }
+    std::ifstream idx(filename + ".idx", std::ios::in | std::ios::binary);
+    if (!idx) {
+        return;
+    }
+    char magic[sizeof(keyIndexMagic)];
+    uint64_t count = 0;
+    idx.read(magic, sizeof(magic));
+    idx.read((char *)&count, sizeof(count));
+    if (!idx || memcmp(magic, keyIndexMagic, sizeof(magic)) != 0 || count == 0 || count > (1ULL << 32)) {
+        std::cerr << "Ignoring malformed key index " << filename << ".idx" << "\n";
+        return;
+    }
+    std::vector<uint64_t> ends(count);
+    idx.read((char *)ends.data(), count * sizeof(uint64_t));
+    bool valid = (bool)idx;
+    for (uint64_t i = 1; valid && i < count; ++i) {
+        valid = ends[i - 1] <= ends[i];
+    }
+
+    const char *release = getenv("LLAMA_KEY_RELEASE");
+    punch = (release != nullptr && strcmp(release, "punch") == 0);
+    int fd = open(filename.c_str(), punch ? O_RDWR : O_RDONLY);
+    struct stat sb;
+    if (!valid || fd < 0 || fstat(fd, &sb) != 0 || ends.back() != (uint64_t)sb.st_size) {
+        std::cerr << "Key index " << filename << ".idx does not match the keys, reading them as one bundle" << "\n";
+        if (fd >= 0) {
+            ::close(fd);
+        }
+        punch = false;
+        return;
+    }
+    if (const char *env = getenv("LLAMA_KEY_READAHEAD")) {
+        readahead = std::max(1ULL, strtoull(env, nullptr, 10));
+    }
+    keyfd = fd;
+    segments = std::move(ends);
+    std::cerr << "Key segments: " << segments.size() << ", read ahead " << readahead << "\n";
+    prefetch_segments();
+}
+
+uint64_t Dealer::read_offset() {
+    if (ramdisk && ramdisk_path) {
+        return ramdiskBuffer - ramdiskStart;
+    }
+    return file.tellg();
+}
+
+void Dealer::prefetch_segments() {
+    size_t last = std::min(segments.size(), segment + readahead);
+    for (; prefetched < last; ++prefetched) {
+        uint64_t start = prefetched == 0 ? 0 : segments[prefetched - 1];
+        posix_fadvise(keyfd, start, segments[prefetched] - start, POSIX_FADV_WILLNEED);
+    }
+}
+
+void Dealer::release_keys(uint64_t upto) {
+    static const uint64_t page = sysconf(_SC_PAGESIZE);
+    upto = upto / page * page;
+    if (upto <= released) {
+        return;
+    }
+    uint64_t len = upto - released;
+    if (ramdisk && ramdisk_path) {
+        madvise(ramdiskStart + released, len, MADV_DONTNEED);
+    }
+    posix_fadvise(keyfd, released, len, POSIX_FADV_DONTNEED);
+    if (punch) {
+        fallocate(keyfd, FALLOC_FL_PUNCH_HOLE | FALLOC_FL_KEEP_SIZE, released, len);
+    }
+    released = upto;
+}
+
+void Dealer::next_segment() {
+    if (segments.empty()) {
+        return;
+    }
+    // The read offset, not the number of calls, decides which segments are
+    // done, so layers without keys need no segment of their own.
+    uint64_t pos = read_offset();
+    while (segment < segments.size() && segments[segment] <= pos) {
+        ++segment;
+    }
+    release_keys(segment == 0 ? 0 : segments[segment - 1]);
+    prefetch_segments();
+}
+
 void Dealer::close() {
+    if (keyfd >= 0) {
+        ::close(keyfd);
+        keyfd = -1;
+    }
     if (useFile) {
         if (!ramdisk && ramdisk_path) {
             file.close();
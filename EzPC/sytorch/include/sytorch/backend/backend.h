@@ -78,9 +78,21 @@ public:
     virtual void addbias(Tensor<T> &x, const Tensor1D<T> &bias) NOT_IMPLEMENTED;
     virtual void scalarmul(Tensor<T> &x, T scalar, Tensor<T> &y) NOT_IMPLEMENTED;
 
+    // called by Layer::forward after every layer
+    virtual void endLayer()
+    {
+
+    }
+
     virtual void optimize(LayerGraphNode<T> *root)
     {
         
     }
 
+    // inputShape (NHWC) lets the graph passes estimate their savings
+    virtual void optimize(LayerGraphNode<T> *root, const std::vector<u64> &inputShape)
+    {
+        optimize(root);
+    }
+
 };
@@ -83,6 +83,19 @@ public:
 		}
     }
 
+    // The dealer ends a key segment per layer, the online parties release
+    // the keys of the layer (see comms.cpp)
+    void endLayer()
+    {
+        if (LlamaConfig::party == 1) {
+            LlamaConfig::server->end_segment();
+            LlamaConfig::client->end_segment();
+        }
+        else {
+            LlamaConfig::dealer->next_segment();
+        }
+    }
+
     void initializeInferencePartyB(Tensor<T>&data){
         u64 size = data.size();
         if(LlamaConfig::party == 1){
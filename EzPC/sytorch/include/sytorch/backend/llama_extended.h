@@ -1,5 +1,6 @@
 #pragma once
 #include <sytorch/backend/llama_base.h>
+#include <sytorch/passes.h>
 
 template <typename T>
 class Sequential;
@@ -200,32 +201,18 @@ public:
     }
 
 
-    void doOptimize(LayerGraphNode<T> *node, LayerGraphNode<T> *root)
+    void optimize(LayerGraphNode<T> *root)
     {
-        if (node->layer->doTruncationForward) {
-            if (node->children.size() == 1) {
-                // std::cout << "yeah.." << "\n";
-                LayerGraphNode<T> *child = node->children[0];
-                if (child->layer->doTruncationForward) {
-                    // no optimization possible
-                    // this is set to true for FC, Conv2D and BatchNormInference
-                }
-                else {
-                    if (child->layer->name == "MaxPool2D" || child->layer->name == "ReLU") {
-                        // optimize
-                        node->layer->doTruncationForward = false;
-                        child->layer->doTruncationForward = true;
-                    }
-                }
-            }
-        }
+        optimize(root, {});
     }
 
-    void optimize(LayerGraphNode<T> *root)
+    void optimize(LayerGraphNode<T> *root, const std::vector<u64> &inputShape)
     {
-        topologicalApply(root, [&](LayerGraphNode<T> *n, LayerGraphNode<T> *r) {
-            doOptimize(n, r);
-        });
+        PassManager<T> passes;
+        passes.cost.bitlength = LlamaConfig::bitlength;
+        passes.addDefaultPasses();
+        passes.run(root, inputShape);
+        passes.print(std::cerr);
     }
 
 };
@@ -21,6 +21,7 @@ public:
     int forwardTruncationMode = 0;
     bool useBias = true;
     bool isTrainingMode = false;
+    bool isIdentity = false; // set by graph passes (sytorch/passes.h): forward only copies the input
     std::string paramstring  = "";
 
     LayerGraphNode<T> *node = nullptr;
@@ -89,18 +90,27 @@ public:
         node->currTensor = &activation;
         activation.graphNode = node;
 
-        if (doPreSignExtension) {
-            for(auto &i : a) {
-                this->backend->signext(*i, scale);
+        if (isIdentity) {
+            always_assert(a.size() == 1 && a[0]->size() == activation.size());
+            for (u64 i = 0; i < activation.size(); ++i) {
+                activation.data[i] = a[0]->data[i];
+            }
+        }
+        else {
+            if (doPreSignExtension) {
+                for(auto &i : a) {
+                    this->backend->signext(*i, scale);
+                }
             }
+            _forward(a);
         }
-        _forward(a);
         if (doTruncationForward) {
             this->backend->truncateForward(activation, scale, forwardTruncationMode);
         }
         if (doPostSignExtension) {
             this->backend->signext(activation, scale);
         }
+        this->backend->endLayer();
         for(auto &i : a) {
             i->graphNode->incrementAndGc();
         }
@@ -283,6 +293,10 @@ template <typename T>
 class AvgPool2D : public Layer<T> {
 public:
     u64 ks, padding, stride;
+    // Truncation of the input moved here by SinkTruncation: the input is at
+    // scale + inputShift and the division by ks * ks (a power of 2) shifts
+    // it away together with the rest.
+    u64 inputShift = 0;
 
     AvgPool2D(u64 ks, u64 padding = 0, u64 _stride = 0) : Layer<T>("AvgPool2D"), ks(ks), padding(padding), stride(_stride == 0 ? ks : _stride) {}
 
@@ -296,7 +310,16 @@ public:
         always_assert(a.shape.size() == 4);
         auto act_4d = this->activation.as_4d();
         auto a_4d = a.as_4d();
-        this->backend->avgPool2D(ks, padding, stride, a_4d, act_4d, this->scale);
+        if (inputShift > 0) {
+            always_assert((ks * ks & (ks * ks - 1)) == 0);
+            u64 logks2 = 0;
+            while ((1ULL << logks2) < ks * ks) logks2++;
+            this->backend->sumPool2D(ks, padding, stride, a_4d, act_4d);
+            this->backend->truncate(this->activation, logks2 + inputShift);
+        }
+        else {
+            this->backend->avgPool2D(ks, padding, stride, a_4d, act_4d, this->scale);
+        }
     }
 
     std::vector<u64> get_output_dims(const std::vector<std::vector<u64>> &inShapes) {
@@ -341,18 +364,33 @@ class MaxPool2D : public Layer<T> {
 public:
     u64 ks, padding, stride;
     Tensor4D<u64> maxIndex;
+    // ReLU moved after the pooling by ReorderReluMaxPool
+    bool doReluForward = false;
+    int reluMode = 0;
+    Tensor<T> pooled;
+    Tensor<T> drelu;
 
-    MaxPool2D(u64 ks, u64 padding = 0, u64 _stride = 0) : Layer<T>("MaxPool2D"), ks(ks), padding(padding), stride(_stride == 0 ? ks : _stride), maxIndex(0,0,0,0) {}
+    MaxPool2D(u64 ks, u64 padding = 0, u64 _stride = 0) : Layer<T>("MaxPool2D"), ks(ks), padding(padding), stride(_stride == 0 ? ks : _stride), maxIndex(0,0,0,0), pooled({0}), drelu({0}) {}
 
     void _resize(const std::vector<std::vector<u64>> &shapes) {
         always_assert(shapes.size() == 1);
         auto &shape = shapes[0];
         always_assert(shape.size() == 4);
         this->maxIndex.resize(this->activation.shape);
+        if (doReluForward) {
+            this->pooled.resize(this->activation.shape);
+            this->drelu.resize(this->activation.shape);
+        }
     }
 
     void _forward(Tensor<T> &a) {
         auto a_4d = a.as_4d();
+        if (doReluForward) {
+            auto pooled_4d = this->pooled.as_4d();
+            this->backend->maxPool2D(ks, padding, stride, a_4d, pooled_4d, maxIndex, this->scale, this->mode);
+            this->backend->relu(this->pooled, this->activation, this->drelu, this->scale, reluMode);
+            return;
+        }
         auto act_4d = this->activation.as_4d();
         this->backend->maxPool2D(ks, padding, stride, a_4d, act_4d, maxIndex, this->scale, this->mode);
     }
@@ -545,6 +583,10 @@ class BatchNormInference : public Layer<T> {
 public:
     Tensor1D<T> A; // scale = s
     Tensor1D<T> B; // scale = 2s
+    // Set by FoldBatchNorm: A and B are folded into the weights and bias of
+    // this layer when the weights are loaded, and this one is an identity.
+    Layer<T> *foldedInto = nullptr;
+    bool foldedIntoUseBias = false; // whether the weights file has a bias for it
 
     BatchNormInference(u64 channels) : Layer<T>("BatchNormInference"), A(channels), B(channels) {
         this->A.fill(0);
@@ -570,8 +612,8 @@ public:
         }
     }
 
-    TensorRef<T> getweights() { return A.ref(); }
-    TensorRef<T> getbias() { return B.ref(); }
+    TensorRef<T> getweights() { return foldedInto ? TensorRef<T>(nullptr, 0) : A.ref(); }
+    TensorRef<T> getbias() { return foldedInto ? TensorRef<T>(nullptr, 0) : B.ref(); }
 
     std::vector<u64> get_output_dims(const std::vector<std::vector<u64>> &inShapes) {
         always_assert(inShapes.size() == 1);
@@ -580,6 +622,16 @@ public:
         always_assert(inShape.back() == this->A.d1);
         return inShape;
     }
+
+    // The BatchNormInference folded into the layer of node, if any
+    static BatchNormInference<T> *foldedChild(LayerGraphNode<T> *node) {
+        for (auto &child : node->children) {
+            if (child->layer->name == "BatchNormInference" && ((BatchNormInference<T> *)child->layer)->foldedInto == node->layer) {
+                return (BatchNormInference<T> *)child->layer;
+            }
+        }
+        return nullptr;
+    }
 };
 
 template <typename T>
@@ -1054,7 +1106,21 @@ public:
         always_assert(shape.size() >= 2);
     }
 
+    // perm is in NCHW terms, tensors are NHWC
+    std::vector<u64> nhwcPerm() const {
+        std::vector<u64> p = perm;
+        for (auto &i : p)
+        {
+            if (i == 1)
+                i = p.size() - 1;
+            else if (i > 1)
+                i -= 1;
+        }
+        return p;
+    }
+
     void _forward(Tensor<T> &a) {
+        auto perm = nhwcPerm();
         if (a.shape.size() == 2)
         {
 #pragma omp parallel for collapse(2)
@@ -1124,15 +1190,8 @@ public:
         always_assert(inShapes.size() == 1);
         auto shape = inShapes[0];
         always_assert(perm.size() == shape.size());
-        for (auto &p : perm)
-        {
-            if (p == 1)
-                p = shape.size() - 1;
-            else if (p > 1)
-                p -= 1;
-        }
         std::vector<u64> outShape;
-        for (auto &p : perm)
+        for (auto &p : nhwcPerm())
         {
             outShape.push_back(shape[p]);
         }
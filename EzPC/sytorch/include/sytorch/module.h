@@ -7,6 +7,34 @@
 #include <sys/stat.h>
 #include <fcntl.h>
 #include <unistd.h>
+#include <cstring>
+
+// Layout of a fixed-point weights snapshot (SytorchModule::save_snapshot).
+// Offsets are in bytes from the start of the file, 64 byte aligned.
+#define SNAPSHOT_MAGIC "SYTSNAP"
+#define SNAPSHOT_VERSION 1
+
+struct SnapshotHeader {
+    char magic[8];
+    uint32_t version = SNAPSHOT_VERSION;
+    uint32_t elemSize; // sizeof(T)
+    u64 scale;
+    u64 bitlength;
+    u64 numEntries; // one per node in execution order
+    u64 size;       // of the whole file
+};
+
+struct SnapshotEntry {
+    char name[40];  // layer name
+    u64 numWeights;
+    u64 numBias;
+    u64 offset;
+};
+
+inline u64 snapshotAlign(u64 offset)
+{
+    return (offset + 63) / 64 * 64;
+}
 
 template <typename T>
 class SytorchModule {
@@ -119,7 +147,9 @@ public:
             return this->_forward(input);
         }
 
-        if (input.graphNode == nullptr) { // when the module is a top level module
+        // when the module is a top level module (root again from the
+        // previous forward of the same input tensor)
+        if (input.graphNode == nullptr || input.graphNode == root) {
             topologicalApply(root, [](LayerGraphNode<T> *node, LayerGraphNode<T> *_root) {
                 node->numUsages = 0;
             });
@@ -140,12 +170,48 @@ public:
         }
     }
 
-    void optimize()
+    void optimize(const std::vector<u64> &inputShape = {})
+    {
+        backend->optimize(root, inputShape);
+    }
+
+    // Parameters of a node as loaded: {weights, bias}. BatchNorm stores its
+    // A and B there (nothing once folded, see FoldBatchNorm).
+    static std::pair<u64, u64> paramCounts(Layer<T> *layer)
     {
-        backend->optimize(root);
+        return {layer->getweights().size, layer->useBias ? layer->getbias().size : 0};
     }
 
-    void load(const std::string weightsFile)
+    // Loads the float weights written by OnnxBridge. If a valid snapshot of
+    // them exists next to the file (weightsFile + ".snap", see
+    // save_snapshot), it is loaded instead, skipping the conversion.
+    // weightsFile can also be a snapshot itself. bitlength is the ring the
+    // weights are used in (LLAMA's LlamaConfig::bitlength, say); snapshots
+    // written for another bitlength are not loaded.
+    //  - SYTORCH_SNAPSHOT=0 ignores snapshots.
+    //  - SYTORCH_SNAPSHOT=write writes the snapshot after a float load.
+    void load(const std::string weightsFile, u64 bitlength = 8 * sizeof(T))
+    {
+        const char *mode = getenv("SYTORCH_SNAPSHOT");
+        bool useSnapshot = (mode == nullptr || strcmp(mode, "0") != 0);
+        if (useSnapshot && isSnapshot(weightsFile)) {
+            always_assert(load_snapshot(weightsFile, bitlength));
+            return;
+        }
+        std::string snapshotFile = weightsFile + ".snap";
+        if (useSnapshot && std::filesystem::exists(snapshotFile) &&
+            std::filesystem::last_write_time(snapshotFile) >= std::filesystem::last_write_time(weightsFile) &&
+            load_snapshot(snapshotFile, bitlength)) {
+            return;
+        }
+
+        load_float(weightsFile);
+        if (mode != nullptr && strcmp(mode, "write") == 0) {
+            save_snapshot(snapshotFile, bitlength);
+        }
+    }
+
+    void load_float(const std::string weightsFile)
     {
         size_t size_in_bytes = std::filesystem::file_size(weightsFile);
         always_assert(size_in_bytes % 4 == 0); // as it's float
@@ -168,25 +234,52 @@ public:
         ::close(fd1);
         u64 scale = this->scale;
         
+        // Offsets of every node first, so the conversion can run in parallel.
+        // The file is laid out for the graph as built, before FoldBatchNorm.
+        std::vector<size_t> offsets(allNodesInExecutionOrder.size());
+        std::map<Layer<T> *, size_t> offsetOf;
         size_t wIdx = 0;
-        for (auto &node: allNodesInExecutionOrder) {
+        for (size_t i = 0; i < allNodesInExecutionOrder.size(); ++i) {
+            offsets[i] = wIdx;
+            auto layer = allNodesInExecutionOrder[i]->layer;
+            offsetOf[layer] = wIdx;
+            if (layer->name == "BatchNormInference") {
+                wIdx += 4 * ((BatchNormInference<T>*) layer)->A.d1;
+            }
+            else {
+                auto bn = BatchNormInference<T>::foldedChild(allNodesInExecutionOrder[i]);
+                bool fileBias = bn ? bn->foldedIntoUseBias : layer->useBias;
+                wIdx += layer->getweights().size + (fileBias ? layer->getbias().size : 0);
+            }
+        }
+        always_assert(wIdx == numParameters);
+
+        for (size_t i = 0; i < allNodesInExecutionOrder.size(); ++i) {
             
-            auto layer = node->layer;
+            auto layer = allNodesInExecutionOrder[i]->layer;
+            size_t wIdx = offsets[i];
             if (layer->name == "BatchNormInference") {
                 auto bn = (BatchNormInference<T>*) layer;
+                if (bn->foldedInto) {
+                    continue; // read with the layer it is folded into
+                }
                 auto channel = bn->A.d1;
                 auto gammaPtr = floatWeights + wIdx;
                 auto betaPtr = floatWeights + wIdx + channel;
                 auto meanPtr = floatWeights + wIdx + 2 * channel;
                 auto varPtr = floatWeights + wIdx + 3 * channel;
+                #pragma omp parallel for
                 for (int j = 0; j < channel; ++j) {
                     bn->A(j) = type_cast<T>((gammaPtr[j] / std::sqrt(varPtr[j])) * (1LL << scale));
                     bn->B(j) = type_cast<T>((betaPtr[j] - gammaPtr[j] * meanPtr[j] / std::sqrt(varPtr[j])) * (1LL << (2 * scale)));
                 }
-                wIdx += 4 * channel;
+            }
+            else if (auto bn = BatchNormInference<T>::foldedChild(allNodesInExecutionOrder[i])) {
+                loadFolded(layer, bn, floatWeights + wIdx, floatWeights + offsetOf[bn]);
             }
             else {
                 auto weights = layer->getweights();
+                #pragma omp parallel for
                 for (u64 j = 0; j < weights.size; j++) {
                     weights.data[j] = type_cast<T>(floatWeights[wIdx + j] * (1LL << scale));
                 }
@@ -197,25 +290,193 @@ public:
                 auto bias = layer->getbias();
                 if (layer->useBias) {
 
+                    #pragma omp parallel for
                     for (u64 j = 0; j < bias.size; ++j) {
                         bias.data[j] = type_cast<T>(floatWeights[wIdx + j] * (float)(1LL << (2*scale)));
                     }
-
-                    wIdx += bias.size;
                 }
                 else {
                     bias.zero();
                 }
             }
         }
-        
-        always_assert(wIdx == numParameters);
     
         //delete floatWeights;
         munmap(floatWeights, buffersize);
        
     }
 
+    // Weights and bias of a Conv2D/Conv3D/FC with a BatchNormInference
+    // folded in: w * gamma / sqrt(var) and (b - mean) * gamma / sqrt(var) + beta
+    void loadFolded(Layer<T> *layer, BatchNormInference<T> *bn, const float *floatWeights, const float *bnWeights)
+    {
+        u64 channel = bn->A.d1;
+        auto gammaPtr = bnWeights;
+        auto betaPtr = bnWeights + channel;
+        auto meanPtr = bnWeights + 2 * channel;
+        auto varPtr = bnWeights + 3 * channel;
+        std::vector<float> a(channel), b(channel);
+        for (u64 c = 0; c < channel; ++c) {
+            a[c] = gammaPtr[c] / std::sqrt(varPtr[c]);
+            b[c] = betaPtr[c] - gammaPtr[c] * meanPtr[c] / std::sqrt(varPtr[c]);
+        }
+
+        auto weights = layer->getweights();
+        auto bias = layer->getbias();
+        always_assert(bias.size == channel);
+        // FC weights are in x out, the convolution filters out x rest
+        bool channelLast = (layer->name == "FC");
+        u64 inner = weights.size / channel;
+        u64 scale = this->scale;
+        #pragma omp parallel for
+        for (u64 j = 0; j < weights.size; j++) {
+            u64 c = channelLast ? j % channel : j / inner;
+            weights.data[j] = type_cast<T>(floatWeights[j] * a[c] * (1LL << scale));
+        }
+
+        auto biasPtr = floatWeights + weights.size;
+        for (u64 c = 0; c < channel; ++c) {
+            float bc = bn->foldedIntoUseBias ? biasPtr[c] : 0;
+            bias.data[c] = type_cast<T>((bc * a[c] + b[c]) * (float)(1LL << (2*scale)));
+        }
+    }
+
+    static bool isSnapshot(const std::string &file)
+    {
+        char magic[sizeof(SnapshotHeader::magic)] = {0};
+        std::ifstream f(file, std::ios::binary);
+        f.read(magic, sizeof(magic));
+        return f && memcmp(magic, SNAPSHOT_MAGIC, sizeof(magic)) == 0;
+    }
+
+    // Writes the loaded parameters, already scaled to T, as a snapshot:
+    // a SnapshotHeader, one SnapshotEntry per node in execution order and
+    // the parameters of each node (weights, then bias) at entry.offset.
+    // bitlength is checked by load_snapshot.
+    void save_snapshot(const std::string &snapshotFile, u64 bitlength = 8 * sizeof(T))
+    {
+        SnapshotHeader header;
+        memcpy(header.magic, SNAPSHOT_MAGIC, sizeof(header.magic));
+        header.elemSize = sizeof(T);
+        header.scale = scale;
+        header.bitlength = bitlength;
+        header.numEntries = allNodesInExecutionOrder.size();
+
+        std::vector<SnapshotEntry> entries(header.numEntries);
+        u64 offset = snapshotAlign(sizeof(SnapshotHeader) + header.numEntries * sizeof(SnapshotEntry));
+        for (size_t i = 0; i < entries.size(); ++i) {
+            auto layer = allNodesInExecutionOrder[i]->layer;
+            auto counts = paramCounts(layer);
+            strncpy(entries[i].name, layer->name.c_str(), sizeof(entries[i].name) - 1);
+            entries[i].numWeights = counts.first;
+            entries[i].numBias = counts.second;
+            entries[i].offset = offset;
+            offset = snapshotAlign(offset + (counts.first + counts.second) * sizeof(T));
+        }
+        header.size = offset;
+
+        std::string tmpFile = snapshotFile + ".tmp";
+        std::ofstream file(tmpFile, std::ios::binary);
+        file.write((char *)&header, sizeof(header));
+        file.write((char *)entries.data(), entries.size() * sizeof(SnapshotEntry));
+        for (size_t i = 0; i < entries.size(); ++i) {
+            auto layer = allNodesInExecutionOrder[i]->layer;
+            file.seekp(entries[i].offset);
+            file.write((char *)layer->getweights().data, entries[i].numWeights * sizeof(T));
+            file.write((char *)layer->getbias().data, entries[i].numBias * sizeof(T));
+        }
+        // pad to the recorded size
+        file.seekp(header.size - 1);
+        file.put(0);
+        file.close();
+        if (!file) {
+            std::cerr << "could not write snapshot " << snapshotFile << "\n";
+            std::filesystem::remove(tmpFile);
+            return;
+        }
+        std::filesystem::rename(tmpFile, snapshotFile);
+        std::cerr << "Model Weights Snapshot: " << snapshotFile << " (" << header.size << " bytes)" << "\n";
+    }
+
+    // Copies the parameters out of a snapshot written by save_snapshot.
+    // Returns false (and leaves the weights alone) if the snapshot was not
+    // written for this model, scale, bitlength and T.
+    bool load_snapshot(const std::string &snapshotFile, u64 bitlength = 8 * sizeof(T))
+    {
+        int fd = open(snapshotFile.c_str(), O_RDONLY);
+        if (fd < 0) {
+            return false;
+        }
+        struct stat sb;
+        fstat(fd, &sb);
+        if ((size_t)sb.st_size < sizeof(SnapshotHeader)) {
+            ::close(fd);
+            return false;
+        }
+        char *base = (char *)mmap(NULL, sb.st_size, PROT_READ, MAP_PRIVATE, fd, 0);
+        ::close(fd);
+        if (base == MAP_FAILED) {
+            return false;
+        }
+        madvise(base, sb.st_size, MADV_WILLNEED);
+
+        auto header = (const SnapshotHeader *)base;
+        auto entries = (const SnapshotEntry *)(base + sizeof(SnapshotHeader));
+        std::string reason;
+        if (memcmp(header->magic, SNAPSHOT_MAGIC, sizeof(header->magic)) != 0 || header->version != SNAPSHOT_VERSION) {
+            reason = "not a snapshot of this version";
+        }
+        else if (header->size != (u64)sb.st_size) {
+            reason = "truncated";
+        }
+        else if (header->elemSize != sizeof(T) || header->scale != scale) {
+            reason = "written for scale " + std::to_string(header->scale) + " and " + std::to_string(8 * header->elemSize) + " bit elements";
+        }
+        else if (header->bitlength != bitlength) {
+            reason = "written for bitlength " + std::to_string(header->bitlength) + ", not " + std::to_string(bitlength);
+        }
+        else if (header->numEntries != allNodesInExecutionOrder.size()) {
+            reason = "written for a different model";
+        }
+        for (size_t i = 0; reason.empty() && i < header->numEntries; ++i) {
+            auto counts = paramCounts(allNodesInExecutionOrder[i]->layer);
+            if (strncmp(entries[i].name, allNodesInExecutionOrder[i]->layer->name.c_str(), sizeof(entries[i].name)) != 0 ||
+                entries[i].numWeights != counts.first || entries[i].numBias != counts.second ||
+                entries[i].offset + (counts.first + counts.second) * sizeof(T) > header->size) {
+                reason = "written for a different model";
+            }
+        }
+        if (!reason.empty()) {
+            std::cerr << "ignoring snapshot " << snapshotFile << ": " << reason << "\n";
+            munmap(base, sb.st_size);
+            return false;
+        }
+
+        std::cerr << "Model Weights Snapshot: " << snapshotFile << " (" << sb.st_size << " bytes)" << "\n";
+        for (size_t i = 0; i < header->numEntries; ++i) {
+            auto layer = allNodesInExecutionOrder[i]->layer;
+            const T *src = (const T *)(base + entries[i].offset);
+            parallelCopy(layer->getweights().data, src, entries[i].numWeights);
+            if (entries[i].numBias > 0) {
+                parallelCopy(layer->getbias().data, src + entries[i].numWeights, entries[i].numBias);
+            }
+            else {
+                layer->getbias().zero();
+            }
+        }
+        munmap(base, sb.st_size);
+        return true;
+    }
+
+    static void parallelCopy(T *dst, const T *src, u64 n)
+    {
+        const u64 block = (1ULL << 20) / sizeof(T);
+        #pragma omp parallel for
+        for (u64 i = 0; i < n; i += block) {
+            memcpy(dst + i, src + i, std::min(block, n - i) * sizeof(T));
+        }
+    }
+
     void dumpi64(const std::string weightsFile)
     {
         std::ofstream file(weightsFile, std::ios::binary);
@@ -0,0 +1,338 @@
+#pragma once
+#include <sytorch/layers/layers.h>
+#include <map>
+#include <memory>
+#include <iomanip>
+#include <sstream>
+
+// Passes over the layer graph, run by a backend's optimize() after init()
+// and before the weights are loaded. A pass only changes how the layers the
+// module calls behave, never which layers are called: it can turn a layer
+// into an identity (Layer::isIdentity), move a truncation
+// (doTruncationForward), or have the loader fold parameters
+// (BatchNormInference::foldedInto).
+//
+// Every pass reports the rewrites it made with an estimate of the key bytes
+// (per party) and online rounds they save, from PassCostModel. Byte
+// estimates need the shape of the input; without it they are 0.
+//
+// SYTORCH_DISABLE_PASSES=FoldBatchNorm,SinkTruncation,... skips passes.
+
+// Rough LLAMA key sizes in bytes, per element and per party
+struct PassCostModel {
+    int bitlength = 64;
+
+    u64 elem() const { return (bitlength + 7) / 8; }
+    u64 dcf(int bin, int groupSize) const { return 16 * (bin + 1) + elem() * groupSize * (bin + 1); }
+    u64 truncation(int shift) const { return dcf(shift, 1) + dcf(bitlength - 1, 2) + 3 * elem(); } // ARSKeyPack
+    u64 relu() const { return dcf(bitlength, 2) + 7 * elem(); } // ReluKeyPack
+    u64 mult() const { return 3 * elem(); }
+};
+
+struct PassStats {
+    std::string pass;
+    u64 rewrites = 0;
+    i64 keyBytes = 0; // saved
+    i64 rounds = 0;   // saved
+};
+
+template <typename T>
+class PassContext {
+public:
+    PassCostModel cost;
+    // output shape of every node, empty if the input shape is not known
+    std::map<LayerGraphNode<T> *, std::vector<u64>> shapes;
+    PassStats *stats = nullptr;
+
+    // 0 if not known
+    i64 numel(LayerGraphNode<T> *node) const
+    {
+        auto it = shapes.find(node);
+        if (it == shapes.end()) {
+            return 0;
+        }
+        i64 n = 1;
+        for (auto d : it->second) {
+            n *= d;
+        }
+        return n;
+    }
+
+    void rewrite(i64 keyBytes, i64 rounds)
+    {
+        stats->rewrites++;
+        stats->keyBytes += keyBytes;
+        stats->rounds += rounds;
+    }
+};
+
+template <typename T>
+class GraphPass {
+public:
+    virtual ~GraphPass() {}
+    virtual const char *name() const = 0;
+    virtual void run(LayerGraphNode<T> *root, PassContext<T> &ctx) = 0;
+};
+
+// Conv2D/Conv3D/FC followed only by a BatchNormInference: the loader folds
+// A and B into the weights and bias, which saves the multiplication by A and
+// the truncation after it.
+template <typename T>
+class FoldBatchNorm : public GraphPass<T> {
+public:
+    const char *name() const { return "FoldBatchNorm"; }
+
+    void run(LayerGraphNode<T> *root, PassContext<T> &ctx)
+    {
+        topologicalApply(root, [&](LayerGraphNode<T> *node, LayerGraphNode<T> *_root) {
+            if (node->layer->name != "BatchNormInference" || node->layer->isIdentity || node->parents.size() != 1) {
+                return;
+            }
+            auto bn = (BatchNormInference<T> *) node->layer;
+            auto parent = node->parents[0];
+            auto layer = parent->layer;
+            if (!(layer->name == "Conv2D" || layer->name == "Conv3D" || layer->name == "FC") ||
+                parent->children.size() != 1 || layer->isIdentity || !layer->doTruncationForward || !bn->doTruncationForward) {
+                return;
+            }
+            bn->foldedInto = layer;
+            bn->foldedIntoUseBias = layer->useBias;
+            bn->isIdentity = true;
+            bn->doTruncationForward = false;
+            layer->useBias = true;
+            ctx.rewrite(ctx.numel(node) * (ctx.cost.mult() + ctx.cost.truncation(bn->scale)), 2);
+        });
+    }
+};
+
+// Transpose followed only by its inverse, and Flatten of a tensor that is
+// already laid out flat (a Flatten, an FC, or N x 1 x 1 x C) become
+// identities. These are local, so they only save copies.
+template <typename T>
+class EliminateTransposeFlatten : public GraphPass<T> {
+public:
+    const char *name() const { return "EliminateTransposeFlatten"; }
+
+    void run(LayerGraphNode<T> *root, PassContext<T> &ctx)
+    {
+        topologicalApply(root, [&](LayerGraphNode<T> *node, LayerGraphNode<T> *_root) {
+            auto layer = node->layer;
+            if (layer->isIdentity || node->parents.size() != 1) {
+                return;
+            }
+            if (layer->name == "Transpose" && node->children.size() == 1) {
+                auto child = node->children[0];
+                if (child->layer->name != "Transpose" || child->layer->isIdentity || child->parents.size() != 1 ||
+                    layer->doTruncationForward || child->layer->doTruncationForward) {
+                    return;
+                }
+                auto p1 = ((Transpose<T> *) layer)->nhwcPerm();
+                auto p2 = ((Transpose<T> *) child->layer)->nhwcPerm();
+                if (p1.size() != p2.size()) {
+                    return;
+                }
+                for (u64 i = 0; i < p2.size(); ++i) {
+                    if (p1[p2[i]] != i) {
+                        return;
+                    }
+                }
+                layer->isIdentity = true;
+                child->layer->isIdentity = true;
+                ctx.rewrite(0, 0);
+            }
+            else if (layer->name == "Flatten" && !layer->doTruncationForward) {
+                auto parent = node->parents[0];
+                bool flat = (parent->layer->name == "Flatten" || parent->layer->name == "FC");
+                auto it = ctx.shapes.find(parent);
+                if (it != ctx.shapes.end()) {
+                    auto &shape = it->second;
+                    u64 inner = 1;
+                    for (u64 i = 1; i + 1 < shape.size(); ++i) {
+                        inner *= shape[i];
+                    }
+                    flat = (shape.size() != 4 && shape.size() != 5) || inner == 1;
+                }
+                if (flat) {
+                    layer->isIdentity = true;
+                    ctx.rewrite(0, 0);
+                }
+            }
+        });
+    }
+};
+
+// ReLU followed only by a MaxPool2D: max pooling commutes with ReLU, so the
+// ReLU runs on the pooled output, which has fewer elements.
+template <typename T>
+class ReorderReluMaxPool : public GraphPass<T> {
+public:
+    const char *name() const { return "ReorderReluMaxPool"; }
+
+    void run(LayerGraphNode<T> *root, PassContext<T> &ctx)
+    {
+        topologicalApply(root, [&](LayerGraphNode<T> *node, LayerGraphNode<T> *_root) {
+            auto layer = node->layer;
+            if (layer->name != "ReLU" || layer->isIdentity || layer->doTruncationForward || node->children.size() != 1) {
+                return;
+            }
+            auto child = node->children[0];
+            if (child->layer->name != "MaxPool2D" || child->layer->isIdentity || child->parents.size() != 1) {
+                return;
+            }
+            auto maxpool = (MaxPool2D<T> *) child->layer;
+            if (maxpool->doReluForward) {
+                return;
+            }
+            layer->isIdentity = true;
+            maxpool->doReluForward = true;
+            maxpool->reluMode = layer->mode;
+            ctx.rewrite((ctx.numel(node) - ctx.numel(child)) * ctx.cost.relu(), 0);
+        });
+    }
+};
+
+// Moves the truncation of a layer past a following layer that commutes with
+// it, to where it is cheaper:
+//  - ReLU, MaxPool2D and identities: truncates the smaller output.
+//  - AvgPool2D with ks * ks a power of 2: merged with the truncation of the
+//    division.
+//  - Add/Concat of layers that all truncate and feed only the Add/Concat:
+//    one truncation of the result instead of one per input.
+template <typename T>
+class SinkTruncation : public GraphPass<T> {
+public:
+    const char *name() const { return "SinkTruncation"; }
+
+    void run(LayerGraphNode<T> *root, PassContext<T> &ctx)
+    {
+        topologicalApply(root, [&](LayerGraphNode<T> *node, LayerGraphNode<T> *_root) {
+            auto layer = node->layer;
+            if (!layer->doTruncationForward || node->children.size() != 1) {
+                return;
+            }
+            auto child = node->children[0];
+            auto cl = child->layer;
+            if (cl->doTruncationForward) {
+                // no optimization possible
+                return;
+            }
+            i64 truncationKey = ctx.cost.truncation(layer->scale);
+            if ((cl->name == "ReLU" || cl->name == "MaxPool2D" || cl->isIdentity) && child->parents.size() == 1) {
+                move({node}, child);
+                ctx.rewrite((ctx.numel(node) - ctx.numel(child)) * truncationKey, 0);
+            }
+            else if (cl->name == "AvgPool2D" && child->parents.size() == 1) {
+                auto avgpool = (AvgPool2D<T> *) cl;
+                u64 ks2 = avgpool->ks * avgpool->ks;
+                if (avgpool->inputShift != 0 || (ks2 & (ks2 - 1)) != 0) {
+                    return;
+                }
+                layer->doTruncationForward = false;
+                avgpool->inputShift = layer->scale;
+                ctx.rewrite(ctx.numel(node) * truncationKey, 1);
+            }
+            else if ((cl->name == "Add" || cl->name == "Concat") && child->parents.size() > 1) {
+                i64 inputs = 0;
+                for (auto &parent : child->parents) {
+                    auto pl = parent->layer;
+                    if (!pl->doTruncationForward || parent->children.size() != 1 ||
+                        pl->forwardTruncationMode != layer->forwardTruncationMode || pl->scale != layer->scale) {
+                        return;
+                    }
+                    inputs += ctx.numel(parent);
+                }
+                move(child->parents, child);
+                ctx.rewrite((inputs - ctx.numel(child)) * truncationKey, child->parents.size() - 1);
+            }
+        });
+    }
+
+private:
+    void move(const std::vector<LayerGraphNode<T> *> &from, LayerGraphNode<T> *to)
+    {
+        for (auto &node : from) {
+            node->layer->doTruncationForward = false;
+        }
+        to->layer->doTruncationForward = true;
+        to->layer->forwardTruncationMode = from[0]->layer->forwardTruncationMode;
+    }
+};
+
+template <typename T>
+class PassManager {
+public:
+    PassCostModel cost;
+    std::vector<std::unique_ptr<GraphPass<T>>> passes;
+    std::vector<PassStats> stats;
+
+    PassManager &add(GraphPass<T> *pass)
+    {
+        passes.emplace_back(pass);
+        return *this;
+    }
+
+    // The passes that pay off with LLAMA, in the order they should run
+    PassManager &addDefaultPasses()
+    {
+        add(new FoldBatchNorm<T>());
+        add(new EliminateTransposeFlatten<T>());
+        add(new ReorderReluMaxPool<T>());
+        add(new SinkTruncation<T>());
+        return *this;
+    }
+
+    void run(LayerGraphNode<T> *root, const std::vector<u64> &inputShape = {})
+    {
+        PassContext<T> ctx;
+        ctx.cost = cost;
+        if (!inputShape.empty()) {
+            inferShapes(root, inputShape, ctx.shapes);
+        }
+
+        std::string disabled;
+        if (const char *env = getenv("SYTORCH_DISABLE_PASSES")) {
+            disabled = "," + std::string(env) + ",";
+        }
+        stats.clear();
+        for (auto &pass : passes) {
+            if (disabled.find("," + std::string(pass->name()) + ",") != std::string::npos) {
+                continue;
+            }
+            stats.push_back(PassStats());
+            stats.back().pass = pass->name();
+            ctx.stats = &stats.back();
+            pass->run(root, ctx);
+        }
+    }
+
+    void print(std::ostream &os) const
+    {
+        os << "Graph passes (estimated savings per party):" << "\n";
+        for (auto &s : stats) {
+            std::stringstream kb;
+            kb << std::fixed << std::setprecision(1) << s.keyBytes / 1024.0 << " KB";
+            os << "   " << std::left << std::setw(28) << s.pass << std::right
+               << std::setw(5) << s.rewrites << " rewrites, "
+               << std::setw(12) << kb.str() << " key, "
+               << std::setw(4) << s.rounds << " rounds" << "\n";
+        }
+    }
+
+    static void inferShapes(LayerGraphNode<T> *root, const std::vector<u64> &inputShape, std::map<LayerGraphNode<T> *, std::vector<u64>> &shapes)
+    {
+        topologicalApply(root, [&](LayerGraphNode<T> *node, LayerGraphNode<T> *_root) {
+            if (node == _root) {
+                shapes[node] = inputShape;
+                return;
+            }
+            std::vector<std::vector<u64>> inShapes;
+            for (auto &parent : node->parents) {
+                if (shapes.find(parent) == shapes.end()) {
+                    return;
+                }
+                inShapes.push_back(shapes[parent]);
+            }
+            shapes[node] = node->layer->get_output_dims(inShapes);
+        });
+    }
+};
@@ -0,0 +1,156 @@
+// Copyright:
+//
+// Copyright (c) 2026 Microsoft Research
+//
+// Permission is hereby granted, free of charge, to any person obtaining a copy
+// of this software and associated documentation files (the "Software"), to deal
+// in the Software without restriction, including without limitation the rights
+// to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+// copies of the Software, and to permit persons to whom the Software is
+// furnished to do so, subject to the following conditions:
+// The above copyright notice and this permission notice shall be included in all
+// copies or substantial portions of the Software.
+// THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+// IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+// FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+// AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+// LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+// OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+// SOFTWARE.
+
+// Runs the graph passes of sytorch/passes.h on a small net in cleartext and
+// checks that it gives the output of the same net without them. Build from
+// EzPC/sytorch:
+//   g++ -std=c++17 -O1 -fopenmp -maes -msse4.1 -Iinclude -I../SCI/extern/eigen
+//       -Iext/llama/include -Iext/cryptoTools tests/passes.cpp
+//       src/sytorch/random.cpp src/sytorch/backend/cleartext.cpp
+//       ext/cryptoTools/cryptoTools/Crypto/AES.cpp
+//       ext/cryptoTools/cryptoTools/Crypto/PRNG.cpp -o passes
+
+#include <sytorch/layers/layers.h>
+#include <sytorch/module.h>
+#include <sytorch/passes.h>
+#include <sytorch/random.h>
+
+template <typename T>
+class Net : public SytorchModule<T> {
+public:
+    Conv2D<T> *conv1;
+    BatchNormInference<T> *bn1;
+    ReLU<T> *relu;
+    MaxPool2D<T> *maxpool;
+    Conv2D<T> *conv2;
+    BatchNormInference<T> *bn2;
+    AvgPool2D<T> *avgpool;
+    Flatten<T> *flatten;
+    FC<T> *fc;
+
+    Net()
+    {
+        conv1 = new Conv2D<T>(3, 4, 3, 1, 1, true);
+        bn1 = new BatchNormInference<T>(4);
+        relu = new ReLU<T>();
+        maxpool = new MaxPool2D<T>(2);
+        conv2 = new Conv2D<T>(4, 8, 3, 1, 1, false);
+        bn2 = new BatchNormInference<T>(8);
+        avgpool = new AvgPool2D<T>(2);
+        flatten = new Flatten<T>();
+        fc = new FC<T>(8, 10, true);
+    }
+
+    Tensor<T> &_forward(Tensor<T> &input)
+    {
+        auto &x1 = maxpool->forward(relu->forward(bn1->forward(conv1->forward(input))));
+        auto &x2 = avgpool->forward(bn2->forward(conv2->forward(x1)));
+        return fc->forward(flatten->forward(x2));
+    }
+};
+
+// Float weights in the layout OnnxBridge writes: weights then bias, and
+// gamma, beta, mean and var for a BatchNorm.
+void writeWeights(Net<i64> &net, const std::string &file)
+{
+    std::vector<float> w;
+    for (auto &node : net.allNodesInExecutionOrder) {
+        auto layer = node->layer;
+        if (layer->name == "BatchNormInference") {
+            u64 channels = ((BatchNormInference<i64> *)layer)->A.d1;
+            for (u64 i = 0; i < 3 * channels; ++i) {
+                w.push_back(rand_float() - 0.5);
+            }
+            for (u64 i = 0; i < channels; ++i) {
+                w.push_back(rand_float() + 0.5);
+            }
+        }
+        else {
+            u64 n = layer->getweights().size + (layer->useBias ? layer->getbias().size : 0);
+            for (u64 i = 0; i < n; ++i) {
+                w.push_back(rand_float() - 0.5);
+            }
+        }
+    }
+    std::ofstream f(file, std::ios::binary);
+    f.write((char *)w.data(), w.size() * sizeof(float));
+}
+
+int main()
+{
+    prngWeights.SetSeed(osuCrypto::toBlock(0, 1));
+    prngStr.SetSeed(osuCrypto::toBlock(0, 2));
+    const u64 scale = 12;
+    const std::string weightsFile = "passes_test_weights.dat";
+
+    Net<i64> ref, opt;
+    ref.init(scale);
+    opt.init(scale);
+
+    PassManager<i64> passes;
+    passes.addDefaultPasses();
+    passes.run(opt.root, {1, 4, 4, 3});
+    passes.print(std::cerr);
+
+    std::map<std::string, u64> expected = {
+        {"FoldBatchNorm", 2},             // conv1 + bn1, conv2 + bn2
+        {"EliminateTransposeFlatten", 1}, // Flatten of N x 1 x 1 x C
+        {"ReorderReluMaxPool", 1},
+        {"SinkTruncation", 5},            // conv1 -> bn1 -> relu -> maxpool, conv2 -> bn2 -> avgpool
+    };
+    always_assert(passes.stats.size() == expected.size());
+    for (auto &s : passes.stats) {
+        if (s.rewrites != expected[s.pass]) {
+            std::cerr << s.pass << ": " << s.rewrites << " rewrites, expected " << expected[s.pass] << "\n";
+            return 1;
+        }
+    }
+    always_assert(opt.bn1->isIdentity && opt.bn2->isIdentity && opt.relu->isIdentity && opt.flatten->isIdentity);
+    always_assert(opt.maxpool->doReluForward && opt.avgpool->inputShift == scale);
+
+    writeWeights(ref, weightsFile);
+    ref.load_float(weightsFile);
+    opt.load_float(weightsFile);
+    std::remove(weightsFile.c_str());
+
+    Tensor<i64> in1({1, 4, 4, 3}), in2({1, 4, 4, 3});
+    for (u64 i = 0; i < in1.size(); ++i) {
+        in1.data[i] = (i64)((rand_float() - 0.5) * 2 * (1LL << scale));
+        in2.data[i] = in1.data[i];
+    }
+    auto &out1 = ref.forward(in1);
+    auto &out2 = opt.forward(in2);
+    always_assert(out1.size() == out2.size());
+
+    // The folded weights are rounded once instead of twice, and truncations
+    // move, so the outputs can differ in the last few bits.
+    const i64 ulps = 4;
+    i64 maxDiff = 0;
+    for (u64 i = 0; i < out1.size(); ++i) {
+        maxDiff = std::max(maxDiff, std::abs(out1.data[i] - out2.data[i]));
+    }
+    std::cerr << "Max difference: " << maxDiff << " (scale " << scale << ")" << "\n";
+    if (maxDiff > ulps) {
+        std::cerr << "FAIL: outputs differ by more than " << ulps << "\n";
+        return 1;
+    }
+    std::cerr << "PASS" << "\n";
+    return 0;
+}
@@ -3,6 +3,11 @@
 
 #include <seal/seal.h>
 
+#include <condition_variable>
+#include <exception>
+#include <mutex>
+#include <thread>
+
 #include "gemini/cheetah/shape_inference.h"
 #include "gemini/cheetah/tensor_encoder.h"
 #include "utils/constants.h"  // ALICE & BOB
@@ -433,6 +438,45 @@ void CheetahLinear::conv2d(const Tensor<uint64_t> &in_tensor,
     }
   }
 
+  if (party_ == sci::BOB) {
+    conv2d_encoded(in_tensor, nullptr, meta, out_tensor);
+  } else {
+    auto encoded_filters = encode_filters(filters, meta);
+    conv2d_encoded(in_tensor, encoded_filters.get(), meta, out_tensor);
+  }
+}
+
+std::shared_ptr<const CheetahLinear::EncodedFilters>
+CheetahLinear::encode_filters(const std::vector<Tensor<uint64_t>> &filters,
+                              const ConvMeta &meta) const {
+  if (party_ == sci::BOB) {
+    throw std::logic_error("CheetahLinear::encode_filters called by client");
+  }
+  if (meta.n_filters != filters.size()) {
+    throw std::invalid_argument(
+        "CheetahLinear::encode_filters meta.n_filters mismatch");
+  }
+  auto encoded_filters = std::make_shared<EncodedFilters>();
+  Code code = conv2d_impl_.encodeFilters(filters, meta, *encoded_filters,
+                                         nthreads_);
+  if (code != Code::OK) {
+    throw std::runtime_error("CheetahLinear::conv2d ecnodeFilters " +
+                             CodeMessage(code));
+  }
+  return encoded_filters;
+}
+
+void CheetahLinear::conv2d_encoded(const Tensor<uint64_t> &in_tensor,
+                                   const EncodedFilters *encoded_filters,
+                                   const ConvMeta &meta,
+                                   Tensor<uint64_t> &out_tensor) const {
+  if (!meta.ishape.IsSameSize(in_tensor.shape())) {
+    throw std::invalid_argument("CheetahLinear::conv2d meta.ishape mismatch");
+  }
+  if (party_ != sci::BOB && encoded_filters == nullptr) {
+    throw std::invalid_argument("CheetahLinear::conv2d missing filters");
+  }
+
   const auto &impl = conv2d_impl_;
 
   Code code;
@@ -457,13 +501,6 @@ void CheetahLinear::conv2d(const Tensor<uint64_t> &in_tensor,
                                CodeMessage(code));
     }
   } else {
-    std::vector<std::vector<seal::Plaintext>> encoded_filters;
-    code = impl.encodeFilters(filters, meta, encoded_filters, nthreads_);
-    if (code != Code::OK) {
-      throw std::runtime_error("CheetahLinear::conv2d ecnodeFilters " +
-                               CodeMessage(code));
-    }
-
     std::vector<seal::Plaintext> encoded_share;
     if (meta.is_shared_input) {
       code = impl.encodeImage(in_tensor, meta, encoded_share, nthreads_);
@@ -477,7 +514,7 @@ void CheetahLinear::conv2d(const Tensor<uint64_t> &in_tensor,
     recv_encrypted_vector(io_, *context_, ct_buff, false);
 
     std::vector<seal::Ciphertext> out_ct;
-    auto code = impl.conv2DSS(ct_buff, encoded_share, encoded_filters, meta,
+    auto code = impl.conv2DSS(ct_buff, encoded_share, *encoded_filters, meta,
                               out_ct, out_tensor, nthreads_);
     if (code != Code::OK) {
       throw std::runtime_error("CheetahLinear::conv2d conv2DSS: " +
@@ -487,6 +524,121 @@ void CheetahLinear::conv2d(const Tensor<uint64_t> &in_tensor,
   }
 }
 
+void CheetahLinear::conv2d_batch(
+    const std::vector<Tensor<uint64_t>> &in_tensors,
+    const EncodedFilters *encoded_filters, const ConvMeta &meta,
+    sci::NetIO *result_io, size_t window,
+    std::vector<Tensor<uint64_t>> &out_tensors) const {
+  const size_t n = in_tensors.size();
+  out_tensors.resize(n);
+  if (result_io == nullptr || result_io == io_ || n <= 1) {
+    for (size_t i = 0; i < n; ++i) {
+      conv2d_encoded(in_tensors[i], encoded_filters, meta, out_tensors[i]);
+    }
+    return;
+  }
+
+  for (const auto &t : in_tensors) {
+    if (!meta.ishape.IsSameSize(t.shape())) {
+      throw std::invalid_argument("CheetahLinear::conv2d meta.ishape mismatch");
+    }
+  }
+  if (party_ != sci::BOB && encoded_filters == nullptr) {
+    throw std::invalid_argument("CheetahLinear::conv2d missing filters");
+  }
+  window = std::max<size_t>(1, window);
+
+  const auto &impl = conv2d_impl_;
+
+  if (party_ == sci::BOB) {
+    std::mutex mtx;
+    std::condition_variable cv;
+    size_t ndone = 0;
+    bool aborted = false;
+    std::exception_ptr send_error;
+
+    std::thread sender([&]() {
+      try {
+        for (size_t i = 0; i < n; ++i) {
+          {
+            std::unique_lock<std::mutex> lock(mtx);
+            cv.wait(lock, [&]() { return aborted || i < ndone + window; });
+            if (aborted) return;
+          }
+          std::vector<seal::Serializable<seal::Ciphertext>> ct_buff;
+          Code code =
+              impl.encryptImage(in_tensors[i], meta, ct_buff, nthreads_);
+          if (code != Code::OK) {
+            throw std::runtime_error("CheetahLinear::conv2d encryptImage " +
+                                     CodeMessage(code));
+          }
+          send_encrypted_vector(io_, ct_buff);
+          io_->flush();
+        }
+      } catch (...) {
+        send_error = std::current_exception();
+      }
+    });
+
+    try {
+      for (size_t i = 0; i < n; ++i) {
+        std::vector<seal::Ciphertext> ct_buff;
+        recv_encrypted_vector(result_io, *context_, ct_buff, true);
+        Code code =
+            impl.decryptToTensor(ct_buff, meta, out_tensors[i], nthreads_);
+        if (code != Code::OK) {
+          throw std::runtime_error("CheetahLinear::conv2d decryptToTensor " +
+                                   CodeMessage(code));
+        }
+        {
+          std::lock_guard<std::mutex> lock(mtx);
+          ++ndone;
+        }
+        cv.notify_one();
+      }
+    } catch (...) {
+      {
+        std::lock_guard<std::mutex> lock(mtx);
+        aborted = true;
+      }
+      cv.notify_one();
+      sender.join();
+      throw;
+    }
+    sender.join();
+    if (send_error) {
+      std::rethrow_exception(send_error);
+    }
+  } else {
+    // The server only reads from io_ and writes to result_io, so the client
+    // can keep streaming images while a result is being sent back.
+    for (size_t i = 0; i < n; ++i) {
+      Code code;
+      std::vector<seal::Plaintext> encoded_share;
+      if (meta.is_shared_input) {
+        code = impl.encodeImage(in_tensors[i], meta, encoded_share, nthreads_);
+        if (code != Code::OK) {
+          throw std::runtime_error("CheetahLinear::conv2d encodeImage " +
+                                   CodeMessage(code));
+        }
+      }
+
+      std::vector<seal::Ciphertext> ct_buff;
+      recv_encrypted_vector(io_, *context_, ct_buff, false);
+
+      std::vector<seal::Ciphertext> out_ct;
+      code = impl.conv2DSS(ct_buff, encoded_share, *encoded_filters, meta,
+                           out_ct, out_tensors[i], nthreads_);
+      if (code != Code::OK) {
+        throw std::runtime_error("CheetahLinear::conv2d conv2DSS: " +
+                                 CodeMessage(code));
+      }
+      send_encrypted_vector(result_io, out_ct);
+      result_io->flush();
+    }
+  }
+}
+
 void CheetahLinear::bn(const Tensor<uint64_t> &input_vector,
                        const Tensor<uint64_t> &scale_vector, const BNMeta &meta,
                        Tensor<uint64_t> &out_vector) const {
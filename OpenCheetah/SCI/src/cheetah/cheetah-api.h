@@ -18,6 +18,7 @@ class CheetahLinear {
   using ConvMeta = HomConv2DSS::Meta;
   using FCMeta = HomFCSS::Meta;
   using BNMeta = HomBNSS::Meta;
+  using EncodedFilters = std::vector<std::vector<seal::Plaintext>>;
 
   CheetahLinear(int party, sci::NetIO *io, uint64_t base_mod, size_t nthreads = 1);
 
@@ -28,6 +29,29 @@ class CheetahLinear {
               const std::vector<Tensor<uint64_t>> &filters,
               const ConvMeta &meta, Tensor<uint64_t> &out_tensor) const;
 
+  // Server only: encodes the filters of a conv layer so they can be reused
+  // by conv2d_encoded across calls (see FilterCache).
+  std::shared_ptr<const EncodedFilters> encode_filters(
+      const std::vector<Tensor<uint64_t>> &filters,
+      const ConvMeta &meta) const;
+
+  // HomConv with filters from encode_filters. The client passes nullptr.
+  void conv2d_encoded(const Tensor<uint64_t> &in_tensor,
+                      const EncodedFilters *encoded_filters,
+                      const ConvMeta &meta, Tensor<uint64_t> &out_tensor) const;
+
+  // HomConv over a batch of images with the same filters, pipelined: the
+  // client encrypts and sends image i+1 while the server computes image i,
+  // with at most `window` images in flight. The results travel back on
+  // result_io, a second channel that the client reads from its main thread
+  // while a sender thread writes to io. Without a distinct result_io the
+  // images are processed one after the other as in conv2d_encoded.
+  void conv2d_batch(const std::vector<Tensor<uint64_t>> &in_tensors,
+                    const EncodedFilters *encoded_filters,
+                    const ConvMeta &meta, sci::NetIO *result_io,
+                    size_t window,
+                    std::vector<Tensor<uint64_t>> &out_tensors) const;
+
   // HomFC
   void fc(const Tensor<uint64_t> &input_matrix,
           const Tensor<uint64_t> &weight_matrix, const FCMeta &meta,
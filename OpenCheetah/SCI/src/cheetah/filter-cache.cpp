@@ -0,0 +1,134 @@
+// Cache of the server-side encoded convolution filters.
+#include "cheetah/filter-cache.h"
+
+#include <cstdio>
+#include <cstdlib>
+#include <sstream>
+
+namespace gemini {
+
+FilterCache::FilterCache(size_t max_bytes) : max_bytes_(max_bytes) {}
+
+size_t FilterCache::DefaultBudget() {
+  size_t mb = 2048;
+  if (const char *env = std::getenv("CHEETAH_FILTER_CACHE_MB")) {
+    mb = std::strtoull(env, nullptr, 10);
+  }
+  return mb << 20;
+}
+
+uint64_t FilterCache::HashFilters(const uint64_t *filters, size_t n) {
+  // FNV-1a over whole words; enough to tell apart different weight sets
+  // that happen to reuse the same buffer.
+  uint64_t h = 0xcbf29ce484222325ULL;
+  for (size_t i = 0; i < n; ++i) {
+    h ^= filters[i];
+    h *= 0x100000001b3ULL;
+  }
+  return h;
+}
+
+std::string FilterCache::MakeKey(const void *weights, uint64_t hash,
+                                 const ConvMeta &meta) {
+  std::ostringstream os;
+  os << weights << ":" << std::hex << hash << std::dec;
+  for (const TensorShape *shape : {&meta.ishape, &meta.fshape}) {
+    os << ":";
+    for (int d = 0; d < shape->dims(); ++d) {
+      os << shape->dim_size(d) << "x";
+    }
+  }
+  os << ":" << meta.n_filters << ":" << static_cast<int>(meta.padding) << ":"
+     << meta.stride << ":" << meta.is_shared_input;
+  return os.str();
+}
+
+size_t FilterCache::EncodedBytes(const EncodedFilters &encoded) {
+  size_t nbytes = 0;
+  for (const auto &filter : encoded) {
+    for (const auto &pt : filter) {
+      nbytes += pt.coeff_count() * sizeof(uint64_t);
+    }
+  }
+  return nbytes;
+}
+
+std::shared_ptr<const FilterCache::EncodedFilters> FilterCache::lookup(
+    const void *weights, uint64_t hash, const ConvMeta &meta) {
+  if (!enabled()) {
+    return nullptr;
+  }
+  auto found = index_.find(MakeKey(weights, hash, meta));
+  if (found == index_.end()) {
+    stats_.misses += 1;
+    return nullptr;
+  }
+  auto entry = found->second;
+  entry->hits += 1;
+  stats_.hits += 1;
+  stats_.saved_ms += entry->encode_ms;
+  lru_.splice(lru_.begin(), lru_, entry);
+  return entry->encoded;
+}
+
+void FilterCache::insert(const void *weights, uint64_t hash,
+                         const ConvMeta &meta,
+                         std::shared_ptr<const EncodedFilters> encoded,
+                         double encode_ms, std::string label) {
+  stats_.encode_ms += encode_ms;
+  if (!enabled() || !encoded) {
+    return;
+  }
+  const size_t nbytes = EncodedBytes(*encoded);
+  if (nbytes > max_bytes_) {
+    return;
+  }
+
+  std::string key = MakeKey(weights, hash, meta);
+  auto found = index_.find(key);
+  if (found != index_.end()) {
+    nbytes_ -= found->second->nbytes;
+    lru_.erase(found->second);
+    index_.erase(found);
+  }
+
+  evict_until(max_bytes_ - nbytes);
+  lru_.push_front(
+      Entry{key, std::move(label), std::move(encoded), nbytes, encode_ms, 0});
+  index_.emplace(std::move(key), lru_.begin());
+  nbytes_ += nbytes;
+}
+
+void FilterCache::evict_until(size_t nbytes) {
+  while (nbytes_ > nbytes && !lru_.empty()) {
+    const Entry &victim = lru_.back();
+    nbytes_ -= victim.nbytes;
+    index_.erase(victim.key);
+    lru_.pop_back();
+    stats_.evictions += 1;
+  }
+}
+
+void FilterCache::clear() {
+  lru_.clear();
+  index_.clear();
+  nbytes_ = 0;
+}
+
+void FilterCache::print_stats() const {
+  std::printf(
+      "Filter cache: %zu entries, %.2f MiB, %llu hits, %llu misses, "
+      "%llu evictions\n",
+      lru_.size(), nbytes_ / 1024. / 1024., (unsigned long long)stats_.hits,
+      (unsigned long long)stats_.misses, (unsigned long long)stats_.evictions);
+  std::printf("Filter cache: %.3f s encoding, %.3f s saved by hits\n",
+              stats_.encode_ms / 1000., stats_.saved_ms / 1000.);
+  for (const Entry &e : lru_) {
+    std::printf("  %s: %.2f MiB, encode %.2f ms, %llu hits\n",
+                e.label.empty() ? e.key.c_str() : e.label.c_str(),
+                e.nbytes / 1024. / 1024., e.encode_ms,
+                (unsigned long long)e.hits);
+  }
+}
+
+}  // namespace gemini
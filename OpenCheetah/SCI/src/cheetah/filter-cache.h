@@ -0,0 +1,93 @@
+// Cache of the server-side encoded convolution filters.
+#ifndef SCI_CHEETAH_FILTER_CACHE_H_
+#define SCI_CHEETAH_FILTER_CACHE_H_
+
+#include <seal/plaintext.h>
+
+#include <cstdint>
+#include <list>
+#include <memory>
+#include <string>
+#include <unordered_map>
+#include <vector>
+
+#include "gemini/cheetah/hom_conv2d_ss.h"
+
+namespace gemini {
+
+// The model weights do not change between inferences, but HomConv2DSS
+// re-encodes (and NTT-transforms) every filter on every call. FilterCache
+// keeps the encoded plaintexts of a conv layer keyed on the weight buffer,
+// a hash of its contents and the conv geometry, so repeated inferences (or
+// the N images of one call) skip the encoding. Entries are evicted least
+// recently used first once the encoded size exceeds the byte budget.
+class FilterCache {
+ public:
+  using EncodedFilters = std::vector<std::vector<seal::Plaintext>>;
+  using ConvMeta = HomConv2DSS::Meta;
+
+  struct Stats {
+    uint64_t hits = 0;
+    uint64_t misses = 0;
+    uint64_t evictions = 0;
+    double encode_ms = 0.;  // spent encoding on misses
+    double saved_ms = 0.;   // encoding time skipped by hits
+  };
+
+  // A budget of 0 bytes disables the cache.
+  explicit FilterCache(size_t max_bytes);
+
+  // Reads the budget in MiB from CHEETAH_FILTER_CACHE_MB (default 2048).
+  static size_t DefaultBudget();
+
+  static uint64_t HashFilters(const uint64_t *filters, size_t n);
+
+  bool enabled() const { return max_bytes_ > 0; }
+
+  // Returns nullptr on a miss.
+  std::shared_ptr<const EncodedFilters> lookup(const void *weights,
+                                               uint64_t hash,
+                                               const ConvMeta &meta);
+
+  // Takes the encoded filters of a layer. encode_ms is the time it took to
+  // produce them; every later hit adds it to Stats::saved_ms.
+  void insert(const void *weights, uint64_t hash, const ConvMeta &meta,
+              std::shared_ptr<const EncodedFilters> encoded, double encode_ms,
+              std::string label = "");
+
+  void clear();
+
+  const Stats &stats() const { return stats_; }
+
+  size_t size_in_bytes() const { return nbytes_; }
+
+  void print_stats() const;
+
+ private:
+  struct Entry {
+    std::string key;
+    std::string label;
+    std::shared_ptr<const EncodedFilters> encoded;
+    size_t nbytes;
+    double encode_ms;
+    uint64_t hits;
+  };
+
+  static std::string MakeKey(const void *weights, uint64_t hash,
+                             const ConvMeta &meta);
+
+  static size_t EncodedBytes(const EncodedFilters &encoded);
+
+  void evict_until(size_t nbytes);
+
+  size_t max_bytes_{0};
+  size_t nbytes_{0};
+  Stats stats_;
+  // Most recently used first.
+  std::list<Entry> lru_;
+  std::unordered_map<std::string, std::list<Entry>::iterator> index_;
+};
+
+}  // namespace gemini
+
+#endif  // SCI_CHEETAH_FILTER_CACHE_H_
@@ -46,6 +46,7 @@ ElemWiseProdField *he_prod;
 
 #if USE_CHEETAH
 gemini::CheetahLinear *cheetah_linear;
+gemini::FilterCache *cheetah_filter_cache = nullptr;
 bool kIsSharedInput;
 #elif defined(SCI_HE)
 ConvField *he_conv;
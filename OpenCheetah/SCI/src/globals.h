@@ -48,6 +48,7 @@ SOFTWARE.
 
 #if USE_CHEETAH
 #include "cheetah/cheetah-api.h"
+#include "cheetah/filter-cache.h"
 #endif
 
 // #define MULTI_THREADING
@@ -78,6 +79,7 @@ extern ElemWiseProdField *he_prod;
 
 #if USE_CHEETAH
 extern gemini::CheetahLinear *cheetah_linear;
+extern gemini::FilterCache *cheetah_filter_cache;
 extern bool kIsSharedInput;
 #elif defined(SCI_HE)
 extern ConvField *he_conv;
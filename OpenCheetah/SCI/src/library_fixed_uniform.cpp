@@ -1949,6 +1949,10 @@ segmentCpuUsages.clear();
 #if USE_CHEETAH
   backend += "-Cheetah";
   cheetah_linear = new gemini::CheetahLinear(party, io, prime_mod, num_threads);
+  if (party == SERVER) {
+    cheetah_filter_cache =
+        new gemini::FilterCache(gemini::FilterCache::DefaultBudget());
+  }
 #elif defined(SCI_HE)
   backend += "-SCI_HE";
   he_conv = new ConvField(party, io);
@@ -2120,6 +2124,13 @@ std::cout << "Test end computation" << std::endl;
     std::cout << "Total comm (sent+received) = (see SERVER OUTPUT)"
               << std::endl;
   }
+#if USE_CHEETAH
+  if (cheetah_filter_cache != nullptr) {
+    cheetah_filter_cache->print_stats();
+    delete cheetah_filter_cache;
+    cheetah_filter_cache = nullptr;
+  }
+#endif
   std::cout << "------------------------------------------------------\n";
 double totalCpuUsage = std::accumulate(segmentCpuUsages.begin(), segmentCpuUsages.end(), 0.0);
     double averageCpuUsage = totalCpuUsage / segmentCpuUsages.size();
@@ -4,6 +4,10 @@
 
 #include <gemini/cheetah/tensor.h>
 
+#include <chrono>
+#include <cstdlib>
+#include <memory>
+
 #include "cheetah/cheetah-api.h"
 #include "defines_uniform.h"
 #include "globals.h"
@@ -208,6 +212,16 @@ void MatMul2D(int32_t d0, int32_t d1, int32_t d2, const intType *mat_A,
 #endif
 }
 
+// Number of images the client may have in flight in a batched Conv2D
+// (CHEETAH_CONV_WINDOW, default 4).
+static size_t ConvBatchWindow() {
+  static const size_t window = []() -> size_t {
+    const char *env = std::getenv("CHEETAH_CONV_WINDOW");
+    return env ? std::max(1L, std::strtol(env, nullptr, 10)) : 4;
+  }();
+  return window;
+}
+
 void Conv2DWrapper(signedIntType N, signedIntType H, signedIntType W,
                    signedIntType CI, signedIntType FH, signedIntType FW,
                    signedIntType CO, signedIntType zPadHLeft,
@@ -235,27 +249,53 @@ void Conv2DWrapper(signedIntType N, signedIntType H, signedIntType W,
   meta.fshape = gemini::TensorShape({CI, FH, FW});
   meta.n_filters = CO;
 
-  std::vector<gemini::Tensor<intType>> filters(CO);
-  for (auto &f : filters) {
-    f.Reshape(meta.fshape);
-  }
+  const int npads = zPadHLeft + zPadHRight + zPadWLeft + zPadWRight;
+  meta.padding = npads == 0 ? gemini::Padding::VALID : gemini::Padding::SAME;
+  meta.stride = strideH;
+  meta.is_shared_input = kIsSharedInput;
 
-  for (int i = 0; i < FH; i++) {
-    for (int j = 0; j < FW; j++) {
-      for (int k = 0; k < CI; k++) {
-        for (int p = 0; p < CO; p++) {
-          filters.at(p)(k, i, j) =
-              getRingElt(Arr4DIdxRowM(filterArr, FH, FW, CI, CO, i, j, k, p));
+  // Only the server holds the weights. Their encoding is reused across calls
+  // through cheetah_filter_cache, so the filters are only rebuilt and encoded
+  // the first time a layer is seen.
+  std::shared_ptr<const gemini::CheetahLinear::EncodedFilters> encoded_filters;
+  if (cheetah_linear->party() == SERVER) {
+    const size_t num_weights = FH * FW * CI * CO;
+    uint64_t filter_hash = 0;
+    if (cheetah_filter_cache->enabled()) {
+      filter_hash = gemini::FilterCache::HashFilters(filterArr, num_weights);
+      encoded_filters =
+          cheetah_filter_cache->lookup(filterArr, filter_hash, meta);
+    }
+    if (!encoded_filters) {
+      std::vector<gemini::Tensor<intType>> filters(CO);
+      for (auto &f : filters) {
+        f.Reshape(meta.fshape);
+      }
+
+      for (int i = 0; i < FH; i++) {
+        for (int j = 0; j < FW; j++) {
+          for (int k = 0; k < CI; k++) {
+            for (int p = 0; p < CO; p++) {
+              filters.at(p)(k, i, j) = getRingElt(
+                  Arr4DIdxRowM(filterArr, FH, FW, CI, CO, i, j, k, p));
+            }
+          }
         }
       }
+
+      auto encode_start = std::chrono::high_resolution_clock::now();
+      encoded_filters = cheetah_linear->encode_filters(filters, meta);
+      std::chrono::duration<double, std::milli> encode_ms =
+          std::chrono::high_resolution_clock::now() - encode_start;
+      cheetah_filter_cache->insert(filterArr, filter_hash, meta,
+                                   encoded_filters, encode_ms.count(),
+                                   "HomConv #" + std::to_string(ctr));
+      for (auto &f : filters) {
+        cheetah_linear->safe_erase(f.data(), meta.fshape.num_elements());
+      }
     }
   }
 
-  const int npads = zPadHLeft + zPadHRight + zPadWLeft + zPadWRight;
-  meta.padding = npads == 0 ? gemini::Padding::VALID : gemini::Padding::SAME;
-  meta.stride = strideH;
-  meta.is_shared_input = kIsSharedInput;
-
   printf(
       "HomConv #%d called N=%ld, H=%ld, W=%ld, CI=%ld, FH=%ld, FW=%ld, "
       "CO=%ld, S=%ld, Padding %s (%d %d %d %d)\n",
@@ -265,12 +305,19 @@ void Conv2DWrapper(signedIntType N, signedIntType H, signedIntType W,
       (meta.padding == gemini::Padding::VALID ? "VALID" : "SAME"), zPadHLeft,
       zPadHRight, zPadWLeft, zPadWRight);
 
+  // With more than one image the convolutions are pipelined, and the results
+  // come back over the second channel, which is idle during linear layers.
+  sci::NetIO *result_io = num_threads > 1 ? ioArr[1] : nullptr;
+
 #ifdef LOG_LAYERWISE
-  const int64_t io_counter = cheetah_linear->io_counter();
+  const int64_t io_counter =
+      cheetah_linear->io_counter() + (result_io ? result_io->counter : 0);
 #endif
 
+  std::vector<gemini::Tensor<intType>> images(N);
   for (int i = 0; i < N; ++i) {
-    gemini::Tensor<intType> image(meta.ishape);
+    gemini::Tensor<intType> &image = images[i];
+    image.Reshape(meta.ishape);
     for (int j = 0; j < H; j++) {
       for (int k = 0; k < W; k++) {
         for (int p = 0; p < CI; p++) {
@@ -279,10 +326,14 @@ void Conv2DWrapper(signedIntType N, signedIntType H, signedIntType W,
         }
       }
     }
+  }
 
-    gemini::Tensor<intType> out_tensor;
-    cheetah_linear->conv2d(image, filters, meta, out_tensor);
+  std::vector<gemini::Tensor<intType>> out_tensors;
+  cheetah_linear->conv2d_batch(images, encoded_filters.get(), meta, result_io,
+                               ConvBatchWindow(), out_tensors);
 
+  for (int i = 0; i < N; ++i) {
+    const gemini::Tensor<intType> &out_tensor = out_tensors[i];
     for (int j = 0; j < newH; j++) {
       for (int k = 0; k < newW; k++) {
         for (int p = 0; p < CO; p++) {
@@ -296,7 +347,9 @@ void Conv2DWrapper(signedIntType N, signedIntType H, signedIntType W,
 #ifdef LOG_LAYERWISE
   auto temp = TIMER_TILL_NOW;
   ConvTimeInMilliSec += temp;
-  const int64_t nbytes_sent = cheetah_linear->io_counter() - io_counter;
+  const int64_t nbytes_sent = cheetah_linear->io_counter() +
+                              (result_io ? result_io->counter : 0) -
+                              io_counter;
   std::cout << "Time in sec for current conv = [" << (temp / 1000.0)
             << "] sent [" << (nbytes_sent / 1024. / 1024.) << "] MB"
             << std::endl;
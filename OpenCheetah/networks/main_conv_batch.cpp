@@ -0,0 +1,98 @@
+// Throughput of the Cheetah HomConv over a batch of images, one image after
+// the other versus pipelined (CheetahLinear::conv2d_batch). Reports images/s
+// for N = 1, 2, 4, ..., maxN. Run both parties on top of scripts/throttle.sh
+// (see scripts/run-conv-batch.sh) to get the LAN and WAN numbers.
+
+#include <chrono>
+#include <iostream>
+#include <vector>
+
+#include "library_fixed.h"
+
+using namespace std;
+
+int party = 0;
+int port = 32000;
+string address = "127.0.0.1";
+int num_threads = 4;
+int32_t bitlength = 41;
+int32_t kScale = 12;
+
+// ResNet-50 res3 3x3 conv by default.
+int H = 28;
+int CI = 128;
+int FH = 3;
+int CO = 128;
+int stride = 1;
+int maxN = 32;
+int window = 4;
+
+double RunBatch(int N, sci::NetIO *result_io) {
+  gemini::CheetahLinear::ConvMeta meta;
+  meta.ishape = gemini::TensorShape({CI, H, H});
+  meta.fshape = gemini::TensorShape({CI, FH, FH});
+  meta.n_filters = CO;
+  meta.padding = gemini::Padding::SAME;
+  meta.stride = stride;
+  meta.is_shared_input = kIsSharedInput;
+
+  std::shared_ptr<const gemini::CheetahLinear::EncodedFilters> encoded;
+  if (party == SERVER) {
+    std::vector<gemini::Tensor<uint64_t>> filters(CO);
+    for (auto &f : filters) {
+      f.Reshape(meta.fshape);
+      f.Randomize(1ULL << kScale);
+    }
+    encoded = cheetah_linear->encode_filters(filters, meta);
+  }
+
+  std::vector<gemini::Tensor<uint64_t>> images(N);
+  for (auto &image : images) {
+    image.Reshape(meta.ishape);
+    image.Randomize(1ULL << kScale);
+  }
+
+  std::vector<gemini::Tensor<uint64_t>> outs;
+  ioArr[0]->sync();
+  auto start = chrono::high_resolution_clock::now();
+  cheetah_linear->conv2d_batch(images, encoded.get(), meta, result_io, window,
+                               outs);
+  chrono::duration<double> elapsed =
+      chrono::high_resolution_clock::now() - start;
+  return elapsed.count();
+}
+
+int main(int argc, char **argv) {
+  ArgMapping amap;
+  amap.arg("r", party, "Role of party: ALICE/SERVER = 1; BOB/CLIENT = 2");
+  amap.arg("p", port, "Port Number");
+  amap.arg("ip", address, "IP Address of server (ALICE)");
+  amap.arg("nt", num_threads, "Number of Threads (>= 2 for pipelining)");
+  amap.arg("ell", bitlength, "Uniform Bitwidth");
+  amap.arg("k", kScale, "bits of scale");
+  amap.arg("H", H, "Image height and width");
+  amap.arg("CI", CI, "Input channels");
+  amap.arg("FH", FH, "Filter height and width");
+  amap.arg("CO", CO, "Output channels");
+  amap.arg("s", stride, "Stride");
+  amap.arg("maxN", maxN, "Largest batch size");
+  amap.arg("w", window, "Images in flight in the pipelined mode");
+  amap.parse(argc, argv);
+
+  assert(num_threads > 1);
+  StartComputation();
+
+  printf("HomConv H=%d CI=%d FH=%d CO=%d stride=%d, window %d\n", H, CI, FH,
+         CO, stride, window);
+  printf("%4s %14s %14s %8s\n", "N", "seq (img/s)", "pipe (img/s)",
+         "speedup");
+  for (int N = 1; N <= maxN; N *= 2) {
+    double t_seq = RunBatch(N, nullptr);
+    double t_pipe = RunBatch(N, ioArr[1]);
+    printf("%4d %14.3f %14.3f %8.2f\n", N, N / t_seq, N / t_pipe,
+           t_seq / t_pipe);
+  }
+
+  EndComputation();
+  return 0;
+}
@@ -0,0 +1,43 @@
+#!/bin/bash
+
+# Measures the batched HomConv throughput (images/s for N=1..32, one image
+# after the other vs pipelined) under the throttle.sh network profiles.
+# Usage: scripts/run-conv-batch.sh [lan|wan|none] [extra args to conv_batch-cheetah]
+. scripts/common.sh
+
+if [ $# -lt 1 ]; then
+  echo "Usage: run-conv-batch.sh [lan|wan|none] [args...]"
+  exit 1
+fi
+
+profile=$1
+shift
+if ! contains "lan wan none" $profile; then
+  echo -e "Usage: run-conv-batch.sh ${RED}[lan|wan|none]${NC} [args...]"
+  exit 1
+fi
+
+if [ ! -f build/bin/conv_batch-cheetah ]; then
+  echo -e "${RED}build/bin/conv_batch-cheetah${NC} not found, run make conv_batch-cheetah in build/"
+  exit 1
+fi
+
+NUM_THREADS=${NUM_THREADS:-4}
+SERVER_PORT=${SERVER_PORT:-32000}
+
+if [ $profile != "none" ]; then
+  bash scripts/throttle.sh $profile
+fi
+
+build/bin/conv_batch-cheetah r=1 nt=$NUM_THREADS p=$SERVER_PORT "$@" > conv_batch-$profile-server.log &
+server_pid=$!
+sleep 1
+build/bin/conv_batch-cheetah r=2 nt=$NUM_THREADS p=$SERVER_PORT "$@" > conv_batch-$profile-client.log
+wait $server_pid
+
+if [ $profile != "none" ]; then
+  bash scripts/throttle.sh del
+fi
+
+echo -e "Throughput (${GREEN}$profile${NC}):"
+grep -A40 "^HomConv H=" conv_batch-$profile-client.log
@@ -0,0 +1,12 @@
+"""Cached, incremental figure generation for the SNNI metric logs.
+
+All ``*_metrics*.csv`` files in ``logfiles/`` and ``logfilespm/`` are loaded
+once into a tidy table (see ``data.load_metrics``), figures are declared as
+specs in ``figures.FIGURES`` and only re-rendered when their input data
+changes (see ``render.render_all``).
+
+Run with ``python -m analysis`` from the repository root.
+"""
+from analysis.data import load_metrics
+from analysis.figures import FIGURES, FigureSpec
+from analysis.render import render_all
@@ -0,0 +1,3 @@
+from analysis.render import main
+
+main()
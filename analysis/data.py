@@ -0,0 +1,121 @@
+import hashlib
+import os
+import pickle
+import re
+
+import pandas as pd
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CACHE_DIR = os.path.join(REPO_ROOT, ".analysis_cache")
+
+# Directory name -> setup name used in the table
+SETUPS = {"logfiles": "default", "logfilespm": "pm"}
+
+FILE_RE = re.compile(
+    r"^(SCI_HE|SCI|cheetah|porthos)_(.+)_(client|server|party\d)_metrics(pm)?\.csv$"
+)
+
+FRAMEWORKS = {
+    "SCI_HE": "SCI_HE",
+    "SCI": "SCI",
+    "cheetah": "Cheetah",
+    "porthos": "Porthos",
+}
+
+# The frameworks name the same networks differently
+NETWORKS = {
+    "alexnet": "AlexNet",
+    "AlexNet": "AlexNet",
+    "densenet121": "DenseNet121",
+    "DenseNet": "DenseNet121",
+    "lenet": "LeNet",
+    "Lenet": "LeNet",
+    "lenet-large": "LeNet-large",
+    "Lenet-large": "LeNet-large",
+    "Lenetbig": "LeNet-big",
+    "resnet50": "ResNet50",
+    "ResNet": "ResNet50",
+    "shufflenetv2": "ShuffleNetV2",
+    "ShuffleNetV2": "ShuffleNetV2",
+    "sqnet": "SqueezeNet-ImgNet",
+    "SqueezeNetImgNet": "SqueezeNet-ImgNet",
+    "SqueezeNetCIFAR10": "SqueezeNet-CIFAR10",
+}
+
+COLUMNS = ["setup", "framework", "network", "party", "metric", "value"]
+
+
+def parse_filename(fname):
+    """Returns (framework, network, party) for a metrics csv, None otherwise."""
+    m = FILE_RE.match(fname)
+    if m is None:
+        return None
+    framework, network, party, _ = m.groups()
+    return FRAMEWORKS[framework], NETWORKS.get(network, network), party
+
+
+def file_digest(path):
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def read_metrics_file(path, setup, framework, network, party):
+    df = pd.read_csv(path)
+    df = df.rename(columns={"Metric": "metric", "Value": "value"})
+    df["value"] = pd.to_numeric(df["value"], errors="coerce")
+    df["setup"] = setup
+    df["framework"] = framework
+    df["network"] = network
+    df["party"] = party
+    return df[COLUMNS]
+
+
+def metric_files(root=REPO_ROOT):
+    for dirname, setup in SETUPS.items():
+        directory = os.path.join(root, dirname)
+        if not os.path.isdir(directory):
+            continue
+        for fname in sorted(os.listdir(directory)):
+            parsed = parse_filename(fname)
+            if parsed is not None:
+                yield (os.path.join(directory, fname), setup) + parsed
+
+
+def load_metrics(root=REPO_ROOT, cache_dir=CACHE_DIR):
+    """Loads all metric csv files into one table with the columns COLUMNS.
+
+    Parsed files are cached by content hash, so only new or modified csv
+    files are read again.
+    """
+    cache_file = os.path.join(cache_dir, "metrics.pkl") if cache_dir else None
+    cache = {}
+    if cache_file and os.path.exists(cache_file):
+        with open(cache_file, "rb") as f:
+            cache = pickle.load(f)
+
+    new_cache = {}
+    changed = False
+    frames = []
+    for path, setup, framework, network, party in metric_files(root):
+        digest = file_digest(path)
+        key = os.path.relpath(path, root)
+        if key in cache and cache[key][0] == digest:
+            df = cache[key][1]
+        else:
+            try:
+                df = read_metrics_file(path, setup, framework, network, party)
+            except Exception as e:
+                print(f"Failed to process {path}: {e}")
+                continue
+            changed = True
+        new_cache[key] = (digest, df)
+        frames.append(df)
+
+    if cache_file and (changed or new_cache.keys() != cache.keys()):
+        os.makedirs(cache_dir, exist_ok=True)
+        with open(cache_file, "wb") as f:
+            pickle.dump(new_cache, f)
+
+    if not frames:
+        return pd.DataFrame(columns=COLUMNS)
+    return pd.concat(frames, ignore_index=True)
@@ -0,0 +1,192 @@
+import hashlib
+import inspect
+
+import numpy as np
+
+# Benchmark label in the figures -> network in the metrics table
+BENCHMARKS = {
+    "AlexNet": "AlexNet",
+    "DenseNet121": "DenseNet121",
+    "LeNet": "LeNet-large",
+    "ResNet50": "ResNet50",
+    "ShuffleNetV2": "ShuffleNetV2",
+    "SqueezeNet-ImgNet": "SqueezeNet-ImgNet",
+    "SqueezeNet-CIFAR10": "SqueezeNet-CIFAR10",
+}
+
+# Party whose logs describe the server/client side of each framework
+SERVER = {"Cheetah": "server", "SCI_HE": "server", "SCI": "server", "Porthos": "party1"}
+CLIENT = {"Cheetah": "client", "SCI_HE": "client", "SCI": "client", "Porthos": "party0"}
+
+
+class FigureSpec:
+    """Declares which part of the metrics table a figure uses and how to draw it.
+
+    render is a module level function render(data, spec, output) so that specs
+    can be sent to worker processes. data has the metrics table columns plus a
+    "benchmark" column with the figure label of the network.
+    """
+
+    def __init__(self, name, output, render, metrics, setup="default",
+                 parties=SERVER, benchmarks=BENCHMARKS, **params):
+        self.name = name
+        self.output = output
+        self.render = render
+        self.metrics = metrics
+        self.setup = setup
+        self.parties = parties
+        self.benchmarks = benchmarks
+        self.params = params
+
+    def select(self, table):
+        mask = (table["setup"] == self.setup) & table["metric"].isin(self.metrics)
+        mask &= table["network"].isin(self.benchmarks.values())
+        party_mask = np.zeros(len(table), dtype=bool)
+        for framework, party in self.parties.items():
+            party_mask |= (table["framework"] == framework) & (table["party"] == party)
+        data = table[mask & party_mask].copy()
+        labels = {network: label for label, network in self.benchmarks.items()}
+        data["benchmark"] = data["network"].map(labels)
+        return data.sort_values(["framework", "network", "party", "metric"]).reset_index(drop=True)
+
+    def digest(self, data):
+        """Hash of everything the rendered figure depends on."""
+        h = hashlib.sha256()
+        h.update(self.name.encode())
+        h.update(repr(sorted(self.params.items())).encode())
+        h.update(inspect.getsource(self.render).encode())
+        h.update(data.to_csv(index=False).encode())
+        return h.hexdigest()
+
+
+def _legend_outside(ax, title):
+    ax.legend(title=title, bbox_to_anchor=(1.05, 1), loc="upper left", borderaxespad=0.0)
+
+
+def bars_by_benchmark(data, spec, output):
+    """One group of bars per benchmark, one bar per framework."""
+    import matplotlib.pyplot as plt
+
+    values = data.copy()
+    values["value"] = values["value"] * spec.params.get("scale", 1)
+    pivot = values.pivot_table(index="benchmark", columns="framework", values="value")
+    fig, ax = plt.subplots(figsize=spec.params.get("figsize", (12, 8)))
+    pivot.plot(kind="bar", colormap="viridis", ax=ax, logy=spec.params.get("logy", False))
+    ax.set_xlabel("Benchmarks")
+    ax.set_ylabel(spec.params["ylabel"])
+    ax.set_title(spec.params["title"])
+    plt.xticks(rotation=45, ha="right")
+    _legend_outside(ax, "SNNI Approaches")
+    fig.tight_layout(rect=[0, 0, 0.85, 1])
+    fig.savefig(output, format="jpeg")
+    plt.close(fig)
+
+
+def bars_for_framework(data, spec, output):
+    """Bars per benchmark for a single framework, one bar per metric."""
+    import matplotlib.pyplot as plt
+
+    pivot = data.pivot_table(index="benchmark", columns="metric", values="value")
+    fig, ax = plt.subplots(figsize=(10, 6))
+    pivot.plot(kind="bar", colormap="viridis", ax=ax)
+    ax.set_title(spec.params["title"])
+    ax.set_ylabel(spec.params["ylabel"])
+    plt.xticks(rotation=45, ha="right")
+    _legend_outside(ax, "Metric")
+    fig.tight_layout(rect=[0, 0, 0.85, 1])
+    fig.savefig(output, format="jpeg")
+    plt.close(fig)
+
+
+def correlation_heatmap(data, spec, output):
+    """Correlation of the selected metrics across benchmarks."""
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+
+    pivot = data.pivot_table(index="benchmark", columns="metric", values="value")
+    fig = plt.figure(figsize=(8, 6))
+    sns.heatmap(pivot.corr(), annot=True, cmap="coolwarm", fmt=".2f")
+    plt.title(spec.params["title"])
+    fig.savefig(output, format="jpeg")
+    plt.close(fig)
+
+
+def _framework_specs():
+    specs = []
+    for framework in SERVER:
+        label = framework + ("Party0" if framework == "Porthos" else "")
+        client = {framework: CLIENT[framework]}
+        server = {framework: SERVER[framework]}
+        specs += [
+            FigureSpec(
+                f"{framework}_average_cpu_usage",
+                f"logfiles/{label}_average_cpu_usage_per_benchmark.jpeg",
+                bars_for_framework,
+                ["Average CPU usage (%)"],
+                parties=client,
+                title=f"{framework} - Average CPU Usage for Client in Different Benchmarks",
+                ylabel="Average CPU Usage (%)",
+            ),
+            FigureSpec(
+                f"{framework}_elapsed_wall_time",
+                f"logfiles/{label}_elapsed_wall_time_per_benchmark.jpeg",
+                bars_for_framework,
+                ["Elapsed wall time (s)"],
+                parties=client,
+                title=f"{framework} - Elapsed Wall Time for Client in Different Benchmarks",
+                ylabel="Elapsed Wall Time (s)",
+            ),
+            FigureSpec(
+                f"{framework}_server_metrics_correlation",
+                f"logfiles/{framework}_server_metrics_correlation_heatmap.jpeg",
+                correlation_heatmap,
+                ["Total time taken (ms)", "Average CPU usage (%)", "Estimated energy used (J)"],
+                parties=server,
+                title=f"Correlation Heatmap of Metrics Across Benchmarks ({framework} - Server)",
+            ),
+        ]
+    return specs
+
+
+FIGURES = [
+    FigureSpec(
+        "total_time_taken_server",
+        "logfiles/total_time_taken_server.jpeg",
+        bars_by_benchmark,
+        ["Total time taken (ms)"],
+        title="Total Time Taken Across Benchmarks in Different SNNI Approaches",
+        ylabel="Total Time Taken (ms)",
+        logy=True,
+    ),
+    FigureSpec(
+        "total_comm_server",
+        "logfiles/total_comm_server.jpeg",
+        bars_by_benchmark,
+        ["Total comm (sent+received) (MiB)"],
+        title="Total Communication Across Benchmarks in Different SNNI Approaches",
+        ylabel="Total comm (sent+received) (MiB)",
+        logy=True,
+    ),
+    FigureSpec(
+        "estimated_energy_server_pm",
+        "logfilespm/estimated_energy_used_divided_by_8_across_snni_logscale.jpeg",
+        bars_by_benchmark,
+        ["Estimated energy used (J)"],
+        setup="pm",
+        title="Estimated Energy Used (J) ",
+        ylabel="Estimated Energy Used (J)",
+        scale=1 / 8,
+        logy=True,
+        figsize=(14, 8),
+    ),
+    FigureSpec(
+        "elapsed_wall_time_server_pm",
+        "logfilespm/elapsed_wall_time_comparison_across_setups.jpeg",
+        bars_by_benchmark,
+        ["Elapsed wall time (s)"],
+        setup="pm",
+        title="Elapsed Wall Time Across Benchmarks in Different SNNI Approaches",
+        ylabel="Elapsed Wall Time (s)",
+        logy=True,
+    ),
+] + _framework_specs()
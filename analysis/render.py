@@ -0,0 +1,88 @@
+import argparse
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from analysis.data import CACHE_DIR, REPO_ROOT, load_metrics
+from analysis.figures import FIGURES
+
+
+def _render(spec, data, output):
+    import matplotlib
+
+    matplotlib.use("Agg")
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+    spec.render(data, spec, output)
+    return output
+
+
+def load_manifest(path):
+    if os.path.exists(path):
+        with open(path, "r") as f:
+            return json.load(f)
+    return {}
+
+
+def render_all(specs=FIGURES, root=REPO_ROOT, cache_dir=CACHE_DIR, jobs=None, force=False):
+    """Renders the figures whose input data changed since the last run.
+
+    Returns the names of the figures that were rendered.
+    """
+    table = load_metrics(root, cache_dir)
+    manifest_path = os.path.join(cache_dir, "figures.json")
+    manifest = load_manifest(manifest_path)
+
+    todo = []
+    for spec in specs:
+        data = spec.select(table)
+        output = os.path.join(root, spec.output)
+        if data.empty:
+            print(f"No data for {spec.name}, skipping.")
+            continue
+        digest = spec.digest(data)
+        if not force and manifest.get(spec.name) == digest and os.path.exists(output):
+            continue
+        todo.append((spec, data, output, digest))
+
+    rendered = []
+    if todo:
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            futures = {
+                pool.submit(_render, spec, data, output): (spec, digest)
+                for spec, data, output, digest in todo
+            }
+            for future in as_completed(futures):
+                spec, digest = futures[future]
+                try:
+                    print(f"Rendered {future.result()}")
+                except Exception as e:
+                    print(f"Failed to render {spec.name}: {e}")
+                    continue
+                manifest[spec.name] = digest
+                rendered.append(spec.name)
+
+    os.makedirs(cache_dir, exist_ok=True)
+    with open(manifest_path, "w") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    print(f"{len(rendered)} figure(s) rendered, {len(specs) - len(todo)} skipped (up to date or no data).")
+    return rendered
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Regenerate the SNNI metric figures.")
+    parser.add_argument("--jobs", type=int, default=None, help="Number of worker processes.")
+    parser.add_argument("--force", action="store_true", help="Render all figures.")
+    parser.add_argument("--only", nargs="+", default=None, help="Names of the figures to consider.")
+    parser.add_argument("--list", action="store_true", help="List the figure names and exit.")
+    args = parser.parse_args()
+
+    if args.list:
+        for spec in FIGURES:
+            print(f"{spec.name}: {spec.output}")
+        return
+    specs = FIGURES if args.only is None else [s for s in FIGURES if s.name in args.only]
+    render_all(specs, jobs=args.jobs, force=args.force)
+
+
+if __name__ == "__main__":
+    main()